@@ -0,0 +1,239 @@
+# Copyright 2022 Guillaume Belanger
+# See LICENSE file for licensing details.
+
+"""rfsimulator throughput benchmark of the DU.
+
+Simulated UEs run as nr-uesoftmodem processes in the `ue` container, each in its own network
+namespace so that every UE gets its own `oaitun_ue1` interface. A veth pair links each namespace
+to the pod network namespace, where the rfsimulator server of nr-softmodem listens. Every UE
+pings the traffic target with the same packet size and interval for the duration of the
+benchmark, while the DU's MAC statistics, the CPU time of nr-softmodem and, when CPU measurements
+are enabled, its L1 slot processing times are sampled.
+"""
+
+import re
+from typing import Dict, List, Optional, Tuple
+
+from frequency_planner import FrequencyPlan
+from stats_exporter import UeStats
+
+UE_CONTAINER_NAME = "ue"
+UE_SERVICE_PREFIX = "ue-"
+UE_SOFTMODEM_PATH = "/opt/oai-nr-ue/bin/nr-uesoftmodem"
+UE_TUN_INTERFACE = "oaitun_ue1"
+MAX_UES = 16
+SSB_HALF_SUBCARRIERS = 120
+# Seconds between two samples of the L1 statistics, and between two PDU session checks
+SAMPLING_PERIOD = 1.0
+PERCENTILES = {"p50": 0.5, "p95": 0.95, "p99": 0.99}
+
+# Creates the network namespace of UE `$1`, linked to the pod network namespace by a veth pair.
+# The container isn't privileged, so the TUN device nr-uesoftmodem opens is created when missing.
+NETNS_SCRIPT = """
+[ -c /dev/net/tun ] || { mkdir -p /dev/net && mknod /dev/net/tun c 10 200; }
+ip netns add "ue$1" 2>/dev/null || true
+ip link add "v-ue$1" type veth peer name "v-eth$1" 2>/dev/null || true
+ip link set "v-eth$1" netns "ue$1"
+ip addr replace "10.201.$1.1/24" dev "v-ue$1"
+ip link set "v-ue$1" up
+ip netns exec "ue$1" ip link set lo up
+ip netns exec "ue$1" ip addr replace "10.201.$1.2/24" dev "v-eth$1"
+ip netns exec "ue$1" ip link set "v-eth$1" up
+"""
+
+# Removes the network namespaces of UEs 1 to `$1`
+NETNS_CLEANUP_SCRIPT = """
+for index in $(seq 1 "$1"); do
+  ip link del "v-ue$index" 2>/dev/null
+  ip netns del "ue$index" 2>/dev/null
+done
+true
+"""
+
+# Pings `$3` from UE `$1` with packets of `$4` bytes every `$5` seconds for `$2` seconds
+TRAFFIC_SCRIPT = f"""
+exec ip netns exec "ue$1" ping -q -I {UE_TUN_INTERFACE} -w "$2" -s "$4" -i "$5" "$3"
+"""
+
+# Lines of nrL1_stats.log written when nr-softmodem runs with --cpu-meas
+L1_PROCESSING_PATTERN = re.compile(
+    r"^(?P<name>L1 (?:Tx|Rx) processing)[^:]*:\s*(?P<average>[\d.]+) us;\s*(?P<trials>\d+);",
+    re.MULTILINE,
+)
+PING_PATTERN = re.compile(
+    r"(?P<transmitted>\d+) packets transmitted, (?P<received>\d+) (?:packets )?received"
+)
+
+
+class BenchmarkError(Exception):
+    """Raised when the benchmark parameters are invalid or the benchmark can't run."""
+
+
+def ue_imsis(imsi_base: str, count: int) -> List[str]:
+    """Returns the IMSI of each UE, incremented from the first one.
+
+    Args:
+        imsi_base: IMSI of the first UE.
+        count: Number of UEs.
+
+    Returns:
+        list: IMSIs, with the length of the first one.
+    """
+    if not imsi_base.isdigit() or not 6 <= len(imsi_base) <= 15:
+        raise BenchmarkError(f"IMSI must be 6 to 15 digits, got '{imsi_base}'")
+    first = int(imsi_base)
+    if len(str(first + count - 1)) > len(imsi_base):
+        raise BenchmarkError(f"IMSIs of {count} UEs overflow from {imsi_base}")
+    return [str(first + index).zfill(len(imsi_base)) for index in range(count)]
+
+
+def ue_command(
+    index: int,
+    frequency_plan: FrequencyPlan,
+    imsi: str,
+    key: str,
+    opc: str,
+    dnn: str,
+    sst: int,
+) -> str:
+    """Returns the command running a simulated UE camping on the DU cell.
+
+    Args:
+        index: UE index, from 1, naming its network namespace.
+        frequency_plan: Frequency plan of the cell.
+        imsi: IMSI of the UE.
+        key: Subscriber key.
+        opc: Operator key.
+        dnn: Data network name of the PDU session.
+        sst: Slice/Service Type of the PDU session.
+
+    Returns:
+        str: Command line.
+    """
+    ssb_start = (
+        frequency_plan.ssb_frequency_khz - frequency_plan.point_a_khz
+    ) // frequency_plan.scs_khz - SSB_HALF_SUBCARRIERS
+    return (
+        f"ip netns exec ue{index} {UE_SOFTMODEM_PATH} --sa --rfsim"
+        f" --rfsimulator.serveraddr 10.201.{index}.1"
+        f" -r {frequency_plan.n_rb} --numerology {frequency_plan.numerology}"
+        f" --band {frequency_plan.band} -C {frequency_plan.ssb_frequency_khz * 1000}"
+        f" --ssb {ssb_start} --uicc0.imsi {imsi} --uicc0.key {key} --uicc0.opc {opc}"
+        f" --uicc0.dnn {dnn} --uicc0.nssai_sst {sst}"
+    )
+
+
+def parse_l1_processing(text: str) -> Dict[str, Tuple[float, int]]:
+    """Parses the L1 processing times of nrL1_stats.log.
+
+    Args:
+        text: Content of nrL1_stats.log.
+
+    Returns:
+        dict: Total processing time in microseconds and number of slots, keyed by `tx` or `rx`.
+    """
+    processing = {}
+    for match in L1_PROCESSING_PATTERN.finditer(text):
+        direction = match.group("name").split()[1].lower()
+        trials = int(match.group("trials"))
+        processing[direction] = (float(match.group("average")) * trials, trials)
+    return processing
+
+
+def interval_means(snapshots: List[Dict[str, Tuple[float, int]]], direction: str) -> List[float]:
+    """Returns the mean slot processing time of each interval between two snapshots.
+
+    Args:
+        snapshots: L1 processing times, in sampling order.
+        direction: `tx` or `rx`.
+
+    Returns:
+        list: Mean processing time in microseconds of each interval with processed slots.
+    """
+    means = []
+    samples = [snapshot[direction] for snapshot in snapshots if direction in snapshot]
+    for (previous_total, previous_trials), (total, trials) in zip(samples, samples[1:]):
+        if trials > previous_trials:
+            means.append((total - previous_total) / (trials - previous_trials))
+    return means
+
+
+def summarize(values: List[float]) -> Optional[Dict[str, float]]:
+    """Returns the percentiles and maximum of values, None when there is none.
+
+    Args:
+        values: Values.
+
+    Returns:
+        dict: Nearest rank percentiles and maximum, rounded to 3 decimals.
+    """
+    if not values:
+        return None
+    ordered = sorted(values)
+    summary = {
+        name: round(ordered[min(len(ordered) - 1, int(fraction * len(ordered)))], 3)
+        for name, fraction in PERCENTILES.items()
+    }
+    summary["max"] = round(ordered[-1], 3)
+    return summary
+
+
+def ue_throughputs(
+    before: Dict[str, UeStats], after: Dict[str, UeStats], seconds: float
+) -> Dict[str, Dict[str, float]]:
+    """Returns the MAC throughput of each UE served during the benchmark.
+
+    Args:
+        before: MAC statistics when the benchmark started, keyed by RNTI.
+        after: MAC statistics when the benchmark ended, keyed by RNTI.
+        seconds: Duration of the benchmark.
+
+    Returns:
+        dict: Downlink and uplink throughput in Mbit/s, keyed by RNTI.
+    """
+    throughputs = {}
+    for rnti, ue in after.items():
+        previous = before.get(rnti, UeStats(rnti=rnti))
+        throughputs[rnti] = {
+            "dl-mbps": _mbps(ue.mac_tx_bytes - previous.mac_tx_bytes, seconds),
+            "ul-mbps": _mbps(ue.mac_rx_bytes - previous.mac_rx_bytes, seconds),
+        }
+    return throughputs
+
+
+def _mbps(byte_count: int, seconds: float) -> float:
+    # Counters restart from 0 when a UE reconnects with the same RNTI
+    return round(max(byte_count, 0) * 8 / seconds / 1e6, 3)
+
+
+def parse_ping_summary(output: str) -> Dict[str, int]:
+    """Returns the packets transmitted and received by ping.
+
+    Args:
+        output: Output of `ping -q`.
+
+    Returns:
+        dict: Number of packets transmitted and received, 0 when ping didn't report them.
+    """
+    match = PING_PATTERN.search(output)
+    if not match:
+        return {"transmitted": 0, "received": 0}
+    return {
+        "transmitted": int(match.group("transmitted")),
+        "received": int(match.group("received")),
+    }
+
+
+def aggregate_throughput(throughputs: Dict[str, Dict[str, float]]) -> Dict[str, float]:
+    """Returns the sum of the UE throughputs.
+
+    Args:
+        throughputs: Downlink and uplink throughput of each UE.
+
+    Returns:
+        dict: Downlink and uplink throughput in Mbit/s.
+    """
+    return {
+        direction: round(sum(ue[direction] for ue in throughputs.values()), 3)
+        for direction in ("dl-mbps", "ul-mbps")
+    }
@@ -0,0 +1,219 @@
+# Copyright 2022 Guillaume Belanger
+# See LICENSE file for licensing details.
+
+"""Physical Cell ID and NR Cell ID planning across DU cells."""
+
+import logging
+from dataclasses import dataclass
+from typing import Dict, Iterable, List, Optional, Set
+
+logger = logging.getLogger(__name__)
+
+PCI_COUNT = 1008
+NR_CELL_ID_MAX = 2**36 - 1
+
+
+class CellPlanningError(Exception):
+    """Raised when no valid cell identity plan can be computed."""
+
+
+@dataclass(frozen=True)
+class CellIdentity:
+    """Radio identity of a single cell."""
+
+    pci: int
+    nr_cell_id: int
+
+    def to_dict(self) -> dict:
+        """Returns a JSON serializable representation of the identity."""
+        return {"pci": self.pci, "nr_cell_id": self.nr_cell_id}
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "CellIdentity":
+        """Builds an identity from its JSON representation."""
+        return cls(pci=int(data["pci"]), nr_cell_id=int(data["nr_cell_id"]))
+
+
+def parse_neighbours(value: str) -> Dict[str, Set[str]]:
+    """Parses a neighbour specification.
+
+    The specification is a semicolon separated list of `<cell>:<cell>,<cell>` entries,
+    for example `0:1,2;1:2`. Relations are symmetric.
+
+    Args:
+        value: Neighbour specification.
+
+    Returns:
+        dict: Neighbours of each cell.
+    """
+    neighbours: Dict[str, Set[str]] = {}
+    for entry in value.split(";"):
+        entry = entry.strip()
+        if not entry:
+            continue
+        if ":" not in entry:
+            raise ValueError(f"Invalid neighbour entry: {entry}")
+        cell, others = entry.split(":", 1)
+        cell = cell.strip()
+        for other in others.split(","):
+            other = other.strip()
+            if not other or other == cell:
+                continue
+            neighbours.setdefault(cell, set()).add(other)
+            neighbours.setdefault(other, set()).add(cell)
+    return neighbours
+
+
+def plan_cells(
+    cells: Iterable[str],
+    neighbours: Optional[Dict[str, Set[str]]] = None,
+    current: Optional[Dict[str, CellIdentity]] = None,
+    reserved_pcis: Iterable[int] = (),
+    nr_cell_id_base: int = 0,
+) -> Dict[str, CellIdentity]:
+    """Assigns a PCI and an NR Cell ID to every cell.
+
+    PCIs are allocated with a greedy graph colouring (DSATUR). Two cells that are neighbours, or
+    that share a neighbour, never get the same PCI (collision and confusion free). Among the
+    remaining candidates, PCIs whose mod-3 and mod-30 values clash with direct neighbours are
+    avoided whenever possible. Cells keep their current identity when it is still valid, so that
+    adding cells only changes the new ones.
+
+    Args:
+        cells: Cells to plan.
+        neighbours: Neighbours of each cell. When None, every cell neighbours every other cell.
+        current: Identities currently in use.
+        reserved_pcis: PCIs used by cells outside of the plan.
+        nr_cell_id_base: First NR Cell ID to allocate.
+
+    Returns:
+        dict: Identity of each cell.
+    """
+    cell_list = sorted(set(cells))
+    current = {cell: identity for cell, identity in (current or {}).items() if cell in cell_list}
+    graph = _build_graph(cell_list, neighbours)
+    pcis = _plan_pcis(cell_list, graph, current, set(reserved_pcis))
+    nr_cell_ids = _plan_nr_cell_ids(cell_list, current, nr_cell_id_base)
+    return {cell: CellIdentity(pci=pcis[cell], nr_cell_id=nr_cell_ids[cell]) for cell in cell_list}
+
+
+def _build_graph(
+    cells: List[str], neighbours: Optional[Dict[str, Set[str]]]
+) -> Dict[str, Set[str]]:
+    if neighbours is None:
+        return {cell: set(cells) - {cell} for cell in cells}
+    graph: Dict[str, Set[str]] = {cell: set() for cell in cells}
+    for cell, others in neighbours.items():
+        if cell not in graph:
+            continue
+        for other in others:
+            if other in graph and other != cell:
+                graph[cell].add(other)
+                graph[other].add(cell)
+    return graph
+
+
+def _conflicting_cells(graph: Dict[str, Set[str]]) -> Dict[str, Set[str]]:
+    """Returns, for each cell, the cells that must not share its PCI."""
+    conflicts = {}
+    for cell, first_tier in graph.items():
+        second_tier: Set[str] = set()
+        for neighbour in first_tier:
+            second_tier |= graph[neighbour]
+        conflicts[cell] = (first_tier | second_tier) - {cell}
+    return conflicts
+
+
+def _plan_pcis(
+    cells: List[str],
+    graph: Dict[str, Set[str]],
+    current: Dict[str, CellIdentity],
+    reserved_pcis: Set[int],
+) -> Dict[str, int]:
+    conflicts = _conflicting_cells(graph)
+    assigned: Dict[str, int] = {}
+    for cell in cells:
+        if cell not in current:
+            continue
+        pci = current[cell].pci
+        if not 0 <= pci < PCI_COUNT or pci in reserved_pcis:
+            continue
+        if any(assigned.get(other) == pci for other in conflicts[cell]):
+            continue
+        assigned[cell] = pci
+
+    unassigned = [cell for cell in cells if cell not in assigned]
+    if unassigned:
+        logger.info("Allocating PCIs for cells: %s", ", ".join(unassigned))
+    order = {cell: index for index, cell in enumerate(cells)}
+    saturation = {
+        cell: {assigned[other] for other in conflicts[cell] if other in assigned}
+        for cell in unassigned
+    }
+    while unassigned:
+        cell = max(
+            unassigned,
+            key=lambda c: (len(saturation[c]), len(conflicts[c]), -order[c]),
+        )
+        pci = _select_pci(cell, graph, saturation[cell], assigned, reserved_pcis)
+        assigned[cell] = pci
+        unassigned.remove(cell)
+        for other in conflicts[cell]:
+            if other in saturation:
+                saturation[other].add(pci)
+    return assigned
+
+
+def _select_pci(
+    cell: str,
+    graph: Dict[str, Set[str]],
+    conflicting_pcis: Set[int],
+    assigned: Dict[str, int],
+    reserved_pcis: Set[int],
+) -> int:
+    forbidden = reserved_pcis | conflicting_pcis
+    mod3_usage = [0] * 3
+    mod30_usage = [0] * 30
+    for neighbour in graph[cell]:
+        if neighbour in assigned:
+            mod3_usage[assigned[neighbour] % 3] += 1
+            mod30_usage[assigned[neighbour] % 30] += 1
+    best_pci = None
+    best_cost = None
+    for pci in range(PCI_COUNT):
+        if pci in forbidden:
+            continue
+        cost = (mod3_usage[pci % 3], mod30_usage[pci % 30])
+        if best_cost is None or cost < best_cost:
+            best_pci, best_cost = pci, cost
+            if cost == (0, 0):
+                break
+    if best_pci is None:
+        raise CellPlanningError(f"No PCI left for cell {cell}")
+    return best_pci
+
+
+def _plan_nr_cell_ids(
+    cells: List[str], current: Dict[str, CellIdentity], nr_cell_id_base: int
+) -> Dict[str, int]:
+    allocated: Dict[str, int] = {}
+    used: Set[int] = set()
+    for cell in cells:
+        if cell not in current:
+            continue
+        nr_cell_id = current[cell].nr_cell_id
+        if nr_cell_id < nr_cell_id_base or nr_cell_id > NR_CELL_ID_MAX or nr_cell_id in used:
+            continue
+        allocated[cell] = nr_cell_id
+        used.add(nr_cell_id)
+    candidate = nr_cell_id_base
+    for cell in cells:
+        if cell in allocated:
+            continue
+        while candidate in used:
+            candidate += 1
+        if candidate > NR_CELL_ID_MAX:
+            raise CellPlanningError("NR Cell ID space exhausted")
+        allocated[cell] = candidate
+        used.add(candidate)
+    return allocated
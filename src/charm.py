@@ -5,87 +5,1510 @@
 """Charmed Operator for the OpenAirInterface 5G Core DU component."""
 
 
+import asyncio
+import json
 import logging
+import time
+from collections import deque
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Dict, List, NamedTuple, Optional, Tuple, cast
+from urllib.request import urlopen
 
+import yaml
 from charms.oai_5g_cu.v0.fiveg_f1 import FiveGF1Requires  # type: ignore[import]
-from charms.observability_libs.v1.kubernetes_service_patch import (  # type: ignore[import]
-    KubernetesServicePatch,
-    ServicePort,
+from lightkube.models.core_v1 import ServicePort
+from ops.charm import (
+    ActionEvent,
+    CharmBase,
+    ConfigChangedEvent,
+    InstallEvent,
+    RelationJoinedEvent,
 )
-from jinja2 import Environment, FileSystemLoader
-from ops.charm import CharmBase, ConfigChangedEvent, InstallEvent, RelationJoinedEvent
+from ops.framework import EventBase, StoredState
 from ops.main import main
-from ops.model import ActiveStatus, BlockedStatus, WaitingStatus
+from ops.model import ActiveStatus, BlockedStatus, StatusBase, WaitingStatus
+from ops.pebble import ChangeError, CheckStatus, ExecError, LayerDict, PathError
 
-from kubernetes import Kubernetes
+from benchmark import (
+    NETNS_CLEANUP_SCRIPT,
+    NETNS_SCRIPT,
+    SAMPLING_PERIOD,
+    TRAFFIC_SCRIPT,
+    UE_CONTAINER_NAME,
+    UE_SERVICE_PREFIX,
+    UE_TUN_INTERFACE,
+    BenchmarkError,
+    aggregate_throughput,
+    interval_means,
+    parse_l1_processing,
+    parse_ping_summary,
+    summarize,
+    ue_command,
+    ue_imsis,
+    ue_throughputs,
+)
+from cell_planner import CellIdentity, CellPlanningError, parse_neighbours, plan_cells
+from config_delivery import (
+    CONFIG_DELIVERY_CONFIG_MAP,
+    CONFIG_MAP_MOUNT_PATH,
+    SWAP_SCRIPT,
+    ConfigDeliveryError,
+    config_hash,
+    config_map_key,
+    stale_config_map_keys,
+    validate_config_delivery,
+)
+from config_diff import HOT, HOT_SECTIONS, RESTART, classify_changes
+from config_history import crash_loop_cause, last_good_config, record_good_config
+from f1_network import (
+    F1_INTERFACE_NAME,
+    MULTUS_NETWORKS_ANNOTATION,
+    F1NetworkError,
+    get_interface_ipv4_address,
+    get_interface_name_for_address,
+    multus_networks_annotation,
+    network_attachment_config,
+)
+from frequency_planner import FrequencyPlan, FrequencyPlanError, plan_frequencies
+from gnb_config import (
+    L1,
+    Gnb,
+    GnbConfig,
+    GnbConfigError,
+    MacRlc,
+    PdcchConfigSib1,
+    Plmn,
+    RfSimulator,
+    Ru,
+    Sctp,
+    ServingCellConfigCommon,
+    Snssai,
+    ThreadStruct,
+    apply_overrides,
+    parse_int,
+)
+from health_checks import pebble_checks, restart_on_failure
+from host_network import HostPortCollisionError, find_port_collisions
+from iq_recorder import (
+    IQ_DIR,
+    IQ_FIFO_PATH,
+    IQ_MODE_OFF,
+    IQ_MODE_RECORD,
+    IQ_MODE_REPLAY,
+    IQ_RECORDING_SUFFIX,
+    IQ_RECORDINGS_DIR,
+    IQ_RECORDINGS_KEPT,
+    IqRecorderError,
+    iq_volume_size_mb,
+    validate_iq_settings,
+)
+from kubernetes import (
+    AsyncKubernetes,
+    Kubernetes,
+    apply_statefulset_patch,
+    is_statefulset_patched,
+)
+from libconfig import Int64
+from log_writer import (
+    LOG_DIR,
+    LOG_FIFO_PATH,
+    LOG_FILE_PATH,
+    MAX_BACKUPS,
+    LogWriterError,
+    log_volume_size_mb,
+    rotated_path,
+    validate_log_settings,
+)
+from metrics_endpoint import MetricsEndpointProvider
+from mimo import AntennaConfig, MimoConfigError
+from node_placement import (
+    NodeInfo,
+    NodePlacementError,
+    NoSuitableNodeError,
+    Toleration,
+    check_placement,
+    parse_node_selector,
+    parse_tolerations,
+)
+from performance_profile import (
+    PerformanceProfileError,
+    get_performance_parameters,
+    parse_overrides,
+)
+from rolling_restart import (
+    RESTART_GRANTS_KEY,
+    RESTART_REQUEST_KEY,
+    SERVING_KEY,
+    Grant,
+    RollingRestartError,
+    grant_restarts,
+    grants_from_json,
+    grants_to_json,
+    validate_rolling_restart,
+)
+from service_patch import ServicePatch
+from softmodem_telnet import TELNET_PORT, SoftmodemTelnet, SoftmodemTelnetError
+from stats_exporter import (
+    KPIS_PATH,
+    L1_STATS_FILE,
+    MAC_STATS_FILE,
+    METRICS_PATH,
+    METRICS_PORT,
+    UeStats,
+    parse_mac_stats,
+)
+from sysctls import (
+    SysctlError,
+    normalize_value,
+    parse_sysctls,
+    split_sysctls,
+    sysctl_path,
+)
+from tdd_pattern import TddPattern, TddPatternError, get_tdd_pattern
+from thread_stats import (
+    PROCESS_NOT_FOUND_EXIT_CODE,
+    SAMPLER_SCRIPT,
+    ThreadStatsError,
+    compute_thread_stats,
+    format_table,
+    parse_sampler_output,
+)
+from workload_ports import PortConfigError, WorkloadPort, validate_ports
 
 logger = logging.getLogger(__name__)
 
 BASE_CONFIG_PATH = "/opt/oai-gnb/etc"
 CONFIG_FILE_NAME = "gnb.conf"
+# nr-softmodem writes its statistics files in its working directory
+STATS_DIR = "/opt/oai-gnb"
+STATS_EXPORTER_SERVICE_NAME = "stats-exporter"
+STATS_EXPORTER_DIR = "/opt/oai-gnb/exporter"
+# Scripts run in the workload container, the exporter and the log writer importing the thread
+# statistics and log analyzer modules
+WORKLOAD_SCRIPTS = (
+    "stats_exporter.py",
+    "thread_stats.py",
+    "log_analyzer.py",
+    "iq_recorder.py",
+    "log_writer.py",
+)
+IQ_RECORDER_PATH = f"{STATS_EXPORTER_DIR}/iq_recorder.py"
+IQ_RECORDER_SERVICE_NAME = "iq-recorder"
+IQ_REPLAY_SERVICE_NAME = "iq-replay"
+LOG_WRITER_PATH = f"{STATS_EXPORTER_DIR}/log_writer.py"
+LOG_WRITER_SERVICE_NAME = "log-writer"
+# Pebble API socket, as seen from the workload container
+WORKLOAD_PEBBLE_SOCKET_PATH = "/charm/container/pebble.socket"
+KPIS_TIMEOUT_SECONDS = 5
+# The kubelet projects ConfigMap updates within its sync period, usually under a minute
+CONFIG_MAP_POLL_ATTEMPTS = 10
+CONFIG_MAP_POLL_INTERVAL_SECONDS = 1
+PEER_RELATION_NAME = "replicas"
+GNB_PARAMETER_ERRORS = (
+    FrequencyPlanError,
+    TddPatternError,
+    MimoConfigError,
+    PerformanceProfileError,
+    GnbConfigError,
+    F1NetworkError,
+    SysctlError,
+    PortConfigError,
+    ConfigDeliveryError,
+    IqRecorderError,
+    RollingRestartError,
+    NodePlacementError,
+    LogWriterError,
+)
+CELL_PLAN_KEY = "cell-plan"
+SYSCTLS_SECTION = "sysctls"
+IQ_SECTION = "rfsim-iq"
+COMMAND_SECTION = "command"
+
+
+class GnbParameters(NamedTuple):
+    """Validated gNB parameters derived from the charm configuration."""
+
+    frequency_plan: FrequencyPlan
+    tdd_pattern: TddPattern
+    antenna_config: AntennaConfig
+    performance: Dict[str, int]
+    overrides: Dict[str, Any]
+    f1_network: Optional[Dict[str, Any]]
+    sysctls: Dict[str, str]
 
 
 class Oai5GDUOperatorCharm(CharmBase):
     """Charm the service."""
 
+    _stored = StoredState()
+
     def __init__(self, *args):
         """Observes juju events."""
         super().__init__(*args)
+        self._stored.set_default(
+            config_sections={},
+            config_changes={},
+            good_configs=[],
+            last_rollback={},
+            sysctl_mismatches=[],
+            applied_config="",
+            f1_network_attachment_applied=False,
+        )
         self._container_name = self._service_name = "du"
         self._container = self.unit.get_container(self._container_name)
-        self.service_patcher = KubernetesServicePatch(
-            service_type="LoadBalancer",
-            charm=self,
-            ports=[
-                ServicePort(
-                    name="s1c",
-                    port=int(self._config_gnb_s1c_port),
-                    protocol="SCTP",
-                    targetPort=int(self._config_gnb_s1c_port),
-                ),
-                ServicePort(
-                    name="s1u",
-                    port=int(self._config_gnb_s1u_port),
-                    protocol="UDP",
-                    targetPort=int(self._config_gnb_s1u_port),
-                ),
-                ServicePort(
-                    name="x2c",
-                    port=int(self._config_gnb_x2c_port),
-                    protocol="UDP",
-                    targetPort=int(self._config_gnb_x2c_port),
-                ),
-                ServicePort(
-                    name="f1",
-                    port=int(self._config_f1_du_port),
-                    protocol="UDP",
-                    targetPort=int(self._config_f1_du_port),
-                ),
-            ],
-        )
-        self.f1_requires = FiveGF1Requires(self, "fiveg-f1")
+        self._ue_container = self.unit.get_container(UE_CONTAINER_NAME)
         self.kubernetes = Kubernetes(namespace=self.model.name)
         self.framework.observe(self.on.install, self._on_install)
+        self.service_patcher: Optional[ServicePatch] = None
+        # The pod is reached on the node address in host networking mode
+        if not self._config_host_network:
+            self.service_patcher = ServicePatch(
+                service_type="LoadBalancer",
+                charm=self,
+                ports=[
+                    ServicePort(
+                        name=workload_port.name,
+                        port=workload_port.port,
+                        protocol=workload_port.protocol,
+                        targetPort=workload_port.port,
+                    )
+                    for workload_port in self._workload_ports
+                ],
+                refresh_event=self.on.config_changed,
+            )
+        self.f1_requires = FiveGF1Requires(self, "fiveg-f1")
+        # The unit address changes with the pod and with host networking
+        self.metrics_endpoint = MetricsEndpointProvider(
+            self,
+            jobs=[
+                {
+                    "metrics_path": METRICS_PATH,
+                    "static_configs": [{"targets": [f"*:{METRICS_PORT}"]}],
+                }
+            ],
+            refresh_event=[self.on.du_pebble_ready, self.on.config_changed],
+        )
+        self.framework.observe(self.framework.on.commit, self._on_commit)
         self.framework.observe(self.on.config_changed, self._on_config_changed)
         self.framework.observe(self.on.fiveg_f1_relation_changed, self._on_config_changed)
         self.framework.observe(self.on.fiveg_f1_relation_joined, self._on_f1_relation_joined)
+        self.framework.observe(self.on.leader_elected, self._on_config_changed)
+        self.framework.observe(self.on.update_status, self._on_update_status)
+        self.framework.observe(self.on.du_pebble_check_failed, self._on_update_status)
+        self.framework.observe(self.on.du_pebble_check_recovered, self._on_update_status)
+        self.framework.observe(self.on.replicas_relation_joined, self._on_config_changed)
+        self.framework.observe(self.on.replicas_relation_changed, self._on_config_changed)
+        self.framework.observe(self.on.replicas_relation_departed, self._on_config_changed)
+        self.framework.observe(self.on.get_tdd_pattern_action, self._on_get_tdd_pattern_action)
+        self.framework.observe(
+            self.on.get_config_changes_action, self._on_get_config_changes_action
+        )
+        self.framework.observe(self.on.get_sysctls_action, self._on_get_sysctls_action)
+        self.framework.observe(self.on.thread_stats_action, self._on_thread_stats_action)
+        self.framework.observe(self.on.get_kpis_action, self._on_get_kpis_action)
+        self.framework.observe(
+            self.on.get_config_history_action, self._on_get_config_history_action
+        )
+        self.framework.observe(self.on.get_iq_recording_action, self._on_get_iq_recording_action)
+        self.framework.observe(self.on.benchmark_action, self._on_benchmark_action)
+        self.framework.observe(self.on.get_logs_action, self._on_get_logs_action)
+
+    def _on_f1_relation_joined(self, event: RelationJoinedEvent) -> None:
+        if not self.unit.is_leader():
+            return
+        du_f1_address = self._du_f1_address
+        if not du_f1_address:
+            raise Exception("DU doesn't have an F1 IP address")
+        self.f1_requires.set_du_information(
+            du_address=du_f1_address,
+            du_port=self._config_f1_du_port,
+            relation_id=event.relation.id,
+        )
+
+    def _on_commit(self, _: EventBase) -> None:
+        """Logs the Kubernetes API calls retried during the hook.
+
+        Returns:
+            None
+        """
+        retries = self.kubernetes.retrier.retries
+        if retries:
+            logger.info("Kubernetes API calls retried %d times in this hook", retries)
+
+    def _on_install(self, event: InstallEvent) -> None:
+        """Triggered on install event.
+
+        Args:
+            event: Juju event
+
+        Returns:
+            None
+        """
+        try:
+            asyncio.run(self._reconcile_on_install())
+        except HostPortCollisionError as e:
+            self.unit.status = BlockedStatus(f"Host network port collision: {e}")
+        except NoSuitableNodeError as e:
+            self.unit.status = BlockedStatus(f"No suitable node: {e}")
+        except (
+            SysctlError,
+            ConfigDeliveryError,
+            IqRecorderError,
+            NodePlacementError,
+            LogWriterError,
+        ) as e:
+            self.unit.status = BlockedStatus(f"Invalid configuration: {e}")
+
+    async def _reconcile_on_install(self) -> None:
+        """Patches the Service and the statefulset concurrently.
+
+        They are independent, so install takes about as long as the slowest of them rather than
+        their sum.
+
+        Returns:
+            None
+        """
+        statefulset_patch = self._statefulset_patch
+        kubernetes = AsyncKubernetes(namespace=self.model.name, retrier=self.kubernetes.retrier)
+        operations = [self._patch_statefulset_async(kubernetes, statefulset_patch)]
+        if self.service_patcher:
+            operations.append(self.service_patcher.reconcile_async(kubernetes))
+        try:
+            results = await asyncio.gather(*operations, return_exceptions=True)
+        finally:
+            await kubernetes.close()
+        for result in results:
+            if isinstance(result, BaseException):
+                raise result
+
+    async def _patch_statefulset_async(
+        self, kubernetes: AsyncKubernetes, statefulset_patch: Dict[str, Any]
+    ) -> None:
+        """Patches the statefulset unless it is already patched, fetching it once.
+
+        Args:
+            kubernetes: Asynchronous Kubernetes client.
+            statefulset_patch: Pod settings the statefulset is patched with.
+
+        Returns:
+            None
+        """
+        statefulset = await kubernetes.get_statefulset(self.app.name)
+        if is_statefulset_patched(statefulset, **statefulset_patch):
+            return
+        if self._config_host_network:
+            node_name = await kubernetes.get_pod_node_name(self._pod_name)
+            ports_in_use = (
+                await kubernetes.get_host_ports_in_use(
+                    node_name=node_name, exclude_app=self.app.name
+                )
+                if node_name
+                else {}
+            )
+            self._raise_on_port_collisions(ports_in_use)
+        if self._placement_restricted:
+            self._check_placement(await kubernetes.get_nodes())
+        apply_statefulset_patch(statefulset, **statefulset_patch)
+        await kubernetes.patch_statefulset(self.app.name, statefulset)
+
+    def _patch_statefulset(self) -> None:
+        """Patches the statefulset unless it is already patched.
+
+        In host networking mode, the ports of the DU are checked against the ports already used
+        on the node before the pod is rolled out. Nodes are checked to fit the placement of the
+        pods when it is restricted.
+
+        Returns:
+            None
+        """
+        statefulset_patch = self._statefulset_patch
+        if self.kubernetes.statefulset_is_patched(
+            statefulset_name=self.app.name, **statefulset_patch
+        ):
+            return
+        if self._config_host_network:
+            self._check_host_ports()
+        if self._placement_restricted:
+            self._check_placement(self.kubernetes.get_nodes())
+        self.kubernetes.patch_statefulset(statefulset_name=self.app.name, **statefulset_patch)
+
+    @property
+    def _statefulset_patch(self) -> Dict[str, Any]:
+        """Returns the pod settings the statefulset is patched with."""
+        pod_sysctls, _ = split_sysctls(self._config_sysctls)
+        validate_config_delivery(self._config_delivery)
+        self._validate_iq_settings()
+        self._validate_log_settings()
+        return {
+            "pod_annotations": self._pod_annotations,
+            "host_network": self._config_host_network,
+            "pod_sysctls": pod_sysctls,
+            "config_map_name": self._config_map_name if self._config_map_enabled else None,
+            "config_map_mount_path": CONFIG_MAP_MOUNT_PATH,
+            "iq_volume_size": f"{iq_volume_size_mb(self._config_iq_ring_size_mb)}Mi"
+            if self._config_iq_mode != IQ_MODE_OFF
+            else None,
+            "iq_volume_mount_path": IQ_DIR,
+            "log_volume_size": self._log_volume_size,
+            "log_volume_mount_path": LOG_DIR,
+            "node_selector": self._config_node_selector,
+            "tolerations": [toleration.to_dict() for toleration in self._config_tolerations],
+            "spread_across_nodes": self._config_spread_across_nodes,
+        }
+
+    @property
+    def _placement_restricted(self) -> bool:
+        """Returns whether the DU pods can only run on some nodes."""
+        return bool(self._config_node_selector) or self._config_spread_across_nodes
+
+    def _check_placement(self, nodes: List[NodeInfo]) -> None:
+        """Raises NoSuitableNodeError when the nodes can't run every DU pod.
+
+        Args:
+            nodes: Nodes of the cluster.
+
+        Returns:
+            None
+        """
+        check_placement(
+            nodes=nodes,
+            node_selector=self._config_node_selector,
+            tolerations=self._config_tolerations,
+            spread_across_nodes=self._config_spread_across_nodes,
+            units=self.app.planned_units(),
+        )
+
+    def _check_host_ports(self) -> None:
+        """Raises HostPortCollisionError when a DU port is already used on the node.
+
+        Returns:
+            None
+        """
+        node_name = self.kubernetes.get_pod_node_name(self._pod_name)
+        ports_in_use = (
+            self.kubernetes.get_host_ports_in_use(node_name=node_name, exclude_app=self.app.name)
+            if node_name
+            else {}
+        )
+        self._raise_on_port_collisions(ports_in_use)
+
+    def _raise_on_port_collisions(self, ports_in_use: Dict[Tuple[int, str], str]) -> None:
+        """Raises HostPortCollisionError when a DU port is in use on the node.
+
+        Args:
+            ports_in_use: `namespace/pod` using each (port, protocol) on the node.
+
+        Returns:
+            None
+        """
+        collisions = find_port_collisions(self._host_ports, ports_in_use)
+        if collisions:
+            raise HostPortCollisionError(", ".join(collisions))
+
+    def _reconcile_f1_network(self, f1_network: Optional[Dict[str, Any]]) -> None:
+        """Creates, updates or deletes the F1 NetworkAttachmentDefinition and attaches it.
+
+        The NetworkAttachmentDefinition is only deleted when this unit applied it, so that
+        deployments without a Multus F1 network don't need access to the resource.
+
+        Args:
+            f1_network: CNI configuration of the F1 network, None when it is disabled.
+
+        Returns:
+            None
+        """
+        if f1_network:
+            self.kubernetes.apply_network_attachment_definition(
+                name=self._f1_network_attachment_name, config=f1_network
+            )
+            self._stored.f1_network_attachment_applied = True
+        elif self._stored.f1_network_attachment_applied:
+            self.kubernetes.delete_network_attachment_definition(
+                name=self._f1_network_attachment_name
+            )
+            self._stored.f1_network_attachment_applied = False
+        self._patch_statefulset()
+
+    def _reconcile_as_leader(self, gnb_parameters: GnbParameters) -> Optional[StatusBase]:
+        """Updates the cell plan and the application's Kubernetes resources.
+
+        Args:
+            gnb_parameters: Validated gNB parameters.
+
+        Returns:
+            StatusBase: Blocked status when reconciliation failed, None otherwise.
+        """
+        try:
+            self._update_cell_plan()
+        except (ValueError, CellPlanningError) as e:
+            return BlockedStatus(f"Invalid cell planning configuration: {e}")
+        self._grant_restarts()
+        try:
+            self._reconcile_f1_network(gnb_parameters.f1_network)
+        except HostPortCollisionError as e:
+            return BlockedStatus(f"Host network port collision: {e}")
+        except NoSuitableNodeError as e:
+            return BlockedStatus(f"No suitable node: {e}")
+        return None
+
+    def _on_config_changed(self, event: ConfigChangedEvent) -> None:
+        """Triggered on any change in configuration.
+
+        Args:
+            event: Config Changed Event
+
+        Returns:
+            None
+        """
+        # Cleared until the configuration is applied, for the status to be kept until then
+        self._stored.applied_config = ""
+        try:
+            gnb_parameters = self._gnb_parameters
+        except GNB_PARAMETER_ERRORS as e:
+            self.unit.status = BlockedStatus(f"Invalid configuration: {e}")
+            return
+        if self.unit.is_leader():
+            blocked_status = self._reconcile_as_leader(gnb_parameters)
+            if blocked_status:
+                self.unit.status = blocked_status
+                return
+        if not self._container.can_connect():
+            self.unit.status = WaitingStatus("Waiting for Pebble in workload container")
+            event.defer()
+            return
+        if not self._f1_relation_created:
+            self.unit.status = BlockedStatus("Waiting for relation to CU to be created")
+            return
+        if not self.f1_requires.cu_address_available:
+            self.unit.status = WaitingStatus(
+                "Waiting for CU IPv4 address to be available in relation data"
+            )
+            return
+        if not self._cell_identity:
+            self.unit.status = WaitingStatus("Waiting for cell identity to be allocated")
+            return
+        self._configure_workload(gnb_parameters, event)
+
+    def _configure_workload(self, gnb_parameters: GnbParameters, event: EventBase) -> None:
+        """Pushes the gNB configuration and (re)starts the workload.
+
+        A configuration that made nr-softmodem crash loop is rolled back to the last known good
+        one, and is not applied again.
+
+        Args:
+            gnb_parameters: Validated gNB parameters.
+
+        Returns:
+            None
+        """
+        du_f1_address = self._du_f1_address
+        if not du_f1_address:
+            self.unit.status = WaitingStatus("Waiting for DU F1 IPv4 address")
+            return
+        if self.unit.is_leader():
+            self._publish_du_information(du_f1_address)
+        try:
+            gnb_config = self._build_gnb_config(gnb_parameters, du_f1_address)
+        except GnbConfigError as e:
+            self.unit.status = BlockedStatus(f"Invalid configuration: {e}")
+            return
+        sections = gnb_config.sections()
+        # Socket buffers are sized when nr-softmodem opens its sockets
+        sections[SYSCTLS_SECTION] = json.dumps(gnb_parameters.sysctls, sort_keys=True)
+        # The IQ recorder and replayer run next to nr-softmodem
+        sections[IQ_SECTION] = json.dumps(self._iq_settings, sort_keys=True)
+        # Command line options are read when nr-softmodem starts
+        sections[COMMAND_SECTION] = self._softmodem_command
+        changes = classify_changes(
+            previous=dict(self._stored.config_sections),
+            current=sections,
+            hot_sections=HOT_SECTIONS if self._config_enable_telnet else (),
+        )
+        content = gnb_config.dumps()
+        rolled_back = config_hash(content) == self._stored.last_rollback.get("rejected")
+        # Without changes, the service and checks report the state of this configuration
+        if not rolled_back and not changes:
+            rolled_back = self._roll_back_crash_loop(content)
+        if rolled_back:
+            self.unit.status = self._rollback_status
+            return
+        if not self._replay_file_exists:
+            self.unit.status = BlockedStatus(
+                f"IQ recording {self._config_iq_replay_file} not found in {IQ_RECORDINGS_DIR}"
+            )
+            return
+        if self._restart_required(changes) and not self._restart_granted(sections):
+            self.unit.status = WaitingStatus("Waiting for other units to restart")
+            return
+        self._push_workload_scripts()
+        if not self._deliver_config(content):
+            self.unit.status = WaitingStatus("Waiting for gnb.conf to be mounted from ConfigMap")
+            event.defer()
+            return
+        self.unit.status = self._apply_changes(gnb_config, gnb_parameters, sections, changes)
+        self._stored.applied_config = content
+        self._publish_restart_state()
+
+    def _on_update_status(self, event: EventBase) -> None:
+        """Updates the status from the Pebble checks, rolling back a crash looping configuration.
+
+        Only the workload container is reached. The status of a configuration that isn't applied
+        is kept until the configuration or relations change. On the leader, restart grants that
+        timed out are released, the configuration being applied again when the grants change.
+
+        Args:
+            event: Update Status or Pebble check event
+
+        Returns:
+            None
+        """
+        if self.unit.is_leader() and self._grant_restarts():
+            self._on_config_changed(event)  # type: ignore[arg-type]
+            return
+        content = self._stored.applied_config
+        if not content or not self._container.can_connect():
+            return
+        if self._roll_back_crash_loop(content):
+            self._stored.applied_config = ""
+            self.unit.status = self._rollback_status
+            return
+        self.unit.status = self._ready_status(content)
+        self._publish_restart_state()
+
+    def _apply_changes(
+        self,
+        gnb_config: GnbConfig,
+        gnb_parameters: GnbParameters,
+        sections: Dict[str, str],
+        changes: Dict[str, str],
+    ) -> StatusBase:
+        """Applies the delivered gNB configuration, restarting the workload when required.
+
+        Runtime changeable settings that can't be applied at runtime are applied with a restart,
+        which waits for a rolling restart grant like any other.
+
+        Args:
+            gnb_config: gNB configuration.
+            gnb_parameters: Validated gNB parameters.
+            sections: Serialized sections of the configuration.
+            changes: Change class of each changed section.
+
+        Returns:
+            StatusBase: Status of the workload.
+        """
+        restart_required = self._restart_required(changes)
+        if not restart_required and changes and not self._apply_hot_changes(gnb_config):
+            changes = dict.fromkeys(changes, RESTART)
+            if not self._restart_granted(sections):
+                return WaitingStatus("Waiting for other units to restart")
+            restart_required = True
+        if restart_required:
+            _, workload_sysctls = split_sysctls(gnb_parameters.sysctls)
+            self._write_sysctls(workload_sysctls)
+            self._update_pebble_layer()
+            self._stored.sysctl_mismatches = self._check_sysctls(gnb_parameters.sysctls)
+        self._update_pebble_plan()
+        for section, change_class in changes.items():
+            logger.info("Section %s changed, applied with %s", section, change_class)
+        self._stored.config_sections = sections
+        self._stored.config_changes = changes
+        if restart_required:
+            # Checks report the state of the previous process until they run again
+            return WaitingStatus("Waiting for nr-softmodem to be ready")
+        return self._ready_status(gnb_config.dumps())
+
+    def _ready_status(self, content: str) -> StatusBase:
+        """Returns the status of nr-softmodem, recording its configuration as good once Active.
+
+        Args:
+            content: gnb.conf content nr-softmodem runs with.
+
+        Returns:
+            StatusBase: Status of the workload.
+        """
+        status = self._workload_status
+        if isinstance(status, ActiveStatus):
+            self._record_good_config(content)
+            if self._stored.sysctl_mismatches:
+                # nr-softmodem serves, with its default socket buffers
+                return ActiveStatus(
+                    f"Sysctls not applied: {', '.join(self._stored.sysctl_mismatches)}"
+                )
+        return status
+
+    def _record_good_config(self, content: str) -> None:
+        """Records a configuration nr-softmodem runs with every check up as known good.
+
+        Args:
+            content: gnb.conf content.
+
+        Returns:
+            None
+        """
+        digest = config_hash(content)
+        history = self._good_configs
+        if history and history[-1]["hash"] == digest:
+            return
+        self._stored.good_configs = record_good_config(
+            history, digest, content, datetime.now(timezone.utc).isoformat(timespec="seconds")
+        )
+        logger.info("gnb.conf %s recorded as known good", digest)
+
+    def _roll_back_crash_loop(self, content: str) -> bool:
+        """Rolls back to the last known good configuration when nr-softmodem crash loops.
+
+        Known good configurations are never rolled back, since they crash for other reasons.
+
+        Args:
+            content: gnb.conf content in use.
+
+        Returns:
+            bool: Whether the configuration was rolled back.
+        """
+        digest = config_hash(content)
+        history = self._good_configs
+        good_config = last_good_config(history)
+        if not good_config or digest in {entry["hash"] for entry in history}:
+            return False
+        services = self._container.get_services(self._service_name)
+        cause = crash_loop_cause(services.get(self._service_name), self._container.get_checks())
+        if not cause:
+            return False
+        logger.warning(
+            "gnb.conf %s crash loops (%s), rolling back to %s", digest, cause, good_config["hash"]
+        )
+        if not self._deliver_config(good_config["content"]):
+            return False
+        self._container.restart(self._service_name)
+        # The next configuration is applied with a restart, whatever changed
+        self._stored.config_sections = {}
+        self._stored.last_rollback = {
+            "rejected": digest,
+            "restored": good_config["hash"],
+            "cause": cause,
+            "time": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        }
+        return True
+
+    def _restart_granted(self, sections: Dict[str, str]) -> bool:
+        """Returns whether nr-softmodem may restart, requesting a rolling restart otherwise.
+
+        nr-softmodem that isn't running serves no cell, so it starts without a grant.
+
+        Args:
+            sections: Serialized sections of the configuration to restart with.
+
+        Returns:
+            bool: Whether the leader granted the restart.
+        """
+        peer_relation = self.model.get_relation(PEER_RELATION_NAME)
+        if not peer_relation or not self._service_is_running:
+            return True
+        request = config_hash(json.dumps(sections, sort_keys=True))
+        peer_relation.data[self.unit][RESTART_REQUEST_KEY] = request
+        if self.unit.is_leader():
+            self._grant_restarts()
+        grant = self._restart_grants.get(self.unit.name)
+        granted = grant is not None and grant.request == request
+        if not granted:
+            logger.info("Restart %s waits for other units to restart", request)
+        return granted
+
+    def _publish_restart_state(self) -> None:
+        """Publishes whether the cell serves, withdrawing the restart request once it does.
+
+        Returns:
+            None
+        """
+        peer_relation = self.model.get_relation(PEER_RELATION_NAME)
+        if not peer_relation:
+            return
+        serving = isinstance(self.unit.status, ActiveStatus)
+        unit_data = peer_relation.data[self.unit]
+        unit_data[SERVING_KEY] = json.dumps(serving)
+        if serving and RESTART_REQUEST_KEY in unit_data:
+            del unit_data[RESTART_REQUEST_KEY]
+            # The leader doesn't get relation events for its own unit data
+            if self.unit.is_leader():
+                self._grant_restarts()
+
+    def _grant_restarts(self) -> bool:
+        """Grants the restart requests of units while enough cells keep serving.
+
+        Returns:
+            bool: Whether the grants changed.
+        """
+        peer_relation = self.model.get_relation(PEER_RELATION_NAME)
+        if not peer_relation:
+            return False
+        units = [self.unit, *peer_relation.units]
+        requests = {
+            unit.name: peer_relation.data[unit][RESTART_REQUEST_KEY]
+            for unit in units
+            if peer_relation.data[unit].get(RESTART_REQUEST_KEY)
+        }
+        serving = {
+            unit.name: peer_relation.data[unit].get(SERVING_KEY) == "true" for unit in units
+        }
+        current_grants = self._restart_grants
+        grants = grant_restarts(
+            units=[unit.name for unit in units],
+            requests=requests,
+            grants=current_grants,
+            serving=serving,
+            max_concurrent=self._config_rolling_restart_max_concurrent,
+            min_serving_percent=self._config_rolling_restart_min_serving_percent,
+            now=time.time(),
+        )
+        if grants == current_grants:
+            return False
+        peer_relation.data[self.app][RESTART_GRANTS_KEY] = json.dumps(
+            grants_to_json(grants), sort_keys=True
+        )
+        logger.info("Restart grants updated: %s", peer_relation.data[self.app][RESTART_GRANTS_KEY])
+        return True
+
+    @property
+    def _restart_grants(self) -> Dict[str, Grant]:
+        """Returns the restart grants of the leader, keyed by unit."""
+        peer_relation = self.model.get_relation(PEER_RELATION_NAME)
+        if not peer_relation:
+            return {}
+        return grants_from_json(
+            json.loads(peer_relation.data[self.app].get(RESTART_GRANTS_KEY) or "{}")
+        )
+
+    @property
+    def _good_configs(self) -> List[Dict[str, str]]:
+        """Returns the known good configurations, oldest first."""
+        return [dict(entry) for entry in self._stored.good_configs]
+
+    @property
+    def _rollback_status(self) -> StatusBase:
+        """Returns the status reporting the last rollback."""
+        rollback = self._stored.last_rollback
+        return BlockedStatus(
+            f"Rolled back gnb.conf {rollback['rejected']} to {rollback['restored']}: "
+            f"{rollback['cause']}"
+        )
+
+    def _write_sysctls(self, sysctls: Dict[str, str]) -> None:
+        """Writes sysctls from the privileged workload container.
+
+        Args:
+            sysctls: Value of each sysctl.
+
+        Returns:
+            None
+        """
+        for name, value in sysctls.items():
+            try:
+                self._container.exec(
+                    ["sh", "-c", 'echo "$1" > "$2"', "sh", value, sysctl_path(name)]
+                ).wait()
+            except (ChangeError, ExecError) as e:
+                logger.warning("Couldn't set sysctl %s to %s: %s", name, value, e)
+
+    def _read_sysctls(self, names: List[str]) -> Dict[str, Optional[str]]:
+        """Returns the effective value of sysctls in the workload container.
+
+        Args:
+            names: Sysctl names.
+
+        Returns:
+            dict: Value of each sysctl, None when it can't be read.
+        """
+        effective_sysctls: Dict[str, Optional[str]] = {}
+        for name in names:
+            try:
+                stdout, _ = self._container.exec(["cat", sysctl_path(name)]).wait_output()
+            except (ChangeError, ExecError) as e:
+                logger.warning("Couldn't read sysctl %s: %s", name, e)
+                effective_sysctls[name] = None
+                continue
+            effective_sysctls[name] = normalize_value(stdout)
+        return effective_sysctls
+
+    def _check_sysctls(self, sysctls: Dict[str, str]) -> List[str]:
+        """Returns the sysctls whose effective value differs from the configured one.
+
+        Args:
+            sysctls: Configured value of each sysctl.
+
+        Returns:
+            list: Names of the sysctls that didn't apply.
+        """
+        mismatches = []
+        for name, effective_value in self._read_sysctls(list(sysctls)).items():
+            if effective_value != sysctls[name]:
+                logger.warning(
+                    "Sysctl %s is %s instead of %s", name, effective_value, sysctls[name]
+                )
+                mismatches.append(name)
+        return sorted(mismatches)
+
+    def _publish_du_information(self, du_f1_address: str) -> None:
+        """Publishes the DU F1 address and port to the CU.
+
+        Args:
+            du_f1_address: DU F1 IPv4 address.
+
+        Returns:
+            None
+        """
+        for relation in self.model.relations["fiveg-f1"]:
+            self.f1_requires.set_du_information(
+                du_address=du_f1_address,
+                du_port=self._config_f1_du_port,
+                relation_id=relation.id,
+            )
+
+    def _restart_required(self, changes: Dict[str, str]) -> bool:
+        """Returns whether the workload must be restarted to apply configuration changes.
+
+        Args:
+            changes: Change class of each changed section.
+
+        Returns:
+            bool: Whether the workload must be restarted.
+        """
+        if RESTART in changes.values():
+            return True
+        if self._service_changed(self._service_name):
+            return True
+        return not self._service_is_running
+
+    def _apply_hot_changes(self, gnb_config: GnbConfig) -> bool:
+        """Applies runtime changeable settings to the running workload.
+
+        Args:
+            gnb_config: New gNB configuration.
+
+        Returns:
+            bool: Whether the settings were applied, False when the telnet server can't be reached.
+        """
+        try:
+            SoftmodemTelnet().set_log_levels(gnb_config.log_config.log_levels)
+        except SoftmodemTelnetError as e:
+            logger.warning("Couldn't apply changes at runtime, restarting: %s", e)
+            return False
+        return True
+
+    def _update_pebble_layer(self) -> None:
+        """Updates pebble layer with new configuration.
+
+        Returns:
+            None
+        """
+        self._container.add_layer("du", self._pebble_layer, combine=True)
+        self._container.replan()
+        self._stop_unused_services()
+        self._container.restart(self._service_name)
+
+    def _stop_unused_services(self) -> None:
+        """Stops the IQ services the IQ mode doesn't use, and the log writer without file logging.
+
+        Returns:
+            None
+        """
+        unused = {
+            IQ_RECORDER_SERVICE_NAME,
+            IQ_REPLAY_SERVICE_NAME,
+            LOG_WRITER_SERVICE_NAME,
+        } - set(self._helper_service_names)
+        services = self._container.get_services(*unused)
+        running = [name for name, service in services.items() if service.is_running()]
+        if running:
+            self._container.stop(*running)
+
+    def _service_changed(self, service_name: str) -> bool:
+        """Returns whether a service in the plan differs from the one of the charm's layer.
+
+        Args:
+            service_name: Pebble service name.
+
+        Returns:
+            bool: Whether the service changed.
+        """
+        service = self._container.get_plan().services.get(service_name)
+        if not service:
+            return True
+        return service.to_dict() != self._pebble_layer["services"][service_name]
+
+    @property
+    def _checks_changed(self) -> bool:
+        """Returns whether the checks in the plan differ from the ones of the charm's layer."""
+        plan_checks = {
+            name: check.to_dict() for name, check in self._container.get_plan().checks.items()
+        }
+        return plan_checks != self._pebble_layer["checks"]
+
+    def _update_pebble_plan(self) -> None:
+        """Replans the statistics exporter, the log writer and the checks when they changed.
+
+        nr-softmodem keeps running.
+
+        Returns:
+            None
+        """
+        service_names = [STATS_EXPORTER_SERVICE_NAME]
+        if self._config_log_to_file:
+            service_names.append(LOG_WRITER_SERVICE_NAME)
+        if not any(map(self._service_changed, service_names)) and not self._checks_changed:
+            return
+        self._container.add_layer("du", self._pebble_layer, combine=True)
+        self._container.replan()
+
+    @property
+    def _workload_status(self) -> StatusBase:
+        """Returns Active once every Pebble check passes, Waiting otherwise."""
+        failing_checks = sorted(
+            name
+            for name, check in self._container.get_checks().items()
+            if check.status != CheckStatus.UP or check.failures
+        )
+        if failing_checks:
+            return WaitingStatus(
+                f"Waiting for nr-softmodem to be ready, failing checks: {', '.join(failing_checks)}"  # noqa: E501, W505
+            )
+        return ActiveStatus()
+
+    @property
+    def _service_is_running(self) -> bool:
+        services = self._container.get_services(self._service_name)
+        return self._service_name in services and services[self._service_name].is_running()
+
+    def _update_cell_plan(self) -> None:
+        """Allocates a PCI and an NR Cell ID to every unit and publishes them to peers.
+
+        Units that already have a valid identity keep it.
+
+        Returns:
+            None
+        """
+        peer_relation = self.model.get_relation(PEER_RELATION_NAME)
+        if not peer_relation:
+            return
+        cells = [self.unit.name] + [unit.name for unit in peer_relation.units]
+        current_plan = self._cell_plan
+        new_plan = plan_cells(
+            cells=cells,
+            neighbours=self._config_cell_neighbours,
+            current=current_plan,
+            reserved_pcis=self._config_reserved_pcis,
+            nr_cell_id_base=self._config_nr_cell_id_base,
+        )
+        if new_plan == current_plan:
+            return
+        peer_relation.data[self.app][CELL_PLAN_KEY] = json.dumps(
+            {cell: identity.to_dict() for cell, identity in new_plan.items()}, sort_keys=True
+        )
+        logger.info("Cell plan updated: %s", peer_relation.data[self.app][CELL_PLAN_KEY])
+
+    @property
+    def _cell_plan(self) -> Dict[str, CellIdentity]:
+        """Returns the cell plan published by the leader."""
+        peer_relation = self.model.get_relation(PEER_RELATION_NAME)
+        if not peer_relation:
+            return {}
+        raw_plan = peer_relation.data[self.app].get(CELL_PLAN_KEY)
+        if not raw_plan:
+            return {}
+        return {
+            cell: CellIdentity.from_dict(identity)
+            for cell, identity in json.loads(raw_plan).items()
+        }
+
+    @property
+    def _cell_identity(self) -> Optional[CellIdentity]:
+        """Returns the identity allocated to this unit's cell."""
+        return self._cell_plan.get(self.unit.name)
+
+    @property
+    def _f1_relation_created(self) -> bool:
+        return self._relation_created("fiveg-f1")
+
+    def _relation_created(self, relation_name: str) -> bool:
+        if not self.model.get_relation(relation_name):
+            return False
+        return True
+
+    def _on_get_tdd_pattern_action(self, event: ActionEvent) -> None:
+        """Reports the TDD pattern in use and its theoretical DL/UL capacity ratio.
+
+        Args:
+            event: Juju event
+
+        Returns:
+            None
+        """
+        try:
+            tdd_pattern = self._gnb_parameters.tdd_pattern
+        except GNB_PARAMETER_ERRORS as e:
+            event.fail(f"Invalid configuration: {e}")
+            return
+        event.set_results(
+            {
+                "periodicity-ms": tdd_pattern.periodicity_ms,
+                "dl-slots": tdd_pattern.dl_slots,
+                "dl-symbols": tdd_pattern.dl_symbols,
+                "ul-slots": tdd_pattern.ul_slots,
+                "ul-symbols": tdd_pattern.ul_symbols,
+                "dl-symbols-per-period": tdd_pattern.dl_symbols_per_period,
+                "ul-symbols-per-period": tdd_pattern.ul_symbols_per_period,
+                "dl-ul-ratio": f"{tdd_pattern.dl_ul_ratio:.2f}",
+            }
+        )
+
+    def _on_get_config_changes_action(self, event: ActionEvent) -> None:
+        """Reports the sections changed by the last configuration update and how they applied.
+
+        Args:
+            event: Juju event
+
+        Returns:
+            None
+        """
+        changes = dict(self._stored.config_changes)
+        event.set_results(
+            {
+                change_class: ",".join(
+                    sorted(section for section, value in changes.items() if value == change_class)
+                )
+                for change_class in (HOT, RESTART)
+            }
+        )
+
+    def _on_get_config_history_action(self, event: ActionEvent) -> None:
+        """Reports the known good gnb.conf versions and the last rollback.
+
+        Args:
+            event: Juju event
+
+        Returns:
+            None
+        """
+        event.set_results(
+            {
+                "good-configs": json.dumps(
+                    [
+                        {"hash": entry["hash"], "recorded-at": entry["recorded-at"]}
+                        for entry in self._good_configs
+                    ]
+                ),
+                "last-rollback": json.dumps(dict(self._stored.last_rollback), sort_keys=True),
+            }
+        )
+
+    def _on_get_iq_recording_action(self, event: ActionEvent) -> None:
+        """Exports the IQ ring as a recording, keeping the last recordings only.
+
+        Args:
+            event: Juju event
+
+        Returns:
+            None
+        """
+        if self._config_iq_mode != IQ_MODE_RECORD:
+            event.fail(f"IQ recording requires rfsim-iq-mode={IQ_MODE_RECORD}")
+            return
+        if not self._container.can_connect():
+            event.fail("Workload container is not available")
+            return
+        name = datetime.now(timezone.utc).strftime(f"rfsim-%Y%m%dT%H%M%SZ{IQ_RECORDING_SUFFIX}")
+        path = f"{IQ_RECORDINGS_DIR}/{name}"
+        try:
+            stdout, _ = self._container.exec(
+                ["python3", IQ_RECORDER_PATH, "export", "--output", path]
+            ).wait_output()
+        except ExecError as e:
+            event.fail(f"Couldn't export the IQ recording: {e.stderr or e}")
+            return
+        except ChangeError as e:
+            event.fail(f"Couldn't export the IQ recording: {e}")
+            return
+        summary = json.loads(stdout)
+        self._prune_iq_recordings()
+        event.set_results(
+            {"name": name, "path": path, "blocks": summary["blocks"], "bytes": summary["bytes"]}
+        )
+
+    def _prune_iq_recordings(self) -> None:
+        """Removes all recordings but the most recent ones and the replayed one.
+
+        Returns:
+            None
+        """
+        recordings = sorted(
+            file.name
+            for file in self._container.list_files(
+                IQ_RECORDINGS_DIR, pattern=f"*{IQ_RECORDING_SUFFIX}"
+            )
+        )
+        for name in recordings[:-IQ_RECORDINGS_KEPT]:
+            if name != self._config_iq_replay_file:
+                self._container.remove_path(f"{IQ_RECORDINGS_DIR}/{name}")
+                logger.info("Removed IQ recording %s", name)
+
+    def _on_get_logs_action(self, event: ActionEvent) -> None:
+        """Returns the last lines of the nr-softmodem log file or of one of its rotated files.
+
+        Args:
+            event: Juju event
+
+        Returns:
+            None
+        """
+        if not self._config_log_to_file:
+            event.fail("nr-softmodem logs to Pebble, file logging requires log-to-file")
+            return
+        if not self._container.can_connect():
+            event.fail("Workload container is not available")
+            return
+        rotation = int(event.params["rotation"])
+        if not 0 <= rotation <= MAX_BACKUPS:
+            event.fail(f"rotation must be between 0 and {MAX_BACKUPS}, got {rotation}")
+            return
+        path = rotated_path(LOG_FILE_PATH, rotation)
+        try:
+            with self._container.pull(path, encoding=None) as log_file:
+                lines = deque(log_file, maxlen=int(event.params["lines"]))
+        except PathError as e:
+            event.fail(f"Couldn't read {path}: {e.message}")
+            return
+        files = sorted(
+            file.name for file in self._container.list_files(LOG_DIR, pattern="nr-softmodem.log*")
+        )
+        event.set_results(
+            {
+                "path": path,
+                "files": ",".join(files),
+                "content": b"".join(lines).decode(errors="replace"),
+            }
+        )
+
+    def _on_benchmark_action(self, event: ActionEvent) -> None:
+        """Runs simulated UEs against nr-softmodem and reports what the DU carried.
+
+        The UEs and their network namespaces are removed once the benchmark ends, whether it
+        succeeded or not.
+
+        Args:
+            event: Juju event
+
+        Returns:
+            None
+        """
+        try:
+            ue_commands = self._benchmark_ue_commands(event.params)
+        except (BenchmarkError, FrequencyPlanError, GnbConfigError) as e:
+            event.fail(f"Invalid benchmark parameters: {e}")
+            return
+        if not self._container.can_connect() or not self._ue_container.can_connect():
+            event.fail("Workload containers are not available")
+            return
+        if self._config_iq_mode == IQ_MODE_REPLAY or not self._service_is_running:
+            event.fail("nr-softmodem must be running as rfsimulator server")
+            return
+        try:
+            results = self._run_benchmark(ue_commands, event.params)
+        except (BenchmarkError, ChangeError, ExecError, ThreadStatsError) as e:
+            event.fail(f"Benchmark failed: {e}")
+            return
+        finally:
+            self._stop_benchmark_ues(len(ue_commands))
+        event.set_results({"results": json.dumps(results, sort_keys=True)})
+
+    def _benchmark_ue_commands(self, params: Dict[str, Any]) -> List[str]:
+        """Returns the command of each simulated UE of the benchmark.
+
+        Args:
+            params: Action parameters.
+
+        Returns:
+            list: nr-uesoftmodem command lines, of UEs 1 to N.
+        """
+        mnc = self._config_mnc.zfill(parse_int("mnc_length", self._config_mnc_length))
+        imsi_base = str(params["imsi"]) or f"{self._config_mcc}{mnc}".ljust(14, "0") + "1"
+        frequency_plan = self._frequency_plan
+        sst = parse_int("sst", self._config_nssai_sst)
+        return [
+            ue_command(
+                index=index,
+                frequency_plan=frequency_plan,
+                imsi=imsi,
+                key=str(params["key"]),
+                opc=str(params["opc"]),
+                dnn=str(params["dnn"]),
+                sst=sst,
+            )
+            for index, imsi in enumerate(ue_imsis(imsi_base, int(params["ues"])), start=1)
+        ]
+
+    def _run_benchmark(self, ue_commands: List[str], params: Dict[str, Any]) -> Dict[str, Any]:
+        """Starts the UEs, drives traffic for the duration and measures the DU meanwhile.
+
+        Args:
+            ue_commands: Command of each simulated UE.
+            params: Action parameters.
+
+        Returns:
+            dict: Benchmark results.
+        """
+        count = len(ue_commands)
+        duration = int(params["duration"])
+        self._start_benchmark_ues(ue_commands)
+        self._wait_for_pdu_sessions(count, int(params["attach-timeout"]))
+        mac_stats = self._read_mac_stats()
+        l1_snapshots = [self._read_l1_processing()]
+        sampler = self._container.exec(
+            ["sh", "-c", SAMPLER_SCRIPT, "sh", str(duration)], timeout=duration + 30
+        )
+        pings = [
+            self._ue_container.exec(
+                [
+                    "sh",
+                    "-c",
+                    TRAFFIC_SCRIPT,
+                    "sh",
+                    str(index),
+                    str(duration),
+                    str(params["traffic-target"]),
+                    str(params["packet-size"]),
+                    str(params["packet-interval"]),
+                ],
+                timeout=duration + 30,
+            )
+            for index in range(1, count + 1)
+        ]
+        start = time.monotonic()
+        while time.monotonic() - start < duration:
+            time.sleep(SAMPLING_PERIOD)
+            l1_snapshots.append(self._read_l1_processing())
+        elapsed = max(time.monotonic() - start, duration)
+        stdout, _ = sampler.wait_output()
+        clock_ticks, previous, current = parse_sampler_output(stdout)
+        threads = compute_thread_stats(previous, current, duration, clock_ticks)
+        throughputs = ue_throughputs(mac_stats, self._read_mac_stats(), elapsed)
+        cell = self._cell_identity
+        return {
+            "ues": count,
+            "duration": duration,
+            "throughput": aggregate_throughput(throughputs),
+            "ue-throughput": throughputs,
+            "cpu-percent-per-cell": {
+                str(cell.nr_cell_id if cell else self.unit.name): round(
+                    sum(thread.cpu_percent for thread in threads), 1
+                )
+            },
+            "slot-processing-us": {
+                direction: summarize(interval_means(l1_snapshots, direction))
+                for direction in ("tx", "rx")
+            },
+            "ping": {
+                f"ue{index}": parse_ping_summary(self._exec_output(ping))
+                for index, ping in enumerate(pings, start=1)
+            },
+        }
+
+    def _start_benchmark_ues(self, ue_commands: List[str]) -> None:
+        """Creates the network namespace of every UE and starts the UEs as Pebble services.
+
+        Args:
+            ue_commands: Command of each simulated UE.
+
+        Returns:
+            None
+        """
+        services = {}
+        for index, command in enumerate(ue_commands, start=1):
+            self._ue_container.exec(["sh", "-c", NETNS_SCRIPT, "sh", str(index)]).wait_output()
+            services[f"{UE_SERVICE_PREFIX}{index}"] = {
+                "override": "replace",
+                "summary": f"simulated UE {index}",
+                "command": command,
+                "startup": "disabled",
+            }
+        self._ue_container.add_layer(
+            "benchmark", cast(LayerDict, {"services": services}), combine=True
+        )
+        self._ue_container.start(*services)
+
+    def _wait_for_pdu_sessions(self, count: int, timeout: int) -> None:
+        """Waits until every UE has an address on its PDU session interface.
 
-    def _on_f1_relation_joined(self, event: RelationJoinedEvent) -> None:
-        if not self.unit.is_leader():
+        Args:
+            count: Number of UEs.
+            timeout: Seconds to wait.
+
+        Returns:
+            None
+        """
+        deadline = time.monotonic() + timeout
+        pending = set(range(1, count + 1))
+        while True:
+            pending = {index for index in pending if not self._ue_has_pdu_session(index)}
+            if not pending:
+                return
+            if time.monotonic() >= deadline:
+                raise BenchmarkError(
+                    f"{count - len(pending)}/{count} UEs got a PDU session within {timeout}s"
+                )
+            time.sleep(SAMPLING_PERIOD)
+
+    def _ue_has_pdu_session(self, index: int) -> bool:
+        command = ["ip", "netns", "exec", f"ue{index}", "ip", "-4", "-o", "addr", "show"]
+        try:
+            stdout, _ = self._ue_container.exec(command + [UE_TUN_INTERFACE]).wait_output()
+        except ExecError:
+            return False
+        return " inet " in stdout
+
+    def _stop_benchmark_ues(self, count: int) -> None:
+        """Stops the simulated UEs and removes their network namespaces.
+
+        Args:
+            count: Number of UEs.
+
+        Returns:
+            None
+        """
+        if not self._ue_container.can_connect():
             return
-        du_hostname, du_ipv4_address = self.kubernetes.get_service_load_balancer_address(
-            name=self.app.name
-        )
-        if not du_ipv4_address:
-            raise Exception("Loadbalancer doesn't have an IP address")
-        self.f1_requires.set_du_information(
-            du_address=du_ipv4_address,
-            du_port=self._config_f1_du_port,
-            relation_id=event.relation.id,
-        )
+        names = [f"{UE_SERVICE_PREFIX}{index}" for index in range(1, count + 1)]
+        services = self._ue_container.get_services(*names)
+        running = [name for name, service in services.items() if service.is_running()]
+        try:
+            if running:
+                self._ue_container.stop(*running)
+            self._ue_container.exec(["sh", "-c", NETNS_CLEANUP_SCRIPT, "sh", str(count)]).wait()
+        except (ChangeError, ExecError) as e:
+            logger.warning("Couldn't clean up the benchmark UEs: %s", e)
 
-    def _on_install(self, event: InstallEvent) -> None:
-        """Triggered on install event.
+    @staticmethod
+    def _exec_output(process: Any) -> str:
+        """Returns the standard output of a process, also when it exited with an error."""
+        try:
+            stdout, _ = process.wait_output()
+        except ExecError as e:
+            return e.stdout or ""
+        return stdout
+
+    def _read_mac_stats(self) -> Dict[str, UeStats]:
+        try:
+            return parse_mac_stats(self._container.pull(f"{STATS_DIR}/{MAC_STATS_FILE}").read())
+        except PathError:
+            return {}
+
+    def _read_l1_processing(self) -> Dict[str, Tuple[float, int]]:
+        try:
+            return parse_l1_processing(self._container.pull(f"{STATS_DIR}/{L1_STATS_FILE}").read())
+        except PathError:
+            return {}
+
+    def _on_get_sysctls_action(self, event: ActionEvent) -> None:
+        """Reports the configured and effective value of each sysctl.
 
         Args:
             event: Juju event
@@ -93,80 +1516,276 @@ class Oai5GDUOperatorCharm(CharmBase):
         Returns:
             None
         """
-        if not self.kubernetes.statefulset_is_patched(
-            statefulset_name=self.app.name,
-        ):
-            self.kubernetes.patch_statefulset(
-                statefulset_name=self.app.name,
-            )
+        try:
+            sysctls = self._config_sysctls
+        except SysctlError as e:
+            event.fail(f"Invalid configuration: {e}")
+            return
+        if not self._container.can_connect():
+            event.fail("Workload container is not available")
+            return
+        event.set_results(
+            {
+                "configured": json.dumps(sysctls, sort_keys=True),
+                "effective": json.dumps(self._read_sysctls(list(sysctls)), sort_keys=True),
+            }
+        )
 
-    def _on_config_changed(self, event: ConfigChangedEvent) -> None:
-        """Triggered on any change in configuration.
+    def _on_thread_stats_action(self, event: ActionEvent) -> None:
+        """Samples the threads of nr-softmodem and reports them busiest first.
 
         Args:
-            event: Config Changed Event
+            event: Juju event
 
         Returns:
             None
         """
         if not self._container.can_connect():
-            self.unit.status = WaitingStatus("Waiting for Pebble in workload container")
-            event.defer()
+            event.fail("Workload container is not available")
             return
-        if not self._f1_relation_created:
-            self.unit.status = BlockedStatus("Waiting for relation to CU to be created")
+        interval = float(event.params["interval"])
+        try:
+            stdout, _ = self._container.exec(
+                ["sh", "-c", SAMPLER_SCRIPT, "sh", str(interval)], timeout=interval + 30
+            ).wait_output()
+            clock_ticks, previous, current = parse_sampler_output(stdout)
+            stats = compute_thread_stats(previous, current, interval, clock_ticks)
+        except ExecError as e:
+            if e.exit_code == PROCESS_NOT_FOUND_EXIT_CODE:
+                event.fail("nr-softmodem is not running")
+            else:
+                event.fail(f"Couldn't sample threads: {e}")
             return
-        if not self.f1_requires.cu_address_available:
-            self.unit.status = WaitingStatus(
-                "Waiting for CU IPv4 address to be available in relation data"
-            )
+        except (ChangeError, ThreadStatsError) as e:
+            event.fail(f"Couldn't sample threads: {e}")
             return
-        self._push_config()
-        self._update_pebble_layer()
-        self.unit.status = ActiveStatus()
+        if event.params["top"]:
+            stats = stats[: event.params["top"]]
+        event.set_results({"threads": format_table(stats)})
 
-    def _update_pebble_layer(self) -> None:
-        """Updates pebble layer with new configuration.
+    def _on_get_kpis_action(self, event: ActionEvent) -> None:
+        """Reports the KPIs the statistics exporter extracted from the nr-softmodem log.
+
+        The exporter shares the network namespace of the pod, so it is reached on localhost.
+
+        Args:
+            event: Juju event
 
         Returns:
             None
         """
-        self._container.add_layer("du", self._pebble_layer, combine=True)
-        self._container.replan()
-        self._container.restart(self._service_name)
+        try:
+            with urlopen(
+                f"http://127.0.0.1:{METRICS_PORT}{KPIS_PATH}", timeout=KPIS_TIMEOUT_SECONDS
+            ) as response:
+                kpis = json.loads(response.read())
+        except (OSError, ValueError) as e:
+            event.fail(f"Couldn't get KPIs from the stats exporter: {e}")
+            return
+        event.set_results({name: json.dumps(summary) for name, summary in kpis.items()})
 
-    @property
-    def _f1_relation_created(self) -> bool:
-        return self._relation_created("fiveg-f1")
+    def _build_gnb_config(self, gnb_parameters: GnbParameters, du_f1_address: str) -> GnbConfig:
+        """Returns the validated gNB configuration of this unit's cell.
 
-    def _relation_created(self, relation_name: str) -> bool:
-        if not self.model.get_relation(relation_name):
-            return False
-        return True
+        Args:
+            gnb_parameters: Validated gNB parameters.
+            du_f1_address: DU F1 IPv4 address.
 
-    def _push_config(self) -> None:
-        jinja2_environment = Environment(loader=FileSystemLoader("src/templates/"))
-        template = jinja2_environment.get_template(f"{CONFIG_FILE_NAME}.j2")
-        content = template.render(
-            gnb_du_name=self._config_gnb_du_name,
-            gnb_du_id=self._config_gnb_du_id,
-            tac=self._config_tac,
-            mcc=self._config_mcc,
-            mnc=self._config_mnc,
-            mnc_length=self._config_mnc_length,
-            nssai_sst=self._config_nssai_sst,
-            nssai_sd=self._config_nssai_sd,
-            du_f1_interface_name=self._config_du_f1_interface_name,
-            du_f1_ipv4_address=self._du_ip_address,
-            cu_f1_ipv4_address=self.f1_requires.cu_address,
-            du_f1_port=self._config_f1_du_port,
-            cu_f1_port=self.f1_requires.cu_port,
-            thread_parallel_config=self._config_thread_parallel_config,
+        Returns:
+            GnbConfig: gNB configuration with overrides applied.
+        """
+        frequency_plan = gnb_parameters.frequency_plan
+        tdd_pattern = gnb_parameters.tdd_pattern
+        antenna_config = gnb_parameters.antenna_config
+        performance = gnb_parameters.performance
+        numerology = frequency_plan.numerology
+        serving_cell_config_common = ServingCellConfigCommon(
+            phys_cell_id=self._cell_identity.pci,  # type: ignore[union-attr]
+            absolute_frequency_ssb=frequency_plan.ssb_arfcn,
+            dl_frequency_band=frequency_plan.band,
+            dl_absolute_frequency_point_a=frequency_plan.point_a_arfcn,
+            dl_subcarrier_spacing=numerology,
+            dl_carrier_bandwidth=frequency_plan.n_rb,
+            initial_dl_bwp_location_and_bandwidth=frequency_plan.initial_bwp_riv,
+            initial_dl_bwp_subcarrier_spacing=numerology,
+            initial_dl_bwp_control_resource_set_zero=frequency_plan.coreset0_index,
+            initial_dl_bwp_search_space_zero=frequency_plan.search_space_zero_index,
+            ul_frequency_band=frequency_plan.band,
+            ul_subcarrier_spacing=numerology,
+            ul_carrier_bandwidth=frequency_plan.n_rb,
+            initial_ul_bwp_location_and_bandwidth=frequency_plan.initial_bwp_riv,
+            initial_ul_bwp_subcarrier_spacing=numerology,
+            ra_response_window=performance["ra_ResponseWindow"],
+            msg1_subcarrier_spacing=numerology,
+            ssb_positions_in_burst_pr=frequency_plan.ssb_positions_in_burst_pr,
+            subcarrier_spacing=numerology,
+            reference_subcarrier_spacing=numerology,
+            dl_ul_transmission_periodicity=tdd_pattern.periodicity_index,
+            nrof_downlink_slots=tdd_pattern.dl_slots,
+            nrof_downlink_symbols=tdd_pattern.dl_symbols,
+            nrof_uplink_slots=tdd_pattern.ul_slots,
+            nrof_uplink_symbols=tdd_pattern.ul_symbols,
+        )
+        gnb = Gnb(
+            gnb_id=parse_int("gNB_ID", self._config_gnb_du_id, hex_width=0),
+            gnb_name=self._config_gnb_du_name,
+            tracking_area_code=parse_int("tracking_area_code", self._config_tac),
+            plmn_list=[
+                Plmn(
+                    mcc=parse_int("mcc", self._config_mcc),
+                    mnc=parse_int("mnc", self._config_mnc),
+                    mnc_length=parse_int("mnc_length", self._config_mnc_length),
+                    snssai_list=[
+                        Snssai(
+                            sst=parse_int("sst", self._config_nssai_sst),
+                            sd=parse_int("sd", self._config_nssai_sd, hex_width=6),
+                        )
+                    ],
+                )
+            ],
+            nr_cellid=Int64(self._cell_identity.nr_cell_id),  # type: ignore[union-attr]
+            min_rxtxtime=performance["min_rxtxtime"],
+            pdsch_antenna_ports_xp=antenna_config.pdsch_antenna_ports_xp,
+            pdsch_antenna_ports_n1=antenna_config.pdsch_antenna_ports_n1,
+            pusch_antenna_ports=antenna_config.pusch_antenna_ports,
+            max_mimo_layers=antenna_config.max_mimo_layers,
+            force_256qam_off=0 if antenna_config.enable_256qam else 1,
+            pdcch_config_sib1=[
+                PdcchConfigSib1(
+                    control_resource_set_zero=frequency_plan.coreset0_index,
+                    search_space_zero=frequency_plan.search_space_zero_index,
+                )
+            ],
+            serving_cell_config_common=[serving_cell_config_common],
+            sctp=Sctp(
+                instreams=performance["SCTP_INSTREAMS"],
+                outstreams=performance["SCTP_OUTSTREAMS"],
+            ),
+        )
+        gnb_config = GnbConfig(
+            active_gnbs=(self._config_gnb_du_name,),
+            gnbs=[gnb],
+            macrlcs=[
+                MacRlc(
+                    local_n_if_name=self._get_du_f1_interface_name(du_f1_address),
+                    local_n_address=du_f1_address,
+                    remote_n_address=self.f1_requires.cu_address,
+                    local_n_portc=self._config_f1_c_port,
+                    local_n_portd=int(self._config_f1_du_port),
+                    remote_n_portc=self._config_cu_f1_c_port,
+                    remote_n_portd=int(self.f1_requires.cu_port),
+                    pusch_target_snrx10=performance["pusch_TargetSNRx10"],
+                    pucch_target_snrx10=performance["pucch_TargetSNRx10"],
+                )
+            ],
+            l1s=[
+                L1(
+                    prach_dtx_threshold=performance["prach_dtx_threshold"],
+                    pucch0_dtx_threshold=performance["pucch0_dtx_threshold"],
+                    ofdm_offset_divisor=performance["ofdm_offset_divisor"],
+                )
+            ],
+            rus=[
+                Ru(
+                    nb_tx=antenna_config.n_tx,
+                    nb_rx=antenna_config.n_rx,
+                    bands=[frequency_plan.band],
+                    bf_weights=antenna_config.beamforming_weights,
+                )
+            ],
+            thread_struct=[ThreadStruct(parallel_config=self._config_thread_parallel_config)],
+            rfsimulator=self._rfsimulator,
         )
+        return apply_overrides(gnb_config, gnb_parameters.overrides)
+
+    def _push_workload_scripts(self) -> None:
+        """Pushes the exporter and IQ recorder to the workload container unless up to date.
+
+        The workload container is recreated on charm upgrades, so running scripts always are
+        the pushed version.
+
+        Returns:
+            None
+        """
+        for file_name in WORKLOAD_SCRIPTS:
+            path = f"{STATS_EXPORTER_DIR}/{file_name}"
+            source = (Path(__file__).parent / file_name).read_text()
+            if self._container.exists(path):
+                if self._container.pull(path).read() == source:
+                    continue
+            self._container.push(path=path, source=source, make_dirs=True)
+            logger.info(f"Wrote file to container: {file_name}")
+
+    def _deliver_config(self, content: str) -> bool:
+        """Delivers gnb.conf to the workload container.
 
+        Args:
+            content: gnb.conf content.
+
+        Returns:
+            bool: Whether gnb.conf is up to date in the workload container.
+        """
+        if self._config_map_enabled:
+            return self._swap_config_map_key(content)
+        self._push_config(content)
+        return True
+
+    def _push_config(self, content: str) -> None:
         self._container.push(path=f"{BASE_CONFIG_PATH}/{CONFIG_FILE_NAME}", source=content)
         logger.info(f"Wrote file to container: {CONFIG_FILE_NAME}")
 
+    def _wait_for_path(self, path: str) -> bool:
+        """Returns whether the path exists in the workload container, polling for it."""
+        for attempt in range(CONFIG_MAP_POLL_ATTEMPTS):
+            if attempt:
+                time.sleep(CONFIG_MAP_POLL_INTERVAL_SECONDS)
+            if self._container.exists(path):
+                return True
+        return False
+
+    def _swap_config_map_key(self, content: str) -> bool:
+        """Stores gnb.conf under a versioned ConfigMap key and points gnb.conf to it.
+
+        The kubelet projects ConfigMap updates into the pod after a delay, so the symlink is only
+        swapped once the new key is mounted, which is polled for briefly. Keys of previous
+        versions are then removed, except the ones of known good versions, kept for rollbacks.
+
+        Args:
+            content: gnb.conf content.
+
+        Returns:
+            bool: Whether gnb.conf points to the content.
+        """
+        key = config_map_key(self._pod_name, content)
+        data = self.kubernetes.get_config_map_data(self._config_map_name)
+        if data.get(key) != content:
+            self.kubernetes.apply_config_map(
+                name=self._config_map_name,
+                data={key: content},
+                owner_statefulset_name=self.app.name,
+            )
+        mounted_path = f"{CONFIG_MAP_MOUNT_PATH}/{key}"
+        config_path = f"{BASE_CONFIG_PATH}/{CONFIG_FILE_NAME}"
+        if not self._wait_for_path(mounted_path):
+            logger.info("ConfigMap key %s is not mounted yet", key)
+            return False
+        try:
+            self._container.exec(["sh", "-c", SWAP_SCRIPT, "sh", mounted_path, config_path]).wait()
+        except (ChangeError, ExecError) as e:
+            logger.warning("Couldn't point %s to %s: %s", CONFIG_FILE_NAME, key, e)
+            return False
+        kept_keys = {key} | {
+            config_map_key(self._pod_name, entry["content"]) for entry in self._good_configs
+        }
+        stale_keys = stale_config_map_keys(data, self._pod_name, kept_keys)
+        if stale_keys:
+            self.kubernetes.apply_config_map(
+                name=self._config_map_name,
+                data={stale_key: None for stale_key in stale_keys},
+                owner_statefulset_name=self.app.name,
+            )
+        return True
+
     @property
     def _config_file_is_pushed(self) -> bool:
         """Check if config file is pushed to the container."""
@@ -209,9 +1828,355 @@ class Oai5GDUOperatorCharm(CharmBase):
         return self.model.config["nssai-sd"]
 
     @property
-    def _config_du_f1_interface_name(self) -> str:
+    def _config_cell_neighbours(self) -> Optional[Dict[str, set]]:
+        """Returns neighbour relations between units, keyed by unit name.
+
+        None means every unit neighbours every other unit.
+        """
+        value = str(self.model.config["cell-neighbours"])
+        if not value:
+            return None
+        return {
+            f"{self.app.name}/{unit}": {f"{self.app.name}/{other}" for other in others}
+            for unit, others in parse_neighbours(value).items()
+        }
+
+    @property
+    def _config_reserved_pcis(self) -> List[int]:
+        value = str(self.model.config["reserved-pcis"])
+        return [int(pci) for pci in value.split(",") if pci.strip()]
+
+    @property
+    def _config_nr_cell_id_base(self) -> int:
+        return int(self.model.config["nr-cellid-base"])
+
+    @property
+    def _gnb_parameters(self) -> GnbParameters:
+        """Returns the validated frequency plan, TDD pattern, antenna and performance settings."""
+        validate_ports(self._host_ports)
+        validate_config_delivery(self._config_delivery)
+        self._validate_iq_settings()
+        self._validate_log_settings()
+        self._validate_node_placement()
+        validate_rolling_restart(
+            self._config_rolling_restart_max_concurrent,
+            self._config_rolling_restart_min_serving_percent,
+        )
+        frequency_plan = self._frequency_plan
+        return GnbParameters(
+            frequency_plan=frequency_plan,
+            tdd_pattern=self._get_tdd_pattern(frequency_plan.numerology),
+            antenna_config=self._antenna_config,
+            performance=self._performance_parameters,
+            overrides=self._gnb_config_overrides,
+            f1_network=self._f1_network_config,
+            sysctls=self._config_sysctls,
+        )
+
+    @property
+    def _config_sysctls(self) -> Dict[str, str]:
+        return parse_sysctls(str(self.model.config["sysctls"]))
+
+    @property
+    def _f1_network_config(self) -> Optional[Dict[str, Any]]:
+        """Returns the CNI configuration of the F1 secondary network, None when disabled."""
+        network_type = str(self.model.config["f1-network-type"])
+        if not network_type:
+            return None
+        if self._config_host_network:
+            raise F1NetworkError("F1 secondary network can't be used with host networking")
+        return network_attachment_config(
+            network_type=network_type,
+            master=str(self.model.config["f1-network-master"]),
+            subnet=str(self.model.config["f1-network-subnet"]),
+            ipam=str(self.model.config["f1-network-ipam"]),
+        )
+
+    @property
+    def _f1_network_enabled(self) -> bool:
+        return bool(self.model.config["f1-network-type"])
+
+    @property
+    def _f1_network_attachment_name(self) -> str:
+        return f"{self.app.name}-f1"
+
+    @property
+    def _pod_annotations(self) -> Dict[str, Optional[str]]:
+        """Returns the pod annotations, None values being annotations to remove."""
+        return {
+            MULTUS_NETWORKS_ANNOTATION: multus_networks_annotation(
+                self._f1_network_attachment_name
+            )
+            if self._f1_network_enabled
+            else None
+        }
+
+    @property
+    def _gnb_config_overrides(self) -> Dict[str, Any]:
+        """Returns the gnb.conf overrides, checked against the default configuration."""
+        value = str(self.model.config["gnb-config-overrides"])
+        try:
+            overrides = yaml.safe_load(value) if value.strip() else {}
+        except yaml.YAMLError as e:
+            raise GnbConfigError(f"gnb-config-overrides is not valid YAML: {e}")
+        if not isinstance(overrides, dict):
+            raise GnbConfigError("gnb-config-overrides must be a mapping of sections")
+        apply_overrides(GnbConfig(), overrides)
+        return overrides
+
+    @property
+    def _performance_parameters(self) -> Dict[str, int]:
+        """Returns the validated gNB parameters of the selected performance profile."""
+        return get_performance_parameters(
+            profile=str(self.model.config["performance-profile"]),
+            overrides=parse_overrides(str(self.model.config["performance-overrides"])),
+        )
+
+    @property
+    def _antenna_config(self) -> AntennaConfig:
+        """Returns the validated antenna and MIMO configuration."""
+        antenna_config = AntennaConfig(
+            n_tx=int(self.model.config["n-tx-antennas"]),
+            n_rx=int(self.model.config["n-rx-antennas"]),
+            max_mimo_layers=int(self.model.config["max-mimo-layers"]),
+            pdsch_antenna_ports=int(self.model.config["pdsch-antenna-ports"]),
+            pusch_antenna_ports=int(self.model.config["pusch-antenna-ports"]),
+            enable_256qam=bool(self.model.config["enable-256qam"]),
+        )
+        antenna_config.validate()
+        return antenna_config
+
+    @property
+    def _frequency_plan(self) -> FrequencyPlan:
+        """Returns the validated frequency plan of the carrier."""
+        return plan_frequencies(
+            band=self._config_band,
+            bandwidth_mhz=self._config_bandwidth_mhz,
+            scs_khz=self._config_scs,
+            center_frequency_khz=self._config_center_frequency_khz,
+        )
+
+    def _get_tdd_pattern(self, numerology: int) -> TddPattern:
+        """Returns the validated TDD pattern selected in the configuration.
+
+        Args:
+            numerology: Numerology of the carrier.
+
+        Returns:
+            TddPattern: TDD pattern
+        """
+        tdd_pattern = get_tdd_pattern(
+            name=str(self.model.config["tdd-pattern"]),
+            numerology=numerology,
+            custom=TddPattern(
+                periodicity_ms=float(self.model.config["tdd-periodicity-ms"]),
+                dl_slots=int(self.model.config["tdd-dl-slots"]),
+                dl_symbols=int(self.model.config["tdd-dl-symbols"]),
+                ul_slots=int(self.model.config["tdd-ul-slots"]),
+                ul_symbols=int(self.model.config["tdd-ul-symbols"]),
+            ),
+        )
+        logger.info(
+            "TDD pattern %s: theoretical DL/UL capacity ratio %.2f",
+            tdd_pattern,
+            tdd_pattern.dl_ul_ratio,
+        )
+        return tdd_pattern
+
+    @property
+    def _config_band(self) -> int:
+        return int(self.model.config["band"])
+
+    @property
+    def _config_bandwidth_mhz(self) -> int:
+        return int(self.model.config["bandwidth-mhz"])
+
+    @property
+    def _config_scs(self) -> int:
+        return int(self.model.config["scs"])
+
+    @property
+    def _config_center_frequency_khz(self) -> int:
+        return round(float(self.model.config["center-frequency"]) * 1000)
+
+    @property
+    def _config_enable_telnet(self) -> bool:
+        return bool(self.model.config["enable-telnet"])
+
+    def _get_du_f1_interface_name(self, du_f1_address: str) -> str:
+        """Returns the name of the interface F1 is bound to.
+
+        Args:
+            du_f1_address: DU F1 IPv4 address.
+
+        Returns:
+            str: Interface name.
+        """
+        if self._f1_network_enabled:
+            return F1_INTERFACE_NAME
+        if self._config_host_network:
+            return get_interface_name_for_address(du_f1_address) or "eth0"
         return "eth0"
 
+    @property
+    def _config_check_stats_freshness(self) -> bool:
+        return bool(self.model.config["check-stats-freshness"])
+
+    @property
+    def _config_rolling_restart_max_concurrent(self) -> int:
+        return int(self.model.config["rolling-restart-max-concurrent"])
+
+    @property
+    def _config_rolling_restart_min_serving_percent(self) -> int:
+        return int(self.model.config["rolling-restart-min-serving-percent"])
+
+    @property
+    def _config_node_selector(self) -> Dict[str, str]:
+        return parse_node_selector(str(self.model.config["node-selector"]))
+
+    @property
+    def _config_tolerations(self) -> List[Toleration]:
+        return parse_tolerations(str(self.model.config["tolerations"]))
+
+    @property
+    def _config_spread_across_nodes(self) -> bool:
+        return bool(self.model.config["spread-across-nodes"])
+
+    def _validate_node_placement(self) -> None:
+        parse_node_selector(str(self.model.config["node-selector"]))
+        parse_tolerations(str(self.model.config["tolerations"]))
+
+    @property
+    def _config_cpu_measurements(self) -> bool:
+        return bool(self.model.config["cpu-measurements"])
+
+    @property
+    def _config_thread_stats_metrics(self) -> bool:
+        return bool(self.model.config["thread-stats-metrics"])
+
+    @property
+    def _config_host_network(self) -> bool:
+        return bool(self.model.config["host-network"])
+
+    @property
+    def _config_delivery(self) -> str:
+        return str(self.model.config["config-delivery"])
+
+    @property
+    def _config_map_enabled(self) -> bool:
+        return self._config_delivery == CONFIG_DELIVERY_CONFIG_MAP
+
+    @property
+    def _config_map_name(self) -> str:
+        return f"{self.app.name}-config"
+
+    @property
+    def _config_log_to_file(self) -> bool:
+        return bool(self.model.config["log-to-file"])
+
+    @property
+    def _config_log_file_max_size_mb(self) -> int:
+        return int(self.model.config["log-file-max-size-mb"])
+
+    @property
+    def _config_log_file_backups(self) -> int:
+        return int(self.model.config["log-file-backups"])
+
+    def _validate_log_settings(self) -> None:
+        validate_log_settings(self._config_log_file_max_size_mb, self._config_log_file_backups)
+
+    @property
+    def _log_volume_size(self) -> Optional[str]:
+        """Returns the size limit of the log volume, None without file logging."""
+        if not self._config_log_to_file:
+            return None
+        size_mb = log_volume_size_mb(
+            self._config_log_file_max_size_mb, self._config_log_file_backups
+        )
+        return f"{size_mb}Mi"
+
+    @property
+    def _config_iq_mode(self) -> str:
+        return str(self.model.config["rfsim-iq-mode"])
+
+    @property
+    def _config_iq_ring_size_mb(self) -> int:
+        return int(self.model.config["rfsim-iq-ring-size-mb"])
+
+    @property
+    def _config_iq_replay_file(self) -> str:
+        return str(self.model.config["rfsim-iq-replay-file"])
+
+    def _validate_iq_settings(self) -> None:
+        validate_iq_settings(
+            self._config_iq_mode, self._config_iq_ring_size_mb, self._config_iq_replay_file
+        )
+
+    @property
+    def _iq_settings(self) -> Dict[str, Any]:
+        """Returns the IQ settings the IQ services run with."""
+        mode = self._config_iq_mode
+        return {
+            "mode": mode,
+            "ring-size-mb": self._config_iq_ring_size_mb if mode == IQ_MODE_RECORD else None,
+            "replay-file": self._config_iq_replay_file if mode == IQ_MODE_REPLAY else None,
+        }
+
+    @property
+    def _iq_service_name(self) -> Optional[str]:
+        """Returns the Pebble service of the IQ mode, None when IQ samples aren't handled."""
+        return {
+            IQ_MODE_RECORD: IQ_RECORDER_SERVICE_NAME,
+            IQ_MODE_REPLAY: IQ_REPLAY_SERVICE_NAME,
+        }.get(self._config_iq_mode)
+
+    @property
+    def _replay_file_path(self) -> str:
+        return f"{IQ_RECORDINGS_DIR}/{self._config_iq_replay_file}"
+
+    @property
+    def _replay_file_exists(self) -> bool:
+        if self._config_iq_mode != IQ_MODE_REPLAY:
+            return True
+        return self._container.exists(self._replay_file_path)
+
+    @property
+    def _rfsimulator(self) -> RfSimulator:
+        """Returns the rfsimulator section of the IQ mode.
+
+        Recorded samples are written to the FIFO read by the IQ recorder. In replay mode,
+        nr-softmodem is the client of the local IQ replayer.
+        """
+        if self._config_iq_mode == IQ_MODE_RECORD:
+            return RfSimulator(options=("saviq",), iq_file=IQ_FIFO_PATH)
+        if self._config_iq_mode == IQ_MODE_REPLAY:
+            return RfSimulator(serveraddr="127.0.0.1")
+        return RfSimulator()
+
+    @property
+    def _pod_name(self) -> str:
+        return self.unit.name.replace("/", "-")
+
+    @property
+    def _workload_ports(self) -> List[WorkloadPort]:
+        """Returns the ports the DU listens on, which its Service exposes."""
+        return [
+            WorkloadPort("s1c", int(self._config_gnb_s1c_port), "SCTP"),
+            WorkloadPort("s1u", int(self._config_gnb_s1u_port), "UDP"),
+            WorkloadPort("x2c", int(self._config_gnb_x2c_port), "UDP"),
+            WorkloadPort("f1c", self._config_f1_c_port, "SCTP"),
+            WorkloadPort("f1", int(self._config_f1_du_port), "UDP"),
+            WorkloadPort("metrics", METRICS_PORT, "TCP"),
+        ]
+
+    @property
+    def _host_ports(self) -> List[WorkloadPort]:
+        """Returns the ports the DU binds on the node in host networking mode."""
+        host_ports = self._workload_ports
+        if self._config_enable_telnet:
+            host_ports.append(WorkloadPort("telnet", TELNET_PORT, "TCP"))
+        return host_ports
+
     @property
     def _config_gnb_s1c_port(self) -> str:
         return "36412"
@@ -226,37 +2191,158 @@ class Oai5GDUOperatorCharm(CharmBase):
 
     @property
     def _config_f1_du_port(self) -> str:
-        return "2153"
+        return str(self.model.config["f1-u-port"])
+
+    @property
+    def _config_f1_c_port(self) -> int:
+        return int(self.model.config["f1-c-port"])
+
+    @property
+    def _config_cu_f1_c_port(self) -> int:
+        return int(self.model.config["cu-f1-c-port"])
 
     @property
     def _config_thread_parallel_config(self) -> str:
         return "PARALLEL_SINGLE_THREAD"
 
     @property
-    def _du_ip_address(self) -> str:
+    def _du_f1_address(self) -> Optional[str]:
+        """Returns the DU F1 IPv4 address.
+
+        This is the address of the secondary F1 interface when enabled, the node address in host
+        networking mode, once the pod runs in the network namespace of the node, and the
+        LoadBalancer address otherwise.
+        """
+        if self._f1_network_enabled:
+            return get_interface_ipv4_address(F1_INTERFACE_NAME)
+        if self._config_host_network:
+            host_ip = self.kubernetes.get_pod_host_ip(self._pod_name)
+            if not host_ip or not get_interface_name_for_address(host_ip):
+                return None
+            return host_ip
         du_hostname, du_ipv4_address = self.kubernetes.get_service_load_balancer_address(
             name=self.app.name
         )
-        if not du_ipv4_address:
-            raise ValueError("No IPv4 address found for DU")
         return du_ipv4_address
 
     @property
-    def _pebble_layer(self) -> dict:
+    def _softmodem_command(self) -> str:
+        """Returns the nr-softmodem command line.
+
+        With file logging, the log writer starts nr-softmodem with its output going to the FIFO
+        of the log writer instead of to Pebble, opened without blocking so that nr-softmodem drops
+        lines rather than stalls when the log writer falls behind.
+        """
+        command = f"/opt/oai-gnb/bin/nr-softmodem -O {BASE_CONFIG_PATH}/{CONFIG_FILE_NAME} --sa -E --rfsim --log_config.global_log_options level nocolor time"  # noqa: E501
+        if self._config_cpu_measurements:
+            command += " --cpu-meas"
+        if self._config_enable_telnet:
+            command += f" --telnetsrv --telnetsrv.listenaddr 127.0.0.1 --telnetsrv.listenport {TELNET_PORT}"  # noqa: E501
+        if self._config_log_to_file:
+            command = f"python3 {LOG_WRITER_PATH} exec --fifo {LOG_FIFO_PATH} {command}"
+        return command
+
+    @property
+    def _log_service_name(self) -> str:
+        """Returns the Pebble service whose logs hold the nr-softmodem lines the analyzer follows."""  # noqa: E501, W505
+        return LOG_WRITER_SERVICE_NAME if self._config_log_to_file else self._service_name
+
+    @property
+    def _stats_exporter_command(self) -> str:
+        command = f"python3 {STATS_EXPORTER_DIR}/stats_exporter.py --stats-dir {STATS_DIR} --port {METRICS_PORT} --pebble-socket {WORKLOAD_PEBBLE_SOCKET_PATH} --log-service {self._log_service_name}"  # noqa: E501
+        if self._config_thread_stats_metrics:
+            command += " --thread-stats"
+        return command
+
+    @property
+    def _pebble_layer(self) -> LayerDict:
         """Return a dictionary representing a Pebble layer."""
-        return {
+        checks = pebble_checks(
+            cu_f1_c_address=self.f1_requires.cu_address or "",
+            cu_f1_c_port=self._config_cu_f1_c_port,
+            stats_file=f"{STATS_DIR}/{MAC_STATS_FILE}",
+            stats_freshness=self._config_check_stats_freshness,
+        )
+        services: Dict[str, Dict[str, Any]] = {
+            self._service_name: {
+                "override": "replace",
+                "summary": "du",
+                "command": self._softmodem_command,
+                "startup": "enabled",
+                "working-dir": STATS_DIR,
+                "on-check-failure": restart_on_failure(checks),
+            },
+            STATS_EXPORTER_SERVICE_NAME: {
+                "override": "replace",
+                "summary": "nr-softmodem statistics exporter",
+                "command": self._stats_exporter_command,
+                "startup": "enabled",
+            },
+        }
+        services.update(self._iq_services)
+        services.update(self._log_writer_services)
+        if self._helper_service_names:
+            services[self._service_name]["after"] = self._helper_service_names
+        layer = {
             "summary": "du layer",
             "description": "pebble config layer for du",
-            "services": {
-                self._service_name: {
-                    "override": "replace",
-                    "summary": "du",
-                    "command": f"/opt/oai-gnb/bin/nr-softmodem -O {BASE_CONFIG_PATH}/{CONFIG_FILE_NAME} --sa -E --rfsim --log_config.global_log_options level nocolor time",  # noqa: E501
-                    "startup": "enabled",
-                }
-            },
+            "services": services,
+            "checks": checks,
+        }
+        return cast(LayerDict, layer)
+
+    @property
+    def _iq_services(self) -> Dict[str, dict]:
+        """Returns the IQ recorder or replayer, started before nr-softmodem.
+
+        Services of another IQ mode that are in the plan are disabled, so that replans don't
+        start them again.
+        """
+        services: Dict[str, dict] = {}
+        plan_services = self._container.get_plan().services
+        for name in (IQ_RECORDER_SERVICE_NAME, IQ_REPLAY_SERVICE_NAME):
+            if name in plan_services:
+                services[name] = {"override": "merge", "startup": "disabled"}
+        if self._config_iq_mode == IQ_MODE_RECORD:
+            services[IQ_RECORDER_SERVICE_NAME] = {
+                "override": "replace",
+                "summary": "rfsimulator IQ recorder",
+                "command": f"python3 {IQ_RECORDER_PATH} record --size-mb {self._config_iq_ring_size_mb}",  # noqa: E501
+                "startup": "enabled",
+            }
+        elif self._config_iq_mode == IQ_MODE_REPLAY:
+            services[IQ_REPLAY_SERVICE_NAME] = {
+                "override": "replace",
+                "summary": "rfsimulator IQ replayer",
+                "command": f"python3 {IQ_RECORDER_PATH} replay --file {self._replay_file_path} --port {self._rfsimulator.serverport}",  # noqa: E501
+                "startup": "enabled",
+            }
+        return services
+
+    @property
+    def _log_writer_services(self) -> Dict[str, dict]:
+        """Returns the log writer with file logging, disabled when it is in the plan otherwise."""
+        if not self._config_log_to_file:
+            if LOG_WRITER_SERVICE_NAME in self._container.get_plan().services:
+                return {LOG_WRITER_SERVICE_NAME: {"override": "merge", "startup": "disabled"}}
+            return {}
+        return {
+            LOG_WRITER_SERVICE_NAME: {
+                "override": "replace",
+                "summary": "nr-softmodem log writer",
+                "command": f"python3 {LOG_WRITER_PATH} write --max-size-mb {self._config_log_file_max_size_mb} --backups {self._config_log_file_backups}",  # noqa: E501
+                "startup": "enabled",
+            }
         }
 
+    @property
+    def _helper_service_names(self) -> List[str]:
+        """Returns the services nr-softmodem writes to, started before it."""
+        names = [self._iq_service_name] if self._iq_service_name else []
+        if self._config_log_to_file:
+            names.append(LOG_WRITER_SERVICE_NAME)
+        return names
+
 
 if __name__ == "__main__":
     main(Oai5GDUOperatorCharm)
@@ -0,0 +1,91 @@
+# Copyright 2022 Guillaume Belanger
+# See LICENSE file for licensing details.
+
+"""Delivery of gnb.conf to the workload container.
+
+gnb.conf is either pushed over Pebble into the container filesystem, or rendered into a ConfigMap
+mounted in the du container. In the latter case, every version of the file is stored under its
+own key, named after the pod and the hash of the content, and the path nr-softmodem reads is a
+symlink swapped to the new key once the kubelet has projected it, so nr-softmodem never reads a
+partially updated file.
+"""
+
+import hashlib
+from typing import Collection, Iterable, List
+
+CONFIG_DELIVERY_PUSH = "push"
+CONFIG_DELIVERY_CONFIG_MAP = "configmap"
+CONFIG_DELIVERY_MODES = (CONFIG_DELIVERY_PUSH, CONFIG_DELIVERY_CONFIG_MAP)
+CONFIG_MAP_MOUNT_PATH = "/opt/oai-gnb/etc-configmap"
+HASH_LENGTH = 12
+
+# Points `$2` to `$1`, rename(2) replacing the previous symlink atomically
+SWAP_SCRIPT = """
+ln -sfn "$1" "$2.new" && mv -Tf "$2.new" "$2"
+"""
+
+
+class ConfigDeliveryError(Exception):
+    """Raised when the configuration delivery mode is invalid."""
+
+
+def validate_config_delivery(value: str) -> None:
+    """Raises ConfigDeliveryError when the configuration delivery mode is unknown.
+
+    Args:
+        value: Value of the `config-delivery` option.
+
+    Returns:
+        None
+    """
+    if value not in CONFIG_DELIVERY_MODES:
+        raise ConfigDeliveryError(
+            f"Config delivery must be one of {', '.join(CONFIG_DELIVERY_MODES)}, got '{value}'"
+        )
+
+
+def config_hash(content: str) -> str:
+    """Returns the hash identifying a version of the configuration.
+
+    Args:
+        content: Configuration file content.
+
+    Returns:
+        str: Truncated SHA-256 of the content.
+    """
+    return hashlib.sha256(content.encode()).hexdigest()[:HASH_LENGTH]
+
+
+def config_map_key(pod_name: str, content: str) -> str:
+    """Returns the ConfigMap key of a version of the configuration of a pod.
+
+    Args:
+        pod_name: Pod name.
+        content: Configuration file content.
+
+    Returns:
+        str: ConfigMap key.
+    """
+    return f"{pod_name}-{config_hash(content)}.conf"
+
+
+def stale_config_map_keys(
+    keys: Iterable[str], pod_name: str, kept_keys: Collection[str]
+) -> List[str]:
+    """Returns the keys of previous versions of the configuration of a pod.
+
+    Args:
+        keys: Keys of the ConfigMap.
+        pod_name: Pod name.
+        kept_keys: Keys of the configuration in use and of the versions kept for rollbacks.
+
+    Returns:
+        list: Keys to remove.
+    """
+    prefix = f"{pod_name}-"
+    key_length = len(prefix) + HASH_LENGTH + len(".conf")
+    return sorted(
+        key
+        for key in keys
+        if key.startswith(prefix) and len(key) == key_length and key not in kept_keys
+    )
@@ -0,0 +1,55 @@
+# Copyright 2022 Guillaume Belanger
+# See LICENSE file for licensing details.
+
+"""Section level gnb.conf change detection and classification.
+
+A change is either applied to the running nr-softmodem (`hot`) or needs the process to be
+restarted (`restart`).
+"""
+
+from typing import Dict, Iterable, List
+
+HOT = "hot"
+RESTART = "restart"
+
+# Sections nr-softmodem can apply at runtime through its telnet server
+HOT_SECTIONS = ("log_config",)
+
+
+def changed_sections(previous: Dict[str, str], current: Dict[str, str]) -> List[str]:
+    """Returns the sections that were added, removed or modified.
+
+    Args:
+        previous: Serialized sections of the previous configuration, keyed by path.
+        current: Serialized sections of the new configuration, keyed by path.
+
+    Returns:
+        list: Sorted section paths.
+    """
+    return sorted(
+        section
+        for section in set(previous) | set(current)
+        if previous.get(section) != current.get(section)
+    )
+
+
+def classify_changes(
+    previous: Dict[str, str], current: Dict[str, str], hot_sections: Iterable[str]
+) -> Dict[str, str]:
+    """Classifies each changed section as hot applicable or restart requiring.
+
+    Args:
+        previous: Serialized sections of the previous configuration, keyed by path.
+        current: Serialized sections of the new configuration, keyed by path.
+        hot_sections: Sections that can be applied without a restart.
+
+    Returns:
+        dict: Change class of each changed section.
+    """
+    hot_sections = set(hot_sections)
+    if not previous:
+        return {section: RESTART for section in current}
+    return {
+        section: HOT if section in hot_sections else RESTART
+        for section in changed_sections(previous, current)
+    }
@@ -0,0 +1,72 @@
+# Copyright 2022 Guillaume Belanger
+# See LICENSE file for licensing details.
+
+"""Last known good versions of gnb.conf and crash loop detection.
+
+A version of gnb.conf is good once nr-softmodem ran it with every Pebble check up. When a new
+version makes nr-softmodem crash loop, the charm rolls back to the most recent good version.
+"""
+
+from typing import Dict, List, Mapping, Optional
+
+from ops.pebble import CheckInfo, CheckLevel, CheckStatus, ServiceInfo, ServiceStatus
+
+# Good versions kept for rollbacks
+GOOD_CONFIG_HISTORY_SIZE = 3
+# Pebble reports services waiting to be restarted after exiting in the `backoff` state
+SERVICE_BACKOFF = "backoff"
+
+
+def record_good_config(
+    history: List[Dict[str, str]], digest: str, content: str, recorded_at: str
+) -> List[Dict[str, str]]:
+    """Returns the history of good versions with a version added as the most recent one.
+
+    Args:
+        history: Good versions, oldest first.
+        digest: Hash of the version.
+        content: Content of the version.
+        recorded_at: Time the version was found good.
+
+    Returns:
+        list: Good versions, oldest first, at most GOOD_CONFIG_HISTORY_SIZE of them.
+    """
+    history = [entry for entry in history if entry["hash"] != digest]
+    history.append({"hash": digest, "content": content, "recorded-at": recorded_at})
+    return history[-GOOD_CONFIG_HISTORY_SIZE:]
+
+
+def last_good_config(history: List[Dict[str, str]]) -> Optional[Dict[str, str]]:
+    """Returns the most recent good version, None when there is none.
+
+    Args:
+        history: Good versions, oldest first.
+
+    Returns:
+        dict: Hash, content and recording time of the version.
+    """
+    return history[-1] if history else None
+
+
+def crash_loop_cause(
+    service: Optional[ServiceInfo], checks: Mapping[str, CheckInfo]
+) -> Optional[str]:
+    """Returns why nr-softmodem is crash looping, None when it isn't.
+
+    nr-softmodem crash loops when Pebble is waiting to restart it after it exited, or when one of
+    its liveness checks is down. Failing readiness checks only mean it isn't serving yet.
+
+    Args:
+        service: Pebble service of nr-softmodem.
+        checks: Pebble checks, keyed by name.
+
+    Returns:
+        str: Cause of the crash loop.
+    """
+    if service and service.current in (SERVICE_BACKOFF, ServiceStatus.ERROR):
+        current = getattr(service.current, "value", service.current)
+        return f"{service.name} service in {current} state"
+    for name, check in sorted(checks.items()):
+        if check.level == CheckLevel.ALIVE and check.status == CheckStatus.DOWN:
+            return f"{name} check down"
+    return None
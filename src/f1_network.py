@@ -0,0 +1,110 @@
+# Copyright 2022 Guillaume Belanger
+# See LICENSE file for licensing details.
+
+"""Secondary network (Multus) attachment of the F1 interface.
+
+With a secondary network, F1 traffic uses a macvlan or ipvlan interface of the pod instead of the
+LoadBalancer Service, so that F1-U GTP packets are not NATed by kube-proxy.
+"""
+
+import fcntl
+import ipaddress
+import json
+import socket
+import struct
+from typing import Any, Dict, Optional
+
+F1_INTERFACE_NAME = "f1"
+MULTUS_NETWORKS_ANNOTATION = "k8s.v1.cni.cncf.io/networks"
+NETWORK_MODES = {"macvlan": "bridge", "ipvlan": "l2"}
+IPAM_SUBNET_KEYS = {"host-local": "subnet", "whereabouts": "range"}
+SIOCGIFADDR = 0x8915
+
+
+class F1NetworkError(Exception):
+    """Raised when the F1 secondary network configuration is not valid."""
+
+
+def network_attachment_config(
+    network_type: str, master: str, subnet: str, ipam: str
+) -> Dict[str, Any]:
+    """Returns the CNI configuration of the F1 NetworkAttachmentDefinition.
+
+    Args:
+        network_type: `macvlan` or `ipvlan`.
+        master: Host interface the secondary interface is attached to.
+        subnet: IPv4 subnet addresses are allocated from, in CIDR notation.
+        ipam: IPAM plugin, `host-local` or `whereabouts`. `host-local` allocates per node, so
+            `whereabouts` is needed when units are spread across nodes.
+
+    Returns:
+        dict: CNI configuration.
+    """
+    if network_type not in NETWORK_MODES:
+        raise F1NetworkError(
+            f"F1 network type must be one of {', '.join(NETWORK_MODES)}, got {network_type}"
+        )
+    if not master:
+        raise F1NetworkError("F1 network master interface can't be empty")
+    if ipam not in IPAM_SUBNET_KEYS:
+        raise F1NetworkError(f"F1 network IPAM must be one of {', '.join(IPAM_SUBNET_KEYS)}")
+    try:
+        network = ipaddress.IPv4Network(subnet)
+    except ValueError:
+        raise F1NetworkError(f"F1 network subnet must be an IPv4 CIDR, got {subnet!r}")
+    return {
+        "cniVersion": "0.3.1",
+        "type": network_type,
+        "master": master,
+        "mode": NETWORK_MODES[network_type],
+        "ipam": {"type": ipam, IPAM_SUBNET_KEYS[ipam]: str(network)},
+    }
+
+
+def multus_networks_annotation(network_attachment_name: str) -> str:
+    """Returns the pod annotation attaching the network as the F1 interface.
+
+    Args:
+        network_attachment_name: Name of the NetworkAttachmentDefinition.
+
+    Returns:
+        str: Value of the `k8s.v1.cni.cncf.io/networks` annotation.
+    """
+    return json.dumps([{"name": network_attachment_name, "interface": F1_INTERFACE_NAME}])
+
+
+def get_interface_ipv4_address(interface_name: str) -> Optional[str]:
+    """Returns the IPv4 address of a network interface of the pod.
+
+    The charm container shares the network namespace of the workload container, so the
+    interfaces Multus attaches to the pod are visible to the charm.
+
+    Args:
+        interface_name: Interface name.
+
+    Returns:
+        str: IPv4 address, None when the interface doesn't exist or has no address.
+    """
+    with socket.socket(socket.AF_INET, socket.SOCK_DGRAM) as sock:
+        try:
+            response = fcntl.ioctl(
+                sock.fileno(), SIOCGIFADDR, struct.pack("256s", interface_name[:15].encode())
+            )
+        except OSError:
+            return None
+    return socket.inet_ntoa(response[20:24])
+
+
+def get_interface_name_for_address(address: str) -> Optional[str]:
+    """Returns the name of the interface holding an IPv4 address.
+
+    Args:
+        address: IPv4 address.
+
+    Returns:
+        str: Interface name, None when no interface holds the address.
+    """
+    for _, interface_name in socket.if_nameindex():
+        if get_interface_ipv4_address(interface_name) == address:
+            return interface_name
+    return None
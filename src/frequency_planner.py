@@ -0,0 +1,345 @@
+# Copyright 2022 Guillaume Belanger
+# See LICENSE file for licensing details.
+
+"""Frequency planning for the DU carrier.
+
+Derives every frequency dependent gNB parameter (PRB count, Point A, SSB position, initial BWP
+and CORESET#0) from the band, channel bandwidth, subcarrier spacing and center frequency.
+All frequencies are handled in kHz.
+"""
+
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Tuple
+
+SSB_SUBCARRIERS = 240
+SUBCARRIERS_PER_PRB = 12
+MAX_BWP_SIZE = 275
+MAX_K_SSB = 23
+K_SSB_UNIT_KHZ = 15
+
+# TS 38.101-1 Table 5.3.2-1: maximum transmission bandwidth configuration (PRBs) per SCS (kHz)
+# and channel bandwidth (MHz)
+N_RB_TABLE: Dict[int, Dict[int, int]] = {
+    15: {5: 25, 10: 52, 15: 79, 20: 106, 25: 133, 30: 160, 40: 216, 50: 270},
+    30: {
+        5: 11,
+        10: 24,
+        15: 38,
+        20: 51,
+        25: 65,
+        30: 78,
+        40: 106,
+        50: 133,
+        60: 162,
+        70: 189,
+        80: 217,
+        90: 245,
+        100: 273,
+    },
+}
+
+NUMEROLOGY = {15: 0, 30: 1}
+
+# TS 38.213 Tables 13-1 (15/15 kHz) and 13-4 (30/30 kHz):
+# index -> (number of RBs, number of symbols, offset in RBs)
+CORESET0_TABLES: Dict[int, Dict[int, Tuple[int, int, int]]] = {
+    15: {
+        0: (24, 2, 0),
+        1: (24, 2, 2),
+        2: (24, 2, 4),
+        3: (24, 3, 0),
+        4: (24, 3, 2),
+        5: (24, 3, 4),
+        6: (48, 1, 12),
+        7: (48, 1, 16),
+        8: (48, 2, 12),
+        9: (48, 2, 16),
+        10: (48, 3, 12),
+        11: (48, 3, 16),
+        12: (96, 1, 38),
+        13: (96, 2, 38),
+        14: (96, 3, 38),
+    },
+    30: {
+        0: (24, 2, 0),
+        1: (24, 2, 1),
+        2: (24, 2, 2),
+        3: (24, 2, 3),
+        4: (24, 2, 4),
+        5: (24, 3, 0),
+        6: (24, 3, 1),
+        7: (24, 3, 2),
+        8: (24, 3, 3),
+        9: (24, 3, 4),
+        10: (48, 1, 12),
+        11: (48, 1, 14),
+        12: (48, 1, 16),
+        13: (48, 2, 12),
+        14: (48, 2, 14),
+        15: (48, 2, 16),
+    },
+}
+
+# CORESET#0 configurations tried in order: largest single symbol CORESETs first.
+CORESET0_PREFERENCE: Dict[int, List[int]] = {
+    15: [7, 6, 12, 9, 8, 13, 11, 10, 14, 2, 1, 0, 5, 4, 3],
+    30: [12, 11, 10, 15, 14, 13, 4, 3, 2, 1, 0, 9, 8, 7, 6, 5],
+}
+
+# searchSpaceZero index 0 (TS 38.213 Table 13-11): O=0, one search space set per slot.
+SEARCH_SPACE_ZERO = 0
+
+
+class FrequencyPlanError(Exception):
+    """Raised when the requested carrier cannot be planned."""
+
+
+@dataclass(frozen=True)
+class SyncRaster:
+    """Synchronization raster entries of a band for an SSB subcarrier spacing."""
+
+    gscn_first: int
+    gscn_last: int
+    gscn_step: int
+
+
+@dataclass(frozen=True)
+class Band:
+    """NR operating band (TS 38.101-1 Tables 5.2-1 and 5.4.3.3-1)."""
+
+    number: int
+    low_khz: int
+    high_khz: int
+    sync_rasters: Dict[int, SyncRaster]
+
+    @property
+    def ssb_scs_khz(self) -> Tuple[int, ...]:
+        """Returns the subcarrier spacings the band supports for SSB."""
+        return tuple(sorted(self.sync_rasters))
+
+
+BANDS: Dict[int, Band] = {
+    band.number: band
+    for band in [
+        Band(38, 2570000, 2620000, {15: SyncRaster(6432, 6543, 1)}),
+        Band(40, 2300000, 2400000, {30: SyncRaster(5762, 5989, 1)}),
+        Band(
+            41,
+            2496000,
+            2690000,
+            {15: SyncRaster(6246, 6717, 3), 30: SyncRaster(6252, 6714, 3)},
+        ),
+        Band(77, 3300000, 4200000, {30: SyncRaster(7711, 8329, 1)}),
+        Band(78, 3300000, 3800000, {30: SyncRaster(7711, 8051, 1)}),
+        Band(79, 4400000, 5000000, {30: SyncRaster(8480, 8880, 16)}),
+    ]
+}
+
+
+@dataclass(frozen=True)
+class FrequencyPlan:
+    """Frequency dependent gNB parameters."""
+
+    band: int
+    scs_khz: int
+    numerology: int
+    bandwidth_mhz: int
+    n_rb: int
+    center_frequency_khz: int
+    point_a_khz: int
+    point_a_arfcn: int
+    ssb_frequency_khz: int
+    ssb_arfcn: int
+    gscn: int
+    ssb_offset_prb: int
+    k_ssb: int
+    ssb_positions_in_burst_pr: int
+    coreset0_index: int
+    coreset0_start_prb: int
+    coreset0_n_rb: int
+    search_space_zero_index: int
+    initial_bwp_start_prb: int
+    initial_bwp_n_rb: int
+    initial_bwp_riv: int
+
+
+def frequency_to_arfcn(frequency_khz: int) -> int:
+    """Converts a frequency to an NR-ARFCN (TS 38.104 section 5.4.2.1).
+
+    Args:
+        frequency_khz: Frequency in kHz.
+
+    Returns:
+        int: NR-ARFCN
+    """
+    if 0 <= frequency_khz < 3000000:
+        if frequency_khz % 5:
+            raise FrequencyPlanError(f"{frequency_khz} kHz is not on the 5 kHz global raster")
+        return frequency_khz // 5
+    if 3000000 <= frequency_khz < 24250000:
+        if (frequency_khz - 3000000) % 15:
+            raise FrequencyPlanError(f"{frequency_khz} kHz is not on the 15 kHz global raster")
+        return 600000 + (frequency_khz - 3000000) // 15
+    raise FrequencyPlanError(f"{frequency_khz} kHz is outside of FR1")
+
+
+def gscn_to_frequency(gscn: int) -> int:
+    """Converts a GSCN to the SSB reference frequency in kHz (TS 38.104 section 5.4.3.1).
+
+    Args:
+        gscn: Global Synchronization Channel Number.
+
+    Returns:
+        int: SSB reference frequency in kHz.
+    """
+    if 2 <= gscn <= 7498:
+        n = (gscn + 1) // 3
+        m = 3 + 2 * (gscn - 3 * n)
+        return n * 1200 + m * 50
+    if 7499 <= gscn <= 22255:
+        return 3000000 + (gscn - 7499) * 1440
+    raise FrequencyPlanError(f"GSCN {gscn} is outside of FR1")
+
+
+def resource_indicator_value(start_prb: int, n_rb: int) -> int:
+    """Computes the RIV of a BWP (TS 38.214 section 5.1.2.2.2, N_BWP_size = 275).
+
+    Args:
+        start_prb: First PRB of the BWP.
+        n_rb: Number of PRBs of the BWP.
+
+    Returns:
+        int: Resource indicator value.
+    """
+    if n_rb < 1 or start_prb < 0 or start_prb + n_rb > MAX_BWP_SIZE:
+        raise FrequencyPlanError(f"Invalid BWP: start={start_prb}, length={n_rb}")
+    if n_rb - 1 <= MAX_BWP_SIZE // 2:
+        return MAX_BWP_SIZE * (n_rb - 1) + start_prb
+    return MAX_BWP_SIZE * (MAX_BWP_SIZE - n_rb + 1) + (MAX_BWP_SIZE - 1 - start_prb)
+
+
+def plan_frequencies(
+    band: int, bandwidth_mhz: int, scs_khz: int, center_frequency_khz: int
+) -> FrequencyPlan:
+    """Computes and validates the frequency plan of a carrier.
+
+    The SSB is placed on the synchronization raster entry closest to the carrier center that is
+    aligned with the PRB grid and leaves room for CORESET#0. The initial BWPs span the whole
+    carrier.
+
+    Args:
+        band: NR operating band.
+        bandwidth_mhz: Channel bandwidth in MHz.
+        scs_khz: Subcarrier spacing in kHz, used for both the carrier and the SSB.
+        center_frequency_khz: Carrier center frequency in kHz.
+
+    Returns:
+        FrequencyPlan: Frequency dependent gNB parameters.
+    """
+    if band not in BANDS:
+        supported_bands = ", ".join(f"n{number}" for number in sorted(BANDS))
+        raise FrequencyPlanError(
+            f"Band n{band} is not supported, supported bands: {supported_bands}"
+        )
+    band_info = BANDS[band]
+    if scs_khz not in N_RB_TABLE:
+        raise FrequencyPlanError(f"Subcarrier spacing of {scs_khz} kHz is not supported")
+    if scs_khz not in band_info.ssb_scs_khz:
+        raise FrequencyPlanError(
+            f"Subcarrier spacing of {scs_khz} kHz is not supported for SSB in band n{band}"
+        )
+    if bandwidth_mhz not in N_RB_TABLE[scs_khz]:
+        raise FrequencyPlanError(
+            f"Bandwidth of {bandwidth_mhz} MHz is not supported with {scs_khz} kHz SCS"
+        )
+    n_rb = N_RB_TABLE[scs_khz][bandwidth_mhz]
+    prb_khz = SUBCARRIERS_PER_PRB * scs_khz
+    point_a_khz = center_frequency_khz - n_rb * prb_khz // 2
+    carrier_end_khz = point_a_khz + n_rb * prb_khz
+    frequency_to_arfcn(center_frequency_khz)
+    if point_a_khz < band_info.low_khz or carrier_end_khz > band_info.high_khz:
+        raise FrequencyPlanError(
+            f"Carrier {point_a_khz / 1000}-{carrier_end_khz / 1000} MHz "
+            f"does not fit in band n{band}"
+        )
+    ssb = _place_ssb(band_info, scs_khz, n_rb, point_a_khz, center_frequency_khz)
+    if not ssb:
+        raise FrequencyPlanError(
+            f"No synchronization raster entry fits SSB and CORESET#0 in a {n_rb} PRB carrier "
+            f"centered on {center_frequency_khz / 1000} MHz"
+        )
+    gscn, ssb_frequency_khz, ssb_offset_prb, k_ssb, coreset0_index = ssb
+    coreset0_n_rb, _, coreset0_offset = CORESET0_TABLES[scs_khz][coreset0_index]
+    return FrequencyPlan(
+        band=band,
+        scs_khz=scs_khz,
+        numerology=NUMEROLOGY[scs_khz],
+        bandwidth_mhz=bandwidth_mhz,
+        n_rb=n_rb,
+        center_frequency_khz=center_frequency_khz,
+        point_a_khz=point_a_khz,
+        point_a_arfcn=frequency_to_arfcn(point_a_khz),
+        ssb_frequency_khz=ssb_frequency_khz,
+        ssb_arfcn=frequency_to_arfcn(ssb_frequency_khz),
+        gscn=gscn,
+        ssb_offset_prb=ssb_offset_prb,
+        k_ssb=k_ssb,
+        ssb_positions_in_burst_pr=1 if ssb_frequency_khz < 3000000 else 2,
+        coreset0_index=coreset0_index,
+        coreset0_start_prb=ssb_offset_prb - coreset0_offset,
+        coreset0_n_rb=coreset0_n_rb,
+        search_space_zero_index=SEARCH_SPACE_ZERO,
+        initial_bwp_start_prb=0,
+        initial_bwp_n_rb=n_rb,
+        initial_bwp_riv=resource_indicator_value(0, n_rb),
+    )
+
+
+def _place_ssb(
+    band: Band, scs_khz: int, n_rb: int, point_a_khz: int, center_frequency_khz: int
+) -> Optional[Tuple[int, int, int, int, int]]:
+    """Returns (GSCN, SSB frequency, SSB offset in PRBs, k_SSB, CORESET#0 index) of the best SSB.
+
+    Candidates aligned with the PRB grid (k_SSB = 0) are preferred, then candidates closest to
+    the carrier center.
+    """
+    prb_khz = SUBCARRIERS_PER_PRB * scs_khz
+    raster = band.sync_rasters[scs_khz]
+    candidates = []
+    for gscn in range(raster.gscn_first, raster.gscn_last + 1, raster.gscn_step):
+        ssb_frequency_khz = gscn_to_frequency(gscn)
+        ssb_start_khz = ssb_frequency_khz - SSB_SUBCARRIERS // 2 * scs_khz
+        if ssb_start_khz < point_a_khz:
+            continue
+        ssb_offset_prb, remainder_khz = divmod(ssb_start_khz - point_a_khz, prb_khz)
+        if remainder_khz % K_SSB_UNIT_KHZ:
+            continue
+        k_ssb = remainder_khz // K_SSB_UNIT_KHZ
+        # k_SSB counts 15 kHz units, so 30 kHz subcarriers only allow even values (TS 38.211
+        # section 7.4.3.1)
+        if k_ssb > MAX_K_SSB or k_ssb % (scs_khz // K_SSB_UNIT_KHZ):
+            continue
+        ssb_n_rb = SSB_SUBCARRIERS // SUBCARRIERS_PER_PRB + (1 if k_ssb else 0)
+        if ssb_offset_prb + ssb_n_rb > n_rb:
+            continue
+        coreset0_index = _select_coreset0(scs_khz, n_rb, ssb_offset_prb)
+        if coreset0_index is None:
+            continue
+        candidates.append(
+            (
+                (k_ssb != 0, abs(ssb_frequency_khz - center_frequency_khz), gscn),
+                (gscn, ssb_frequency_khz, ssb_offset_prb, k_ssb, coreset0_index),
+            )
+        )
+    if not candidates:
+        return None
+    return min(candidates)[1]
+
+
+def _select_coreset0(scs_khz: int, n_rb: int, ssb_offset_prb: int) -> Optional[int]:
+    for index in CORESET0_PREFERENCE[scs_khz]:
+        coreset_n_rb, _, offset = CORESET0_TABLES[scs_khz][index]
+        start = ssb_offset_prb - offset
+        if start >= 0 and start + coreset_n_rb <= n_rb:
+            return index
+    return None
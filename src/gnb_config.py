@@ -0,0 +1,542 @@
+# Copyright 2022 Guillaume Belanger
+# See LICENSE file for licensing details.
+
+"""Typed model of the nr-softmodem gNB DU configuration (gnb.conf).
+
+Every section is a dataclass whose defaults are the OAI reference DU values. Values are range
+checked on creation, so that an invalid configuration is rejected before it reaches the workload.
+"""
+
+import dataclasses
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional, Tuple, overload
+
+import libconfig
+from libconfig import Hex, Int64
+
+LOG_LEVELS = ("error", "warn", "analysis", "info", "debug", "trace")
+PARALLEL_CONFIGS = ("PARALLEL_SINGLE_THREAD", "PARALLEL_RU_L1_SPLIT", "PARALLEL_RU_L1_TRX_SPLIT")
+WORKER_CONFIGS = ("WORKER_DISABLE", "WORKER_ENABLE")
+NR_CELL_ID_MAX = 2**36 - 1
+UINT_MAX = 2**32 - 1
+
+
+class GnbConfigError(ValueError):
+    """Raised when the gNB configuration is not valid."""
+
+
+@overload
+def parse_int(name: str, value: str) -> int:
+    pass
+
+
+@overload
+def parse_int(name: str, value: str, hex_width: int) -> Hex:
+    pass
+
+
+def parse_int(name: str, value: str, hex_width: Optional[int] = None) -> int:
+    """Parses an integer setting given as a string.
+
+    Args:
+        name: Setting name, used in the error message.
+        value: Decimal value, or hexadecimal value without prefix when `hex_width` is set.
+        hex_width: Number of hexadecimal digits the value is written with.
+
+    Returns:
+        int: Parsed value, a Hex when `hex_width` is set.
+    """
+    try:
+        if hex_width is not None:
+            return Hex(int(value, 16), hex_width)
+        return int(value)
+    except ValueError:
+        raise GnbConfigError(f"{name} must be an integer, got {value}")
+
+
+def _setting(name: str, default: Any = None, default_factory: Any = None) -> Any:
+    """Declares a field serialized under the libconfig setting `name`."""
+    if default_factory is not None:
+        return field(default_factory=default_factory, metadata={"setting": name})
+    return field(default=default, metadata={"setting": name})
+
+
+def _check_range(name: str, value: int, minimum: int, maximum: int) -> None:
+    if not minimum <= value <= maximum:
+        raise GnbConfigError(f"{name} must be between {minimum} and {maximum}, got {value}")
+
+
+def _check_choice(name: str, value: str, choices: Tuple[str, ...]) -> None:
+    if value not in choices:
+        raise GnbConfigError(f"{name} must be one of {', '.join(choices)}, got {value}")
+
+
+class Section:
+    """Base class of the configuration sections."""
+
+    def to_libconfig(self) -> Dict[str, Any]:
+        """Returns the section as libconfig settings, in declaration order."""
+        settings: Dict[str, Any] = {}
+        for section_field in dataclasses.fields(self):  # type: ignore[arg-type]
+            name = section_field.metadata.get("setting", section_field.name)
+            settings[name] = _to_libconfig(getattr(self, section_field.name))
+        return settings
+
+    def with_overrides(self, overrides: Dict[str, Any]) -> Any:
+        """Returns a copy of the section with settings replaced, validated again.
+
+        Args:
+            overrides: New values keyed by libconfig setting name. Values of nested sections,
+                or of lists holding a single section, are themselves override mappings.
+
+        Returns:
+            A new section of the same type.
+        """
+        if not isinstance(overrides, dict):
+            raise GnbConfigError(f"Overrides of {type(self).__name__} must be a mapping")
+        fields_by_setting = {
+            section_field.metadata.get("setting", section_field.name): section_field
+            for section_field in dataclasses.fields(self)  # type: ignore[arg-type]
+        }
+        changes = {}
+        for name, value in overrides.items():
+            if name not in fields_by_setting:
+                raise GnbConfigError(f"Unknown setting {name} in {type(self).__name__}")
+            attribute = fields_by_setting[name].name
+            changes[attribute] = _override_value(name, getattr(self, attribute), value)
+        return dataclasses.replace(self, **changes)  # type: ignore[type-var]
+
+
+def _to_libconfig(value: Any) -> Any:
+    if isinstance(value, Section):
+        return value.to_libconfig()
+    if isinstance(value, list):
+        return [_to_libconfig(item) for item in value]
+    if isinstance(value, tuple):
+        return tuple(_to_libconfig(item) for item in value)
+    return value
+
+
+def _is_group(value: Any) -> bool:
+    return isinstance(value, dict) or (
+        isinstance(value, list) and bool(value) and isinstance(value[0], dict)
+    )
+
+
+def _override_value(name: str, current: Any, value: Any) -> Any:
+    if isinstance(current, Section):
+        return current.with_overrides(value)
+    if isinstance(current, list) and len(current) == 1 and isinstance(current[0], Section):
+        return [current[0].with_overrides(value)]
+    if isinstance(current, (list, tuple)):
+        if not isinstance(value, (list, tuple)):
+            raise GnbConfigError(f"{name} must be a list")
+        return type(current)(value)
+    return _override_scalar(name, current, value)
+
+
+def _override_scalar(name: str, current: Any, value: Any) -> Any:
+    if isinstance(current, bool) or isinstance(value, bool):
+        if not isinstance(current, bool) or not isinstance(value, bool):
+            raise GnbConfigError(f"{name} has an invalid type")
+        return value
+    if isinstance(current, int):
+        if not isinstance(value, int):
+            raise GnbConfigError(f"{name} must be an integer")
+        if isinstance(current, Hex):
+            return Hex(value, current.width)
+        return type(current)(value)
+    if isinstance(current, str):
+        if not isinstance(value, str):
+            raise GnbConfigError(f"{name} must be a string")
+        return value
+    raise GnbConfigError(f"{name} can't be overridden")
+
+
+@dataclass(frozen=True)
+class Snssai(Section):
+    """Single network slice selection assistance information."""
+
+    sst: int = 1
+    sd: Hex = Hex(1, 6)
+
+    def __post_init__(self):
+        """Validates the slice."""
+        _check_range("sst", self.sst, 0, 255)
+        _check_range("sd", self.sd, 0, 0xFFFFFF)
+
+
+@dataclass(frozen=True)
+class Plmn(Section):
+    """Public land mobile network served by the cell."""
+
+    mcc: int = 208
+    mnc: int = 99
+    mnc_length: int = 2
+    snssai_list: List[Snssai] = _setting("snssaiList", default_factory=lambda: [Snssai()])
+
+    def __post_init__(self):
+        """Validates the PLMN."""
+        _check_range("mcc", self.mcc, 0, 999)
+        _check_range("mnc_length", self.mnc_length, 2, 3)
+        _check_range("mnc", self.mnc, 0, 10**self.mnc_length - 1)
+
+
+@dataclass(frozen=True)
+class PdcchConfigSib1(Section):
+    """PDCCH configuration of SIB1."""
+
+    control_resource_set_zero: int = _setting("controlResourceSetZero", 12)
+    search_space_zero: int = _setting("searchSpaceZero", 0)
+
+    def __post_init__(self):
+        """Validates CORESET#0 and searchSpaceZero indexes."""
+        _check_range("controlResourceSetZero", self.control_resource_set_zero, 0, 15)
+        _check_range("searchSpaceZero", self.search_space_zero, 0, 15)
+
+
+@dataclass(frozen=True)
+class ServingCellConfigCommon(Section):
+    """Serving cell common configuration."""
+
+    phys_cell_id: int = _setting("physCellId", 0)
+    absolute_frequency_ssb: int = _setting("absoluteFrequencySSB", 641280)
+    dl_frequency_band: int = _setting("dl_frequencyBand", 78)
+    dl_absolute_frequency_point_a: int = _setting("dl_absoluteFrequencyPointA", 640008)
+    dl_offst_to_carrier: int = _setting("dl_offstToCarrier", 0)
+    dl_subcarrier_spacing: int = _setting("dl_subcarrierSpacing", 1)
+    dl_carrier_bandwidth: int = _setting("dl_carrierBandwidth", 106)
+    initial_dl_bwp_location_and_bandwidth: int = _setting(
+        "initialDLBWPlocationAndBandwidth", 28875
+    )
+    initial_dl_bwp_subcarrier_spacing: int = _setting("initialDLBWPsubcarrierSpacing", 1)
+    initial_dl_bwp_control_resource_set_zero: int = _setting(
+        "initialDLBWPcontrolResourceSetZero", 12
+    )
+    initial_dl_bwp_search_space_zero: int = _setting("initialDLBWPsearchSpaceZero", 0)
+    ul_frequency_band: int = _setting("ul_frequencyBand", 78)
+    ul_offst_to_carrier: int = _setting("ul_offstToCarrier", 0)
+    ul_subcarrier_spacing: int = _setting("ul_subcarrierSpacing", 1)
+    ul_carrier_bandwidth: int = _setting("ul_carrierBandwidth", 106)
+    p_max: int = _setting("pMax", 20)
+    initial_ul_bwp_location_and_bandwidth: int = _setting(
+        "initialULBWPlocationAndBandwidth", 28875
+    )
+    initial_ul_bwp_subcarrier_spacing: int = _setting("initialULBWPsubcarrierSpacing", 1)
+    prach_configuration_index: int = _setting("prach_ConfigurationIndex", 98)
+    prach_msg1_fdm: int = _setting("prach_msg1_FDM", 0)
+    prach_msg1_frequency_start: int = _setting("prach_msg1_FrequencyStart", 0)
+    zero_correlation_zone_config: int = _setting("zeroCorrelationZoneConfig", 13)
+    preamble_received_target_power: int = _setting("preambleReceivedTargetPower", -96)
+    preamble_trans_max: int = _setting("preambleTransMax", 6)
+    power_ramping_step: int = _setting("powerRampingStep", 1)
+    ra_response_window: int = _setting("ra_ResponseWindow", 4)
+    ssb_per_rach_occasion_and_cb_preambles_per_ssb_pr: int = _setting(
+        "ssb_perRACH_OccasionAndCB_PreamblesPerSSB_PR", 4
+    )
+    ssb_per_rach_occasion_and_cb_preambles_per_ssb: int = _setting(
+        "ssb_perRACH_OccasionAndCB_PreamblesPerSSB", 14
+    )
+    ra_contention_resolution_timer: int = _setting("ra_ContentionResolutionTimer", 7)
+    rsrp_threshold_ssb: int = _setting("rsrp_ThresholdSSB", 19)
+    prach_root_sequence_index_pr: int = _setting("prach_RootSequenceIndex_PR", 2)
+    prach_root_sequence_index: int = _setting("prach_RootSequenceIndex", 1)
+    msg1_subcarrier_spacing: int = _setting("msg1_SubcarrierSpacing", 1)
+    restricted_set_config: int = _setting("restrictedSetConfig", 0)
+    msg3_delta_preamble: int = _setting("msg3_DeltaPreamble", 1)
+    p0_nominal_with_grant: int = _setting("p0_NominalWithGrant", -90)
+    pucch_group_hopping: int = _setting("pucchGroupHopping", 0)
+    hopping_id: int = _setting("hoppingId", 40)
+    p0_nominal: int = _setting("p0_nominal", -90)
+    ssb_positions_in_burst_pr: int = _setting("ssb_PositionsInBurst_PR", 2)
+    ssb_positions_in_burst_bitmap: int = _setting("ssb_PositionsInBurst_Bitmap", 1)
+    ssb_periodicity_serving_cell: int = _setting("ssb_periodicityServingCell", 2)
+    dmrs_type_a_position: int = _setting("dmrs_TypeA_Position", 0)
+    subcarrier_spacing: int = _setting("subcarrierSpacing", 1)
+    reference_subcarrier_spacing: int = _setting("referenceSubcarrierSpacing", 1)
+    dl_ul_transmission_periodicity: int = _setting("dl_UL_TransmissionPeriodicity", 6)
+    nrof_downlink_slots: int = _setting("nrofDownlinkSlots", 7)
+    nrof_downlink_symbols: int = _setting("nrofDownlinkSymbols", 6)
+    nrof_uplink_slots: int = _setting("nrofUplinkSlots", 2)
+    nrof_uplink_symbols: int = _setting("nrofUplinkSymbols", 4)
+    ss_pbch_block_power: int = _setting("ssPBCH_BlockPower", -25)
+
+    def __post_init__(self):
+        """Validates the serving cell parameters."""
+        _check_range("physCellId", self.phys_cell_id, 0, 1007)
+        for name, value in (
+            ("absoluteFrequencySSB", self.absolute_frequency_ssb),
+            ("dl_absoluteFrequencyPointA", self.dl_absolute_frequency_point_a),
+        ):
+            _check_range(name, value, 0, 3279165)
+        for name, value in (
+            ("dl_carrierBandwidth", self.dl_carrier_bandwidth),
+            ("ul_carrierBandwidth", self.ul_carrier_bandwidth),
+        ):
+            _check_range(name, value, 1, 275)
+        for name, value in (
+            ("dl_subcarrierSpacing", self.dl_subcarrier_spacing),
+            ("ul_subcarrierSpacing", self.ul_subcarrier_spacing),
+            ("initialDLBWPsubcarrierSpacing", self.initial_dl_bwp_subcarrier_spacing),
+            ("initialULBWPsubcarrierSpacing", self.initial_ul_bwp_subcarrier_spacing),
+            ("msg1_SubcarrierSpacing", self.msg1_subcarrier_spacing),
+            ("subcarrierSpacing", self.subcarrier_spacing),
+            ("referenceSubcarrierSpacing", self.reference_subcarrier_spacing),
+        ):
+            _check_range(name, value, 0, 3)
+        for name, value in (
+            ("initialDLBWPcontrolResourceSetZero", self.initial_dl_bwp_control_resource_set_zero),
+            ("initialDLBWPsearchSpaceZero", self.initial_dl_bwp_search_space_zero),
+        ):
+            _check_range(name, value, 0, 15)
+        _check_range("pMax", self.p_max, -30, 33)
+        _check_range("prach_ConfigurationIndex", self.prach_configuration_index, 0, 255)
+        _check_range("preambleTransMax", self.preamble_trans_max, 0, 10)
+        _check_range("ra_ResponseWindow", self.ra_response_window, 0, 7)
+        _check_range("ra_ContentionResolutionTimer", self.ra_contention_resolution_timer, 0, 7)
+        _check_range("ssb_periodicityServingCell", self.ssb_periodicity_serving_cell, 0, 5)
+        _check_range("dl_UL_TransmissionPeriodicity", self.dl_ul_transmission_periodicity, 0, 7)
+        _check_range("nrofDownlinkSymbols", self.nrof_downlink_symbols, 0, 13)
+        _check_range("nrofUplinkSymbols", self.nrof_uplink_symbols, 0, 13)
+        _check_range("ssPBCH_BlockPower", self.ss_pbch_block_power, -60, 50)
+
+
+@dataclass(frozen=True)
+class Sctp(Section):
+    """SCTP association parameters."""
+
+    instreams: int = _setting("SCTP_INSTREAMS", 2)
+    outstreams: int = _setting("SCTP_OUTSTREAMS", 2)
+
+    def __post_init__(self):
+        """Validates the stream counts."""
+        _check_range("SCTP_INSTREAMS", self.instreams, 1, 65535)
+        _check_range("SCTP_OUTSTREAMS", self.outstreams, 1, 65535)
+
+
+@dataclass(frozen=True)
+class Gnb(Section):
+    """gNBs section."""
+
+    gnb_id: Hex = _setting("gNB_ID", Hex(0xE00))
+    gnb_name: str = _setting("gNB_name", "oai-du-rfsim")
+    tracking_area_code: int = 1
+    plmn_list: List[Plmn] = field(default_factory=lambda: [Plmn()])
+    nr_cellid: Int64 = Int64(12345678)
+    min_rxtxtime: int = 6
+    pdsch_antenna_ports_xp: int = _setting("pdsch_AntennaPorts_XP", 1)
+    pdsch_antenna_ports_n1: int = _setting("pdsch_AntennaPorts_N1", 1)
+    pusch_antenna_ports: int = _setting("pusch_AntennaPorts", 1)
+    max_mimo_layers: int = _setting("maxMIMO_layers", 1)
+    force_256qam_off: int = 1
+    pdcch_config_sib1: List[PdcchConfigSib1] = _setting(
+        "pdcch_ConfigSIB1", default_factory=lambda: [PdcchConfigSib1()]
+    )
+    serving_cell_config_common: List[ServingCellConfigCommon] = _setting(
+        "servingCellConfigCommon", default_factory=lambda: [ServingCellConfigCommon()]
+    )
+    sctp: Sctp = _setting("SCTP", default_factory=Sctp)
+
+    def __post_init__(self):
+        """Validates the gNB identity and physical layer parameters."""
+        _check_range("gNB_ID", self.gnb_id, 0, 2**32 - 1)
+        _check_range("tracking_area_code", self.tracking_area_code, 1, 0xFFFFFD)
+        _check_range("nr_cellid", self.nr_cellid, 0, NR_CELL_ID_MAX)
+        _check_range("min_rxtxtime", self.min_rxtxtime, 2, 8)
+        _check_range("pusch_AntennaPorts", self.pusch_antenna_ports, 1, 4)
+        _check_range("maxMIMO_layers", self.max_mimo_layers, 1, 4)
+        _check_range("force_256qam_off", self.force_256qam_off, 0, 1)
+        if not self.gnb_name:
+            raise GnbConfigError("gNB_name can't be empty")
+
+
+@dataclass(frozen=True)
+class MacRlc(Section):
+    """MACRLCs section, with the F1 northbound transport."""
+
+    num_cc: int = 1
+    tr_s_preference: str = "local_L1"
+    tr_n_preference: str = "f1"
+    local_n_if_name: str = "eth0"
+    local_n_address: str = "127.0.0.1"
+    remote_n_address: str = "127.0.0.1"
+    local_n_portc: int = 500
+    local_n_portd: int = 2153
+    remote_n_portc: int = 501
+    remote_n_portd: int = 2153
+    pusch_target_snrx10: int = _setting("pusch_TargetSNRx10", 200)
+    pucch_target_snrx10: int = _setting("pucch_TargetSNRx10", 200)
+
+    def __post_init__(self):
+        """Validates ports and power control targets."""
+        for name, value in (
+            ("local_n_portc", self.local_n_portc),
+            ("local_n_portd", self.local_n_portd),
+            ("remote_n_portc", self.remote_n_portc),
+            ("remote_n_portd", self.remote_n_portd),
+        ):
+            _check_range(name, value, 1, 65535)
+        _check_range("pusch_TargetSNRx10", self.pusch_target_snrx10, 0, 500)
+        _check_range("pucch_TargetSNRx10", self.pucch_target_snrx10, 0, 500)
+        if not self.local_n_address or not self.remote_n_address:
+            raise GnbConfigError("F1 addresses can't be empty")
+
+
+@dataclass(frozen=True)
+class L1(Section):
+    """L1s section."""
+
+    num_cc: int = 1
+    tr_n_preference: str = "local_mac"
+    prach_dtx_threshold: int = 200
+    pucch0_dtx_threshold: int = 150
+    ofdm_offset_divisor: int = 8
+
+    def __post_init__(self):
+        """Validates L1 thresholds."""
+        _check_range("prach_dtx_threshold", self.prach_dtx_threshold, 0, 500)
+        _check_range("pucch0_dtx_threshold", self.pucch0_dtx_threshold, 0, 500)
+        _check_range("ofdm_offset_divisor", self.ofdm_offset_divisor, 1, UINT_MAX)
+
+
+@dataclass(frozen=True)
+class Ru(Section):
+    """RUs section."""
+
+    local_rf: str = "yes"
+    nb_tx: int = 1
+    nb_rx: int = 1
+    att_tx: int = 0
+    att_rx: int = 0
+    bands: List[int] = field(default_factory=lambda: [78])
+    max_pdsch_reference_signal_power: int = _setting("max_pdschReferenceSignalPower", -27)
+    max_rxgain: int = 114
+    enb_instances: List[int] = _setting("eNB_instances", default_factory=lambda: [0])
+    bf_weights: List[Hex] = field(
+        default_factory=lambda: [Hex(0x7FFF, 8), Hex(0, 8), Hex(0, 8), Hex(0, 8)]
+    )
+    clock_src: str = "internal"
+
+    def __post_init__(self):
+        """Validates the antenna counts and beamforming matrix."""
+        _check_range("nb_tx", self.nb_tx, 1, 8)
+        _check_range("nb_rx", self.nb_rx, 1, 8)
+        if len(self.bf_weights) < self.nb_tx:
+            raise GnbConfigError("bf_weights must have at least one weight per TX antenna")
+
+
+@dataclass(frozen=True)
+class ThreadStruct(Section):
+    """THREAD_STRUCT section."""
+
+    parallel_config: str = "PARALLEL_SINGLE_THREAD"
+    worker_config: str = "WORKER_ENABLE"
+
+    def __post_init__(self):
+        """Validates the threading model."""
+        _check_choice("parallel_config", self.parallel_config, PARALLEL_CONFIGS)
+        _check_choice("worker_config", self.worker_config, WORKER_CONFIGS)
+
+
+@dataclass(frozen=True)
+class RfSimulator(Section):
+    """rfsimulator section."""
+
+    serveraddr: str = "server"
+    serverport: str = "4043"
+    options: Tuple[str, ...] = ()
+    modelname: str = "AWGN"
+    iq_file: str = _setting("IQfile", "/tmp/rfsimulator.iqs")
+
+
+@dataclass(frozen=True)
+class LogConfig(Section):
+    """log_config section."""
+
+    global_log_level: str = "info"
+    hw_log_level: str = "info"
+    phy_log_level: str = "info"
+    mac_log_level: str = "info"
+    rlc_log_level: str = "info"
+    pdcp_log_level: str = "info"
+    rrc_log_level: str = "info"
+    f1ap_log_level: str = "debug"
+    ngap_log_level: str = "debug"
+
+    def __post_init__(self):
+        """Validates log levels."""
+        for log_field in dataclasses.fields(self):
+            _check_choice(log_field.name, getattr(self, log_field.name), LOG_LEVELS)
+
+    @property
+    def log_levels(self) -> Dict[str, str]:
+        """Returns the log level of each component, keyed by lower case component name."""
+        return {
+            log_field.name[: -len("_log_level")]: getattr(self, log_field.name)
+            for log_field in dataclasses.fields(self)
+        }
+
+
+@dataclass(frozen=True)
+class GnbConfig(Section):
+    """Complete gnb.conf of a DU."""
+
+    active_gnbs: Tuple[str, ...] = _setting("Active_gNBs", ("oai-du-rfsim",))
+    asn1_verbosity: str = _setting("Asn1_verbosity", "none")
+    gnbs: List[Gnb] = _setting("gNBs", default_factory=lambda: [Gnb()])
+    macrlcs: List[MacRlc] = _setting("MACRLCs", default_factory=lambda: [MacRlc()])
+    l1s: List[L1] = _setting("L1s", default_factory=lambda: [L1()])
+    rus: List[Ru] = _setting("RUs", default_factory=lambda: [Ru()])
+    thread_struct: List[ThreadStruct] = _setting(
+        "THREAD_STRUCT", default_factory=lambda: [ThreadStruct()]
+    )
+    rfsimulator: RfSimulator = field(default_factory=RfSimulator)
+    log_config: LogConfig = field(default_factory=LogConfig)
+
+    def __post_init__(self):
+        """Validates cross-section consistency."""
+        _check_choice("Asn1_verbosity", self.asn1_verbosity, ("none", "info", "annoying"))
+        gnb_names = tuple(gnb.gnb_name for gnb in self.gnbs)
+        for active_gnb in self.active_gnbs:
+            _check_choice("Active_gNBs", active_gnb, gnb_names)
+
+    def sections(self) -> Dict[str, str]:
+        """Returns each section serialized on its own, keyed by path, for change detection.
+
+        Groups nested in a top level section, for example `gNBs.servingCellConfigCommon`, are
+        sections of their own. The settings left in the top level section are keyed by its name.
+        """
+        sections = {}
+        for name, value in self.to_libconfig().items():
+            group = value[0] if isinstance(value, list) and len(value) == 1 else value
+            if not isinstance(group, dict):
+                sections[name] = libconfig.dumps({name: value})
+                continue
+            settings = {}
+            for child_name, child in group.items():
+                if _is_group(child):
+                    sections[f"{name}.{child_name}"] = libconfig.dumps({child_name: child})
+                else:
+                    settings[child_name] = child
+            sections[name] = libconfig.dumps(settings)
+        return sections
+
+    def dumps(self) -> str:
+        """Returns the configuration as a libconfig document."""
+        return libconfig.dumps(self.to_libconfig())
+
+
+def apply_overrides(config: GnbConfig, overrides: Optional[Dict[str, Any]]) -> GnbConfig:
+    """Applies section level overrides to a configuration.
+
+    Args:
+        config: Configuration to override.
+        overrides: New values keyed by section then setting name, for example
+            `{"MACRLCs": {"pusch_TargetSNRx10": 250}, "log_config": {"mac_log_level": "debug"}}`.
+
+    Returns:
+        GnbConfig: Validated configuration.
+    """
+    if not overrides:
+        return config
+    return config.with_overrides(overrides)
@@ -0,0 +1,119 @@
+# Copyright 2022 Guillaume Belanger
+# See LICENSE file for licensing details.
+
+"""Pebble health checks of nr-softmodem.
+
+    - du-alive: the nr-softmodem process exists and is neither a zombie nor stopped
+    - f1-association: the F1-C SCTP association with the CU is established
+    - stats-fresh: nr-softmodem keeps rewriting its MAC statistics, which it stops doing when
+      its scheduler is wedged
+
+Failing alive checks restart nr-softmodem. The F1 association only gates readiness: it fails
+whenever the CU is down or slow to answer, which a restart of the DU doesn't fix.
+
+Checks run `sh` with tools of the base image only, since they run in the workload container.
+"""
+
+import shlex
+from typing import Dict, List
+
+ALIVE_CHECK = "du-alive"
+F1_ASSOCIATION_CHECK = "f1-association"
+STATS_FRESH_CHECK = "stats-fresh"
+CHECK_PERIOD = "5s"
+CHECK_TIMEOUT = "3s"
+# Consecutive failures before a check is down, and an alive check restarts the service
+CHECK_THRESHOLD = 3
+# nr-softmodem rewrites its MAC statistics about every second
+STATS_MAX_AGE_SECONDS = 30
+SCTP_ASSOCS_PATH = "/proc/net/sctp/assocs"
+
+ALIVE_SCRIPT = """
+for process in /proc/[0-9]*; do
+  read -r name < "$process/comm" 2>/dev/null || continue
+  [ "$name" = nr-softmodem ] || continue
+  read -r _ _ state _ < "$process/stat" || continue
+  [ "$state" != Z ] && [ "$state" != T ] && exit 0
+done
+exit 1
+"""
+
+# RPORT is the 13th column of /proc/net/sctp/assocs and the remote addresses follow `<->`, the
+# primary one marked with `*`. The DU connects from an ephemeral port, so LPORT isn't matched.
+F1_ASSOCIATION_SCRIPT = """
+awk -v remote_address="$1" -v remote_port="$2" '
+  $13 == remote_port {
+    for (i = 14; i <= NF && $i != "<->"; i++) {}
+    for (i++; i <= NF; i++) {
+      address = $i
+      sub(/^[*]/, "", address)
+      if (address == remote_address) found = 1
+    }
+  }
+  END { exit !found }' "$3"
+"""
+
+STATS_FRESH_SCRIPT = """
+modified=$(stat -c %Y "$1") || exit 1
+[ $(($(date +%s) - modified)) -le "$2" ]
+"""
+
+
+def _exec_check(level: str, command: List[str]) -> dict:
+    return {
+        "override": "replace",
+        "level": level,
+        "period": CHECK_PERIOD,
+        "timeout": CHECK_TIMEOUT,
+        "threshold": CHECK_THRESHOLD,
+        "exec": {"command": shlex.join(command)},
+    }
+
+
+def pebble_checks(
+    cu_f1_c_address: str, cu_f1_c_port: int, stats_file: str, stats_freshness: bool
+) -> Dict[str, dict]:
+    """Returns the checks of the Pebble layer.
+
+    Args:
+        cu_f1_c_address: F1-C address of the CU.
+        cu_f1_c_port: F1-C SCTP port of the CU.
+        stats_file: Path of the MAC statistics file.
+        stats_freshness: Whether to check the MAC statistics are being rewritten.
+
+    Returns:
+        dict: Pebble check of each check name.
+    """
+    checks = {
+        ALIVE_CHECK: _exec_check("alive", ["sh", "-c", ALIVE_SCRIPT]),
+        F1_ASSOCIATION_CHECK: _exec_check(
+            "ready",
+            [
+                "sh",
+                "-c",
+                F1_ASSOCIATION_SCRIPT,
+                "sh",
+                cu_f1_c_address,
+                str(cu_f1_c_port),
+                SCTP_ASSOCS_PATH,
+            ],
+        ),
+    }
+    if stats_freshness:
+        checks[STATS_FRESH_CHECK] = _exec_check(
+            "alive",
+            ["sh", "-c", STATS_FRESH_SCRIPT, "sh", stats_file, str(STATS_MAX_AGE_SECONDS)],
+        )
+    return checks
+
+
+def restart_on_failure(checks: Dict[str, dict]) -> Dict[str, str]:
+    """Returns the `on-check-failure` of the nr-softmodem service.
+
+    Args:
+        checks: Pebble check of each check name.
+
+    Returns:
+        dict: Action of each alive check, the service being restarted when it fails.
+    """
+    return {name: "restart" for name, check in checks.items() if check["level"] == "alive"}
@@ -0,0 +1,36 @@
+# Copyright 2022 Guillaume Belanger
+# See LICENSE file for licensing details.
+
+"""Host networking mode of the DU pod.
+
+With host networking, the DU binds its ports directly on the node, so they must not collide with
+ports other pods of the node expose on the host.
+"""
+
+from typing import Dict, List, Tuple
+
+from workload_ports import WorkloadPort
+
+
+class HostPortCollisionError(Exception):
+    """Raised when a DU port is already used on the node."""
+
+
+def find_port_collisions(
+    ports: List[WorkloadPort], ports_in_use: Dict[Tuple[int, str], str]
+) -> List[str]:
+    """Returns the DU ports colliding with ports in use on the node.
+
+    Args:
+        ports: Ports the DU binds on the node.
+        ports_in_use: Owner of each (port, protocol) already used on the node.
+
+    Returns:
+        list: Description of each collision.
+    """
+    collisions = []
+    for port in ports:
+        owner = ports_in_use.get((port.port, port.protocol))
+        if owner:
+            collisions.append(f"{port.port}/{port.protocol} ({port.name}) used by {owner}")
+    return collisions
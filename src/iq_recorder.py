@@ -0,0 +1,419 @@
+# Copyright 2022 Guillaume Belanger
+# See LICENSE file for licensing details.
+
+"""Recording and replay of the IQ samples of the rfsimulator.
+
+With the `saviq` option, the rfsimulator of nr-softmodem writes its IQ samples to `IQfile` as a
+sequence of blocks, each made of a header and of the samples of every antenna. To bound the
+recording, `IQfile` is a FIFO read by this recorder, which keeps the most recent blocks in a ring
+file of fixed size mapped in memory, overwriting the oldest blocks. A recording is exported from
+the ring as a regular IQ file, which the replayer serves to nr-softmodem as the remote end of the
+rfsimulator, looping over it. It only uses the standard library since it runs with the Python
+interpreter of the workload image.
+"""
+
+import argparse
+import fcntl
+import json
+import mmap
+import os
+import re
+import socket
+import stat
+import struct
+import threading
+from typing import BinaryIO, Iterator, List, Optional, Tuple
+
+IQ_MODE_OFF = "off"
+IQ_MODE_RECORD = "record"
+IQ_MODE_REPLAY = "replay"
+IQ_MODES = (IQ_MODE_OFF, IQ_MODE_RECORD, IQ_MODE_REPLAY)
+IQ_DIR = "/var/lib/oai-iq"
+IQ_FIFO_PATH = f"{IQ_DIR}/rfsimulator.iqs"
+IQ_RING_PATH = f"{IQ_DIR}/ring.iqr"
+IQ_RECORDINGS_DIR = f"{IQ_DIR}/recordings"
+IQ_RECORDING_SUFFIX = ".iqs"
+# Exported recordings kept in the IQ volume, besides the ring
+IQ_RECORDINGS_KEPT = 3
+RING_SIZE_MB_MAX = 4096
+RECORDING_NAME_PATTERN = re.compile(r"^[A-Za-z0-9][A-Za-z0-9._-]*\.iqs$")
+
+# samplesBlockHeader_t: size, nbAnt, timestamp, option_value, option_flag
+BLOCK_HEADER = struct.Struct("<IIQII")
+# Samples are 16 bit I and Q values
+SAMPLE_SIZE = 4
+# Magic, capacity, head, tail and number of blocks of the ring
+RING_HEADER = struct.Struct("<8sQQQQ")
+RING_MAGIC = b"OAIIQRG1"
+# Block size marking the end of the data before the ring wraps
+WRAP_MARKER = 0xFFFFFFFF
+
+
+class IqRecorderError(Exception):
+    """Raised when the IQ recording settings or files are invalid."""
+
+
+def validate_iq_settings(mode: str, ring_size_mb: int, replay_file: str) -> None:
+    """Raises IqRecorderError when the IQ recording settings are invalid.
+
+    Args:
+        mode: Value of the `rfsim-iq-mode` option.
+        ring_size_mb: Value of the `rfsim-iq-ring-size-mb` option.
+        replay_file: Value of the `rfsim-iq-replay-file` option.
+
+    Returns:
+        None
+    """
+    if mode not in IQ_MODES:
+        raise IqRecorderError(f"rfsim-iq-mode must be one of {', '.join(IQ_MODES)}, got {mode}")
+    if not 1 <= ring_size_mb <= RING_SIZE_MB_MAX:
+        raise IqRecorderError(
+            f"rfsim-iq-ring-size-mb must be between 1 and {RING_SIZE_MB_MAX}, got {ring_size_mb}"
+        )
+    if mode != IQ_MODE_REPLAY:
+        return
+    if not RECORDING_NAME_PATTERN.match(replay_file):
+        raise IqRecorderError(
+            f"rfsim-iq-replay-file must be the name of a recording, got '{replay_file}'"
+        )
+
+
+def iq_volume_size_mb(ring_size_mb: int) -> int:
+    """Returns the size of the IQ volume, holding the ring and the exported recordings.
+
+    Args:
+        ring_size_mb: Size of the ring in MiB.
+
+    Returns:
+        int: Size in MiB.
+    """
+    # One more recording than kept, since the oldest is removed once the new one is exported
+    return ring_size_mb * (IQ_RECORDINGS_KEPT + 2)
+
+
+def block_size(header: bytes) -> int:
+    """Returns the size of a block, header included, from its header."""
+    size, antennas, _, _, _ = BLOCK_HEADER.unpack(header)
+    return BLOCK_HEADER.size + size * antennas * SAMPLE_SIZE
+
+
+class IqRing:
+    """Ring of rfsimulator blocks in a memory-mapped file.
+
+    Blocks are stored whole and contiguously. A block that doesn't fit before the end of the ring
+    is stored at its start, after a wrap marker when there is room for one, and the oldest blocks
+    are dropped to make room. The file is locked while blocks are written so that exports read a
+    consistent ring.
+    """
+
+    def __init__(self, path: str, capacity: int):
+        """Opens the ring file at `path`, creating it empty unless it has this capacity.
+
+        Args:
+            path: Path of the ring file.
+            capacity: Bytes of blocks the ring holds.
+        """
+        self.capacity = capacity
+        self._file = open(path, "a+b")
+        self._file.seek(0, os.SEEK_END)
+        size = RING_HEADER.size + capacity
+        if self._file.tell() != size:
+            self._file.truncate(size)
+        self._map = mmap.mmap(self._file.fileno(), size)
+        magic, ring_capacity, self.head, self.tail, self.count = RING_HEADER.unpack_from(self._map)
+        if magic != RING_MAGIC or ring_capacity != capacity:
+            self.head = self.tail = self.count = 0
+            self._write_header()
+
+    @classmethod
+    def open(cls, path: str) -> "IqRing":
+        """Opens an existing ring file with the capacity it was created with.
+
+        Args:
+            path: Path of the ring file.
+
+        Returns:
+            IqRing: Ring.
+        """
+        with open(path, "rb") as file:
+            magic, capacity, _, _, _ = RING_HEADER.unpack(file.read(RING_HEADER.size))
+        if magic != RING_MAGIC:
+            raise IqRecorderError(f"{path} is not an IQ ring file")
+        return cls(path, capacity)
+
+    def close(self) -> None:
+        """Unmaps and closes the ring file."""
+        self._map.close()
+        self._file.close()
+
+    def append(self, block: bytes) -> bool:
+        """Appends a block, dropping the oldest ones to make room.
+
+        Args:
+            block: Block, header included.
+
+        Returns:
+            bool: False when the block is larger than the ring and was dropped.
+        """
+        if len(block) > self.capacity:
+            return False
+        with self._locked(fcntl.LOCK_EX):
+            if self.capacity - self.head < len(block):
+                self._drop(self.head, self.capacity)
+                if self.capacity - self.head >= BLOCK_HEADER.size:
+                    self._write_at(self.head, BLOCK_HEADER.pack(WRAP_MARKER, 0, 0, 0, 0))
+                self.head = 0
+            self._drop(self.head, self.head + len(block))
+            self._write_at(self.head, block)
+            self.head += len(block)
+            self.count += 1
+            self._write_header()
+        return True
+
+    def blocks(self) -> List[bytes]:
+        """Returns the blocks, oldest first, read while the ring is locked."""
+        blocks = []
+        with self._locked(fcntl.LOCK_SH):
+            # The ring may have been written by the recorder since it was opened
+            _, _, self.head, self.tail, self.count = RING_HEADER.unpack_from(self._map)
+            offset = self.tail
+            for _ in range(self.count):
+                length = self._block_length(offset)
+                start = RING_HEADER.size + offset
+                end = start + length
+                blocks.append(self._map[start:end])
+                offset = self._block_start(offset + length)
+        return blocks
+
+    def _drop(self, start: int, end: int) -> None:
+        """Drops the oldest blocks while they start between `start` and `end`."""
+        while self.count and start <= self.tail < end:
+            self.tail = self._block_start(self.tail + self._block_length(self.tail))
+            self.count -= 1
+        if not self.count:
+            self.tail = self.head = start if start < self.capacity else 0
+
+    def _block_length(self, offset: int) -> int:
+        """Returns the size of the block at `offset`, header included."""
+        size, antennas, _, _, _ = BLOCK_HEADER.unpack_from(self._map, RING_HEADER.size + offset)
+        return BLOCK_HEADER.size + size * antennas * SAMPLE_SIZE
+
+    def _block_start(self, offset: int) -> int:
+        """Returns where the block following `offset` starts, following wrap markers."""
+        if self.capacity - offset < BLOCK_HEADER.size:
+            return 0
+        start = RING_HEADER.size + offset
+        size = BLOCK_HEADER.unpack_from(self._map, start)[0]
+        return 0 if size == WRAP_MARKER else offset
+
+    def _write_at(self, offset: int, data: bytes) -> None:
+        start = RING_HEADER.size + offset
+        end = start + len(data)
+        self._map[start:end] = data
+
+    def _write_header(self) -> None:
+        RING_HEADER.pack_into(
+            self._map, 0, RING_MAGIC, self.capacity, self.head, self.tail, self.count
+        )
+
+    def _locked(self, operation: int) -> "_FileLock":
+        return _FileLock(self._file, operation)
+
+
+class _FileLock:
+    """Advisory lock of a file, held within a `with` block."""
+
+    def __init__(self, file: BinaryIO, operation: int):
+        """Locks `file` with `operation` once the block is entered."""
+        self._file = file
+        self._operation = operation
+
+    def __enter__(self) -> None:
+        fcntl.flock(self._file.fileno(), self._operation)
+
+    def __exit__(self, *_) -> None:
+        fcntl.flock(self._file.fileno(), fcntl.LOCK_UN)
+
+
+def read_blocks(stream: BinaryIO) -> Iterator[bytes]:
+    """Yields the blocks of a stream of rfsimulator blocks until it ends.
+
+    Args:
+        stream: Stream of blocks.
+
+    Yields:
+        bytes: Block, header included.
+    """
+    while True:
+        header = _read_exactly(stream, BLOCK_HEADER.size)
+        if header is None:
+            return
+        payload = _read_exactly(stream, block_size(header) - BLOCK_HEADER.size)
+        if payload is None:
+            return
+        yield header + payload
+
+
+def _read_exactly(stream: BinaryIO, length: int) -> Optional[bytes]:
+    """Reads `length` bytes, None when the stream ends before."""
+    data = b""
+    while len(data) < length:
+        chunk = stream.read(length - len(data))
+        if not chunk:
+            return None
+        data += chunk
+    return data
+
+
+def shift_timestamp(block: bytes, offset: int) -> bytes:
+    """Returns a block with its timestamp shifted by `offset` samples."""
+    size, antennas, timestamp, option_value, option_flag = BLOCK_HEADER.unpack_from(block)
+    header = BLOCK_HEADER.pack(size, antennas, timestamp + offset, option_value, option_flag)
+    samples_start = len(header)
+    return header + block[samples_start:]
+
+
+def recording_span(path: str) -> Tuple[int, int]:
+    """Returns the timestamp of the first block of a recording and the samples it spans.
+
+    Args:
+        path: Path of the recording.
+
+    Returns:
+        tuple: First timestamp and number of samples up to the end of the last block.
+    """
+    first = end = None
+    with open(path, "rb") as file:
+        for block in read_blocks(file):
+            size, _, timestamp, _, _ = BLOCK_HEADER.unpack_from(block)
+            first = timestamp if first is None else first
+            end = timestamp + size
+    if first is None or end is None:
+        raise IqRecorderError(f"{path} holds no IQ block")
+    return first, end - first
+
+
+def record(fifo_path: str, ring_path: str, capacity: int) -> None:
+    """Stores the blocks written to the FIFO in the ring, reopening the FIFO after each writer.
+
+    Args:
+        fifo_path: Path of the FIFO nr-softmodem writes its IQ samples to.
+        ring_path: Path of the ring file.
+        capacity: Bytes of blocks the ring holds.
+
+    Returns:
+        None
+    """
+    _make_fifo(fifo_path)
+    ring = IqRing(ring_path, capacity)
+    while True:
+        with open(fifo_path, "rb") as fifo:
+            for block in read_blocks(fifo):
+                ring.append(block)
+
+
+def _make_fifo(path: str) -> None:
+    """Creates a FIFO at `path`, replacing a regular file."""
+    try:
+        if stat.S_ISFIFO(os.stat(path).st_mode):
+            return
+        os.unlink(path)
+    except FileNotFoundError:
+        pass
+    os.mkfifo(path)
+
+
+def export(ring_path: str, output_path: str) -> dict:
+    """Writes the blocks of the ring, oldest first, as a recording.
+
+    Args:
+        ring_path: Path of the ring file.
+        output_path: Path of the recording.
+
+    Returns:
+        dict: Number of blocks and bytes of the recording.
+    """
+    ring = IqRing.open(ring_path)
+    try:
+        blocks = ring.blocks()
+    finally:
+        ring.close()
+    if not blocks:
+        raise IqRecorderError("No IQ block was recorded")
+    os.makedirs(os.path.dirname(output_path), exist_ok=True)
+    with open(f"{output_path}.tmp", "wb") as file:
+        for block in blocks:
+            file.write(block)
+    os.replace(f"{output_path}.tmp", output_path)
+    return {"blocks": len(blocks), "bytes": sum(len(block) for block in blocks)}
+
+
+def replay(path: str, address: str, port: int) -> None:
+    """Serves a recording to rfsimulator clients, looping over it with increasing timestamps.
+
+    Args:
+        path: Path of the recording.
+        address: Address to listen on.
+        port: rfsimulator server port.
+
+    Returns:
+        None
+    """
+    _, span = recording_span(path)
+    server = socket.create_server((address, port), reuse_port=True)
+    while True:
+        connection, _ = server.accept()
+        threading.Thread(target=_discard, args=(connection,), daemon=True).start()
+        try:
+            _send_recording(connection, path, span)
+        except OSError:
+            pass
+        finally:
+            connection.close()
+
+
+def _send_recording(connection: socket.socket, path: str, span: int) -> None:
+    """Sends the blocks of a recording until the client disconnects."""
+    offset = 0
+    while True:
+        with open(path, "rb") as file:
+            for block in read_blocks(file):
+                connection.sendall(shift_timestamp(block, offset))
+        offset += span
+
+
+def _discard(connection: socket.socket) -> None:
+    """Reads and drops the samples sent by the client, so that it never blocks."""
+    try:
+        while connection.recv(65536):
+            pass
+    except OSError:
+        pass
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    """Records, exports or replays IQ samples."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    record_parser = subparsers.add_parser("record")
+    record_parser.add_argument("--fifo", default=IQ_FIFO_PATH)
+    record_parser.add_argument("--ring", default=IQ_RING_PATH)
+    record_parser.add_argument("--size-mb", type=int, required=True)
+    export_parser = subparsers.add_parser("export")
+    export_parser.add_argument("--ring", default=IQ_RING_PATH)
+    export_parser.add_argument("--output", required=True)
+    replay_parser = subparsers.add_parser("replay")
+    replay_parser.add_argument("--file", required=True)
+    replay_parser.add_argument("--address", default="127.0.0.1")
+    replay_parser.add_argument("--port", type=int, required=True)
+    args = parser.parse_args(argv)
+    if args.command == "record":
+        record(args.fifo, args.ring, args.size_mb * 2**20)
+    elif args.command == "export":
+        print(json.dumps(export(args.ring, args.output)))
+    else:
+        replay(args.file, args.address, args.port)
+
+
+if __name__ == "__main__":
+    main()
@@ -3,28 +3,161 @@
 
 """Kubernetes specific utilities."""
 
+import json
 import logging
-from typing import Optional, Tuple
+from typing import Any, Dict, Iterable, List, Optional, Tuple, cast
 
-from lightkube import Client
+from lightkube import AsyncClient, Client
+from lightkube.core.exceptions import ApiError
+from lightkube.generic_resource import create_namespaced_resource
+from lightkube.models.core_v1 import (
+    Affinity,
+    Capabilities,
+    ConfigMapVolumeSource,
+    Container,
+    EmptyDirVolumeSource,
+    PodAffinityTerm,
+    PodAntiAffinity,
+    PodSecurityContext,
+    PodSpec,
+    SecurityContext,
+    Sysctl,
+    Toleration,
+    Volume,
+    VolumeMount,
+)
+from lightkube.models.meta_v1 import LabelSelector, ObjectMeta, OwnerReference
 from lightkube.resources.apps_v1 import StatefulSet
-from lightkube.resources.core_v1 import Service
+from lightkube.resources.core_v1 import ConfigMap, Node, Pod, Service
 from lightkube.types import PatchType
 
+from benchmark import UE_CONTAINER_NAME
+from node_placement import NodeInfo, Taint
+from retry import Retrier
+
 logger = logging.getLogger(__name__)
 
+NetworkAttachmentDefinition = create_namespaced_resource(
+    group="k8s.cni.cncf.io",
+    version="v1",
+    kind="NetworkAttachmentDefinition",
+    plural="network-attachment-definitions",
+)
+CONFIG_MAP_VOLUME_NAME = "gnb-config"
+IQ_VOLUME_NAME = "iq-recordings"
+LOG_VOLUME_NAME = "softmodem-logs"
+HOSTNAME_TOPOLOGY_KEY = "kubernetes.io/hostname"
+WORKLOAD_CONTAINER_NAME = "du"
+# The simulated UEs run in network namespaces linked by veth pairs: `ip netns` bind mounts the
+# namespaces under /run/netns and remounts /sys when entering them, which needs SYS_ADMIN, and the
+# veth pairs and the tunnel interface of nr-uesoftmodem need NET_ADMIN
+UE_CAPABILITIES = ["NET_ADMIN", "SYS_ADMIN"]
+
+
+class _KubernetesRequests:
+    """Requests of the API calls made by both the synchronous and asynchronous clients."""
+
+    def __init__(self, namespace: str, retrier: Optional[Retrier] = None):
+        """Sets the namespace of the resources and the retries of the calls.
 
-class Kubernetes:
+        Args:
+            namespace: Namespace of the resources.
+            retrier: Retries of calls failing with transient errors. The time budget of retries
+                starts when it is created, so a new one is created for every hook by default.
+        """
+        self.namespace = namespace
+        self.retrier = retrier or Retrier()
+
+    def _get_request(self, res: Any, name: str) -> Dict[str, Any]:
+        return {"res": res, "name": name, "namespace": self.namespace}
+
+    def _node_pods_request(self, node_name: str) -> Dict[str, Any]:
+        return {"res": Pod, "namespace": "*", "fields": {"spec.nodeName": node_name}}
+
+    def _statefulset_patch_request(self, name: str, statefulset: StatefulSet) -> Dict[str, Any]:
+        return {
+            "res": StatefulSet,
+            "name": name,
+            "obj": statefulset,
+            "patch_type": PatchType.MERGE,
+            "namespace": self.namespace,
+        }
+
+    def _service_apply_requests(
+        self, service: Service, field_manager: str, replace_ports: bool
+    ) -> List[Dict[str, Any]]:
+        """Returns the patches applying the fields of a Service with server-side apply.
+
+        Args:
+            service: Desired Service.
+            field_manager: Field manager owning the applied fields.
+            replace_ports: Whether to also replace the port list, removing ports owned by other
+                field managers.
+
+        Returns:
+            list: Arguments of the patch calls, in order.
+        """
+        name = service.metadata.name  # type: ignore[union-attr]
+        requests: List[Dict[str, Any]] = [
+            {
+                "res": Service,
+                "name": name,
+                "obj": service,
+                "patch_type": PatchType.APPLY,
+                "field_manager": field_manager,
+                "force": True,
+                "namespace": self.namespace,
+            }
+        ]
+        if replace_ports:
+            requests.append(
+                {
+                    "res": Service,
+                    "name": name,
+                    "obj": {"spec": {"ports": [port.to_dict() for port in service.spec.ports]}},  # type: ignore[union-attr]  # noqa: E501
+                    "patch_type": PatchType.MERGE,
+                    "field_manager": field_manager,
+                    "namespace": self.namespace,
+                }
+            )
+        return requests
+
+
+class Kubernetes(_KubernetesRequests):
     """Kubernetes main class."""
 
-    def __init__(self, namespace: str):
-        """Initializes K8s client."""
+    def __init__(self, namespace: str, retrier: Optional[Retrier] = None):
+        """Initializes K8s client.
+
+        Args:
+            namespace: Namespace of the resources.
+            retrier: Retries of calls failing with transient errors. The time budget of retries
+                starts when it is created, so a new one is created for every hook by default.
+        """
+        super().__init__(namespace, retrier)
         self.client = Client()
-        self.namespace = namespace
 
     def get_service(self, name: str) -> Service:
         """Gets service based on name."""
-        return self.client.get(Service, name, namespace=self.namespace)  # type: ignore[return-value]  # noqa: E501
+        return self.retrier.call(self.client.get, **self._get_request(Service, name))
+
+    def apply_service(
+        self, service: Service, field_manager: str, replace_ports: bool = False
+    ) -> None:
+        """Applies the fields of a Service with server-side apply.
+
+        Args:
+            service: Desired Service.
+            field_manager: Field manager owning the applied fields.
+            replace_ports: Whether to also replace the port list, removing ports owned by other
+                field managers.
+
+        Returns:
+            None
+        """
+        for request in self._service_apply_requests(service, field_manager, replace_ports):
+            self.retrier.call(self.client.patch, **request)
+        logger.info(f"Service {service.metadata.name} applied")  # type: ignore[union-attr]
 
     def get_service_load_balancer_address(self, name: str) -> Tuple[Optional[str], Optional[str]]:
         """Retrieves LoadBalancer address based on service name."""
@@ -36,62 +169,835 @@ class Kubernetes:
             raise RuntimeError("The service has no ingress address.")
         return ingress[0].hostname, ingress[0].ip
 
+    def get_pod(self, name: str) -> Pod:
+        """Gets pod based on name."""
+        return self.retrier.call(self.client.get, **self._get_request(Pod, name))
+
+    def get_pod_host_ip(self, name: str) -> Optional[str]:
+        """Returns the address of the node a pod runs on."""
+        pod = self.get_pod(name)
+        return pod.status.hostIP if pod.status else None
+
+    def get_pod_node_name(self, name: str) -> Optional[str]:
+        """Returns the name of the node a pod runs on."""
+        return _node_name(self.get_pod(name))
+
+    def get_host_ports_in_use(
+        self, node_name: str, exclude_app: str
+    ) -> Dict[Tuple[int, str], str]:
+        """Returns the ports pods of a node expose on the host.
+
+        Ports of hostNetwork pods are only known when they are declared in the pod spec.
+
+        Args:
+            node_name: Node name.
+            exclude_app: Juju application whose pods are ignored.
+
+        Returns:
+            dict: `namespace/pod` using each (port, protocol).
+        """
+        pods = self.retrier.call(
+            lambda: list(self.client.list(**self._node_pods_request(node_name)))
+        )
+        return host_ports_in_use(pods, exclude_app)
+
     def patch_statefulset(
         self,
         statefulset_name: str,
+        pod_annotations: Optional[Dict[str, Optional[str]]] = None,
+        host_network: bool = False,
+        pod_sysctls: Optional[Dict[str, str]] = None,
+        config_map_name: Optional[str] = None,
+        config_map_mount_path: Optional[str] = None,
+        iq_volume_size: Optional[str] = None,
+        iq_volume_mount_path: Optional[str] = None,
+        log_volume_size: Optional[str] = None,
+        log_volume_mount_path: Optional[str] = None,
+        node_selector: Optional[Dict[str, str]] = None,
+        tolerations: Optional[List[dict]] = None,
+        spread_across_nodes: bool = False,
     ) -> None:
         """Patches a statefulset with volumes and volume mounts.
 
         Args:
             statefulset_name: Statefulset name.
+            pod_annotations: Annotations of the pod template. None values remove the annotation.
+            host_network: Whether the pod uses the network namespace of the node.
+            pod_sysctls: Sysctls set in the pod security context.
+            config_map_name: ConfigMap mounted in the workload container, None to unmount it.
+            config_map_mount_path: Path the ConfigMap is mounted on.
+            iq_volume_size: Size limit of the IQ recording volume, None to remove it.
+            iq_volume_mount_path: Path the IQ recording volume is mounted on.
+            log_volume_size: Size limit of the memory backed log volume, None to remove it.
+            log_volume_mount_path: Path the log volume is mounted on.
+            node_selector: Labels of the nodes the pod runs on, None to leave them unchanged.
+            tolerations: Tolerations of the pod, None to leave them unchanged.
+            spread_across_nodes: Whether the statefulset's pods run on distinct nodes.
 
         Returns:
             None
         """
-        statefulset = self.client.get(
-            res=StatefulSet, name=statefulset_name, namespace=self.namespace
+        statefulset = self._get_statefulset(statefulset_name)
+        apply_statefulset_patch(
+            statefulset,
+            pod_annotations=pod_annotations,
+            host_network=host_network,
+            pod_sysctls=pod_sysctls,
+            config_map_name=config_map_name,
+            config_map_mount_path=config_map_mount_path,
+            iq_volume_size=iq_volume_size,
+            iq_volume_mount_path=iq_volume_mount_path,
+            log_volume_size=log_volume_size,
+            log_volume_mount_path=log_volume_mount_path,
+            node_selector=node_selector,
+            tolerations=tolerations,
+            spread_across_nodes=spread_across_nodes,
         )
-        if not hasattr(statefulset, "spec"):
-            raise RuntimeError(f"Could not find `spec` in the {statefulset_name} statefulset")
-
-        statefulset.spec.template.spec.securityContext.runAsUser = 0
-        statefulset.spec.template.spec.securityContext.runAsGroup = 0
-        statefulset.spec.template.spec.containers[1].securityContext.privileged = True
-
-        self.client.patch(
-            res=StatefulSet,
-            name=statefulset_name,
-            obj=statefulset,
-            patch_type=PatchType.MERGE,
-            namespace=self.namespace,
+        self.retrier.call(
+            self.client.patch, **self._statefulset_patch_request(statefulset_name, statefulset)
         )
         logger.info(f"Statefulset {statefulset_name} patched with security group")
 
-    def statefulset_is_patched(self, statefulset_name: str) -> bool:
+    def statefulset_is_patched(
+        self,
+        statefulset_name: str,
+        pod_annotations: Optional[Dict[str, Optional[str]]] = None,
+        host_network: bool = False,
+        pod_sysctls: Optional[Dict[str, str]] = None,
+        config_map_name: Optional[str] = None,
+        config_map_mount_path: Optional[str] = None,
+        iq_volume_size: Optional[str] = None,
+        iq_volume_mount_path: Optional[str] = None,
+        log_volume_size: Optional[str] = None,
+        log_volume_mount_path: Optional[str] = None,
+        node_selector: Optional[Dict[str, str]] = None,
+        tolerations: Optional[List[dict]] = None,
+        spread_across_nodes: bool = False,
+    ) -> bool:
         """Returns whether the statefulset is patched or not.
 
         Args:
             statefulset_name: Statefulset name.
+            pod_annotations: Expected annotations of the pod template. None values must be absent.
+            host_network: Whether the pod is expected to use the network namespace of the node.
+            pod_sysctls: Expected sysctls of the pod security context.
+            config_map_name: ConfigMap expected to be mounted, None when it must not be.
+            config_map_mount_path: Path the ConfigMap is expected to be mounted on.
+            iq_volume_size: Expected size limit of the IQ recording volume, None when it must
+                not exist.
+            iq_volume_mount_path: Path the IQ recording volume is expected to be mounted on.
+            log_volume_size: Expected size limit of the log volume, None when it must not exist.
+            log_volume_mount_path: Path the log volume is expected to be mounted on.
+            node_selector: Expected node selector of the pod, None when it isn't checked.
+            tolerations: Expected tolerations of the pod, None when they aren't checked.
+            spread_across_nodes: Whether the pods are expected to run on distinct nodes.
 
         Returns:
             True if the statefulset is patched, False otherwise.
         """
-        statefulset = self.client.get(
-            res=StatefulSet, name=statefulset_name, namespace=self.namespace
+        return is_statefulset_patched(
+            self._get_statefulset(statefulset_name),
+            pod_annotations=pod_annotations,
+            host_network=host_network,
+            pod_sysctls=pod_sysctls,
+            config_map_name=config_map_name,
+            config_map_mount_path=config_map_mount_path,
+            iq_volume_size=iq_volume_size,
+            iq_volume_mount_path=iq_volume_mount_path,
+            log_volume_size=log_volume_size,
+            log_volume_mount_path=log_volume_mount_path,
+            node_selector=node_selector,
+            tolerations=tolerations,
+            spread_across_nodes=spread_across_nodes,
         )
-        if not hasattr(statefulset, "spec"):
-            raise RuntimeError(f"Could not find `spec` in the {statefulset_name} statefulset")
 
-        if statefulset.spec.template.spec.securityContext.runAsUser != 0:
-            logger.info("runAsUser is not set to 0")
-            return False
+    def get_nodes(self) -> List[NodeInfo]:
+        """Returns the scheduling related state of the nodes of the cluster."""
+        nodes = self.retrier.call(lambda: list(self.client.list(Node)))
+        return [node_info(node) for node in nodes]
+
+    def _get_statefulset(self, name: str) -> StatefulSet:
+        return _checked_statefulset(
+            self.retrier.call(self.client.get, **self._get_request(StatefulSet, name)), name
+        )
 
-        if statefulset.spec.template.spec.securityContext.runAsGroup != 0:
-            logger.info("runAsGroup is not set to 0")
+    def get_config_map_data(self, name: str) -> Dict[str, str]:
+        """Returns the data of a ConfigMap, empty when it doesn't exist.
+
+        Args:
+            name: ConfigMap name.
+
+        Returns:
+            dict: Value of each key.
+        """
+        try:
+            config_map = self.retrier.call(
+                self.client.get, res=ConfigMap, name=name, namespace=self.namespace
+            )
+        except ApiError as e:
+            if e.status.code != 404:
+                raise
+            return {}
+        return config_map.data or {}
+
+    def apply_config_map(
+        self, name: str, data: Dict[str, Optional[str]], owner_statefulset_name: str
+    ) -> None:
+        """Creates a ConfigMap or merges keys into it.
+
+        The ConfigMap is owned by the statefulset, so that it is garbage collected with it.
+
+        Args:
+            name: ConfigMap name.
+            data: Value of each key. None values remove the key.
+            owner_statefulset_name: Name of the statefulset owning the ConfigMap.
+
+        Returns:
+            None
+        """
+        try:
+            self._merge_config_map(name, data)
+            return
+        except ApiError as e:
+            if e.status.code != 404:
+                raise
+        owner = self.retrier.call(
+            self.client.get, res=StatefulSet, name=owner_statefulset_name, namespace=self.namespace
+        )
+        created = self._create(
+            ConfigMap(
+                metadata=ObjectMeta(
+                    name=name,
+                    ownerReferences=[
+                        OwnerReference(
+                            apiVersion="apps/v1",
+                            kind="StatefulSet",
+                            name=owner_statefulset_name,
+                            uid=owner.metadata.uid,
+                        )
+                    ],
+                ),
+                data={key: value for key, value in data.items() if value is not None},
+            )
+        )
+        if not created:
+            self._merge_config_map(name, data)
+            return
+        logger.info(f"ConfigMap {name} created")
+
+    def _create(self, obj: Any) -> bool:
+        """Creates an object, returning False when it already exists.
+
+        Creates aren't idempotent: a create retried after a timeout fails with a conflict when
+        the first attempt went through, as when another unit created the object in the meantime.
+        """
+        try:
+            self.retrier.call(self.client.create, obj=obj, namespace=self.namespace)
+        except ApiError as e:
+            if e.status.code != 409:
+                raise
             return False
+        return True
+
+    def _merge_config_map(self, name: str, data: Dict[str, Optional[str]]) -> None:
+        """Merges keys into an existing ConfigMap, None values removing the key."""
+        self.retrier.call(
+            self.client.patch,
+            res=ConfigMap,
+            name=name,
+            obj={"data": data},
+            patch_type=PatchType.MERGE,
+            namespace=self.namespace,
+        )
+        logger.info(f"ConfigMap {name} updated")
+
+    def apply_network_attachment_definition(self, name: str, config: dict) -> None:
+        """Creates a NetworkAttachmentDefinition or updates its CNI configuration.
+
+        Args:
+            name: NetworkAttachmentDefinition name.
+            config: CNI configuration.
+
+        Returns:
+            None
+        """
+        spec = {"config": json.dumps(config, sort_keys=True)}
+        try:
+            existing = self.retrier.call(
+                self.client.get,
+                res=NetworkAttachmentDefinition,
+                name=name,
+                namespace=self.namespace,
+            )
+        except ApiError as e:
+            if e.status.code != 404:
+                raise
+            existing = None
+        if existing is None:
+            if self._create(
+                NetworkAttachmentDefinition(metadata=ObjectMeta(name=name), spec=spec)
+            ):
+                logger.info(f"NetworkAttachmentDefinition {name} created")
+                return
+        elif existing.spec == spec:
+            return
+        self.retrier.call(
+            self.client.patch,
+            res=NetworkAttachmentDefinition,
+            name=name,
+            obj={"spec": spec},
+            patch_type=PatchType.MERGE,
+            namespace=self.namespace,
+        )
+        logger.info(f"NetworkAttachmentDefinition {name} updated")
+
+    def delete_network_attachment_definition(self, name: str) -> None:
+        """Deletes a NetworkAttachmentDefinition if it exists.
+
+        Args:
+            name: NetworkAttachmentDefinition name.
+
+        Returns:
+            None
+        """
+        try:
+            self.retrier.call(
+                self.client.delete,
+                res=NetworkAttachmentDefinition,
+                name=name,
+                namespace=self.namespace,
+            )
+        except ApiError as e:
+            if e.status.code != 404:
+                raise
+            return
+        logger.info(f"NetworkAttachmentDefinition {name} deleted")
+
+
+class AsyncKubernetes(_KubernetesRequests):
+    """Kubernetes operations awaited concurrently, using lightkube's asynchronous client."""
+
+    def __init__(self, namespace: str, retrier: Optional[Retrier] = None):
+        """Initializes the asynchronous K8s client.
+
+        Args:
+            namespace: Namespace of the resources.
+            retrier: Retries of calls failing with transient errors.
+        """
+        super().__init__(namespace, retrier)
+        self.client = AsyncClient()
+
+    async def close(self) -> None:
+        """Closes the connections of the client."""
+        await self.client.close()
+
+    async def get_statefulset(self, name: str) -> StatefulSet:
+        """Gets statefulset based on name."""
+        return _checked_statefulset(
+            await self.retrier.call_async(self.client.get, **self._get_request(StatefulSet, name)),
+            name,
+        )
+
+    async def patch_statefulset(self, name: str, statefulset: StatefulSet) -> None:
+        """Patches a statefulset with the pod template of a fetched and modified statefulset.
+
+        Args:
+            name: Statefulset name.
+            statefulset: Statefulset, as modified by apply_statefulset_patch.
+
+        Returns:
+            None
+        """
+        await self.retrier.call_async(
+            self.client.patch, **self._statefulset_patch_request(name, statefulset)
+        )
+        logger.info(f"Statefulset {name} patched with security group")
+
+    async def get_pod_node_name(self, name: str) -> Optional[str]:
+        """Returns the name of the node a pod runs on."""
+        return _node_name(
+            await self.retrier.call_async(self.client.get, **self._get_request(Pod, name))
+        )
+
+    async def get_host_ports_in_use(
+        self, node_name: str, exclude_app: str
+    ) -> Dict[Tuple[int, str], str]:
+        """Returns the ports pods of a node expose on the host.
+
+        Args:
+            node_name: Node name.
+            exclude_app: Juju application whose pods are ignored.
+
+        Returns:
+            dict: `namespace/pod` using each (port, protocol).
+        """
+
+        async def list_pods() -> List[Pod]:
+            return [pod async for pod in self.client.list(**self._node_pods_request(node_name))]
+
+        return host_ports_in_use(await self.retrier.call_async(list_pods), exclude_app)
+
+    async def get_nodes(self) -> List[NodeInfo]:
+        """Returns the scheduling related state of the nodes of the cluster."""
+
+        async def list_nodes() -> List[Node]:
+            return [node async for node in self.client.list(Node)]
+
+        return [node_info(node) for node in await self.retrier.call_async(list_nodes)]
+
+    async def get_service(self, name: str) -> Service:
+        """Gets service based on name."""
+        return await self.retrier.call_async(self.client.get, **self._get_request(Service, name))
+
+    async def apply_service(
+        self, service: Service, field_manager: str, replace_ports: bool = False
+    ) -> None:
+        """Applies the fields of a Service with server-side apply.
+
+        Args:
+            service: Desired Service.
+            field_manager: Field manager owning the applied fields.
+            replace_ports: Whether to also replace the port list, removing ports owned by other
+                field managers.
+
+        Returns:
+            None
+        """
+        for request in self._service_apply_requests(service, field_manager, replace_ports):
+            await self.retrier.call_async(self.client.patch, **request)
+        logger.info(f"Service {service.metadata.name} applied")  # type: ignore[union-attr]
+
+
+def _checked_statefulset(statefulset: Any, name: str) -> StatefulSet:
+    """Returns a fetched statefulset, raising RuntimeError when it has no spec."""
+    if not hasattr(statefulset, "spec"):
+        raise RuntimeError(f"Could not find `spec` in the {name} statefulset")
+    return statefulset
+
+
+def _node_name(pod: Pod) -> Optional[str]:
+    """Returns the name of the node a fetched pod runs on."""
+    return pod.spec.nodeName if pod.spec else None
+
+
+def host_ports_in_use(pods: Iterable[Pod], exclude_app: str) -> Dict[Tuple[int, str], str]:
+    """Returns the ports pods expose on the host.
+
+    Args:
+        pods: Pods of a node.
+        exclude_app: Juju application whose pods are ignored.
+
+    Returns:
+        dict: `namespace/pod` using each (port, protocol).
+    """
+    ports_in_use = {}
+    for pod in pods:
+        metadata = cast(ObjectMeta, pod.metadata)
+        pod_spec = cast(PodSpec, pod.spec)
+        labels = metadata.labels or {}
+        if labels.get("app.kubernetes.io/name") == exclude_app:
+            continue
+        if pod.status and pod.status.phase in ("Succeeded", "Failed"):
+            continue
+        for container in pod_spec.containers:
+            for port in container.ports or []:
+                host_port = port.hostPort or (port.containerPort if pod_spec.hostNetwork else None)
+                if host_port:
+                    ports_in_use[(host_port, port.protocol or "TCP")] = (
+                        f"{metadata.namespace}/{metadata.name}"
+                    )
+    return ports_in_use
+
+
+def node_info(node: Node) -> NodeInfo:
+    """Returns the scheduling related state of a node.
+
+    Args:
+        node: Node.
+
+    Returns:
+        NodeInfo: Labels, taints and cordoning of the node.
+    """
+    spec = node.spec
+    return NodeInfo(
+        name=node.metadata.name,  # type: ignore[union-attr, arg-type]
+        labels=(node.metadata.labels if node.metadata else None) or {},
+        taints=[
+            Taint(key=taint.key, effect=taint.effect, value=taint.value)
+            for taint in (spec.taints if spec else None) or []
+        ],
+        unschedulable=bool(spec and spec.unschedulable),
+    )
+
+
+def apply_statefulset_patch(
+    statefulset: StatefulSet,
+    pod_annotations: Optional[Dict[str, Optional[str]]] = None,
+    host_network: bool = False,
+    pod_sysctls: Optional[Dict[str, str]] = None,
+    config_map_name: Optional[str] = None,
+    config_map_mount_path: Optional[str] = None,
+    iq_volume_size: Optional[str] = None,
+    iq_volume_mount_path: Optional[str] = None,
+    log_volume_size: Optional[str] = None,
+    log_volume_mount_path: Optional[str] = None,
+    node_selector: Optional[Dict[str, str]] = None,
+    tolerations: Optional[List[dict]] = None,
+    spread_across_nodes: bool = False,
+) -> None:
+    """Sets the security context, networking, sysctls, volumes and placement of the pods.
+
+    Args:
+        statefulset: Statefulset, modified in place.
+        pod_annotations: Annotations of the pod template. None values remove the annotation.
+        host_network: Whether the pod uses the network namespace of the node.
+        pod_sysctls: Sysctls set in the pod security context.
+        config_map_name: ConfigMap mounted in the workload container, None to unmount it.
+        config_map_mount_path: Path the ConfigMap is mounted on.
+        iq_volume_size: Size limit of the IQ recording volume, None to remove it.
+        iq_volume_mount_path: Path the IQ recording volume is mounted on.
+        log_volume_size: Size limit of the memory backed log volume, None to remove it.
+        log_volume_mount_path: Path the log volume is mounted on.
+        node_selector: Labels of the nodes the pods run on, None to leave them unchanged.
+        tolerations: Tolerations of the pods, None to leave them unchanged.
+        spread_across_nodes: Whether the pods run on distinct nodes.
+
+    Returns:
+        None
+    """
+    pod_spec = _pod_spec(statefulset)
+    _set_security_contexts(pod_spec)
+    if pod_annotations:
+        if not statefulset.spec.template.metadata:
+            statefulset.spec.template.metadata = ObjectMeta()
+        annotations = statefulset.spec.template.metadata.annotations or {}
+        annotations.update(pod_annotations)
+        statefulset.spec.template.metadata.annotations = annotations
+    pod_spec.hostNetwork = host_network
+    pod_spec.dnsPolicy = _dns_policy(host_network)
+    if pod_sysctls is not None:
+        cast(PodSecurityContext, pod_spec.securityContext).sysctls = [
+            Sysctl(name=name, value=value) for name, value in sorted(pod_sysctls.items())
+        ]
+    _set_config_map_volume(pod_spec, config_map_name, config_map_mount_path)
+    _set_empty_dir_volume(pod_spec, IQ_VOLUME_NAME, iq_volume_size, iq_volume_mount_path)
+    # Memory backed, so that writing the log never waits for a disk
+    _set_empty_dir_volume(
+        pod_spec, LOG_VOLUME_NAME, log_volume_size, log_volume_mount_path, medium="Memory"
+    )
+    _set_placement(statefulset, node_selector, tolerations, spread_across_nodes)
+
+
+def is_statefulset_patched(
+    statefulset: StatefulSet,
+    pod_annotations: Optional[Dict[str, Optional[str]]] = None,
+    host_network: bool = False,
+    pod_sysctls: Optional[Dict[str, str]] = None,
+    config_map_name: Optional[str] = None,
+    config_map_mount_path: Optional[str] = None,
+    iq_volume_size: Optional[str] = None,
+    iq_volume_mount_path: Optional[str] = None,
+    log_volume_size: Optional[str] = None,
+    log_volume_mount_path: Optional[str] = None,
+    node_selector: Optional[Dict[str, str]] = None,
+    tolerations: Optional[List[dict]] = None,
+    spread_across_nodes: bool = False,
+) -> bool:
+    """Returns whether a statefulset is patched or not.
 
-        if not statefulset.spec.template.spec.containers[1].securityContext.privileged:
-            logger.info("workload container is not privileged")
+    Args:
+        statefulset: Statefulset.
+        pod_annotations: Expected annotations of the pod template. None values must be absent.
+        host_network: Whether the pod is expected to use the network namespace of the node.
+        pod_sysctls: Expected sysctls of the pod security context.
+        config_map_name: ConfigMap expected to be mounted, None when it must not be.
+        config_map_mount_path: Path the ConfigMap is expected to be mounted on.
+        iq_volume_size: Expected size limit of the IQ recording volume, None when it must not
+            exist.
+        iq_volume_mount_path: Path the IQ recording volume is expected to be mounted on.
+        log_volume_size: Expected size limit of the log volume, None when it must not exist.
+        log_volume_mount_path: Path the log volume is expected to be mounted on.
+        node_selector: Expected node selector of the pods, None when it isn't checked.
+        tolerations: Expected tolerations of the pods, None when they aren't checked.
+        spread_across_nodes: Whether the pods are expected to run on distinct nodes.
+
+    Returns:
+        True if the statefulset is patched, False otherwise.
+    """
+    pod_spec = _pod_spec(statefulset)
+    if not _security_contexts_are_up_to_date(pod_spec):
+        return False
+
+    metadata = statefulset.spec.template.metadata
+    annotations = (metadata.annotations if metadata else None) or {}
+    for key, value in (pod_annotations or {}).items():
+        if annotations.get(key) != value:
+            logger.info(f"Pod annotation {key} is not set to {value}")
             return False
 
-        return True
+    if bool(pod_spec.hostNetwork) != host_network:
+        logger.info(f"hostNetwork is not set to {host_network}")
+        return False
+
+    if host_network and pod_spec.dnsPolicy != _dns_policy(True):
+        logger.info(f"dnsPolicy is not set to {_dns_policy(True)}")
+        return False
+
+    sysctls = (pod_spec.securityContext.sysctls if pod_spec.securityContext else None) or []
+    current_sysctls = {sysctl.name: sysctl.value for sysctl in sysctls}
+    if pod_sysctls is not None and current_sysctls != pod_sysctls:
+        logger.info("Pod sysctls are not up to date")
+        return False
+
+    if _config_map_volume(pod_spec) != (
+        config_map_name,
+        config_map_mount_path if config_map_name else None,
+    ):
+        logger.info("ConfigMap volume is not up to date")
+        return False
+
+    empty_dir_volumes = [
+        (IQ_VOLUME_NAME, iq_volume_size, iq_volume_mount_path),
+        (LOG_VOLUME_NAME, log_volume_size, log_volume_mount_path),
+    ]
+    if not all(_empty_dir_volume_is_up_to_date(pod_spec, *volume) for volume in empty_dir_volumes):
+        return False
+
+    if not _placement_is_up_to_date(statefulset, node_selector, tolerations, spread_across_nodes):
+        return False
+
+    return True
+
+
+def _pod_spec(statefulset: StatefulSet) -> PodSpec:
+    """Returns the pod spec of the template of a fetched statefulset."""
+    return cast(PodSpec, statefulset.spec.template.spec)
+
+
+def _container(pod_spec: PodSpec, name: str) -> Optional[Container]:
+    """Returns a container of the pods by name, None when the charm doesn't declare it."""
+    return next((container for container in pod_spec.containers if container.name == name), None)
+
+
+def _workload_container(pod_spec: PodSpec) -> Container:
+    """Returns the container nr-softmodem runs in."""
+    container = _container(pod_spec, WORKLOAD_CONTAINER_NAME)
+    if not container:
+        raise RuntimeError(f"Could not find the {WORKLOAD_CONTAINER_NAME} container")
+    return container
+
+
+def _set_security_contexts(pod_spec: PodSpec) -> None:
+    """Runs the pods as root, the workload container privileged and the ue one with capabilities.
+
+    The privileged flag of the ue container is set to False rather than removed, since merge
+    patches leave the fields absent from the patch unchanged.
+    """
+    if not pod_spec.securityContext:
+        pod_spec.securityContext = PodSecurityContext()
+    pod_spec.securityContext.runAsUser = 0
+    pod_spec.securityContext.runAsGroup = 0
+    workload_container = _workload_container(pod_spec)
+    if not workload_container.securityContext:
+        workload_container.securityContext = SecurityContext()
+    workload_container.securityContext.privileged = True
+    ue_container = _container(pod_spec, UE_CONTAINER_NAME)
+    if not ue_container:
+        return
+    if not ue_container.securityContext:
+        ue_container.securityContext = SecurityContext()
+    ue_container.securityContext.privileged = False
+    ue_container.securityContext.capabilities = Capabilities(add=UE_CAPABILITIES)
+
+
+def _security_contexts_are_up_to_date(pod_spec: PodSpec) -> bool:
+    """Returns whether the security contexts are the ones _set_security_contexts sets."""
+    security_context = pod_spec.securityContext or PodSecurityContext()
+    if security_context.runAsUser != 0:
+        logger.info("runAsUser is not set to 0")
+        return False
+
+    if security_context.runAsGroup != 0:
+        logger.info("runAsGroup is not set to 0")
+        return False
+
+    workload_security_context = _workload_container(pod_spec).securityContext
+    if not workload_security_context or not workload_security_context.privileged:
+        logger.info(f"{WORKLOAD_CONTAINER_NAME} container is not privileged")
+        return False
+
+    ue_container = _container(pod_spec, UE_CONTAINER_NAME)
+    if ue_container and not _has_ue_capabilities(ue_container.securityContext):
+        logger.info(f"{UE_CONTAINER_NAME} container doesn't run with {UE_CAPABILITIES} only")
+        return False
+
+    return True
+
+
+def _has_ue_capabilities(security_context: Optional[SecurityContext]) -> bool:
+    """Returns whether a security context adds the UE capabilities, without privileges."""
+    if not security_context or security_context.privileged:
+        return False
+    capabilities = security_context.capabilities
+    return sorted((capabilities.add if capabilities else None) or []) == UE_CAPABILITIES
+
+
+def _config_map_volume(pod_spec: PodSpec) -> Tuple[Optional[str], Optional[str]]:
+    """Returns the ConfigMap mounted in the workload container and its mount path."""
+    volumes = {volume.name: volume for volume in pod_spec.volumes or []}
+    volume = volumes.get(CONFIG_MAP_VOLUME_NAME)
+    mounts = {mount.name: mount for mount in _workload_container(pod_spec).volumeMounts or []}
+    mount = mounts.get(CONFIG_MAP_VOLUME_NAME)
+    if not volume or not volume.configMap or not mount:
+        return None, None
+    return volume.configMap.name, mount.mountPath
+
+
+def _set_config_map_volume(
+    pod_spec: PodSpec, config_map_name: Optional[str], mount_path: Optional[str]
+) -> None:
+    """Mounts a ConfigMap in the workload container, or unmounts it when the name is None.
+
+    The volume is optional so that the pod starts before the ConfigMap is created.
+    """
+    pod_spec.volumes = [
+        volume for volume in pod_spec.volumes or [] if volume.name != CONFIG_MAP_VOLUME_NAME
+    ]
+    container = _workload_container(pod_spec)
+    container.volumeMounts = [
+        mount for mount in container.volumeMounts or [] if mount.name != CONFIG_MAP_VOLUME_NAME
+    ]
+    if not config_map_name or not mount_path:
+        return
+    pod_spec.volumes.append(
+        Volume(
+            name=CONFIG_MAP_VOLUME_NAME,
+            configMap=ConfigMapVolumeSource(name=config_map_name, optional=True),
+        )
+    )
+    container.volumeMounts.append(
+        VolumeMount(name=CONFIG_MAP_VOLUME_NAME, mountPath=mount_path, readOnly=True)
+    )
+
+
+def _empty_dir_volume(pod_spec: PodSpec, name: str) -> Tuple[Optional[str], Optional[str]]:
+    """Returns the size limit and mount path of an emptyDir volume of the workload container."""
+    volumes = {volume.name: volume for volume in pod_spec.volumes or []}
+    volume = volumes.get(name)
+    mounts = {mount.name: mount for mount in _workload_container(pod_spec).volumeMounts or []}
+    mount = mounts.get(name)
+    if not volume or not volume.emptyDir or not mount:
+        return None, None
+    return volume.emptyDir.sizeLimit, mount.mountPath
+
+
+def _empty_dir_volume_is_up_to_date(
+    pod_spec: PodSpec, name: str, size: Optional[str], mount_path: Optional[str]
+) -> bool:
+    """Returns whether an emptyDir volume has the expected size limit and mount path."""
+    if _empty_dir_volume(pod_spec, name) != (size, mount_path if size else None):
+        logger.info(f"{name} volume is not up to date")
+        return False
+    return True
+
+
+def _set_empty_dir_volume(
+    pod_spec: PodSpec,
+    name: str,
+    size: Optional[str],
+    mount_path: Optional[str],
+    medium: Optional[str] = None,
+) -> None:
+    """Mounts an emptyDir volume in the workload container, or removes it when the size is None."""
+    pod_spec.volumes = [volume for volume in pod_spec.volumes or [] if volume.name != name]
+    container = _workload_container(pod_spec)
+    container.volumeMounts = [
+        mount for mount in container.volumeMounts or [] if mount.name != name
+    ]
+    if not size or not mount_path:
+        return
+    pod_spec.volumes.append(
+        Volume(name=name, emptyDir=EmptyDirVolumeSource(sizeLimit=size, medium=medium))
+    )
+    container.volumeMounts.append(VolumeMount(name=name, mountPath=mount_path))
+
+
+def _placement_is_up_to_date(
+    statefulset: StatefulSet,
+    node_selector: Optional[Dict[str, str]],
+    tolerations: Optional[List[dict]],
+    spread_across_nodes: bool,
+) -> bool:
+    """Returns whether the node selector, tolerations and spreading of the pods are up to date."""
+    pod_spec = _pod_spec(statefulset)
+    if node_selector is not None and (pod_spec.nodeSelector or {}) != node_selector:
+        logger.info("nodeSelector is not up to date")
+        return False
+    current_tolerations = [toleration.to_dict() for toleration in pod_spec.tolerations or []]
+    if tolerations is not None and current_tolerations != tolerations:
+        logger.info("Tolerations are not up to date")
+        return False
+    if _spread_terms(pod_spec) != _expected_spread_terms(statefulset, spread_across_nodes):
+        logger.info(f"Spreading across nodes is not set to {spread_across_nodes}")
+        return False
+    return True
+
+
+def _set_placement(
+    statefulset: StatefulSet,
+    node_selector: Optional[Dict[str, str]],
+    tolerations: Optional[List[dict]],
+    spread_across_nodes: bool,
+) -> None:
+    """Sets the node selector, tolerations and spreading of the pods.
+
+    Merge patches only remove map keys set to None and replace lists, so removed node labels are
+    set to None and spreading is removed with an empty list of anti-affinity terms. The node
+    affinity of the pods, which Juju sets from constraints, is kept.
+    """
+    pod_spec = _pod_spec(statefulset)
+    if node_selector is not None:
+        removed: Dict[str, Optional[str]] = {
+            label: None for label in pod_spec.nodeSelector or {} if label not in node_selector
+        }
+        pod_spec.nodeSelector = {**removed, **node_selector}
+    if tolerations is not None:
+        pod_spec.tolerations = [
+            cast(Toleration, Toleration.from_dict(toleration)) for toleration in tolerations
+        ]
+    terms = _expected_spread_terms(statefulset, spread_across_nodes)
+    if not terms and not _spread_terms(pod_spec):
+        return
+    if not pod_spec.affinity:
+        pod_spec.affinity = Affinity()
+    if not pod_spec.affinity.podAntiAffinity:
+        pod_spec.affinity.podAntiAffinity = PodAntiAffinity()
+    pod_spec.affinity.podAntiAffinity.requiredDuringSchedulingIgnoredDuringExecution = [
+        cast(PodAffinityTerm, PodAffinityTerm.from_dict(term)) for term in terms
+    ]
+
+
+def _spread_terms(pod_spec: PodSpec) -> List[dict]:
+    """Returns the required pod anti-affinity terms of the pods."""
+    anti_affinity = pod_spec.affinity.podAntiAffinity if pod_spec.affinity else None
+    if not anti_affinity:
+        return []
+    terms = anti_affinity.requiredDuringSchedulingIgnoredDuringExecution or []
+    return [term.to_dict() for term in terms]
+
+
+def _expected_spread_terms(statefulset: StatefulSet, spread_across_nodes: bool) -> List[dict]:
+    """Returns the anti-affinity terms keeping the statefulset's pods on distinct nodes."""
+    if not spread_across_nodes:
+        return []
+    selector = statefulset.spec.selector
+    term = PodAffinityTerm(
+        labelSelector=LabelSelector(matchLabels=selector.matchLabels),
+        topologyKey=HOSTNAME_TOPOLOGY_KEY,
+    )
+    return [term.to_dict()]
+
+
+def _dns_policy(host_network: bool) -> str:
+    """Returns the DNS policy letting the pod resolve cluster names."""
+    return "ClusterFirstWithHostNet" if host_network else "ClusterFirst"
@@ -0,0 +1,105 @@
+# Copyright 2022 Guillaume Belanger
+# See LICENSE file for licensing details.
+
+"""Deterministic libconfig serializer.
+
+Python values map to libconfig as follows:
+    - dict: group (`{ ... }`), settings are written in insertion order
+    - list of dicts: list of groups (`( { ... }, { ... } )`)
+    - tuple: list (`( ... )`)
+    - list: array (`[ ... ]`)
+    - str: string, bool: boolean, int: integer, float: float
+    - Int64: 64-bit integer (`L` suffix), Hex: hexadecimal integer
+"""
+
+import re
+from typing import Any, List
+
+INDENT = "  "
+SETTING_NAME_PATTERN = re.compile(r"^[A-Za-z*][-A-Za-z0-9_*]*$")
+
+
+class LibconfigError(ValueError):
+    """Raised when a value can't be represented in libconfig."""
+
+
+class Int64(int):
+    """Integer written as a libconfig 64-bit integer."""
+
+
+class Hex(int):
+    """Integer written in hexadecimal, zero padded to `width` digits."""
+
+    width: int
+
+    def __new__(cls, value: int, width: int = 0):
+        """Creates a hexadecimal integer."""
+        instance = super().__new__(cls, value)
+        instance.width = width
+        return instance
+
+
+def dumps(settings: dict) -> str:
+    """Serializes top level settings to libconfig.
+
+    Args:
+        settings: Top level settings.
+
+    Returns:
+        str: libconfig document.
+    """
+    lines: List[str] = []
+    for name, value in settings.items():
+        lines.extend(_setting(name, value, 0))
+        lines.append("")
+    return "\n".join(lines)
+
+
+def _setting(name: str, value: Any, depth: int) -> List[str]:
+    if not SETTING_NAME_PATTERN.match(name):
+        raise LibconfigError(f"Invalid setting name: {name}")
+    value_lines = _value(value, depth)
+    value_lines[0] = f"{INDENT * depth}{name} = {value_lines[0].lstrip()}"
+    value_lines[-1] += ";"
+    return value_lines
+
+
+def _value(value: Any, depth: int) -> List[str]:
+    indent = INDENT * depth
+    if isinstance(value, dict):
+        lines = [f"{indent}{{"]
+        for name, child in value.items():
+            lines.extend(_setting(name, child, depth + 1))
+        lines.append(f"{indent}}}")
+        return lines
+    if isinstance(value, (list, tuple)) and value and isinstance(value[0], dict):
+        lines = [f"{indent}("]
+        for index, group in enumerate(value):
+            group_lines = _value(group, depth + 1)
+            if index < len(value) - 1:
+                group_lines[-1] += ","
+            lines.extend(group_lines)
+        lines.append(f"{indent})")
+        return lines
+    if isinstance(value, tuple):
+        return [f"{indent}({', '.join(_scalar(item) for item in value)})"]
+    if isinstance(value, list):
+        return [f"{indent}[{', '.join(_scalar(item) for item in value)}]"]
+    return [f"{indent}{_scalar(value)}"]
+
+
+def _scalar(value: Any) -> str:
+    if isinstance(value, bool):
+        return "true" if value else "false"
+    if isinstance(value, Hex):
+        return f"0x{int(value):0{value.width}x}"
+    if isinstance(value, Int64):
+        return f"{int(value)}L"
+    if isinstance(value, int):
+        return str(value)
+    if isinstance(value, float):
+        return repr(value)
+    if isinstance(value, str):
+        escaped = value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+        return f'"{escaped}"'
+    raise LibconfigError(f"Unsupported libconfig value: {value!r}")
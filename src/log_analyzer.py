@@ -0,0 +1,343 @@
+# Copyright 2022 Guillaume Belanger
+# See LICENSE file for licensing details.
+
+"""Workload KPIs extracted from the nr-softmodem log.
+
+The log of the `du` service is followed through the Pebble logs API and every line is matched
+against the messages nr-softmodem prints at bring-up and during random access:
+    - F1 Setup latency: F1 Setup Request to F1 Setup Response
+    - Restart to ready: process start (`CMDLINE:`) to F1 Setup Response
+    - RA duration: RA procedure initiated to Msg4 acknowledged
+    - Attach duration: RA procedure initiated to UE Context Setup Request from the CU
+    - Errors and warnings, from the log level nr-softmodem writes before each message
+
+Durations are kept in fixed bucket histograms and in a bounded window of recent samples, so
+memory doesn't grow with the uptime of the DU. This module runs in the statistics exporter, in
+the workload container, so it only uses the standard library.
+"""
+
+import http.client
+import json
+import re
+import socket
+import threading
+import time
+from collections import OrderedDict, deque
+from datetime import datetime
+from typing import Deque, Dict, Iterable, List, Optional, Tuple
+
+LATENCY_BUCKETS = (0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0)
+RA_BUCKETS = (0.005, 0.01, 0.02, 0.05, 0.1, 0.2, 0.5, 1.0, 2.0, 5.0)
+# Number of recent samples kept by each histogram for percentiles
+WINDOW_SIZE = 256
+# Number of UEs tracked between the start and the end of a procedure
+MAX_PENDING_UES = 1024
+ERROR_RATE_WINDOW_SECONDS = 60.0
+MAX_ERROR_TIMESTAMPS = 10000
+RECONNECT_DELAY_SECONDS = 5.0
+
+START_PATTERN = re.compile(r"CMDLINE: ")
+F1_SETUP_REQUEST_PATTERN = re.compile(r"F1AP_SETUP_REQ|F1 Setup Request", re.IGNORECASE)
+F1_SETUP_RESPONSE_PATTERN = re.compile(r"F1AP_SETUP_RESP|F1 Setup Response", re.IGNORECASE)
+RA_START_PATTERN = re.compile(r"Initiating RA procedure")
+TC_RNTI_PATTERN = re.compile(r"TC-RNTI (?P<rnti>[0-9a-f]{4})\b")
+RA_DONE_PATTERN = re.compile(r"UE RNTI 0x(?P<rnti>[0-9a-f]{4})\) Received Ack of Msg4")
+ATTACH_DONE_PATTERN = re.compile(
+    r"UE[ _]?CONTEXT[ _]?SETUP[ _]?REQ.*?RNTI:? (?:0x)?(?P<rnti>[0-9a-f]{4})\b", re.IGNORECASE
+)
+LEVEL_PATTERN = re.compile(r"\[[A-Z0-9_]+\]\s+(?P<level>[EW])\s")
+KPI_PATTERNS = (
+    START_PATTERN,
+    F1_SETUP_REQUEST_PATTERN,
+    F1_SETUP_RESPONSE_PATTERN,
+    RA_START_PATTERN,
+    TC_RNTI_PATTERN,
+    RA_DONE_PATTERN,
+    ATTACH_DONE_PATTERN,
+)
+
+
+class RollingHistogram:
+    """Histogram with cumulative buckets and a bounded window of recent samples."""
+
+    def __init__(self, buckets: Tuple[float, ...], window_size: int = WINDOW_SIZE):
+        """Creates an empty histogram with upper bounds `buckets`."""
+        self.buckets = buckets
+        self.bucket_counts = [0] * len(buckets)
+        self.count = 0
+        self.sum = 0.0
+        self.recent: Deque[float] = deque(maxlen=window_size)
+
+    def observe(self, value: float) -> None:
+        """Records a sample."""
+        for index, upper_bound in enumerate(self.buckets):
+            if value <= upper_bound:
+                self.bucket_counts[index] += 1
+        self.count += 1
+        self.sum += value
+        self.recent.append(value)
+
+    def summary(self) -> Dict[str, float]:
+        """Returns the count of samples and the percentiles of the recent ones."""
+        recent = sorted(self.recent)
+        if not recent:
+            return {"count": self.count}
+        return {
+            "count": self.count,
+            "last": self.recent[-1],
+            "p50": _percentile(recent, 0.5),
+            "p95": _percentile(recent, 0.95),
+            "max": recent[-1],
+        }
+
+    def metric_lines(self, name: str, help_text: str) -> List[str]:
+        """Returns the histogram in the Prometheus text exposition format."""
+        lines = [f"# HELP {name} {help_text}", f"# TYPE {name} histogram"]
+        for upper_bound, bucket_count in zip(self.buckets, self.bucket_counts):
+            lines.append(f'{name}_bucket{{le="{upper_bound}"}} {bucket_count}')
+        lines.append(f'{name}_bucket{{le="+Inf"}} {self.count}')
+        lines.append(f"{name}_sum {self.sum}")
+        lines.append(f"{name}_count {self.count}")
+        return lines
+
+
+def _percentile(sorted_values: List[float], fraction: float) -> float:
+    return sorted_values[min(int(fraction * len(sorted_values)), len(sorted_values) - 1)]
+
+
+class LogAnalyzer:
+    """Extracts KPIs from nr-softmodem log lines, in the order they were written."""
+
+    def __init__(self):
+        """Creates an analyzer without samples."""
+        self._lock = threading.Lock()
+        self.histograms = {
+            "f1-setup-latency": RollingHistogram(LATENCY_BUCKETS),
+            "restart-to-ready": RollingHistogram(LATENCY_BUCKETS),
+            "ra-duration": RollingHistogram(RA_BUCKETS),
+            "attach-duration": RollingHistogram(LATENCY_BUCKETS),
+        }
+        self.errors = 0
+        self.warnings = 0
+        self._error_times: Deque[float] = deque(maxlen=MAX_ERROR_TIMESTAMPS)
+        self._last_time = 0.0
+        self._process_start: Optional[float] = None
+        self._f1_setup_request: Optional[float] = None
+        self._ra_starts: Deque[float] = deque(maxlen=MAX_PENDING_UES)
+        self._ue_ra_starts: "OrderedDict[str, float]" = OrderedDict()
+        self._ue_attach_starts: "OrderedDict[str, float]" = OrderedDict()
+
+    def process(self, timestamp: float, message: str) -> None:
+        """Updates the KPIs with a log line.
+
+        Args:
+            timestamp: Time the line was written, in seconds since the epoch.
+            message: Log line.
+
+        Returns:
+            None
+        """
+        with self._lock:
+            self._last_time = max(self._last_time, timestamp)
+            self._process_level(timestamp, message)
+            if START_PATTERN.search(message):
+                self._process_start = timestamp
+                self._f1_setup_request = None
+            elif F1_SETUP_REQUEST_PATTERN.search(message):
+                self._f1_setup_request = timestamp
+            elif F1_SETUP_RESPONSE_PATTERN.search(message):
+                self._process_f1_setup_response(timestamp)
+            else:
+                self._process_random_access(timestamp, message)
+
+    def _process_level(self, timestamp: float, message: str) -> None:
+        match = LEVEL_PATTERN.search(message)
+        if not match:
+            return
+        if match["level"] == "E":
+            self.errors += 1
+            self._error_times.append(timestamp)
+        else:
+            self.warnings += 1
+
+    def _process_f1_setup_response(self, timestamp: float) -> None:
+        if self._f1_setup_request is not None:
+            self.histograms["f1-setup-latency"].observe(timestamp - self._f1_setup_request)
+            self._f1_setup_request = None
+        if self._process_start is not None:
+            self.histograms["restart-to-ready"].observe(timestamp - self._process_start)
+            self._process_start = None
+
+    def _process_random_access(self, timestamp: float, message: str) -> None:
+        if RA_START_PATTERN.search(message):
+            self._ra_starts.append(timestamp)
+            return
+        match = TC_RNTI_PATTERN.search(message)
+        if match and self._ra_starts:
+            _bounded_set(self._ue_ra_starts, match["rnti"], self._ra_starts.popleft())
+            return
+        match = RA_DONE_PATTERN.search(message)
+        if match and match["rnti"] in self._ue_ra_starts:
+            start = self._ue_ra_starts.pop(match["rnti"])
+            self.histograms["ra-duration"].observe(timestamp - start)
+            _bounded_set(self._ue_attach_starts, match["rnti"], start)
+            return
+        match = ATTACH_DONE_PATTERN.search(message)
+        if match and match["rnti"].lower() in self._ue_attach_starts:
+            start = self._ue_attach_starts.pop(match["rnti"].lower())
+            self.histograms["attach-duration"].observe(timestamp - start)
+
+    @property
+    def errors_per_minute(self) -> float:
+        """Returns the number of errors logged in the last minute of the log."""
+        window_start = self._last_time - ERROR_RATE_WINDOW_SECONDS
+        while self._error_times and self._error_times[0] < window_start:
+            self._error_times.popleft()
+        return len(self._error_times) * 60 / ERROR_RATE_WINDOW_SECONDS
+
+    def kpis(self) -> Dict[str, Dict[str, float]]:
+        """Returns a summary of each KPI."""
+        with self._lock:
+            kpis = {name: histogram.summary() for name, histogram in self.histograms.items()}
+            kpis["log-errors"] = {
+                "errors": self.errors,
+                "warnings": self.warnings,
+                "errors-per-minute": self.errors_per_minute,
+            }
+        return kpis
+
+    def metric_lines(self) -> List[str]:
+        """Returns the KPIs in the Prometheus text exposition format."""
+        with self._lock:
+            lines: List[str] = []
+            for name, histogram in self.histograms.items():
+                metric_name = f"oai_du_{name.replace('-', '_')}_seconds"
+                lines.extend(histogram.metric_lines(metric_name, f"{METRIC_HELP[name]}."))
+            for name, help_text, metric_type, value in (
+                ("oai_du_log_errors_total", "Errors logged.", "counter", self.errors),
+                ("oai_du_log_warnings_total", "Warnings logged.", "counter", self.warnings),
+                (
+                    "oai_du_log_errors_per_minute",
+                    "Errors logged in the last minute.",
+                    "gauge",
+                    self.errors_per_minute,
+                ),
+            ):
+                lines.extend(
+                    [
+                        f"# HELP {name} {help_text}",
+                        f"# TYPE {name} {metric_type}",
+                        f"{name} {value}",
+                    ]
+                )
+        return lines
+
+
+METRIC_HELP = {
+    "f1-setup-latency": "Time from F1 Setup Request to F1 Setup Response",
+    "restart-to-ready": "Time from nr-softmodem start to F1 Setup Response",
+    "ra-duration": "Time from RA procedure initiation to Msg4 acknowledgement",
+    "attach-duration": "Time from RA procedure initiation to UE Context Setup Request",
+}
+
+
+def _bounded_set(pending: "OrderedDict[str, float]", rnti: str, start: float) -> None:
+    pending[rnti] = start
+    pending.move_to_end(rnti)
+    while len(pending) > MAX_PENDING_UES:
+        pending.popitem(last=False)
+
+
+def is_kpi_message(message: str) -> bool:
+    """Returns whether the analyzer measures a KPI from a log line, besides its level.
+
+    Args:
+        message: Log line.
+
+    Returns:
+        bool: Whether the line starts or ends a measured procedure.
+    """
+    return any(pattern.search(message) for pattern in KPI_PATTERNS)
+
+
+def parse_log_entry(line: bytes) -> Optional[Tuple[float, str]]:
+    """Parses an entry of the Pebble logs API.
+
+    Args:
+        line: JSON entry, for example `{"time": "2022-09-23T12:34:56.123456789Z", ...}`.
+
+    Returns:
+        tuple: Time of the entry in seconds since the epoch and the message, None when the line
+            isn't a log entry.
+    """
+    try:
+        entry = json.loads(line)
+        return parse_pebble_time(entry["time"]), entry["message"].rstrip("\n")
+    except (ValueError, KeyError, TypeError):
+        return None
+
+
+def parse_pebble_time(value: str) -> float:
+    """Returns an RFC 3339 time with up to nanosecond precision in seconds since the epoch."""
+    match = re.match(
+        r"^(?P<seconds>[^.]+?)(?:\.(?P<fraction>\d+))?(?P<zone>Z|[+-]\d\d:\d\d)$", value
+    )
+    if not match:
+        raise ValueError(f"Invalid time {value}")
+    zone = "+00:00" if match["zone"] == "Z" else match["zone"]
+    seconds = datetime.fromisoformat(f"{match['seconds']}{zone}").timestamp()
+    return seconds + float(f"0.{match['fraction'] or 0}")
+
+
+class _UnixHTTPConnection(http.client.HTTPConnection):
+    def __init__(self, socket_path: str):
+        super().__init__("localhost")
+        self._socket_path = socket_path
+
+    def connect(self) -> None:
+        self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.sock.connect(self._socket_path)
+
+
+def follow_service_logs(socket_path: str, service: str) -> Iterable[Tuple[float, str]]:
+    """Yields the new log lines of a Pebble service as they are written.
+
+    Args:
+        socket_path: Path of the Pebble API socket.
+        service: Service name.
+
+    Yields:
+        tuple: Time of the line in seconds since the epoch and the line.
+    """
+    connection = _UnixHTTPConnection(socket_path)
+    try:
+        connection.request("GET", f"/v1/logs?follow=true&n=0&services={service}")
+        response = connection.getresponse()
+        if response.status != 200:
+            raise ConnectionError(f"Pebble logs API returned {response.status}")
+        for line in response:
+            entry = parse_log_entry(line)
+            if entry:
+                yield entry
+    finally:
+        connection.close()
+
+
+def analyze_service_logs(analyzer: LogAnalyzer, socket_path: str, service: str) -> None:
+    """Feeds the analyzer with the log of a service forever, reconnecting when needed.
+
+    Args:
+        analyzer: Log analyzer.
+        socket_path: Path of the Pebble API socket.
+        service: Service name.
+
+    Returns:
+        None
+    """
+    while True:
+        try:
+            for timestamp, message in follow_service_logs(socket_path, service):
+                analyzer.process(timestamp, message)
+        except (OSError, http.client.HTTPException):
+            pass
+        time.sleep(RECONNECT_DELAY_SECONDS)
@@ -0,0 +1,325 @@
+# Copyright 2022 Guillaume Belanger
+# See LICENSE file for licensing details.
+
+"""Rotating log file of nr-softmodem.
+
+With file logging, nr-softmodem writes its output to a FIFO instead of Pebble, opened without
+blocking so that its writes fail and its lines are dropped rather than stalling it when the FIFO is
+full. This writer reads the FIFO in large chunks, enlarging its buffer so that it rarely fills, and
+hands them to a thread appending them to a log file on a memory backed volume, rotated by size.
+The thread forwards only warnings, errors and the lines the log analyzer follows to its standard
+output, and so to Pebble. When the file falls behind, chunks beyond the queue are dropped and
+counted, and when it can't be written, the error is reported and the chunks are counted instead.
+
+This script runs in the workload container, so it only uses the standard library.
+"""
+
+import argparse
+import fcntl
+import os
+import queue
+import stat
+import sys
+import threading
+import time
+from typing import BinaryIO, List, Optional
+
+from log_analyzer import LEVEL_PATTERN, is_kpi_message
+
+LOG_DIR = "/var/log/oai"
+LOG_FIFO_PATH = f"{LOG_DIR}/nr-softmodem.fifo"
+LOG_FILE_PATH = f"{LOG_DIR}/nr-softmodem.log"
+MIN_FILE_SIZE_MB = 1
+MAX_FILE_SIZE_MB = 1024
+MAX_BACKUPS = 10
+# Bytes read from the FIFO at once
+READ_SIZE = 2**16
+# Chunks waiting to be written, beyond which new chunks are dropped
+MAX_QUEUED_CHUNKS = 256
+# Linux fcntl setting the buffer size of a pipe, not exposed by Python before 3.10
+F_SETPIPE_SZ = 1031
+PIPE_SIZE = 2**20
+# Seconds between checks for the FIFO before nr-softmodem is started
+FIFO_POLL_INTERVAL_SECONDS = 0.1
+
+
+class LogWriterError(Exception):
+    """Raised when the log file settings are invalid."""
+
+
+def validate_log_settings(max_size_mb: int, backups: int) -> None:
+    """Validates the log file settings.
+
+    Args:
+        max_size_mb: Size of the log file in MiB before it is rotated.
+        backups: Number of rotated files kept.
+
+    Returns:
+        None
+    """
+    if not MIN_FILE_SIZE_MB <= max_size_mb <= MAX_FILE_SIZE_MB:
+        raise LogWriterError(
+            f"log-file-max-size-mb must be between {MIN_FILE_SIZE_MB} and {MAX_FILE_SIZE_MB}, "
+            f"got {max_size_mb}"
+        )
+    if not 0 <= backups <= MAX_BACKUPS:
+        raise LogWriterError(
+            f"log-file-backups must be between 0 and {MAX_BACKUPS}, got {backups}"
+        )
+
+
+def log_volume_size_mb(max_size_mb: int, backups: int) -> int:
+    """Returns the size of the volume holding the log file and its rotated files.
+
+    Args:
+        max_size_mb: Size of the log file in MiB before it is rotated.
+        backups: Number of rotated files kept.
+
+    Returns:
+        int: Size in MiB, with room for a chunk written past the size of each file.
+    """
+    return max_size_mb * (backups + 1) + 1
+
+
+def rotated_path(path: str, rotation: int) -> str:
+    """Returns the path of a log file, `rotation` rotations ago.
+
+    Args:
+        path: Path of the current log file.
+        rotation: Number of rotations, 0 for the current file.
+
+    Returns:
+        str: Path of the file.
+    """
+    return f"{path}.{rotation}" if rotation else path
+
+
+class RotatingFile:
+    """Log file rotated once writing a chunk would make it exceed its size."""
+
+    def __init__(self, path: str, max_bytes: int, backups: int):
+        """Opens the log file, appending to it.
+
+        Args:
+            path: Path of the log file.
+            max_bytes: Size of the file before it is rotated.
+            backups: Number of rotated files kept.
+        """
+        self.path = path
+        self.max_bytes = max_bytes
+        self.backups = backups
+        self._file = open(path, "ab", buffering=0)
+
+    def write(self, data: bytes) -> None:
+        """Appends data, rotating the file first when it would exceed its size.
+
+        The file is unbuffered, so that data failing to be written isn't kept to be written again.
+
+        Args:
+            data: Complete lines.
+
+        Returns:
+            None
+        """
+        size = self._file.tell()
+        if size and size + len(data) > self.max_bytes:
+            self.rotate()
+        self._file.write(data)
+
+    def rotate(self) -> None:
+        """Renames the file and its rotated files one rotation older, dropping the oldest.
+
+        Returns:
+            None
+        """
+        self._file.close()
+        try:
+            for rotation in range(self.backups, 0, -1):
+                source = rotated_path(self.path, rotation - 1)
+                if os.path.exists(source):
+                    os.replace(source, rotated_path(self.path, rotation))
+            if not self.backups:
+                os.unlink(self.path)
+        finally:
+            self._file = open(self.path, "ab", buffering=0)
+
+    def close(self) -> None:
+        """Closes the file."""
+        self._file.close()
+
+
+def forwarded_lines(data: bytes) -> List[bytes]:
+    """Returns the lines of a chunk forwarded to Pebble.
+
+    Args:
+        data: Complete lines.
+
+    Returns:
+        list: Warnings, errors and lines the log analyzer follows, with their newline.
+    """
+    lines = []
+    for line in data.splitlines(keepends=True):
+        message = line.decode(errors="replace")
+        if LEVEL_PATTERN.search(message) or is_kpi_message(message):
+            lines.append(line)
+    return lines
+
+
+class LineReader:
+    """Splits chunks read from a stream into complete lines."""
+
+    def __init__(self):
+        """Creates a reader without pending data."""
+        self._partial = b""
+
+    def feed(self, data: bytes) -> bytes:
+        """Returns the complete lines of the data read so far.
+
+        Args:
+            data: Chunk read from the stream.
+
+        Returns:
+            bytes: Complete lines, empty when none was completed.
+        """
+        data = self._partial + data
+        end = data.rfind(b"\n") + 1
+        self._partial = data[end:]
+        # Lines longer than the read size are written in pieces rather than buffered forever
+        if len(self._partial) >= READ_SIZE:
+            end, self._partial = len(data), b""
+        return data[:end]
+
+
+def write_chunks(
+    chunks: "queue.Queue[Optional[bytes]]", log_file: RotatingFile, output: BinaryIO
+) -> None:
+    """Writes queued chunks to the log file and forwards some of their lines until None.
+
+    Chunks the log file fails to hold, for example when its volume is full, are dropped. The first
+    error is reported, and the dropped bytes once the file is written again.
+
+    Args:
+        chunks: Chunks of complete lines.
+        log_file: Log file.
+        output: Stream lines are forwarded to.
+
+    Returns:
+        None
+    """
+    dropped = 0
+    while True:
+        chunk = chunks.get()
+        if chunk is None:
+            return
+        lines = forwarded_lines(chunk)
+        try:
+            log_file.write(chunk)
+        except OSError as e:
+            if not dropped:
+                lines.insert(0, f"log_writer: failed to write {log_file.path}: {e}\n".encode())
+            dropped += len(chunk)
+        else:
+            if dropped:
+                lines.insert(0, f"log_writer: dropped {dropped} bytes from the file\n".encode())
+                dropped = 0
+        if lines:
+            output.write(b"".join(lines))
+            output.flush()
+
+
+def run(fifo_path: str, file_path: str, max_bytes: int, backups: int, output: BinaryIO) -> None:
+    """Reads the FIFO nr-softmodem logs to forever, writing its lines to the log file.
+
+    The FIFO is opened for reading and writing, so it never reaches end of file and
+    nr-softmodem opening it never waits for this reader, including across restarts.
+
+    Args:
+        fifo_path: Path of the FIFO.
+        file_path: Path of the log file.
+        max_bytes: Size of the log file before it is rotated.
+        backups: Number of rotated files kept.
+        output: Stream lines are forwarded to.
+
+    Returns:
+        None
+    """
+    _make_fifo(fifo_path)
+    fd = os.open(fifo_path, os.O_RDWR)
+    try:
+        fcntl.fcntl(fd, F_SETPIPE_SZ, PIPE_SIZE)
+    except OSError:
+        # Unprivileged processes are limited by /proc/sys/fs/pipe-max-size
+        pass
+    chunks: "queue.Queue[Optional[bytes]]" = queue.Queue(maxsize=MAX_QUEUED_CHUNKS)
+    log_file = RotatingFile(file_path, max_bytes, backups)
+    writer = threading.Thread(target=write_chunks, args=(chunks, log_file, output), daemon=True)
+    writer.start()
+    reader = LineReader()
+    dropped = 0
+    while True:
+        lines = reader.feed(os.read(fd, READ_SIZE))
+        if not lines:
+            continue
+        if dropped:
+            lines = f"log_writer: dropped {dropped} bytes\n".encode() + lines
+        try:
+            chunks.put_nowait(lines)
+            dropped = 0
+        except queue.Full:
+            dropped += len(lines)
+
+
+def exec_writing_to_fifo(fifo_path: str, argv: List[str]) -> None:
+    """Replaces this process with a command whose output goes to the FIFO, once it exists.
+
+    The FIFO is opened without blocking, so that the command's writes fail rather than block when
+    the FIFO is full. It is opened for reading too, so that the command never gets SIGPIPE while
+    the log writer restarts.
+
+    Args:
+        fifo_path: Path of the FIFO, created by the log writer.
+        argv: Command and its arguments.
+
+    Returns:
+        None
+    """
+    while not os.path.exists(fifo_path):
+        time.sleep(FIFO_POLL_INTERVAL_SECONDS)
+    fd = os.open(fifo_path, os.O_RDWR | os.O_NONBLOCK)
+    os.dup2(fd, sys.stdout.fileno())
+    os.dup2(fd, sys.stderr.fileno())
+    os.close(fd)
+    os.execvp(argv[0], argv)
+
+
+def _make_fifo(path: str) -> None:
+    """Creates a FIFO at `path`, replacing a regular file."""
+    if os.path.lexists(path):
+        if stat.S_ISFIFO(os.stat(path).st_mode):
+            return
+        os.unlink(path)
+    os.mkfifo(path)
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    """Writes the nr-softmodem log until interrupted, or runs nr-softmodem writing to it."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    write_parser = subparsers.add_parser("write")
+    write_parser.add_argument("--fifo", default=LOG_FIFO_PATH)
+    write_parser.add_argument("--file", default=LOG_FILE_PATH)
+    write_parser.add_argument("--max-size-mb", type=int, required=True)
+    write_parser.add_argument("--backups", type=int, required=True)
+    exec_parser = subparsers.add_parser("exec")
+    exec_parser.add_argument("--fifo", default=LOG_FIFO_PATH)
+    exec_parser.add_argument("argv", nargs=argparse.REMAINDER)
+    args = parser.parse_args(argv)
+    if args.command == "exec":
+        exec_writing_to_fifo(args.fifo, args.argv)
+        return
+    validate_log_settings(args.max_size_mb, args.backups)
+    run(args.fifo, args.file, args.max_size_mb * 2**20, args.backups, sys.stdout.buffer)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,83 @@
+# Copyright 2022 Guillaume Belanger
+# See LICENSE file for licensing details.
+
+"""Provider side of the `prometheus_scrape` interface.
+
+The leader publishes the scrape jobs and every unit publishes its address, which Prometheus
+substitutes to the `*` host of the jobs' targets. The constructor takes the `jobs` and
+`refresh_event` arguments of the `charms.prometheus_k8s.v0.prometheus_scrape` provider, so that
+the charm can switch to that library by changing the import only.
+"""
+
+import json
+from typing import List, Optional, Union
+
+from ops.charm import CharmBase
+from ops.framework import BoundEvent, EventBase, Object
+
+DEFAULT_JOBS = [{"metrics_path": "/metrics"}]
+
+
+class MetricsEndpointProvider(Object):
+    """Publishes scrape jobs over the `prometheus_scrape` interface."""
+
+    def __init__(
+        self,
+        charm: CharmBase,
+        relation_name: str = "metrics-endpoint",
+        jobs: Optional[List[dict]] = None,
+        refresh_event: Optional[Union[BoundEvent, List[BoundEvent]]] = None,
+    ):
+        """Observes the events the scrape jobs and unit address are published on.
+
+        Args:
+            charm: Charm exposing the metrics.
+            relation_name: Name of the relation.
+            jobs: Scrape jobs, targets using `*` as host for the address of every unit.
+            refresh_event: Events after which the unit address may have changed, for example
+                `config_changed` when it depends on the configuration.
+        """
+        super().__init__(charm, relation_name)
+        self._charm = charm
+        self._relation_name = relation_name
+        self._jobs = jobs or DEFAULT_JOBS
+        if refresh_event is None:
+            refresh_event = []
+        elif not isinstance(refresh_event, list):
+            refresh_event = [refresh_event]
+        events = charm.on[relation_name]
+        self.framework.observe(events.relation_joined, self._set_scrape_job_spec)
+        self.framework.observe(events.relation_changed, self._set_scrape_job_spec)
+        self.framework.observe(charm.on.leader_elected, self._set_scrape_job_spec)
+        self.framework.observe(charm.on.upgrade_charm, self._set_scrape_job_spec)
+        for event in refresh_event:
+            self.framework.observe(event, self._set_scrape_job_spec)
+
+    def _set_scrape_job_spec(self, _: EventBase) -> None:
+        """Publishes the unit address and, on the leader, the scrape jobs to every relation."""
+        for relation in self._charm.model.relations[self._relation_name]:
+            binding = self._charm.model.get_binding(relation)
+            bind_address = binding.network.bind_address if binding else None
+            if bind_address:
+                relation.data[self._charm.unit].update(
+                    {
+                        "prometheus_scrape_unit_address": str(bind_address),
+                        "prometheus_scrape_unit_name": self._charm.unit.name,
+                    }
+                )
+            if self._charm.unit.is_leader():
+                relation.data[self._charm.app].update(
+                    {
+                        "scrape_metadata": json.dumps(self._scrape_metadata),
+                        "scrape_jobs": json.dumps(self._jobs),
+                    }
+                )
+
+    @property
+    def _scrape_metadata(self) -> dict:
+        return {
+            "model": self._charm.model.name,
+            "model_uuid": self._charm.model.uuid,
+            "application": self._charm.app.name,
+            "charm_name": self._charm.meta.name,
+        }
@@ -0,0 +1,94 @@
+# Copyright 2022 Guillaume Belanger
+# See LICENSE file for licensing details.
+
+"""Antenna, MIMO and modulation configuration."""
+
+from dataclasses import dataclass
+from typing import List
+
+from libconfig import Hex
+
+VALID_ANTENNA_COUNTS = (1, 2, 4, 8)
+VALID_PDSCH_ANTENNA_PORTS = (1, 2, 4, 8)
+VALID_PUSCH_ANTENNA_PORTS = (1, 2, 4)
+VALID_MIMO_LAYERS = (1, 2, 4)
+MIN_BEAMFORMING_WEIGHTS = 4
+UNIT_WEIGHT = Hex(0x7FFF, 8)
+ZERO_WEIGHT = Hex(0, 8)
+
+
+class MimoConfigError(Exception):
+    """Raised when the antenna configuration is not consistent."""
+
+
+@dataclass(frozen=True)
+class AntennaConfig:
+    """Antenna and MIMO configuration of the cell."""
+
+    n_tx: int
+    n_rx: int
+    max_mimo_layers: int
+    pdsch_antenna_ports: int
+    pusch_antenna_ports: int
+    enable_256qam: bool
+
+    def validate(self) -> None:
+        """Validates the antenna counts, antenna ports and MIMO layers against each other.
+
+        Returns:
+            None
+        """
+        if self.n_tx not in VALID_ANTENNA_COUNTS:
+            raise MimoConfigError(f"Number of TX antennas must be one of {VALID_ANTENNA_COUNTS}")
+        if self.n_rx not in VALID_ANTENNA_COUNTS:
+            raise MimoConfigError(f"Number of RX antennas must be one of {VALID_ANTENNA_COUNTS}")
+        if self.pdsch_antenna_ports not in VALID_PDSCH_ANTENNA_PORTS:
+            raise MimoConfigError(
+                f"Number of PDSCH antenna ports must be one of {VALID_PDSCH_ANTENNA_PORTS}"
+            )
+        if self.pusch_antenna_ports not in VALID_PUSCH_ANTENNA_PORTS:
+            raise MimoConfigError(
+                f"Number of PUSCH antenna ports must be one of {VALID_PUSCH_ANTENNA_PORTS}"
+            )
+        if self.max_mimo_layers not in VALID_MIMO_LAYERS:
+            raise MimoConfigError(f"Maximum MIMO layers must be one of {VALID_MIMO_LAYERS}")
+        if self.pdsch_antenna_ports > self.n_tx:
+            raise MimoConfigError(
+                f"{self.pdsch_antenna_ports} PDSCH antenna ports need at least as many TX "
+                f"antennas, got {self.n_tx}"
+            )
+        if self.pusch_antenna_ports > self.n_rx:
+            raise MimoConfigError(
+                f"{self.pusch_antenna_ports} PUSCH antenna ports need at least as many RX "
+                f"antennas, got {self.n_rx}"
+            )
+        if self.max_mimo_layers > self.pdsch_antenna_ports:
+            raise MimoConfigError(
+                f"{self.max_mimo_layers} MIMO layers need at least as many PDSCH antenna ports, "
+                f"got {self.pdsch_antenna_ports}"
+            )
+
+    @property
+    def pdsch_antenna_ports_xp(self) -> int:
+        """Returns the number of cross-polarized PDSCH antenna ports."""
+        return 1 if self.pdsch_antenna_ports == 1 else 2
+
+    @property
+    def pdsch_antenna_ports_n1(self) -> int:
+        """Returns the number of horizontal PDSCH antenna ports per polarization."""
+        return self.pdsch_antenna_ports // self.pdsch_antenna_ports_xp
+
+    @property
+    def beamforming_weights(self) -> List[Hex]:
+        """Returns the RU beamforming weights, one row per TX antenna.
+
+        Each TX antenna is mapped to logical antenna port `antenna % pdsch_antenna_ports` with
+        unit gain. The matrix is padded with zeros up to the 4 weights OAI expects at least.
+        """
+        weights = [
+            UNIT_WEIGHT if antenna % self.pdsch_antenna_ports == port else ZERO_WEIGHT
+            for antenna in range(self.n_tx)
+            for port in range(self.pdsch_antenna_ports)
+        ]
+        weights += [ZERO_WEIGHT] * (MIN_BEAMFORMING_WEIGHTS - len(weights))
+        return weights
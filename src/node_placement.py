@@ -0,0 +1,182 @@
+# Copyright 2022 Guillaume Belanger
+# See LICENSE file for licensing details.
+
+"""Placement of DU pods on nodes.
+
+DU pods only run on nodes with the labels of `node-selector`, for example nodes with isolated
+cores and a real-time kernel, may run on nodes with the taints of `tolerations`, and run one per
+node with `spread-across-nodes`. Nodes are checked against the placement before the statefulset
+rolls it out, so that a placement no node satisfies leaves the running pods in place instead of
+replacing them with pods stuck in Pending.
+"""
+
+from dataclasses import dataclass
+from typing import Dict, List, Optional
+
+# Taint effects keeping pods that don't tolerate them off a node
+BLOCKING_EFFECTS = ("NoSchedule", "NoExecute")
+TAINT_EFFECTS = ("NoSchedule", "PreferNoSchedule", "NoExecute")
+
+
+class NodePlacementError(Exception):
+    """Raised when the node placement settings are invalid."""
+
+
+class NoSuitableNodeError(Exception):
+    """Raised when not enough nodes can run the DU pods."""
+
+
+@dataclass(frozen=True)
+class Taint:
+    """Taint of a node."""
+
+    key: str
+    effect: str
+    value: Optional[str] = None
+
+
+@dataclass(frozen=True)
+class Toleration:
+    """Toleration of DU pods, of every taint effect when the effect is None."""
+
+    key: str
+    value: Optional[str] = None
+    effect: Optional[str] = None
+
+    def tolerates(self, taint: Taint) -> bool:
+        """Returns whether the toleration tolerates a taint."""
+        if self.key != taint.key or self.effect not in (None, taint.effect):
+            return False
+        return self.value is None or self.value == taint.value
+
+    def to_dict(self) -> dict:
+        """Returns the Kubernetes representation of the toleration."""
+        toleration = {"key": self.key, "operator": "Equal" if self.value else "Exists"}
+        if self.value:
+            toleration["value"] = self.value
+        if self.effect:
+            toleration["effect"] = self.effect
+        return toleration
+
+
+@dataclass(frozen=True)
+class NodeInfo:
+    """Scheduling related state of a node."""
+
+    name: str
+    labels: Dict[str, str]
+    taints: List[Taint]
+    unschedulable: bool = False
+
+
+def parse_node_selector(value: str) -> Dict[str, str]:
+    """Parses a node selector.
+
+    The node selector is a comma separated list of `<label>=<value>` entries, for example
+    `node-role.kubernetes.io/du=true,kubernetes.io/arch=amd64`.
+
+    Args:
+        value: Node selector.
+
+    Returns:
+        dict: Value of each node label.
+    """
+    node_selector = {}
+    for entry in value.split(","):
+        entry = entry.strip()
+        if not entry:
+            continue
+        label, separator, label_value = entry.partition("=")
+        if not separator or not label.strip():
+            raise NodePlacementError(f"Invalid node-selector entry: {entry}")
+        node_selector[label.strip()] = label_value.strip()
+    return node_selector
+
+
+def parse_tolerations(value: str) -> List[Toleration]:
+    """Parses tolerations.
+
+    Tolerations are a comma separated list of taints as written by `kubectl taint`,
+    `<key>[=<value>][:<effect>]`, for example `isolcpus=true:NoSchedule,realtime`. Without an
+    effect, every effect of the taint is tolerated.
+
+    Args:
+        value: Tolerations.
+
+    Returns:
+        list: Tolerations.
+    """
+    tolerations = []
+    for entry in value.split(","):
+        entry = entry.strip()
+        if not entry:
+            continue
+        taint, _, effect = entry.partition(":")
+        key, _, taint_value = taint.partition("=")
+        if not key.strip():
+            raise NodePlacementError(f"Invalid tolerations entry: {entry}")
+        if effect and effect not in TAINT_EFFECTS:
+            raise NodePlacementError(
+                f"Invalid taint effect {effect}, expected one of {', '.join(TAINT_EFFECTS)}"
+            )
+        tolerations.append(
+            Toleration(key=key.strip(), value=taint_value.strip() or None, effect=effect or None)
+        )
+    return tolerations
+
+
+def suitable_nodes(
+    nodes: List[NodeInfo], node_selector: Dict[str, str], tolerations: List[Toleration]
+) -> List[str]:
+    """Returns the nodes DU pods can be scheduled on.
+
+    Args:
+        nodes: Nodes of the cluster.
+        node_selector: Labels nodes must have.
+        tolerations: Tolerations of DU pods.
+
+    Returns:
+        list: Names of the schedulable nodes with every label that tolerate the pods.
+    """
+    return [node.name for node in nodes if _fits(node, node_selector, tolerations)]
+
+
+def _fits(node: NodeInfo, node_selector: Dict[str, str], tolerations: List[Toleration]) -> bool:
+    """Returns whether DU pods can be scheduled on a node."""
+    if node.unschedulable:
+        return False
+    if any(node.labels.get(label) != value for label, value in node_selector.items()):
+        return False
+    return all(
+        any(toleration.tolerates(taint) for toleration in tolerations)
+        for taint in node.taints
+        if taint.effect in BLOCKING_EFFECTS
+    )
+
+
+def check_placement(
+    nodes: List[NodeInfo],
+    node_selector: Dict[str, str],
+    tolerations: List[Toleration],
+    spread_across_nodes: bool,
+    units: int,
+) -> None:
+    """Raises NoSuitableNodeError when the DU pods can't all be scheduled.
+
+    Args:
+        nodes: Nodes of the cluster.
+        node_selector: Labels nodes must have.
+        tolerations: Tolerations of DU pods.
+        spread_across_nodes: Whether DU pods run on distinct nodes.
+        units: Number of DU pods.
+
+    Returns:
+        None
+    """
+    count = len(suitable_nodes(nodes, node_selector, tolerations))
+    if not count:
+        raise NoSuitableNodeError("no schedulable node matches node-selector and tolerations")
+    if spread_across_nodes and count < units:
+        raise NoSuitableNodeError(
+            f"spread-across-nodes needs {units} nodes, {count} match node-selector and tolerations"
+        )
@@ -0,0 +1,130 @@
+# Copyright 2022 Guillaume Belanger
+# See LICENSE file for licensing details.
+
+"""Scheduler and L1 performance profiles.
+
+A profile maps to a set of gNB parameters trading latency for capacity. Parameters are keyed by
+their gnb.conf name.
+"""
+
+from typing import Dict, Tuple
+
+UINT_MAX = 2**32 - 1
+
+CUSTOM_PROFILE = "custom"
+
+# gnb.conf parameter -> (minimum, maximum)
+PARAMETER_RANGES: Dict[str, Tuple[int, int]] = {
+    "min_rxtxtime": (2, 8),
+    "pusch_TargetSNRx10": (0, 500),
+    "pucch_TargetSNRx10": (0, 500),
+    "prach_dtx_threshold": (0, 500),
+    "pucch0_dtx_threshold": (0, 500),
+    "ofdm_offset_divisor": (1, UINT_MAX),
+    # Index in 1, 2, 4, 8, 10, 20, 40, 80 slots
+    "ra_ResponseWindow": (0, 7),
+    "SCTP_INSTREAMS": (1, 65535),
+    "SCTP_OUTSTREAMS": (1, 65535),
+}
+
+PROFILES: Dict[str, Dict[str, int]] = {
+    "balanced": {
+        "min_rxtxtime": 6,
+        "pusch_TargetSNRx10": 200,
+        "pucch_TargetSNRx10": 200,
+        "prach_dtx_threshold": 200,
+        "pucch0_dtx_threshold": 150,
+        "ofdm_offset_divisor": 8,
+        "ra_ResponseWindow": 4,
+        "SCTP_INSTREAMS": 2,
+        "SCTP_OUTSTREAMS": 2,
+    },
+    # Shortest DL to UL feedback delay and RA response window, earlier detection of PRACH and
+    # PUCCH, no OFDM symbol offset.
+    "low-latency": {
+        "min_rxtxtime": 2,
+        "pusch_TargetSNRx10": 200,
+        "pucch_TargetSNRx10": 200,
+        "prach_dtx_threshold": 120,
+        "pucch0_dtx_threshold": 100,
+        "ofdm_offset_divisor": UINT_MAX,
+        "ra_ResponseWindow": 2,
+        "SCTP_INSTREAMS": 2,
+        "SCTP_OUTSTREAMS": 2,
+    },
+    # Higher uplink SNR target for higher MCS, more L1 processing headroom and more SCTP streams
+    # so that a busy F1-C is not head-of-line blocked across UEs.
+    "high-throughput": {
+        "min_rxtxtime": 6,
+        "pusch_TargetSNRx10": 250,
+        "pucch_TargetSNRx10": 200,
+        "prach_dtx_threshold": 200,
+        "pucch0_dtx_threshold": 150,
+        "ofdm_offset_divisor": 8,
+        "ra_ResponseWindow": 4,
+        "SCTP_INSTREAMS": 16,
+        "SCTP_OUTSTREAMS": 16,
+    },
+}
+
+
+class PerformanceProfileError(Exception):
+    """Raised when a performance profile or one of its overrides is not valid."""
+
+
+def parse_overrides(value: str) -> Dict[str, int]:
+    """Parses comma separated `parameter=value` overrides.
+
+    Args:
+        value: Overrides, for example `min_rxtxtime=2,pusch_TargetSNRx10=250`.
+
+    Returns:
+        dict: Override value of each parameter.
+    """
+    overrides = {}
+    for entry in value.split(","):
+        entry = entry.strip()
+        if not entry:
+            continue
+        name, separator, raw_value = entry.partition("=")
+        name = name.strip()
+        if not separator:
+            raise PerformanceProfileError(f"Invalid override {entry}, expected parameter=value")
+        if name not in PARAMETER_RANGES:
+            raise PerformanceProfileError(f"Unknown performance parameter {name}")
+        try:
+            overrides[name] = int(raw_value.strip())
+        except ValueError:
+            raise PerformanceProfileError(f"Value of {name} must be an integer")
+    return overrides
+
+
+def get_performance_parameters(profile: str, overrides: Dict[str, int]) -> Dict[str, int]:
+    """Returns the validated gNB parameters of a profile with overrides applied.
+
+    Args:
+        profile: Profile name, or `custom` in which case every parameter must be overridden.
+        overrides: Values replacing the ones of the profile.
+
+    Returns:
+        dict: Value of each parameter.
+    """
+    if profile == CUSTOM_PROFILE:
+        missing = [name for name in PARAMETER_RANGES if name not in overrides]
+        if missing:
+            raise PerformanceProfileError(
+                f"Custom performance profile is missing: {', '.join(missing)}"
+            )
+        parameters = {}
+    elif profile in PROFILES:
+        parameters = dict(PROFILES[profile])
+    else:
+        valid_profiles = ", ".join(list(PROFILES) + [CUSTOM_PROFILE])
+        raise PerformanceProfileError(
+            f"Unknown performance profile {profile}, valid values: {valid_profiles}"
+        )
+    parameters.update(overrides)
+    for name, (minimum, maximum) in PARAMETER_RANGES.items():
+        if not minimum <= parameters[name] <= maximum:
+            raise PerformanceProfileError(f"{name} must be between {minimum} and {maximum}")
+    return parameters
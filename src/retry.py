@@ -0,0 +1,150 @@
+# Copyright 2022 Guillaume Belanger
+# See LICENSE file for licensing details.
+
+"""Retries of Kubernetes API calls failing with transient errors.
+
+Throttled requests (429), server errors (5xx) and connection errors are retried with a capped
+exponential backoff and jitter, or after the delay requested by the `Retry-After` header. Retries
+stop once the time budget of the hook would be exceeded, the last error then being raised.
+
+Creates aren't idempotent, so callers retrying them treat a conflict (409) as the object existing.
+"""
+
+import asyncio
+import logging
+import random
+import time
+from dataclasses import dataclass
+from typing import Awaitable, Callable, Optional, TypeVar
+
+from lightkube.core.exceptions import ApiError
+
+try:  # lightkube >= 1.0 uses the httpx2 fork of httpx
+    from httpx2 import TransportError
+except ImportError:
+    from httpx import TransportError  # type: ignore[no-redef, import-not-found]
+
+logger = logging.getLogger(__name__)
+
+RETRYABLE_STATUS_CODES = (429, 500, 502, 503, 504)
+RETRYABLE_ERRORS = (ApiError, TransportError, ConnectionError)
+
+T = TypeVar("T")
+
+
+@dataclass(frozen=True)
+class RetryPolicy:
+    """Backoff and time budget of retries."""
+
+    # Delay before the first retry, doubled at each retry
+    base_delay: float = 0.25
+    max_delay: float = 5.0
+    # Time spent retrying over the whole hook
+    budget: float = 20.0
+
+
+class Retrier:
+    """Calls functions, retrying them on transient errors within a time budget."""
+
+    def __init__(
+        self,
+        policy: RetryPolicy = RetryPolicy(),
+        clock: Callable[[], float] = time.monotonic,
+        sleep: Callable[[float], None] = time.sleep,
+        jitter: Callable[[], float] = random.random,
+        async_sleep: Callable[[float], Awaitable[None]] = asyncio.sleep,
+    ):
+        """Starts the time budget.
+
+        Args:
+            policy: Backoff and time budget of retries.
+            clock: Monotonic clock.
+            sleep: Function waiting for a number of seconds.
+            jitter: Function returning a random number between 0 and 1.
+            async_sleep: Coroutine function waiting for a number of seconds.
+        """
+        self.policy = policy
+        self.retries = 0
+        self._clock = clock
+        self._sleep = sleep
+        self._async_sleep = async_sleep
+        self._jitter = jitter
+        self._deadline = clock() + policy.budget
+
+    def call(self, function: Callable[..., T], *args, **kwargs) -> T:
+        """Calls a function, retrying it while it fails with transient errors.
+
+        Args:
+            function: Function to call.
+            args: Positional arguments of the function.
+            kwargs: Keyword arguments of the function.
+
+        Returns:
+            The value returned by the function.
+        """
+        attempt = 0
+        while True:
+            try:
+                return function(*args, **kwargs)
+            except RETRYABLE_ERRORS as e:
+                delay = self._next_delay(e, attempt)
+                if delay is None:
+                    raise
+                self._sleep(delay)
+                attempt += 1
+
+    async def call_async(self, function: Callable[..., Awaitable[T]], *args, **kwargs) -> T:
+        """Awaits a coroutine function, retrying it while it fails with transient errors.
+
+        Args:
+            function: Coroutine function to await.
+            args: Positional arguments of the function.
+            kwargs: Keyword arguments of the function.
+
+        Returns:
+            The value returned by the function.
+        """
+        attempt = 0
+        while True:
+            try:
+                return await function(*args, **kwargs)
+            except RETRYABLE_ERRORS as e:
+                delay = self._next_delay(e, attempt)
+                if delay is None:
+                    raise
+                await self._async_sleep(delay)
+                attempt += 1
+
+    def _next_delay(self, error: Exception, attempt: int) -> Optional[float]:
+        """Returns the delay before retrying, None when the error must be raised."""
+        delay = self._retry_delay(error, attempt)
+        if delay is None or self._clock() + delay > self._deadline:
+            return None
+        logger.warning("Kubernetes API call failed, retrying in %.2fs: %s", delay, error)
+        self.retries += 1
+        return delay
+
+    def _retry_delay(self, error: Exception, attempt: int) -> Optional[float]:
+        """Returns the delay before retrying, None when the error isn't transient."""
+        if isinstance(error, ApiError):
+            if error.status.code not in RETRYABLE_STATUS_CODES:
+                return None
+            retry_after = _retry_after(error)
+            if retry_after is not None:
+                return retry_after
+        backoff = min(self.policy.max_delay, self.policy.base_delay * 2**attempt)
+        # Equal jitter keeps half of the backoff so retries don't become immediate
+        return backoff / 2 + self._jitter() * backoff / 2
+
+
+def _retry_after(error: ApiError) -> Optional[float]:
+    """Returns the delay in seconds of the `Retry-After` header, None when absent."""
+    response = getattr(error, "response", None)
+    if response is None:
+        return None
+    value = response.headers.get("Retry-After")
+    try:
+        return max(0.0, float(value)) if value is not None else None
+    except ValueError:
+        # HTTP dates aren't used by the API server
+        return None
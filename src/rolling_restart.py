@@ -0,0 +1,125 @@
+# Copyright 2022 Guillaume Belanger
+# See LICENSE file for licensing details.
+
+"""Rolling restarts of nr-softmodem across DU units.
+
+Units needing a restart while nr-softmodem serves their cell request it in their peer unit data.
+The leader grants requests in unit order, to at most `max_concurrent` serving units at a time and
+as long as enough other units keep serving. A unit keeps its grant until its cell serves again,
+with F1 re-established, and then withdraws its request, which lets the leader grant the next one.
+
+Units that don't serve restart without holding back the others. A grant stops holding them back
+as well once it times out, so that a unit whose cell never serves again doesn't stall the
+rolling restart.
+"""
+
+from dataclasses import asdict, dataclass
+from typing import Dict, Iterable
+
+RESTART_REQUEST_KEY = "restart-request"
+RESTART_GRANTS_KEY = "restart-grants"
+SERVING_KEY = "serving"
+# nr-softmodem restarts and re-establishes F1 within a minute when the CU is up
+GRANT_TIMEOUT_SECONDS = 600
+
+
+@dataclass(frozen=True)
+class Grant:
+    """Restart request granted to a unit."""
+
+    request: str
+    # Time the leader granted the request, in seconds since the epoch
+    time: float
+    # Whether the unit served when granted, its restart then costing capacity
+    serving: bool
+
+    def holds_back(self, now: float) -> bool:
+        """Returns whether the restart holds back the restart of other serving units."""
+        return self.serving and now - self.time < GRANT_TIMEOUT_SECONDS
+
+
+def grants_to_json(grants: Dict[str, Grant]) -> Dict[str, dict]:
+    """Returns grants in the form they are published in, keyed by unit."""
+    return {unit: asdict(grant) for unit, grant in grants.items()}
+
+
+def grants_from_json(grants: Dict[str, dict]) -> Dict[str, Grant]:
+    """Returns published grants, keyed by unit."""
+    return {unit: Grant(**grant) for unit, grant in grants.items()}
+
+
+class RollingRestartError(Exception):
+    """Raised when the rolling restart settings are invalid."""
+
+
+def validate_rolling_restart(max_concurrent: int, min_serving_percent: int) -> None:
+    """Validates the rolling restart settings.
+
+    Args:
+        max_concurrent: Units restarting at the same time.
+        min_serving_percent: Percentage of the units that keep serving during restarts.
+
+    Returns:
+        None
+    """
+    if max_concurrent < 1:
+        raise RollingRestartError(
+            f"rolling-restart-max-concurrent must be at least 1, got {max_concurrent}"
+        )
+    # 100% would never let a serving unit restart
+    if not 0 <= min_serving_percent <= 99:
+        raise RollingRestartError(
+            "rolling-restart-min-serving-percent must be between 0 and 99, "
+            f"got {min_serving_percent}"
+        )
+
+
+def grant_restarts(
+    units: Iterable[str],
+    requests: Dict[str, str],
+    grants: Dict[str, Grant],
+    serving: Dict[str, bool],
+    max_concurrent: int,
+    min_serving_percent: int,
+    now: float,
+) -> Dict[str, Grant]:
+    """Returns the restart grants once withdrawn requests are released and new ones granted.
+
+    Restarting a unit that doesn't serve costs no capacity, so only the restarts of serving units
+    are limited by `max_concurrent` and held back by the serving floor.
+
+    Args:
+        units: Units of the application.
+        requests: Restart request of each unit requesting one.
+        grants: Current restart grants, keyed by unit.
+        serving: Whether each unit's cell serves.
+        max_concurrent: Serving units restarting at the same time.
+        min_serving_percent: Percentage of the units that keep serving during restarts.
+        now: Current time, in seconds since the epoch.
+
+    Returns:
+        dict: Grants, keyed by unit.
+    """
+    units = sorted(units, key=_unit_number)
+    active = {
+        unit: grants[unit]
+        for unit in units
+        if unit in grants and requests.get(unit) == grants[unit].request
+    }
+    restarting = [unit for unit, grant in active.items() if grant.holds_back(now)]
+    min_serving = len(units) * min_serving_percent // 100
+    serving_units = {unit for unit in units if serving.get(unit) and unit not in active}
+    for unit in units:
+        if unit in active or unit not in requests:
+            continue
+        if unit in serving_units:
+            if len(restarting) >= max_concurrent or len(serving_units) - 1 < min_serving:
+                continue
+            serving_units.remove(unit)
+            restarting.append(unit)
+        active[unit] = Grant(request=requests[unit], time=now, serving=bool(serving.get(unit)))
+    return active
+
+
+def _unit_number(unit: str) -> int:
+    return int(unit.rsplit("/", 1)[1])
@@ -0,0 +1,187 @@
+# Copyright 2022 Guillaume Belanger
+# See LICENSE file for licensing details.
+
+"""Reconciliation of the Kubernetes Service created by Juju.
+
+The Service patch library merge-patches the Service when its ports differ, which leaves ports,
+like Juju's placeholder, and other fields behind. Here, the desired fields are sent with
+server-side apply instead, so the Service is never recreated, which would change the address of
+a LoadBalancer Service.
+
+On install, the charm reconciles the Service concurrently with its other Kubernetes API calls,
+so the library only reconciles it on `upgrade-charm` and the refresh events.
+"""
+
+import logging
+from typing import List, Optional, Union, cast
+
+from charms.observability_libs.v1.kubernetes_service_patch import (  # type: ignore[import]
+    KubernetesServicePatch,
+    ServiceType,
+)
+from lightkube import ApiError
+from lightkube.core import exceptions
+from lightkube.models.core_v1 import ServicePort, ServiceSpec
+from lightkube.models.meta_v1 import ObjectMeta
+from lightkube.resources.core_v1 import Service
+from ops.charm import CharmBase, InstallEvent
+from ops.framework import BoundEvent, EventBase
+
+from kubernetes import AsyncKubernetes, Kubernetes
+
+logger = logging.getLogger(__name__)
+
+
+class ServicePatch(KubernetesServicePatch):
+    """Service patch library reconciling the whole desired Service spec."""
+
+    def __init__(
+        self,
+        charm: CharmBase,
+        ports: List[ServicePort],
+        service_type: ServiceType = "ClusterIP",
+        *,
+        refresh_event: Optional[Union[BoundEvent, List[BoundEvent]]] = None,
+    ):
+        """Builds the desired Service, named after the application.
+
+        Args:
+            charm: Charm whose Service is reconciled.
+            ports: Ports of the Service.
+            service_type: Type of the Service.
+            refresh_event: Events the Service is reconciled on, besides `upgrade-charm`.
+        """
+        super().__init__(charm, ports, service_type=service_type, refresh_event=refresh_event)
+
+    def _patch(self, event: EventBase) -> None:
+        """Reconciles the Service, logging failures like the library."""
+        if isinstance(event, InstallEvent):
+            # Reconciled by the charm, which lets failures fail the hook
+            return
+        try:
+            kubernetes = Kubernetes(namespace=self._namespace)
+        except exceptions.ConfigError as e:
+            logger.warning("Error creating k8s client: %s", e)
+            return
+        try:
+            self.reconcile(kubernetes)
+        except ApiError as e:
+            if e.status.code == 403:
+                logger.error("Kubernetes service patch failed: `juju trust` this application.")
+            else:
+                logger.error("Kubernetes service patch failed: %s", str(e))
+
+    def reconcile(self, kubernetes: Kubernetes) -> None:
+        """Applies the desired Service unless it is up to date.
+
+        Args:
+            kubernetes: Kubernetes client.
+
+        Returns:
+            None
+        """
+        service = kubernetes.get_service(self.service_name)
+        if self.is_up_to_date(service):
+            return
+        kubernetes.apply_service(
+            self.service,
+            field_manager=self.field_manager,
+            replace_ports=bool(self.stale_ports(service)),
+        )
+
+    async def reconcile_async(self, kubernetes: AsyncKubernetes) -> None:
+        """Applies the desired Service unless it is up to date.
+
+        Args:
+            kubernetes: Asynchronous Kubernetes client.
+
+        Returns:
+            None
+        """
+        service = await kubernetes.get_service(self.service_name)
+        if self.is_up_to_date(service):
+            return
+        await kubernetes.apply_service(
+            self.service,
+            field_manager=self.field_manager,
+            replace_ports=bool(self.stale_ports(service)),
+        )
+
+    def is_patched(self) -> bool:
+        """Returns whether the Service has the desired spec."""
+        kubernetes = Kubernetes(namespace=self._namespace)
+        return self.is_up_to_date(kubernetes.get_service(self.service_name))
+
+    def is_up_to_date(self, service: Service) -> bool:
+        """Returns whether a fetched Service has the desired spec.
+
+        Ports and type must be equal. Node ports, labels, selectors and annotations that aren't
+        desired are ignored.
+
+        Args:
+            service: Service fetched from the cluster.
+
+        Returns:
+            bool: Whether the Service has the desired spec.
+        """
+        desired_spec = cast(ServiceSpec, self.service.spec)
+        spec = cast(ServiceSpec, service.spec)
+        if _port_keys(spec.ports) != _port_keys(desired_spec.ports):
+            return False
+        if (spec.type or "ClusterIP") != (desired_spec.type or "ClusterIP"):
+            return False
+        # Node ports are allocated by Kubernetes unless they are set
+        node_ports = {
+            (port.port, port.protocol or "TCP"): port.nodePort for port in spec.ports or []
+        }
+        for port in desired_spec.ports or []:
+            if port.nodePort and node_ports[(port.port, port.protocol or "TCP")] != port.nodePort:
+                return False
+        if not _contains(spec.selector, desired_spec.selector):
+            return False
+        metadata = cast(ObjectMeta, service.metadata)
+        desired_metadata = cast(ObjectMeta, self.service.metadata)
+        if not _contains(metadata.labels, desired_metadata.labels):
+            return False
+        return _contains(metadata.annotations, desired_metadata.annotations)
+
+    def stale_ports(self, service: Service) -> List[ServicePort]:
+        """Returns the ports of a fetched Service that aren't desired.
+
+        Args:
+            service: Service fetched from the cluster.
+
+        Returns:
+            list: Ports to remove.
+        """
+        desired_ports = cast(ServiceSpec, self.service.spec).ports or []
+        desired_keys = {(port.port, port.protocol or "TCP") for port in desired_ports}
+        return [
+            port
+            for port in cast(ServiceSpec, service.spec).ports or []
+            if (port.port, port.protocol or "TCP") not in desired_keys
+        ]
+
+    @property
+    def field_manager(self) -> str:
+        """Field manager of the applied fields."""
+        return f"{self._app}-service-patch"
+
+
+def _port_keys(ports: Optional[List[ServicePort]]) -> List[tuple]:
+    """Returns the fields identifying each port, in a comparable form."""
+    return sorted(
+        (
+            port.name or "",
+            port.port,
+            str(port.targetPort or port.port),
+            port.protocol or "TCP",
+        )
+        for port in ports or []
+    )
+
+
+def _contains(actual: Optional[dict], desired: Optional[dict]) -> bool:
+    """Returns whether every desired key is set to the desired value."""
+    actual = actual or {}
+    return all(actual.get(key) == value for key, value in (desired or {}).items())
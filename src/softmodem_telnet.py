@@ -0,0 +1,109 @@
+# Copyright 2022 Guillaume Belanger
+# See LICENSE file for licensing details.
+
+"""Client of the nr-softmodem telnet server, used to apply settings at runtime.
+
+The telnet server is loaded with `--telnetsrv`. The charm container shares the network namespace
+of the workload, so the server is reached on localhost.
+"""
+
+import logging
+import re
+import socket
+from typing import Dict
+
+logger = logging.getLogger(__name__)
+
+TELNET_PORT = 9090
+GLOBAL_LOG_COMPONENT = "global"
+# `softmodem log show` prints one line per component, for example " 12               RLC:  info"
+LOG_COMPONENT_PATTERN = re.compile(r"^\s*(\d+)\s+([A-Za-z0-9_]+)\s*:", re.MULTILINE)
+
+
+class SoftmodemTelnetError(Exception):
+    """Raised when a telnet command can't be run."""
+
+
+class SoftmodemTelnet:
+    """nr-softmodem telnet client."""
+
+    def __init__(
+        self,
+        host: str = "127.0.0.1",
+        port: int = TELNET_PORT,
+        connect_timeout: float = 2.0,
+        read_timeout: float = 0.5,
+    ):
+        """Creates a client.
+
+        Args:
+            host: Address of the telnet server.
+            port: Port of the telnet server.
+            connect_timeout: Seconds to wait for the connection.
+            read_timeout: Seconds without output after which a command is considered done.
+        """
+        self.host = host
+        self.port = port
+        self.connect_timeout = connect_timeout
+        self.read_timeout = read_timeout
+
+    def run(self, command: str) -> str:
+        """Runs a command and returns its output.
+
+        Args:
+            command: Command, for example `softmodem log show`.
+
+        Returns:
+            str: Command output.
+        """
+        try:
+            with socket.create_connection(
+                (self.host, self.port), timeout=self.connect_timeout
+            ) as connection:
+                connection.sendall(f"{command}\n".encode())
+                connection.settimeout(self.read_timeout)
+                output = b""
+                while True:
+                    try:
+                        data = connection.recv(4096)
+                    except socket.timeout:
+                        break
+                    if not data:
+                        break
+                    output += data
+        except OSError as e:
+            raise SoftmodemTelnetError(f"Can't run `{command}` on nr-softmodem: {e}")
+        return output.decode(errors="ignore")
+
+    def log_components(self) -> Dict[str, int]:
+        """Returns the index of each log component, keyed by lower case component name."""
+        output = self.run("softmodem log show")
+        components = {
+            name.lower(): int(index) for index, name in LOG_COMPONENT_PATTERN.findall(output)
+        }
+        if not components:
+            raise SoftmodemTelnetError("nr-softmodem didn't report any log component")
+        return components
+
+    def set_log_levels(self, log_levels: Dict[str, str]) -> None:
+        """Sets log levels of the running nr-softmodem.
+
+        Args:
+            log_levels: Log level keyed by lower case component name. The `global` level is
+                applied to every component first.
+
+        Returns:
+            None
+        """
+        components = self.log_components()
+        last_index = max(components.values())
+        if GLOBAL_LOG_COMPONENT in log_levels:
+            self.run(f"softmodem log level_{log_levels[GLOBAL_LOG_COMPONENT]} 0-{last_index}")
+        for component, level in log_levels.items():
+            if component == GLOBAL_LOG_COMPONENT:
+                continue
+            if component not in components:
+                raise SoftmodemTelnetError(f"Unknown log component {component}")
+            index = components[component]
+            self.run(f"softmodem log level_{level} {index}-{index}")
+            logger.info("Log level of %s set to %s", component, level)
@@ -0,0 +1,480 @@
+# Copyright 2022 Guillaume Belanger
+# See LICENSE file for licensing details.
+
+"""Prometheus exporter of nr-softmodem MAC and L1 statistics.
+
+nr-softmodem periodically rewrites `nrMAC_stats.log` and `nrL1_stats.log` in its working
+directory. This exporter runs next to it in the workload container, reads the files when they
+change and serves per UE and per cell metrics on `/metrics`. When given the Pebble socket, it
+also follows the nr-softmodem log and serves the resulting KPIs, as metrics and as JSON on
+`/kpis`. It only uses the standard library since it runs with the Python interpreter of the
+workload image.
+"""
+
+import argparse
+import json
+import os
+import re
+import threading
+import time
+from dataclasses import dataclass
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+from log_analyzer import LogAnalyzer, analyze_service_logs
+from thread_stats import SOFTMODEM_PROCESS_NAME, TaskSample, find_pid, read_tasks
+
+METRICS_PORT = 9102
+METRICS_PATH = "/metrics"
+KPIS_PATH = "/kpis"
+MAC_STATS_FILE = "nrMAC_stats.log"
+L1_STATS_FILE = "nrL1_stats.log"
+
+UE_PATTERN = re.compile(r"^UE RNTI (?P<rnti>[0-9a-f]{4})\b")
+RSRP_PATTERN = re.compile(r"average RSRP (?P<rsrp>-?\d+)")
+CQI_PATTERN = re.compile(r"^UE (?P<rnti>[0-9a-f]{4}): CQI (?P<cqi>\d+)")
+SCH_PATTERN = re.compile(
+    r"^UE (?P<rnti>[0-9a-f]{4}): (?P<direction>dl|ul)sch_rounds (?P<rounds>[\d/]+),"
+    r".*?(?:dl|ul)sch_errors (?P<errors>\d+)"
+    r".*?BLER (?P<bler>[\d.]+) MCS (?:\(\d+\) )?(?P<mcs>\d+)"
+)
+MAC_BYTES_PATTERN = re.compile(
+    r"^UE (?P<rnti>[0-9a-f]{4}): MAC:\s+TX\s+(?P<tx>\d+)\s+RX\s+(?P<rx>\d+) bytes"
+)
+AVG_I0_PATTERN = re.compile(r"avg_I0 = (?P<value>-?\d+) dB")
+PRACH_I0_PATTERN = re.compile(r"PRACH I0 = (?P<value>-?[\d.]+) dB")
+BLACKLISTED_PRBS_PATTERN = re.compile(r"Blacklisted PRBs (?P<blacklisted>\d+)/(?P<total>\d+)")
+
+
+@dataclass
+class UeStats:
+    """MAC statistics of a UE."""
+
+    rnti: str
+    rsrp_dbm: Optional[int] = None
+    cqi: Optional[int] = None
+    dl_rounds: Tuple[int, ...] = ()
+    dl_errors: int = 0
+    dl_bler: float = 0.0
+    dl_mcs: int = 0
+    ul_rounds: Tuple[int, ...] = ()
+    ul_errors: int = 0
+    ul_bler: float = 0.0
+    ul_mcs: int = 0
+    mac_tx_bytes: int = 0
+    mac_rx_bytes: int = 0
+
+    @property
+    def dl_retransmissions(self) -> int:
+        """Returns the number of downlink HARQ retransmissions."""
+        return sum(self.dl_rounds[1:])
+
+    @property
+    def ul_retransmissions(self) -> int:
+        """Returns the number of uplink HARQ retransmissions."""
+        return sum(self.ul_rounds[1:])
+
+
+@dataclass
+class CellStats:
+    """L1 statistics of the cell."""
+
+    avg_i0_db: Optional[int] = None
+    prach_i0_db: Optional[float] = None
+    blacklisted_prbs: Optional[int] = None
+    total_prbs: Optional[int] = None
+
+
+def parse_mac_stats(text: str) -> Dict[str, UeStats]:
+    """Parses the content of nrMAC_stats.log.
+
+    Lines that don't match, such as a line being written, are ignored.
+
+    Args:
+        text: Content of the file.
+
+    Returns:
+        dict: Statistics of each UE, keyed by RNTI.
+    """
+    ues: Dict[str, UeStats] = {}
+    for line in text.splitlines():
+        match = UE_PATTERN.match(line)
+        if match:
+            ue = ues.setdefault(match["rnti"], UeStats(rnti=match["rnti"]))
+            rsrp_match = RSRP_PATTERN.search(line)
+            if rsrp_match:
+                ue.rsrp_dbm = int(rsrp_match["rsrp"])
+            continue
+        for pattern, update in (
+            (CQI_PATTERN, _update_cqi),
+            (SCH_PATTERN, _update_sch),
+            (MAC_BYTES_PATTERN, _update_mac_bytes),
+        ):
+            match = pattern.match(line)
+            if match:
+                update(ues.setdefault(match["rnti"], UeStats(rnti=match["rnti"])), match)
+                break
+    return ues
+
+
+def _update_cqi(ue: UeStats, match: re.Match) -> None:
+    ue.cqi = int(match["cqi"])
+
+
+def _update_sch(ue: UeStats, match: re.Match) -> None:
+    rounds = tuple(int(count) for count in match["rounds"].split("/") if count)
+    direction = match["direction"]
+    setattr(ue, f"{direction}_rounds", rounds)
+    setattr(ue, f"{direction}_errors", int(match["errors"]))
+    setattr(ue, f"{direction}_bler", float(match["bler"]))
+    setattr(ue, f"{direction}_mcs", int(match["mcs"]))
+
+
+def _update_mac_bytes(ue: UeStats, match: re.Match) -> None:
+    ue.mac_tx_bytes = int(match["tx"])
+    ue.mac_rx_bytes = int(match["rx"])
+
+
+def parse_l1_stats(text: str) -> CellStats:
+    """Parses the content of nrL1_stats.log.
+
+    Args:
+        text: Content of the file.
+
+    Returns:
+        CellStats: Statistics of the cell.
+    """
+    cell = CellStats()
+    match = AVG_I0_PATTERN.search(text)
+    if match:
+        cell.avg_i0_db = int(match["value"])
+    match = PRACH_I0_PATTERN.search(text)
+    if match:
+        cell.prach_i0_db = float(match["value"])
+    match = BLACKLISTED_PRBS_PATTERN.search(text)
+    if match:
+        cell.blacklisted_prbs = int(match["blacklisted"])
+        cell.total_prbs = int(match["total"])
+    return cell
+
+
+class StatsFile:
+    """Statistics file read again whenever it changes.
+
+    nr-softmodem rewrites the files in place, keeping their first line, so the file is read whole
+    whenever its inode, modification time or size changes. It only holds a few KiB.
+    """
+
+    def __init__(self, path: str):
+        """Creates a reader of the file at `path`."""
+        self.path = path
+        self._signature: Optional[Tuple[int, int, int]] = None
+
+    def read(self) -> Optional[str]:
+        """Returns the content of the file, None when it is missing or didn't change."""
+        try:
+            stat = os.stat(self.path)
+        except FileNotFoundError:
+            return None
+        signature = (stat.st_ino, stat.st_mtime_ns, stat.st_size)
+        if signature == self._signature:
+            return None
+        with open(self.path, "rb") as file:
+            content = file.read()
+        self._signature = signature
+        return content.decode(errors="replace")
+
+
+class StatsExporter:
+    """Turns the statistics files of nr-softmodem into Prometheus metrics."""
+
+    def __init__(
+        self,
+        stats_dir: str,
+        clock: Callable[[], float] = time.monotonic,
+        thread_stats: bool = False,
+        proc: str = "/proc",
+        log_analyzer: Optional[LogAnalyzer] = None,
+    ):
+        """Creates an exporter of the statistics files of `stats_dir`.
+
+        Args:
+            stats_dir: Working directory of nr-softmodem.
+            clock: Monotonic clock used to compute throughputs.
+            thread_stats: Whether to export per thread CPU time and context switches, read from
+                procfs on every scrape.
+            proc: Mount point of procfs.
+            log_analyzer: Analyzer of the nr-softmodem log whose KPIs are exported.
+        """
+        self.log_analyzer = log_analyzer
+        self._thread_stats = thread_stats
+        self._proc = proc
+        self._pid: Optional[int] = None
+        self._mac_stats_file = StatsFile(os.path.join(stats_dir, MAC_STATS_FILE))
+        self._l1_stats_file = StatsFile(os.path.join(stats_dir, L1_STATS_FILE))
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._ues: Dict[str, UeStats] = {}
+        self._cell = CellStats()
+        # RNTI -> (time, MAC TX bytes, MAC RX bytes) of the previous sample
+        self._previous_samples: Dict[str, Tuple[float, int, int]] = {}
+        self._throughputs: Dict[str, Tuple[float, float]] = {}
+        self._last_update: Optional[float] = None
+
+    def update(self) -> None:
+        """Reads the statistics files that changed since the last update."""
+        with self._lock:
+            mac_stats = self._mac_stats_file.read()
+            if mac_stats is not None:
+                self._update_ues(parse_mac_stats(mac_stats))
+            l1_stats = self._l1_stats_file.read()
+            if l1_stats is not None:
+                self._cell = parse_l1_stats(l1_stats)
+
+    def _update_ues(self, ues: Dict[str, UeStats]) -> None:
+        now = self._clock()
+        throughputs = {}
+        for rnti, ue in ues.items():
+            previous = self._previous_samples.get(rnti)
+            if previous and now > previous[0]:
+                previous_time, previous_tx_bytes, previous_rx_bytes = previous
+                elapsed = now - previous_time
+                throughputs[rnti] = (
+                    max(ue.mac_tx_bytes - previous_tx_bytes, 0) * 8 / elapsed,
+                    max(ue.mac_rx_bytes - previous_rx_bytes, 0) * 8 / elapsed,
+                )
+            elif rnti in self._throughputs:
+                throughputs[rnti] = self._throughputs[rnti]
+        self._previous_samples = {
+            rnti: (now, ue.mac_tx_bytes, ue.mac_rx_bytes) for rnti, ue in ues.items()
+        }
+        self._throughputs = throughputs
+        self._ues = ues
+        self._last_update = time.time()
+
+    def render(self) -> str:
+        """Returns the metrics in the Prometheus text exposition format."""
+        with self._lock:
+            ues = [self._ues[rnti] for rnti in sorted(self._ues)]
+            lines: List[str] = []
+            for name, metric_type, help_text, value in UE_METRICS:
+                samples = [
+                    (f'{{rnti="{ue.rnti}"}}', value(ue, self._throughputs.get(ue.rnti)))
+                    for ue in ues
+                ]
+                lines.extend(_metric_lines(name, metric_type, help_text, samples))
+            dl_throughput = sum(throughput[0] for throughput in self._throughputs.values())
+            ul_throughput = sum(throughput[1] for throughput in self._throughputs.values())
+            for name, help_text, cell_value in (
+                ("oai_du_connected_ues", "Number of UEs in the MAC statistics.", len(ues)),
+                (
+                    "oai_du_cell_dl_throughput_bits_per_second",
+                    "Downlink MAC throughput of the cell.",
+                    dl_throughput,
+                ),
+                (
+                    "oai_du_cell_ul_throughput_bits_per_second",
+                    "Uplink MAC throughput of the cell.",
+                    ul_throughput,
+                ),
+                ("oai_du_cell_avg_i0_db", "Average uplink interference.", self._cell.avg_i0_db),
+                ("oai_du_cell_prach_i0_db", "PRACH interference.", self._cell.prach_i0_db),
+                (
+                    "oai_du_cell_blacklisted_prbs",
+                    "Uplink PRBs blacklisted by L1.",
+                    self._cell.blacklisted_prbs,
+                ),
+                ("oai_du_cell_prbs", "PRBs of the carrier.", self._cell.total_prbs),
+                (
+                    "oai_du_stats_last_update_timestamp_seconds",
+                    "Time the MAC statistics last changed.",
+                    self._last_update,
+                ),
+            ):
+                lines.extend(_metric_lines(name, "gauge", help_text, [("", cell_value)]))
+            if self._thread_stats:
+                lines.extend(self._thread_metric_lines())
+        if self.log_analyzer:
+            lines.extend(self.log_analyzer.metric_lines())
+        return "\n".join(lines) + "\n"
+
+    def _thread_metric_lines(self) -> List[str]:
+        tasks = self._read_softmodem_tasks()
+        clock_ticks = os.sysconf("SC_CLK_TCK")
+        threads = [tasks[tid] for tid in sorted(tasks)]
+        lines: List[str] = []
+        for name, metric_type, help_text, value in THREAD_METRICS:
+            samples = [
+                (f'{{tid="{thread.tid}",name="{thread.name}"}}', value(thread, clock_ticks))
+                for thread in threads
+            ]
+            lines.extend(_metric_lines(name, metric_type, help_text, samples))
+        return lines
+
+    def _read_softmodem_tasks(self) -> Dict[int, TaskSample]:
+        for _ in range(2):
+            if self._pid is None:
+                self._pid = find_pid(SOFTMODEM_PROCESS_NAME, self._proc)
+                if self._pid is None:
+                    return {}
+            try:
+                tasks = read_tasks(self._pid, self._proc)
+            except FileNotFoundError:
+                tasks = {}
+            # The PID is looked up again once nr-softmodem restarted
+            if any(task.tid == self._pid for task in tasks.values()):
+                return tasks
+            self._pid = None
+        return {}
+
+
+UE_METRICS: List[
+    Tuple[str, str, str, Callable[[UeStats, Optional[Tuple[float, float]]], Optional[float]]]
+] = [
+    (
+        "oai_du_ue_dl_throughput_bits_per_second",
+        "gauge",
+        "Downlink MAC throughput of the UE.",
+        lambda ue, throughput: throughput[0] if throughput else None,
+    ),
+    (
+        "oai_du_ue_ul_throughput_bits_per_second",
+        "gauge",
+        "Uplink MAC throughput of the UE.",
+        lambda ue, throughput: throughput[1] if throughput else None,
+    ),
+    ("oai_du_ue_dl_bler", "gauge", "Downlink BLER of the UE.", lambda ue, _: ue.dl_bler),
+    ("oai_du_ue_ul_bler", "gauge", "Uplink BLER of the UE.", lambda ue, _: ue.ul_bler),
+    ("oai_du_ue_dl_mcs", "gauge", "Downlink MCS of the UE.", lambda ue, _: ue.dl_mcs),
+    ("oai_du_ue_ul_mcs", "gauge", "Uplink MCS of the UE.", lambda ue, _: ue.ul_mcs),
+    (
+        "oai_du_ue_dl_harq_retransmissions_total",
+        "counter",
+        "Downlink HARQ retransmissions of the UE.",
+        lambda ue, _: ue.dl_retransmissions,
+    ),
+    (
+        "oai_du_ue_ul_harq_retransmissions_total",
+        "counter",
+        "Uplink HARQ retransmissions of the UE.",
+        lambda ue, _: ue.ul_retransmissions,
+    ),
+    (
+        "oai_du_ue_dl_errors_total",
+        "counter",
+        "Downlink transport blocks in error.",
+        lambda ue, _: ue.dl_errors,
+    ),
+    (
+        "oai_du_ue_ul_errors_total",
+        "counter",
+        "Uplink transport blocks in error.",
+        lambda ue, _: ue.ul_errors,
+    ),
+    (
+        "oai_du_ue_mac_tx_bytes_total",
+        "counter",
+        "MAC bytes sent to the UE.",
+        lambda ue, _: ue.mac_tx_bytes,
+    ),
+    (
+        "oai_du_ue_mac_rx_bytes_total",
+        "counter",
+        "MAC bytes received from the UE.",
+        lambda ue, _: ue.mac_rx_bytes,
+    ),
+    ("oai_du_ue_cqi", "gauge", "Wideband CQI reported by the UE.", lambda ue, _: ue.cqi),
+    ("oai_du_ue_rsrp_dbm", "gauge", "Average RSRP of the UE.", lambda ue, _: ue.rsrp_dbm),
+]
+
+
+THREAD_METRICS: List[Tuple[str, str, str, Callable[[TaskSample, int], float]]] = [
+    (
+        "oai_du_thread_cpu_seconds_total",
+        "counter",
+        "CPU time of the nr-softmodem thread.",
+        lambda thread, clock_ticks: thread.cpu_ticks / clock_ticks,
+    ),
+    (
+        "oai_du_thread_voluntary_context_switches_total",
+        "counter",
+        "Voluntary context switches of the nr-softmodem thread.",
+        lambda thread, _: thread.voluntary_switches,
+    ),
+    (
+        "oai_du_thread_involuntary_context_switches_total",
+        "counter",
+        "Involuntary context switches of the nr-softmodem thread.",
+        lambda thread, _: thread.involuntary_switches,
+    ),
+    (
+        "oai_du_thread_last_cpu",
+        "gauge",
+        "CPU the nr-softmodem thread last ran on.",
+        lambda thread, _: thread.processor,
+    ),
+]
+
+
+def _metric_lines(
+    name: str, metric_type: str, help_text: str, samples: Sequence[Tuple[str, Optional[float]]]
+) -> List[str]:
+    lines = [f"# HELP {name} {help_text}", f"# TYPE {name} {metric_type}"]
+    for labels, value in samples:
+        if value is not None:
+            lines.append(f"{name}{labels} {value}")
+    return lines
+
+
+def _request_handler(exporter: StatsExporter) -> type:
+    class MetricsRequestHandler(BaseHTTPRequestHandler):
+        def do_GET(self) -> None:  # noqa: N802
+            if self.path == METRICS_PATH:
+                exporter.update()
+                self._send(exporter.render(), "text/plain; version=0.0.4")
+            elif self.path == KPIS_PATH and exporter.log_analyzer:
+                self._send(json.dumps(exporter.log_analyzer.kpis()), "application/json")
+            else:
+                self.send_error(404)
+
+        def _send(self, content: str, content_type: str) -> None:
+            body = content.encode()
+            self.send_response(200)
+            self.send_header("Content-Type", content_type)
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format: str, *args) -> None:
+            pass
+
+    return MetricsRequestHandler
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    """Serves the metrics until interrupted."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--stats-dir", required=True)
+    parser.add_argument("--address", default="0.0.0.0")
+    parser.add_argument("--port", type=int, default=METRICS_PORT)
+    parser.add_argument("--thread-stats", action="store_true")
+    parser.add_argument("--pebble-socket", help="Pebble API socket to follow the log from")
+    parser.add_argument("--log-service", default="du")
+    args = parser.parse_args(argv)
+    log_analyzer = None
+    if args.pebble_socket:
+        log_analyzer = LogAnalyzer()
+        threading.Thread(
+            target=analyze_service_logs,
+            args=(log_analyzer, args.pebble_socket, args.log_service),
+            daemon=True,
+        ).start()
+    exporter = StatsExporter(
+        args.stats_dir, thread_stats=args.thread_stats, log_analyzer=log_analyzer
+    )
+    server = ThreadingHTTPServer((args.address, args.port), _request_handler(exporter))
+    server.serve_forever()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,86 @@
+# Copyright 2022 Guillaume Belanger
+# See LICENSE file for licensing details.
+
+"""Kernel parameters (sysctls) of the DU pod.
+
+Sysctls Kubernetes considers safe are set in the pod security context. The other ones are written
+to /proc/sys from the privileged workload container before nr-softmodem starts.
+"""
+
+import re
+from typing import Dict, Tuple
+
+# Sysctls every kubelet allows in the pod security context
+SAFE_SYSCTLS = frozenset(
+    {
+        "kernel.shm_rmid_forced",
+        "net.ipv4.ip_local_port_range",
+        "net.ipv4.ip_unprivileged_port_start",
+        "net.ipv4.ping_group_range",
+        "net.ipv4.tcp_syncookies",
+    }
+)
+SYSCTL_NAME_PATTERN = re.compile(r"^[a-z0-9_]+(\.[a-z0-9_-]+)+$")
+SYSCTL_VALUE_PATTERN = re.compile(r"^[0-9A-Za-z_. -]+$")
+
+
+class SysctlError(Exception):
+    """Raised when the sysctls configuration is not valid."""
+
+
+def parse_sysctls(value: str) -> Dict[str, str]:
+    """Parses comma separated `name=value` sysctls.
+
+    Args:
+        value: Sysctls, for example `net.core.rmem_max=26214400,net.core.wmem_max=26214400`.
+            Values made of several fields are space separated.
+
+    Returns:
+        dict: Value of each sysctl.
+    """
+    sysctls = {}
+    for entry in value.split(","):
+        entry = entry.strip()
+        if not entry:
+            continue
+        name, separator, sysctl_value = entry.partition("=")
+        name, sysctl_value = name.strip(), " ".join(sysctl_value.split())
+        if not separator:
+            raise SysctlError(f"Invalid sysctl {entry}, expected name=value")
+        if not SYSCTL_NAME_PATTERN.match(name):
+            raise SysctlError(f"Invalid sysctl name {name}")
+        if not SYSCTL_VALUE_PATTERN.match(sysctl_value):
+            raise SysctlError(f"Invalid value for sysctl {name}")
+        sysctls[name] = sysctl_value
+    return sysctls
+
+
+def split_sysctls(sysctls: Dict[str, str]) -> Tuple[Dict[str, str], Dict[str, str]]:
+    """Splits sysctls between the ones set in the pod security context and the other ones.
+
+    Args:
+        sysctls: Value of each sysctl.
+
+    Returns:
+        tuple: Safe sysctls and unsafe sysctls.
+    """
+    safe = {name: value for name, value in sysctls.items() if name in SAFE_SYSCTLS}
+    unsafe = {name: value for name, value in sysctls.items() if name not in SAFE_SYSCTLS}
+    return safe, unsafe
+
+
+def sysctl_path(name: str) -> str:
+    """Returns the /proc/sys path of a sysctl.
+
+    Args:
+        name: Sysctl name.
+
+    Returns:
+        str: Path of the sysctl.
+    """
+    return "/proc/sys/" + name.replace(".", "/")
+
+
+def normalize_value(value: str) -> str:
+    """Returns a sysctl value with fields separated by single spaces, as read from /proc/sys."""
+    return " ".join(value.split())
@@ -0,0 +1,149 @@
+# Copyright 2022 Guillaume Belanger
+# See LICENSE file for licensing details.
+
+"""TDD UL/DL pattern presets and validation."""
+
+from dataclasses import dataclass
+from typing import Dict
+
+SYMBOLS_PER_SLOT = 14
+
+# dl_UL_TransmissionPeriodicity values (TS 38.331 TDD-UL-DL-Pattern), indexed by their enum value
+PERIODICITIES_MS = [0.5, 0.625, 1.0, 1.25, 2.0, 2.5, 5.0, 10.0]
+
+CUSTOM_PATTERN = "custom"
+
+
+class TddPatternError(Exception):
+    """Raised when a TDD pattern is not valid."""
+
+
+@dataclass(frozen=True)
+class TddPattern:
+    """Single periodicity TDD UL/DL pattern (pattern1)."""
+
+    periodicity_ms: float
+    dl_slots: int
+    dl_symbols: int
+    ul_slots: int
+    ul_symbols: int
+
+    @property
+    def periodicity_index(self) -> int:
+        """Returns the dl_UL_TransmissionPeriodicity enum value of the pattern."""
+        return PERIODICITIES_MS.index(self.periodicity_ms)
+
+    @property
+    def dl_symbols_per_period(self) -> int:
+        """Returns the number of downlink symbols in a period."""
+        return self.dl_slots * SYMBOLS_PER_SLOT + self.dl_symbols
+
+    @property
+    def ul_symbols_per_period(self) -> int:
+        """Returns the number of uplink symbols in a period."""
+        return self.ul_slots * SYMBOLS_PER_SLOT + self.ul_symbols
+
+    @property
+    def dl_ul_ratio(self) -> float:
+        """Returns the theoretical downlink to uplink capacity ratio."""
+        return self.dl_symbols_per_period / self.ul_symbols_per_period
+
+    def slots_per_period(self, numerology: int) -> int:
+        """Returns the number of slots in a period.
+
+        Args:
+            numerology: Numerology of the reference subcarrier spacing.
+
+        Returns:
+            int: Number of slots in a period.
+        """
+        slots = self.periodicity_ms * 2**numerology
+        if slots != int(slots):
+            raise TddPatternError(
+                f"Periodicity of {self.periodicity_ms} ms is not a whole number of slots "
+                f"with {15 * 2**numerology} kHz SCS"
+            )
+        return int(slots)
+
+    def validate(self, numerology: int) -> None:
+        """Validates the slot and symbol counts against the periodicity and numerology.
+
+        Args:
+            numerology: Numerology of the reference subcarrier spacing.
+
+        Returns:
+            None
+        """
+        if self.periodicity_ms not in PERIODICITIES_MS:
+            periodicities = ", ".join(str(periodicity) for periodicity in PERIODICITIES_MS)
+            raise TddPatternError(
+                f"Periodicity of {self.periodicity_ms} ms is not one of {periodicities}"
+            )
+        slots = self.slots_per_period(numerology)
+        for name, value in (("DL slots", self.dl_slots), ("UL slots", self.ul_slots)):
+            if value < 0:
+                raise TddPatternError(f"Number of {name} can't be negative")
+        for name, value in (("DL symbols", self.dl_symbols), ("UL symbols", self.ul_symbols)):
+            if not 0 <= value < SYMBOLS_PER_SLOT:
+                raise TddPatternError(f"Number of {name} must be between 0 and 13")
+        flexible_slots = slots - self.dl_slots - self.ul_slots
+        if flexible_slots < 1:
+            raise TddPatternError(
+                f"{self.dl_slots} DL and {self.ul_slots} UL slots leave no room for a guard "
+                f"period in a {slots} slot period"
+            )
+        if flexible_slots == 1 and self.dl_symbols + self.ul_symbols >= SYMBOLS_PER_SLOT:
+            raise TddPatternError(
+                f"{self.dl_symbols} DL and {self.ul_symbols} UL symbols leave no guard symbol "
+                "in the special slot"
+            )
+        if not self.dl_symbols_per_period:
+            raise TddPatternError("Pattern has no downlink symbol")
+        if not self.ul_symbols_per_period:
+            raise TddPatternError("Pattern has no uplink symbol")
+
+
+# Presets for each numerology. At 30 kHz SCS, "dl-heavy" is the DDDDDDDSUU pattern.
+PRESETS: Dict[str, Dict[int, TddPattern]] = {
+    "dl-heavy": {
+        0: TddPattern(periodicity_ms=5.0, dl_slots=3, dl_symbols=6, ul_slots=1, ul_symbols=4),
+        1: TddPattern(periodicity_ms=5.0, dl_slots=7, dl_symbols=6, ul_slots=2, ul_symbols=4),
+    },
+    "balanced": {
+        0: TddPattern(periodicity_ms=5.0, dl_slots=2, dl_symbols=6, ul_slots=2, ul_symbols=4),
+        1: TddPattern(periodicity_ms=5.0, dl_slots=5, dl_symbols=6, ul_slots=4, ul_symbols=4),
+    },
+    "ul-heavy": {
+        0: TddPattern(periodicity_ms=5.0, dl_slots=1, dl_symbols=6, ul_slots=3, ul_symbols=4),
+        1: TddPattern(periodicity_ms=5.0, dl_slots=2, dl_symbols=6, ul_slots=7, ul_symbols=4),
+    },
+    "low-latency": {
+        1: TddPattern(periodicity_ms=0.5, dl_slots=0, dl_symbols=10, ul_slots=0, ul_symbols=2),
+    },
+}
+
+
+def get_tdd_pattern(name: str, numerology: int, custom: TddPattern) -> TddPattern:
+    """Returns the validated TDD pattern for a preset name.
+
+    Args:
+        name: Preset name or `custom`.
+        numerology: Numerology of the reference subcarrier spacing.
+        custom: Pattern used when `name` is `custom`.
+
+    Returns:
+        TddPattern: Validated TDD pattern.
+    """
+    if name == CUSTOM_PATTERN:
+        pattern = custom
+    elif name not in PRESETS:
+        valid_names = ", ".join(list(PRESETS) + [CUSTOM_PATTERN])
+        raise TddPatternError(f"Unknown TDD pattern {name}, valid values: {valid_names}")
+    elif numerology not in PRESETS[name]:
+        raise TddPatternError(
+            f"TDD pattern {name} is not available with {15 * 2**numerology} kHz SCS"
+        )
+    else:
+        pattern = PRESETS[name][numerology]
+    pattern.validate(numerology)
+    return pattern
@@ -0,0 +1,248 @@
+# Copyright 2022 Guillaume Belanger
+# See LICENSE file for licensing details.
+
+"""Per thread CPU usage and scheduling of nr-softmodem.
+
+Threads are sampled from `/proc/<pid>/task/<tid>`: CPU time and the CPU the thread last ran on
+come from `stat`, context switches from `sched`, or from `status` when the kernel doesn't expose
+scheduler statistics. This module is also used by the statistics exporter in the workload
+container, so it only uses the standard library.
+"""
+
+import os
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Tuple
+
+SOFTMODEM_PROCESS_NAME = "nr-softmodem"
+DEFAULT_CLOCK_TICKS = 100
+# Exit code of the sampler script when nr-softmodem isn't running
+PROCESS_NOT_FOUND_EXIT_CODE = 3
+TASK_MARKER = "== "
+SAMPLE_MARKER = "@@ sample"
+
+# Samples the threads twice, `$1` seconds apart
+SAMPLER_SCRIPT = f"""
+for process in /proc/[0-9]*; do
+  if [ "$(cat "$process/comm" 2>/dev/null)" = {SOFTMODEM_PROCESS_NAME} ]; then
+    pid=${{process#/proc/}}
+    break
+  fi
+done
+[ -n "$pid" ] || exit {PROCESS_NOT_FOUND_EXIT_CODE}
+echo "clk_tck $(getconf CLK_TCK 2>/dev/null || echo {DEFAULT_CLOCK_TICKS})"
+sample() {{
+  for task in /proc/$pid/task/*; do
+    echo "{TASK_MARKER}${{task##*/}}"
+    cat "$task/stat" "$task/sched" "$task/status" 2>/dev/null
+  done
+}}
+sample
+echo "{SAMPLE_MARKER}"
+sleep "$1"
+sample
+"""
+
+SWITCH_KEYS = {
+    # sched
+    "nr_voluntary_switches": "voluntary",
+    "nr_involuntary_switches": "involuntary",
+    # status
+    "voluntary_ctxt_switches": "voluntary",
+    "nonvoluntary_ctxt_switches": "involuntary",
+}
+
+
+class ThreadStatsError(Exception):
+    """Raised when thread statistics can't be parsed."""
+
+
+@dataclass
+class TaskSample:
+    """Counters of a thread at a point in time."""
+
+    tid: int
+    name: str
+    cpu_ticks: int
+    processor: int
+    voluntary_switches: int = 0
+    involuntary_switches: int = 0
+
+
+@dataclass
+class ThreadStats:
+    """Activity of a thread over a sampling interval."""
+
+    tid: int
+    name: str
+    cpu_percent: float
+    voluntary_switches_per_second: float
+    involuntary_switches_per_second: float
+    processor: int
+
+
+def parse_task(tid: int, text: str) -> TaskSample:
+    """Parses the `stat` of a thread followed by its `sched` or `status`.
+
+    Args:
+        tid: Thread ID.
+        text: Content of the files.
+
+    Returns:
+        TaskSample: Counters of the thread.
+    """
+    stat, _, switches = text.partition("\n")
+    # The thread name is between parentheses and may contain spaces and parentheses
+    head, separator, tail = stat.rpartition(")")
+    _, _, name = head.partition("(")
+    fields = tail.split()
+    if not separator or len(fields) < 37:
+        raise ThreadStatsError(f"Invalid stat of thread {tid}")
+    # Fields are numbered from 1 in proc(5), the first field after the name is the 3rd one
+    utime, stime, processor = fields[11], fields[12], fields[36]
+    sample = TaskSample(
+        tid=tid,
+        name=name,
+        cpu_ticks=int(utime) + int(stime),
+        processor=int(processor),
+    )
+    seen = set()
+    for line in switches.splitlines():
+        key, separator, value = line.partition(":")
+        kind = SWITCH_KEYS.get(key.strip())
+        if not separator or not kind or kind in seen:
+            continue
+        seen.add(kind)
+        setattr(sample, f"{kind}_switches", int(value.strip().split(".")[0]))
+    return sample
+
+
+def parse_sampler_output(output: str) -> Tuple[int, Dict[int, TaskSample], Dict[int, TaskSample]]:
+    """Parses the output of the sampler script.
+
+    Args:
+        output: Output of SAMPLER_SCRIPT.
+
+    Returns:
+        tuple: Clock ticks per second and the threads of the first and second samples.
+    """
+    clock_line, _, samples = output.partition("\n")
+    name, _, value = clock_line.partition(" ")
+    if name != "clk_tck" or SAMPLE_MARKER not in samples:
+        raise ThreadStatsError("Invalid sampler output")
+    first, _, second = samples.partition(f"{SAMPLE_MARKER}\n")
+    return int(value), _parse_sample(first), _parse_sample(second)
+
+
+def _parse_sample(sample: str) -> Dict[int, TaskSample]:
+    tasks = {}
+    for block in sample.split(TASK_MARKER)[1:]:
+        tid, _, text = block.partition("\n")
+        # Threads exiting while being sampled have no stat
+        if text.strip():
+            tasks[int(tid)] = parse_task(int(tid), text)
+    return tasks
+
+
+def find_pid(name: str = SOFTMODEM_PROCESS_NAME, proc: str = "/proc") -> Optional[int]:
+    """Returns the PID of the process named `name`, None when it isn't running.
+
+    Args:
+        name: Process name.
+        proc: Mount point of procfs.
+
+    Returns:
+        int: PID.
+    """
+    for entry in os.listdir(proc):
+        if not entry.isdigit():
+            continue
+        try:
+            with open(os.path.join(proc, entry, "comm")) as comm:
+                if comm.read().strip() == name:
+                    return int(entry)
+        except OSError:
+            continue
+    return None
+
+
+def read_tasks(pid: int, proc: str = "/proc") -> Dict[int, TaskSample]:
+    """Returns the counters of every thread of a process.
+
+    Args:
+        pid: Process ID.
+        proc: Mount point of procfs.
+
+    Returns:
+        dict: Counters of each thread, keyed by thread ID.
+    """
+    tasks = {}
+    task_dir = os.path.join(proc, str(pid), "task")
+    for tid in os.listdir(task_dir):
+        text = ""
+        for file_name in ("stat", "sched", "status"):
+            try:
+                with open(os.path.join(task_dir, tid, file_name)) as file:
+                    text += file.read()
+            except OSError:
+                continue
+        if text:
+            tasks[int(tid)] = parse_task(int(tid), text)
+    return tasks
+
+
+def compute_thread_stats(
+    previous: Dict[int, TaskSample],
+    current: Dict[int, TaskSample],
+    interval: float,
+    clock_ticks: int,
+) -> List[ThreadStats]:
+    """Returns the activity of the threads present in both samples, busiest first.
+
+    Args:
+        previous: Threads of the first sample.
+        current: Threads of the second sample.
+        interval: Seconds between the samples.
+        clock_ticks: Clock ticks per second.
+
+    Returns:
+        list: Activity of each thread.
+    """
+    if interval <= 0:
+        raise ThreadStatsError("Sampling interval must be positive")
+    stats = []
+    for tid, sample in current.items():
+        if tid not in previous:
+            continue
+        cpu_ticks = sample.cpu_ticks - previous[tid].cpu_ticks
+        voluntary_switches = sample.voluntary_switches - previous[tid].voluntary_switches
+        involuntary_switches = sample.involuntary_switches - previous[tid].involuntary_switches
+        stats.append(
+            ThreadStats(
+                tid=tid,
+                name=sample.name,
+                cpu_percent=100 * cpu_ticks / clock_ticks / interval,
+                voluntary_switches_per_second=voluntary_switches / interval,
+                involuntary_switches_per_second=involuntary_switches / interval,
+                processor=sample.processor,
+            )
+        )
+    return sorted(stats, key=lambda thread: (-thread.cpu_percent, thread.tid))
+
+
+def format_table(stats: List[ThreadStats]) -> str:
+    """Returns thread statistics as a text table.
+
+    Args:
+        stats: Activity of each thread.
+
+    Returns:
+        str: Table with a header line.
+    """
+    lines = [f"{'TID':>7} {'NAME':<16} {'CPU%':>6} {'VCSW/s':>9} {'ICSW/s':>9} {'CPU':>4}"]
+    for thread in stats:
+        lines.append(
+            f"{thread.tid:>7} {thread.name:<16} {thread.cpu_percent:>6.1f} "
+            f"{thread.voluntary_switches_per_second:>9.1f} "
+            f"{thread.involuntary_switches_per_second:>9.1f} {thread.processor:>4}"
+        )
+    return "\n".join(lines)
@@ -0,0 +1,43 @@
+# Copyright 2022 Guillaume Belanger
+# See LICENSE file for licensing details.
+
+"""Ports the DU listens on."""
+
+from typing import Dict, List, NamedTuple, Tuple
+
+
+class WorkloadPort(NamedTuple):
+    """Port the DU listens on."""
+
+    name: str
+    port: int
+    protocol: str
+
+
+class PortConfigError(Exception):
+    """Raised when the port configuration is not valid."""
+
+
+def validate_ports(ports: List[WorkloadPort]) -> None:
+    """Validates that ports are in range and that no two of them collide.
+
+    Args:
+        ports: Ports the DU listens on.
+
+    Returns:
+        None
+    """
+    owners: Dict[Tuple[int, str], str] = {}
+    for workload_port in ports:
+        if not 1 <= workload_port.port <= 65535:
+            raise PortConfigError(
+                f"Port of {workload_port.name} must be between 1 and 65535, "
+                f"got {workload_port.port}"
+            )
+        key = (workload_port.port, workload_port.protocol)
+        if key in owners:
+            raise PortConfigError(
+                f"{workload_port.port}/{workload_port.protocol} is used by both {owners[key]} "
+                f"and {workload_port.name}"
+            )
+        owners[key] = workload_port.name
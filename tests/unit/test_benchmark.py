@@ -0,0 +1,83 @@
+# Copyright 2022 Guillaume Belanger
+# See LICENSE file for licensing details.
+
+import unittest
+
+from benchmark import (
+    BenchmarkError,
+    aggregate_throughput,
+    interval_means,
+    parse_l1_processing,
+    parse_ping_summary,
+    summarize,
+    ue_command,
+    ue_imsis,
+    ue_throughputs,
+)
+from frequency_planner import plan_frequencies
+from stats_exporter import UeStats
+
+L1_STATS = (
+    "Blacklisted PRBs 0/106\n"
+    "L1 Tx processing thread 0:   52.50 us;         200;   Max 90.00 us\n"
+    "L1 Rx processing:  120.00 us;        100;   Max 300.00 us\n"
+)
+
+
+class TestBenchmark(unittest.TestCase):
+    def test_given_imsi_base_when_ue_imsis_then_imsis_are_incremented_and_zero_padded(self):
+        self.assertEqual(ue_imsis("001010000000009", 2), ["001010000000009", "001010000000010"])
+
+    def test_given_imsis_overflowing_when_ue_imsis_then_benchmark_error_is_raised(self):
+        with self.assertRaises(BenchmarkError):
+            ue_imsis("999999", 2)
+
+    def test_given_frequency_plan_when_ue_command_then_ue_camps_on_ssb_of_cell(self):
+        frequency_plan = plan_frequencies(
+            band=78, bandwidth_mhz=40, scs_khz=30, center_frequency_khz=3450000
+        )
+
+        command = ue_command(2, frequency_plan, "208990000000002", "k", "o", "oai", 1)
+
+        self.assertTrue(command.startswith("ip netns exec ue2 /opt/oai-nr-ue/bin/nr-uesoftmodem"))
+        self.assertIn(" --rfsimulator.serveraddr 10.201.2.1 ", command)
+        self.assertIn(" -r 106 --numerology 1 --band 78 -C 3449280000 --ssb 492 ", command)
+        self.assertTrue(command.endswith(" --uicc0.dnn oai --uicc0.nssai_sst 1"))
+
+    def test_given_l1_stats_when_parse_l1_processing_then_totals_and_slots_are_returned(self):
+        self.assertEqual(
+            parse_l1_processing(L1_STATS), {"tx": (10500.0, 200), "rx": (12000.0, 100)}
+        )
+
+    def test_given_snapshots_when_interval_means_then_mean_of_new_slots_is_returned(self):
+        snapshots = [{"tx": (1000.0, 10)}, {"tx": (1000.0, 10)}, {"tx": (4000.0, 40)}, {}]
+
+        self.assertEqual(interval_means(snapshots, "tx"), [100.0])
+
+    def test_given_values_when_summarize_then_percentiles_and_max_are_returned(self):
+        self.assertEqual(
+            summarize([float(value) for value in range(1, 101)]),
+            {"p50": 51.0, "p95": 96.0, "p99": 100.0, "max": 100.0},
+        )
+        self.assertIsNone(summarize([]))
+
+    def test_given_mac_stats_when_ue_throughputs_then_throughput_of_each_ue_is_summed(self):
+        before = {"4a3b": UeStats(rnti="4a3b", mac_tx_bytes=1000, mac_rx_bytes=500)}
+        after = {
+            "4a3b": UeStats(rnti="4a3b", mac_tx_bytes=1251000, mac_rx_bytes=250500),
+            "4a3c": UeStats(rnti="4a3c", mac_tx_bytes=1250000, mac_rx_bytes=0),
+        }
+
+        throughputs = ue_throughputs(before, after, 10)
+
+        self.assertEqual(throughputs["4a3b"], {"dl-mbps": 1.0, "ul-mbps": 0.2})
+        self.assertEqual(aggregate_throughput(throughputs), {"dl-mbps": 2.0, "ul-mbps": 0.2})
+
+    def test_given_ping_output_when_parse_ping_summary_then_packet_counts_are_returned(self):
+        output = (
+            "--- 8.8.8.8 ping statistics ---\n"
+            "300 packets transmitted, 297 received, 1% packet loss, time 29912ms\n"
+        )
+
+        self.assertEqual(parse_ping_summary(output), {"transmitted": 300, "received": 297})
+        self.assertEqual(parse_ping_summary(""), {"transmitted": 0, "received": 0})
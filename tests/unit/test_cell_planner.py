@@ -0,0 +1,114 @@
+# Copyright 2022 Guillaume Belanger
+# See LICENSE file for licensing details.
+
+import unittest
+
+from cell_planner import (
+    PCI_COUNT,
+    CellIdentity,
+    CellPlanningError,
+    parse_neighbours,
+    plan_cells,
+)
+
+
+def _hexagonal_grid(rows: int, columns: int) -> dict:
+    """Returns the neighbours of each cell of a hexagonal grid (offset coordinates)."""
+    neighbours: dict = {}
+    for row in range(rows):
+        for column in range(columns):
+            if row % 2:
+                offsets = [(0, -1), (0, 1), (-1, 0), (-1, 1), (1, 0), (1, 1)]
+            else:
+                offsets = [(0, -1), (0, 1), (-1, -1), (-1, 0), (1, -1), (1, 0)]
+            cell = f"cell-{row}-{column}"
+            neighbours[cell] = {
+                f"cell-{row + d_row}-{column + d_column}"
+                for d_row, d_column in offsets
+                if 0 <= row + d_row < rows and 0 <= column + d_column < columns
+            }
+    return neighbours
+
+
+class TestCellPlanner(unittest.TestCase):
+    def _assert_collision_and_confusion_free(self, plan: dict, neighbours: dict):
+        for cell, first_tier in neighbours.items():
+            for neighbour in first_tier:
+                self.assertNotEqual(plan[cell].pci, plan[neighbour].pci)
+                for second_tier in neighbours[neighbour] - {cell}:
+                    self.assertNotEqual(plan[cell].pci, plan[second_tier].pci)
+
+    def test_given_single_cell_when_plan_cells_then_first_pci_and_base_cell_id_are_allocated(
+        self,
+    ):
+        plan = plan_cells(cells=["du/0"], nr_cell_id_base=12345678)
+
+        self.assertEqual(plan, {"du/0": CellIdentity(pci=0, nr_cell_id=12345678)})
+
+    def test_given_120_fully_meshed_cells_when_plan_cells_then_identities_are_unique(self):
+        cells = [f"du/{index}" for index in range(120)]
+
+        plan = plan_cells(cells=cells, nr_cell_id_base=1000)
+
+        self.assertEqual(len({identity.pci for identity in plan.values()}), 120)
+        self.assertEqual(len({identity.nr_cell_id for identity in plan.values()}), 120)
+        self.assertTrue(all(0 <= identity.pci < PCI_COUNT for identity in plan.values()))
+
+    def test_given_hexagonal_grid_of_144_cells_when_plan_cells_then_plan_is_collision_confusion_and_mod3_free(  # noqa: E501
+        self,
+    ):
+        neighbours = _hexagonal_grid(rows=12, columns=12)
+
+        plan = plan_cells(cells=neighbours.keys(), neighbours=neighbours)
+
+        self._assert_collision_and_confusion_free(plan, neighbours)
+        for cell, first_tier in neighbours.items():
+            for neighbour in first_tier:
+                self.assertNotEqual(plan[cell].pci % 3, plan[neighbour].pci % 3)
+
+    def test_given_existing_plan_when_cells_are_added_then_existing_cells_keep_their_identity(
+        self,
+    ):
+        neighbours = _hexagonal_grid(rows=10, columns=12)
+        existing_cells = [cell for cell in neighbours if not cell.startswith("cell-9-")]
+        initial_plan = plan_cells(cells=existing_cells, neighbours=neighbours)
+
+        new_plan = plan_cells(cells=neighbours.keys(), neighbours=neighbours, current=initial_plan)
+
+        for cell in existing_cells:
+            self.assertEqual(new_plan[cell], initial_plan[cell])
+        self._assert_collision_and_confusion_free(new_plan, neighbours)
+
+    def test_given_colliding_current_plan_when_plan_cells_then_only_one_cell_is_reassigned(self):
+        current = {
+            "du/0": CellIdentity(pci=7, nr_cell_id=1),
+            "du/1": CellIdentity(pci=7, nr_cell_id=2),
+            "du/2": CellIdentity(pci=9, nr_cell_id=3),
+        }
+
+        plan = plan_cells(cells=current.keys(), current=current, nr_cell_id_base=1)
+
+        self.assertEqual(plan["du/0"], current["du/0"])
+        self.assertEqual(plan["du/2"], current["du/2"])
+        self.assertNotIn(plan["du/1"].pci, {7, 9})
+        self.assertEqual(plan["du/1"].nr_cell_id, 2)
+
+    def test_given_reserved_pcis_when_plan_cells_then_reserved_pcis_are_not_allocated(self):
+        cells = [f"du/{index}" for index in range(10)]
+
+        plan = plan_cells(cells=cells, reserved_pcis=range(0, 30))
+
+        self.assertTrue(all(identity.pci >= 30 for identity in plan.values()))
+
+    def test_given_more_fully_meshed_cells_than_pcis_when_plan_cells_then_error_is_raised(self):
+        cells = [f"du/{index}" for index in range(10)]
+
+        with self.assertRaises(CellPlanningError):
+            plan_cells(cells=cells, reserved_pcis=range(0, PCI_COUNT - 5))
+
+    def test_given_neighbour_specification_when_parse_neighbours_then_relations_are_symmetric(
+        self,
+    ):
+        neighbours = parse_neighbours("0:1,2; 1:2")
+
+        self.assertEqual(neighbours, {"0": {"1", "2"}, "1": {"0", "2"}, "2": {"0", "1"}})
@@ -1,10 +1,13 @@
 # Copyright 2022 Guillaume Belanger
 # See LICENSE file for licensing details.
 
+import asyncio
+import json
 import unittest
-from unittest.mock import patch
+from unittest.mock import AsyncMock, MagicMock, PropertyMock, patch
 
 import ops.testing
+from lightkube.core.exceptions import ApiError
 from lightkube.models.core_v1 import (
     LoadBalancerIngress,
     LoadBalancerStatus,
@@ -12,27 +15,70 @@ from lightkube.models.core_v1 import (
     ServiceSpec,
 )
 from lightkube.models.core_v1 import ServiceStatus as K8sServiceStatus
-from ops.model import ActiveStatus
-from ops.pebble import ServiceInfo, ServiceStartup, ServiceStatus
+from lightkube.models.meta_v1 import Status
+from ops.model import ActiveStatus, BlockedStatus, WaitingStatus
+from ops.pebble import (
+    CheckInfo,
+    CheckLevel,
+    CheckStatus,
+    ServiceInfo,
+    ServiceStartup,
+    ServiceStatus,
+)
 from ops.testing import Harness
 
+from benchmark import NETNS_CLEANUP_SCRIPT, NETNS_SCRIPT, TRAFFIC_SCRIPT
 from charm import Oai5GDUOperatorCharm
+from config_delivery import SWAP_SCRIPT, config_hash, config_map_key
+from health_checks import pebble_checks
+from node_placement import NodeInfo
+from rolling_restart import GRANT_TIMEOUT_SECONDS
+from softmodem_telnet import SoftmodemTelnetError
+from thread_stats import SAMPLER_SCRIPT
 
 
 class TestCharm(unittest.TestCase):
     @patch("lightkube.core.client.GenericSyncClient")
     @patch(
-        "charm.KubernetesServicePatch",
-        lambda charm, ports, service_type: None,
+        "charm.ServicePatch",
+        lambda charm, ports, service_type, refresh_event: None,
     )
     def setUp(self, patch_lightkube_client):
         ops.testing.SIMULATE_CAN_CONNECT = True
         self.model_name = "whatever"
         self.addCleanup(setattr, ops.testing, "SIMULATE_CAN_CONNECT", False)
+        self.patch_statefulset_is_patched = self._start_patch(
+            "charm.Kubernetes.statefulset_is_patched", return_value=True
+        )
+        self.patch_apply_network_attachment_definition = self._start_patch(
+            "charm.Kubernetes.apply_network_attachment_definition"
+        )
+        self.patch_delete_network_attachment_definition = self._start_patch(
+            "charm.Kubernetes.delete_network_attachment_definition"
+        )
         self.harness = Harness(Oai5GDUOperatorCharm)
         self.addCleanup(self.harness.cleanup)
         self.harness.set_model_name(name=self.model_name)
         self.harness.begin()
+        self.sysctl_values = {}
+        self.harness.handle_exec("du", ["sh"], handler=self._write_sysctl)
+        self.harness.handle_exec("du", ["cat"], handler=self._read_sysctl)
+
+    def _write_sysctl(self, args: ops.testing.ExecArgs) -> ops.testing.ExecResult:
+        value, path = args.command[-2:]
+        self.sysctl_values[path] = value
+        return ops.testing.ExecResult()
+
+    def _read_sysctl(self, args: ops.testing.ExecArgs) -> ops.testing.ExecResult:
+        return ops.testing.ExecResult(stdout=self.sysctl_values.get(args.command[1], "0") + "\n")
+
+    def _start_patch(self, target: str, **kwargs):
+        patcher = patch(target, **kwargs)
+        self.addCleanup(patcher.stop)
+        return patcher.start()
+
+    def _create_peer_relation(self) -> int:
+        return self.harness.add_relation("replicas", self.harness.charm.app.name)
 
     def _create_cu_relation_with_valid_data(self):
         relation_id = self.harness.add_relation("fiveg-f1", "cu")
@@ -61,224 +107,178 @@ class TestCharm(unittest.TestCase):
                 loadBalancer=LoadBalancerStatus(ingress=[LoadBalancerIngress(ip=load_balancer_ip)])
             ),
         )
+        self.harness.set_leader(True)
+        self._create_peer_relation()
         self.harness.set_can_connect(container="du", val=True)
         cu_adress, cu_port = self._create_cu_relation_with_valid_data()
         mock_push.assert_called_with(
             path="/opt/oai-gnb/etc/gnb.conf",
-            source='Active_gNBs = ( "oai-du-rfsim");\n'
-            "# Asn1_verbosity, choice in: none, info, annoying\n"
-            'Asn1_verbosity = "none";\n\n'
-            "gNBs =\n"
-            "(\n"
-            " {\n"
-            "    ////////// Identification parameters:\n"
-            "    gNB_ID = 0xe00;\n\n"
-            '#     cell_type =  "CELL_MACRO_GNB";\n\n'
-            '    gNB_name  =  "oai-du-rfsim";\n\n'
-            "    // Tracking area code, 0x0000 and 0xfffe are reserved values\n"
-            "    tracking_area_code  =  1;\n"
-            "    plmn_list = ({ mcc = 208; mnc = 99; mnc_length =2; snssaiList = ({ sst = 1, sd = 0x000001 }) });\n\n\n"  # noqa: E501, W505
-            "    nr_cellid = 12345678L;\n\n"
-            "    ////////// Physical parameters:\n\n"
-            "    min_rxtxtime                                              = 6;\n"
-            "    force_256qam_off = 1;\n\n"
+            source='Active_gNBs = ("oai-du-rfsim");\n'
+            "\n"
+            'Asn1_verbosity = "none";\n'
+            "\n"
+            "gNBs = (\n"
+            "  {\n"
+            "    gNB_ID = 0xe00;\n"
+            '    gNB_name = "oai-du-rfsim";\n'
+            "    tracking_area_code = 1;\n"
+            "    plmn_list = (\n"
+            "      {\n"
+            "        mcc = 208;\n"
+            "        mnc = 99;\n"
+            "        mnc_length = 2;\n"
+            "        snssaiList = (\n"
+            "          {\n"
+            "            sst = 1;\n"
+            "            sd = 0x000001;\n"
+            "          }\n"
+            "        );\n"
+            "      }\n"
+            "    );\n"
+            "    nr_cellid = 12345678L;\n"
+            "    min_rxtxtime = 6;\n"
+            "    pdsch_AntennaPorts_XP = 1;\n"
+            "    pdsch_AntennaPorts_N1 = 1;\n"
+            "    pusch_AntennaPorts = 1;\n"
+            "    maxMIMO_layers = 1;\n"
+            "    force_256qam_off = 1;\n"
             "    pdcch_ConfigSIB1 = (\n"
             "      {\n"
             "        controlResourceSetZero = 12;\n"
             "        searchSpaceZero = 0;\n"
             "      }\n"
-            "    );\n\n"
+            "    );\n"
             "    servingCellConfigCommon = (\n"
-            "    {\n"
-            " #spCellConfigCommon\n\n"
-            "      physCellId                                                    = 0;\n\n"
-            "#  downlinkConfigCommon\n"
-            "    #frequencyInfoDL\n"
-            "      # this is 3600 MHz + 43 PRBs@30kHz SCS (same as initial BWP)\n"
-            "      absoluteFrequencySSB                                          = 641280;\n"  # noqa: E501, W505
-            "      dl_frequencyBand                                                 = 78;\n"
-            "      # this is 3600 MHz\n"
-            "      dl_absoluteFrequencyPointA                                       = 640008;\n"  # noqa: E501, W505
-            "      #scs-SpecificCarrierList\n"
-            "        dl_offstToCarrier                                              = 0;\n"
-            "# subcarrierSpacing\n"
-            "# 0=kHz15, 1=kHz30, 2=kHz60, 3=kHz120\n"
-            "        dl_subcarrierSpacing                                           = 1;\n"
-            "        dl_carrierBandwidth                                            = 106;\n"  # noqa: E501, W505
-            "     #initialDownlinkBWP\n"
-            "      #genericParameters\n"
-            "        # this is RBstart=27,L=48 (275*(L-1))+RBstart\n"
-            "        initialDLBWPlocationAndBandwidth                               = 28875; # 6366 12925 12956 28875 12952\n"  # noqa: E501, W505
-            "# subcarrierSpacing\n"
-            "# 0=kHz15, 1=kHz30, 2=kHz60, 3=kHz120\n"
-            "        initialDLBWPsubcarrierSpacing                                           = 1;\n"  # noqa: E501, W505
-            "      #pdcch-ConfigCommon\n"
-            "        initialDLBWPcontrolResourceSetZero                              = 12;\n"  # noqa: E501, W505
-            "        initialDLBWPsearchSpaceZero                                             = 0;\n\n"  # noqa: E501, W505
-            "  #uplinkConfigCommon\n"
-            "     #frequencyInfoUL\n"
-            "      ul_frequencyBand                                                 = 78;\n"
-            "      #scs-SpecificCarrierList\n"
-            "      ul_offstToCarrier                                              = 0;\n"
-            "# subcarrierSpacing\n"
-            "# 0=kHz15, 1=kHz30, 2=kHz60, 3=kHz120\n"
-            "      ul_subcarrierSpacing                                           = 1;\n"
-            "      ul_carrierBandwidth                                            = 106;\n"
-            "      pMax                                                          = 20;\n"
-            "     #initialUplinkBWP\n"
-            "      #genericParameters\n"
-            "        initialULBWPlocationAndBandwidth                            = 28875;\n"
-            "# subcarrierSpacing\n"
-            "# 0=kHz15, 1=kHz30, 2=kHz60, 3=kHz120\n"
-            "        initialULBWPsubcarrierSpacing                                           = 1;\n"  # noqa: E501, W505
-            "      #rach-ConfigCommon\n"
-            "        #rach-ConfigGeneric\n"
-            "          prach_ConfigurationIndex                                  = 98;\n"
-            "#prach_msg1_FDM\n"
-            "#0 = one, 1=two, 2=four, 3=eight\n"
-            "          prach_msg1_FDM                                            = 0;\n"
-            "          prach_msg1_FrequencyStart                                 = 0;\n"
-            "          zeroCorrelationZoneConfig                                 = 13;\n"
-            "          preambleReceivedTargetPower                               = -96;\n"
-            "#preamblTransMax (0...10) = (3,4,5,6,7,8,10,20,50,100,200)\n"
-            "          preambleTransMax                                          = 6;\n"
-            "#powerRampingStep\n"
-            "# 0=dB0,1=dB2,2=dB4,3=dB6\n"
-            "        powerRampingStep                                            = 1;\n"
-            "#ra_ReponseWindow\n"
-            "#1,2,4,8,10,20,40,80\n"
-            "        ra_ResponseWindow                                           = 4;\n"
-            "#ssb_perRACH_OccasionAndCB_PreamblesPerSSB_PR\n"
-            "#1=oneeighth,2=onefourth,3=half,4=one,5=two,6=four,7=eight,8=sixteen\n"
-            "        ssb_perRACH_OccasionAndCB_PreamblesPerSSB_PR                = 4;\n"
-            "#oneHalf (0..15) 4,8,12,16,...60,64\n"
-            "        ssb_perRACH_OccasionAndCB_PreamblesPerSSB                   = 14;\n"
-            "#ra_ContentionResolutionTimer\n"
-            "#(0..7) 8,16,24,32,40,48,56,64\n"
-            "        ra_ContentionResolutionTimer                                = 7;\n"
-            "        rsrp_ThresholdSSB                                           = 19;\n"
-            "#prach-RootSequenceIndex_PR\n"
-            "#1 = 839, 2 = 139\n"
-            "        prach_RootSequenceIndex_PR                                  = 2;\n"
-            "        prach_RootSequenceIndex                                     = 1;\n"
-            "        # SCS for msg1, can only be 15 for 30 kHz < 6 GHz, takes precendence over the one derived from prach-ConfigIndex\n"  # noqa: E501, W505
-            "        #\n"
-            "        msg1_SubcarrierSpacing                                      = 1,\n"
-            "# restrictedSetConfig\n"
-            "# 0=unrestricted, 1=restricted type A, 2=restricted type B\n"
-            "        restrictedSetConfig                                         = 0,\n\n"
-            "        msg3_DeltaPreamble                                          = 1;\n"
-            "        p0_NominalWithGrant                                         =-90;\n\n"
-            "# pucch-ConfigCommon setup :\n"
-            "# pucchGroupHopping\n"
-            "# 0 = neither, 1= group hopping, 2=sequence hopping\n"
-            "        pucchGroupHopping                                           = 0;\n"
-            "        hoppingId                                                   = 40;\n"
-            "        p0_nominal                                                  = -90;\n"
-            "# ssb_PositionsInBurs_BitmapPR\n"
-            "# 1=short, 2=medium, 3=long\n"
-            "      ssb_PositionsInBurst_PR                                       = 2;\n"
-            "      ssb_PositionsInBurst_Bitmap                                   = 1;\n\n"
-            "# ssb_periodicityServingCell\n"
-            "# 0 = ms5, 1=ms10, 2=ms20, 3=ms40, 4=ms80, 5=ms160, 6=spare2, 7=spare1\n"
-            "      ssb_periodicityServingCell                                    = 2;\n\n"
-            "# dmrs_TypeA_position\n"
-            "# 0 = pos2, 1 = pos3\n"
-            "      dmrs_TypeA_Position                                           = 0;\n\n"
-            "# subcarrierSpacing\n"
-            "# 0=kHz15, 1=kHz30, 2=kHz60, 3=kHz120\n"
-            "      subcarrierSpacing                                             = 1;\n\n\n "  # noqa: E501, W505
-            " #tdd-UL-DL-ConfigurationCommon\n"
-            "# subcarrierSpacing\n"
-            "# 0=kHz15, 1=kHz30, 2=kHz60, 3=kHz120\n"
-            "      referenceSubcarrierSpacing                                    = 1;\n"
-            "      # pattern1\n"
-            "      # dl_UL_TransmissionPeriodicity\n"
-            "      # 0=ms0p5, 1=ms0p625, 2=ms1, 3=ms1p25, 4=ms2, 5=ms2p5, 6=ms5, 7=ms10\n"
-            "      dl_UL_TransmissionPeriodicity                                 = 6;\n"
-            "      nrofDownlinkSlots                                             = 7;\n"
-            "      nrofDownlinkSymbols                                           = 6;\n"
-            "      nrofUplinkSlots                                               = 2;\n"
-            "      nrofUplinkSymbols                                             = 4;\n\n"
-            "      ssPBCH_BlockPower                                             = -25;\n"
-            "     }\n\n"
-            "  );\n\n\n"
-            "    # ------- SCTP definitions\n"
-            "    SCTP :\n"
-            "    {\n"
-            "        # Number of streams to use in input/output\n"
-            "        SCTP_INSTREAMS  = 2;\n"
-            "        SCTP_OUTSTREAMS = 2;\n"
+            "      {\n"
+            "        physCellId = 0;\n"
+            "        absoluteFrequencySSB = 641280;\n"
+            "        dl_frequencyBand = 78;\n"
+            "        dl_absoluteFrequencyPointA = 640008;\n"
+            "        dl_offstToCarrier = 0;\n"
+            "        dl_subcarrierSpacing = 1;\n"
+            "        dl_carrierBandwidth = 106;\n"
+            "        initialDLBWPlocationAndBandwidth = 28875;\n"
+            "        initialDLBWPsubcarrierSpacing = 1;\n"
+            "        initialDLBWPcontrolResourceSetZero = 12;\n"
+            "        initialDLBWPsearchSpaceZero = 0;\n"
+            "        ul_frequencyBand = 78;\n"
+            "        ul_offstToCarrier = 0;\n"
+            "        ul_subcarrierSpacing = 1;\n"
+            "        ul_carrierBandwidth = 106;\n"
+            "        pMax = 20;\n"
+            "        initialULBWPlocationAndBandwidth = 28875;\n"
+            "        initialULBWPsubcarrierSpacing = 1;\n"
+            "        prach_ConfigurationIndex = 98;\n"
+            "        prach_msg1_FDM = 0;\n"
+            "        prach_msg1_FrequencyStart = 0;\n"
+            "        zeroCorrelationZoneConfig = 13;\n"
+            "        preambleReceivedTargetPower = -96;\n"
+            "        preambleTransMax = 6;\n"
+            "        powerRampingStep = 1;\n"
+            "        ra_ResponseWindow = 4;\n"
+            "        ssb_perRACH_OccasionAndCB_PreamblesPerSSB_PR = 4;\n"
+            "        ssb_perRACH_OccasionAndCB_PreamblesPerSSB = 14;\n"
+            "        ra_ContentionResolutionTimer = 7;\n"
+            "        rsrp_ThresholdSSB = 19;\n"
+            "        prach_RootSequenceIndex_PR = 2;\n"
+            "        prach_RootSequenceIndex = 1;\n"
+            "        msg1_SubcarrierSpacing = 1;\n"
+            "        restrictedSetConfig = 0;\n"
+            "        msg3_DeltaPreamble = 1;\n"
+            "        p0_NominalWithGrant = -90;\n"
+            "        pucchGroupHopping = 0;\n"
+            "        hoppingId = 40;\n"
+            "        p0_nominal = -90;\n"
+            "        ssb_PositionsInBurst_PR = 2;\n"
+            "        ssb_PositionsInBurst_Bitmap = 1;\n"
+            "        ssb_periodicityServingCell = 2;\n"
+            "        dmrs_TypeA_Position = 0;\n"
+            "        subcarrierSpacing = 1;\n"
+            "        referenceSubcarrierSpacing = 1;\n"
+            "        dl_UL_TransmissionPeriodicity = 6;\n"
+            "        nrofDownlinkSlots = 7;\n"
+            "        nrofDownlinkSymbols = 6;\n"
+            "        nrofUplinkSlots = 2;\n"
+            "        nrofUplinkSymbols = 4;\n"
+            "        ssPBCH_BlockPower = -25;\n"
+            "      }\n"
+            "    );\n"
+            "    SCTP = {\n"
+            "      SCTP_INSTREAMS = 2;\n"
+            "      SCTP_OUTSTREAMS = 2;\n"
             "    };\n"
             "  }\n"
-            ");\n\n"
+            ");\n"
+            "\n"
             "MACRLCs = (\n"
             "  {\n"
-            "    num_cc           = 1;\n"
-            '    tr_s_preference  = "local_L1";\n'
-            '    tr_n_preference  = "f1";\n'
+            "    num_cc = 1;\n"
+            '    tr_s_preference = "local_L1";\n'
+            '    tr_n_preference = "f1";\n'
             '    local_n_if_name = "eth0";\n'
             '    local_n_address = "1.2.3.4";\n'
-            f'    remote_n_address = "{cu_adress}";\n'
-            "    local_n_portc   = 500;\n"
-            "    local_n_portd   = 2153;\n"
-            "    remote_n_portc  = 501;\n"
-            f"    remote_n_portd  = {cu_port};\n"
-            "    pusch_TargetSNRx10          = 200;\n"
-            "    pucch_TargetSNRx10          = 200;\n"
+            '    remote_n_address = "5.6.7.8";\n'
+            "    local_n_portc = 500;\n"
+            "    local_n_portd = 2153;\n"
+            "    remote_n_portc = 501;\n"
+            "    remote_n_portd = 1234;\n"
+            "    pusch_TargetSNRx10 = 200;\n"
+            "    pucch_TargetSNRx10 = 200;\n"
             "  }\n"
-            ");\n\n"
+            ");\n"
+            "\n"
             "L1s = (\n"
-            "{\n"
-            "  num_cc = 1;\n"
-            '  tr_n_preference = "local_mac";\n'
-            "  prach_dtx_threshold = 200;\n"
-            "  pucch0_dtx_threshold = 150;\n"
-            "  ofdm_offset_divisor = 8; #set this to UINT_MAX for offset 0\n"
-            "}\n"
-            ");\n\n"
+            "  {\n"
+            "    num_cc = 1;\n"
+            '    tr_n_preference = "local_mac";\n'
+            "    prach_dtx_threshold = 200;\n"
+            "    pucch0_dtx_threshold = 150;\n"
+            "    ofdm_offset_divisor = 8;\n"
+            "  }\n"
+            ");\n"
+            "\n"
             "RUs = (\n"
-            "    {\n"
-            '       local_rf       = "yes"\n'
-            "         nb_tx          = 1\n"
-            "         nb_rx          = 1\n"
-            "         att_tx         = 0\n"
-            "         att_rx         = 0;\n"
-            "         bands          = [78];\n"
-            "         max_pdschReferenceSignalPower = -27;\n"
-            "         max_rxgain                    = 114;\n"
-            "         eNB_instances  = [0];\n"
-            "         #beamforming 1x4 matrix:\n"
-            "         bf_weights = [0x00007fff, 0x0000, 0x0000, 0x0000];\n"
-            '         clock_src = "internal";\n'
-            "    }\n"
-            ");\n\n"
+            "  {\n"
+            '    local_rf = "yes";\n'
+            "    nb_tx = 1;\n"
+            "    nb_rx = 1;\n"
+            "    att_tx = 0;\n"
+            "    att_rx = 0;\n"
+            "    bands = [78];\n"
+            "    max_pdschReferenceSignalPower = -27;\n"
+            "    max_rxgain = 114;\n"
+            "    eNB_instances = [0];\n"
+            "    bf_weights = [0x00007fff, 0x00000000, 0x00000000, 0x00000000];\n"
+            '    clock_src = "internal";\n'
+            "  }\n"
+            ");\n"
+            "\n"
             "THREAD_STRUCT = (\n"
             "  {\n"
-            '    #three config for level of parallelism "PARALLEL_SINGLE_THREAD", "PARALLEL_RU_L1_SPLIT", or "PARALLEL_RU_L1_TRX_SPLIT"\n'  # noqa: E501, W505
-            '    parallel_config    = "PARALLEL_SINGLE_THREAD";\n'
-            '    #two option for worker "WORKER_DISABLE" or "WORKER_ENABLE"\n'
-            '    worker_config      = "WORKER_ENABLE";\n'
+            '    parallel_config = "PARALLEL_SINGLE_THREAD";\n'
+            '    worker_config = "WORKER_ENABLE";\n'
             "  }\n"
-            ");\nrfsimulator: {\n"
-            'serveraddr = "server";\n'
-            '    serverport = "4043";\n'
-            '    options = (); #("saviq"); or/and "chanmod"\n'
-            '    modelname = "AWGN";\n'
-            '    IQfile = "/tmp/rfsimulator.iqs"\n'
-            "}\n\n"
-            "     log_config :\n"
-            "     {\n"
-            '       global_log_level                      ="info";\n'
-            '       hw_log_level                          ="info";\n'
-            '       phy_log_level                         ="info";\n'
-            '       mac_log_level                         ="info";\n'
-            '       rlc_log_level                         ="info";\n'
-            '       pdcp_log_level                        ="info";\n'
-            '       rrc_log_level                         ="info";\n'
-            '       f1ap_log_level                         ="debug";\n'
-            '       ngap_log_level                         ="debug";\n'
-            "    };",
+            ");\n"
+            "\n"
+            "rfsimulator = {\n"
+            '  serveraddr = "server";\n'
+            '  serverport = "4043";\n'
+            "  options = ();\n"
+            '  modelname = "AWGN";\n'
+            '  IQfile = "/tmp/rfsimulator.iqs";\n'
+            "};\n"
+            "\n"
+            "log_config = {\n"
+            '  global_log_level = "info";\n'
+            '  hw_log_level = "info";\n'
+            '  phy_log_level = "info";\n'
+            '  mac_log_level = "info";\n'
+            '  rlc_log_level = "info";\n'
+            '  pdcp_log_level = "info";\n'
+            '  rrc_log_level = "info";\n'
+            '  f1ap_log_level = "debug";\n'
+            '  ngap_log_level = "debug";\n'
+            "};\n",
         )
 
     @patch("lightkube.Client.get")
@@ -293,6 +293,8 @@ class TestCharm(unittest.TestCase):
                 loadBalancer=LoadBalancerStatus(ingress=[LoadBalancerIngress(ip=load_balancer_ip)])
             ),
         )
+        self.harness.set_leader(True)
+        self._create_peer_relation()
         self.harness.set_can_connect(container="du", val=True)
         self._create_cu_relation_with_valid_data()
 
@@ -303,15 +305,31 @@ class TestCharm(unittest.TestCase):
                     "summary": "du",
                     "command": "/opt/oai-gnb/bin/nr-softmodem -O /opt/oai-gnb/etc/gnb.conf --sa -E --rfsim --log_config.global_log_options level nocolor time",  # noqa: E501
                     "startup": "enabled",
-                }
+                    "working-dir": "/opt/oai-gnb",
+                    "on-check-failure": {"du-alive": "restart"},
+                },
+                "stats-exporter": {
+                    "override": "replace",
+                    "summary": "nr-softmodem statistics exporter",
+                    "command": "python3 /opt/oai-gnb/exporter/stats_exporter.py --stats-dir /opt/oai-gnb --port 9102 --pebble-socket /charm/container/pebble.socket --log-service du",  # noqa: E501
+                    "startup": "enabled",
+                },
             },
+            "checks": pebble_checks(
+                cu_f1_c_address="5.6.7.8",
+                cu_f1_c_port=501,
+                stats_file="/opt/oai-gnb/nrMAC_stats.log",
+                stats_freshness=False,
+            ),
         }
         self.harness.container_pebble_ready("du")
         updated_plan = self.harness.get_container_pebble_plan("du").to_dict()
         self.assertEqual(expected_plan, updated_plan)
         service = self.harness.model.unit.get_container("du").get_service("du")
         self.assertTrue(service.is_running())
-        self.assertEqual(self.harness.model.unit.status, ActiveStatus())
+        self.assertEqual(
+            self.harness.model.unit.status, WaitingStatus("Waiting for nr-softmodem to be ready")
+        )
 
     @patch("lightkube.Client.get")
     @patch("ops.model.Container.get_service")
@@ -341,3 +359,1320 @@ class TestCharm(unittest.TestCase):
         )
 
         assert relation_data["du_address"] == load_balancer_ip
+
+    def test_given_unit_is_leader_and_peers_when_peer_relation_joined_then_cell_plan_is_published(  # noqa: E501
+        self,
+    ):
+        self.harness.set_leader(True)
+        relation_id = self._create_peer_relation()
+        self.harness.add_relation_unit(relation_id=relation_id, remote_unit_name="oai-5g-du/1")
+        self.harness.add_relation_unit(relation_id=relation_id, remote_unit_name="oai-5g-du/2")
+
+        relation_data = self.harness.get_relation_data(
+            relation_id=relation_id, app_or_unit=self.harness.model.app.name
+        )
+
+        cell_plan = json.loads(relation_data["cell-plan"])
+        self.assertEqual(set(cell_plan), {"oai-5g-du/0", "oai-5g-du/1", "oai-5g-du/2"})
+        self.assertEqual(len({cell["pci"] for cell in cell_plan.values()}), 3)
+        self.assertEqual(len({cell["nr_cell_id"] for cell in cell_plan.values()}), 3)
+        self.assertEqual(cell_plan["oai-5g-du/0"], {"pci": 0, "nr_cell_id": 12345678})
+
+    def test_given_no_cell_identity_allocated_when_config_changed_then_status_is_waiting(self):
+        self._create_peer_relation()
+        self.harness.set_can_connect(container="du", val=True)
+        self._create_cu_relation_with_valid_data()
+
+        self.harness.update_config({})
+
+        self.assertEqual(
+            self.harness.model.unit.status,
+            WaitingStatus("Waiting for cell identity to be allocated"),
+        )
+
+    def test_given_invalid_bandwidth_when_config_changed_then_status_is_blocked(self):
+        self.harness.set_can_connect(container="du", val=True)
+
+        self.harness.update_config({"bandwidth-mhz": 45})
+
+        self.assertEqual(
+            self.harness.model.unit.status,
+            BlockedStatus(
+                "Invalid configuration: Bandwidth of 45 MHz is not supported with 30 kHz SCS"  # noqa: E501, W505
+            ),
+        )
+
+    def _set_up_running_workload(self, patch_lightkube_client_get):
+        patch_lightkube_client_get.return_value = Service(
+            spec=ServiceSpec(type="LoadBalancer"),
+            status=K8sServiceStatus(
+                loadBalancer=LoadBalancerStatus(ingress=[LoadBalancerIngress(ip="1.2.3.4")])
+            ),
+        )
+        self.harness.set_leader(True)
+        self._create_peer_relation()
+        self.harness.set_can_connect(container="du", val=True)
+        self._create_cu_relation_with_valid_data()
+
+    @patch("charm.SoftmodemTelnet.set_log_levels")
+    @patch("lightkube.Client.get")
+    @patch("ops.model.Container.push", new=lambda *args, **kwargs: None)
+    def test_given_telnet_enabled_when_log_level_changes_then_it_is_applied_without_restart(
+        self, patch_lightkube_client_get, patch_set_log_levels
+    ):
+        self.harness.update_config({"enable-telnet": True})
+        self._set_up_running_workload(patch_lightkube_client_get)
+
+        with patch("ops.model.Container.restart") as patch_restart:
+            self.harness.update_config(
+                {"gnb-config-overrides": "log_config: {mac_log_level: debug}"}
+            )
+
+        patch_restart.assert_not_called()
+        self.assertEqual(patch_set_log_levels.call_args.args[0]["mac"], "debug")
+        action_output = self.harness.run_action("get-config-changes")
+        self.assertEqual(action_output.results, {"hot": "log_config", "restart": ""})
+
+    @patch("charm.SoftmodemTelnet.set_log_levels")
+    @patch("lightkube.Client.get")
+    @patch("ops.model.Container.push", new=lambda *args, **kwargs: None)
+    def test_given_telnet_unreachable_when_log_level_changes_then_workload_is_restarted_once_granted(  # noqa: E501
+        self, patch_lightkube_client_get, patch_set_log_levels
+    ):
+        self.harness.update_config({"enable-telnet": True})
+        self._set_up_running_workload(patch_lightkube_client_get)
+        patch_set_log_levels.side_effect = SoftmodemTelnetError("Connection refused")
+        relation_id = self.harness.model.get_relation("replicas").id
+        self.harness.add_relation_unit(relation_id, "oai-5g-du/1")
+        self.harness.update_relation_data(
+            relation_id, "oai-5g-du/1", {"restart-request": "abc", "serving": "true"}
+        )
+
+        with patch("ops.model.Container.restart") as patch_restart:
+            self.harness.update_config(
+                {"gnb-config-overrides": "log_config: {mac_log_level: debug}"}
+            )
+
+        patch_restart.assert_not_called()
+        self.assertEqual(
+            self.harness.model.unit.status, WaitingStatus("Waiting for other units to restart")
+        )
+        self.assertIn(
+            "restart-request", self.harness.get_relation_data(relation_id, "oai-5g-du/0")
+        )
+
+        with patch("ops.model.Container.restart") as patch_restart:
+            self.harness.update_relation_data(
+                relation_id, "oai-5g-du/1", {"restart-request": "", "serving": "true"}
+            )
+
+        patch_restart.assert_called_once_with("du")
+        self.assertEqual(
+            self.harness.model.unit.status, WaitingStatus("Waiting for nr-softmodem to be ready")
+        )
+        action_output = self.harness.run_action("get-config-changes")
+        self.assertEqual(action_output.results, {"hot": "", "restart": "log_config"})
+
+    @patch("charm.SoftmodemTelnet.set_log_levels")
+    @patch("lightkube.Client.get")
+    @patch("ops.model.Container.push", new=lambda *args, **kwargs: None)
+    def test_given_telnet_disabled_when_log_level_changes_then_workload_is_restarted(
+        self, patch_lightkube_client_get, patch_set_log_levels
+    ):
+        self._set_up_running_workload(patch_lightkube_client_get)
+
+        with patch("ops.model.Container.restart") as patch_restart:
+            self.harness.update_config(
+                {"gnb-config-overrides": "log_config: {mac_log_level: debug}"}
+            )
+
+        patch_restart.assert_called_once_with("du")
+        patch_set_log_levels.assert_not_called()
+
+    @patch("lightkube.Client.get")
+    @patch("ops.model.Container.push", new=lambda *args, **kwargs: None)
+    def test_given_scheduler_setting_changes_when_config_changed_then_workload_is_restarted(
+        self, patch_lightkube_client_get
+    ):
+        self.harness.update_config({"enable-telnet": True})
+        self._set_up_running_workload(patch_lightkube_client_get)
+
+        with patch("ops.model.Container.restart") as patch_restart:
+            self.harness.update_config({"performance-profile": "high-throughput"})
+
+        patch_restart.assert_called_once_with("du")
+        action_output = self.harness.run_action("get-config-changes")
+        self.assertEqual(action_output.results, {"hot": "", "restart": "MACRLCs,gNBs.SCTP"})
+
+    @patch("charm.time.time", new=lambda: 1000000.0)
+    @patch("lightkube.Client.get")
+    @patch("ops.model.Container.push", new=lambda *args, **kwargs: None)
+    def test_given_other_unit_restarting_when_restart_required_then_unit_restarts_once_other_unit_withdraws_request(  # noqa: E501
+        self, patch_lightkube_client_get
+    ):
+        self._set_up_running_workload(patch_lightkube_client_get)
+        relation_id = self.harness.model.get_relation("replicas").id
+        self.harness.add_relation_unit(relation_id, "oai-5g-du/1")
+        self.harness.update_relation_data(
+            relation_id, "oai-5g-du/1", {"restart-request": "abc", "serving": "true"}
+        )
+        self.assertEqual(
+            json.loads(self.harness.get_relation_data(relation_id, "oai-5g-du")["restart-grants"]),
+            {"oai-5g-du/1": {"request": "abc", "time": 1000000.0, "serving": True}},
+        )
+
+        with patch("ops.model.Container.restart") as patch_restart:
+            self.harness.update_config({"performance-profile": "high-throughput"})
+
+        patch_restart.assert_not_called()
+        self.assertEqual(
+            self.harness.model.unit.status, WaitingStatus("Waiting for other units to restart")
+        )
+        request = self.harness.get_relation_data(relation_id, "oai-5g-du/0")["restart-request"]
+
+        with patch("ops.model.Container.restart") as patch_restart:
+            self.harness.update_relation_data(
+                relation_id, "oai-5g-du/1", {"restart-request": "", "serving": "true"}
+            )
+
+        patch_restart.assert_called_once_with("du")
+        self.assertEqual(
+            json.loads(self.harness.get_relation_data(relation_id, "oai-5g-du")["restart-grants"]),
+            {"oai-5g-du/0": {"request": request, "time": 1000000.0, "serving": True}},
+        )
+
+        self.harness.charm.on.update_status.emit()
+
+        unit_data = self.harness.get_relation_data(relation_id, "oai-5g-du/0")
+        self.assertEqual(unit_data["serving"], "true")
+        self.assertNotIn("restart-request", unit_data)
+        self.assertEqual(
+            self.harness.get_relation_data(relation_id, "oai-5g-du")["restart-grants"], "{}"
+        )
+
+    @patch("lightkube.Client.get")
+    @patch("ops.model.Container.push", new=lambda *args, **kwargs: None)
+    def test_given_other_unit_stuck_after_restart_when_restart_required_then_unit_restarts(
+        self, patch_lightkube_client_get
+    ):
+        self._set_up_running_workload(patch_lightkube_client_get)
+        relation_id = self.harness.model.get_relation("replicas").id
+        self.harness.add_relation_unit(relation_id, "oai-5g-du/1")
+        with patch("charm.time.time", return_value=1000000.0):
+            self.harness.update_relation_data(
+                relation_id, "oai-5g-du/1", {"restart-request": "abc", "serving": "true"}
+            )
+        self.harness.update_relation_data(relation_id, "oai-5g-du/1", {"serving": "false"})
+
+        with patch("ops.model.Container.restart") as patch_restart, patch(
+            "charm.time.time", return_value=1000000.0 + GRANT_TIMEOUT_SECONDS
+        ):
+            self.harness.update_config(
+                {
+                    "performance-profile": "high-throughput",
+                    "rolling-restart-min-serving-percent": 0,
+                }
+            )
+
+        patch_restart.assert_called_once_with("du")
+
+    @patch("lightkube.Client.get")
+    @patch("ops.model.Container.push", new=lambda *args, **kwargs: None)
+    def test_given_other_unit_grant_times_out_when_update_status_then_unit_restarts(
+        self, patch_lightkube_client_get
+    ):
+        self._set_up_running_workload(patch_lightkube_client_get)
+        relation_id = self.harness.model.get_relation("replicas").id
+        self.harness.add_relation_unit(relation_id, "oai-5g-du/1")
+        with patch("charm.time.time", return_value=1000000.0):
+            self.harness.update_relation_data(
+                relation_id, "oai-5g-du/1", {"restart-request": "abc", "serving": "true"}
+            )
+            self.harness.update_relation_data(relation_id, "oai-5g-du/1", {"serving": "false"})
+            self.harness.update_config(
+                {
+                    "performance-profile": "high-throughput",
+                    "rolling-restart-min-serving-percent": 0,
+                }
+            )
+
+        with patch("ops.model.Container.restart") as patch_restart, patch(
+            "charm.time.time", return_value=1000000.0 + GRANT_TIMEOUT_SECONDS
+        ):
+            self.harness.charm.on.update_status.emit()
+
+        patch_restart.assert_called_once_with("du")
+
+    @patch("lightkube.Client.get")
+    @patch("ops.model.Container.push", new=lambda *args, **kwargs: None)
+    def test_given_configuration_unchanged_when_config_changed_then_workload_is_not_restarted(
+        self, patch_lightkube_client_get
+    ):
+        self._set_up_running_workload(patch_lightkube_client_get)
+
+        with patch("ops.model.Container.restart") as patch_restart:
+            self.harness.charm.on.config_changed.emit()
+
+        patch_restart.assert_not_called()
+
+    @patch("charm.get_interface_ipv4_address")
+    @patch("ops.model.Container.push")
+    def test_given_f1_secondary_network_when_config_changed_then_interface_address_is_used_and_published(  # noqa: E501
+        self, patch_push, patch_get_interface_ipv4_address
+    ):
+        patch_get_interface_ipv4_address.return_value = "192.168.250.10"
+        self.harness.update_config(
+            {"f1-network-type": "macvlan", "f1-network-subnet": "192.168.250.0/24"}
+        )
+        self.harness.set_leader(True)
+        self._create_peer_relation()
+        self.harness.set_can_connect(container="du", val=True)
+
+        self._create_cu_relation_with_valid_data()
+
+        patch_get_interface_ipv4_address.assert_called_with("f1")
+        content = patch_push.call_args.kwargs["source"]
+        self.assertIn('    local_n_if_name = "f1";\n', content)
+        self.assertIn('    local_n_address = "192.168.250.10";\n', content)
+        relation = self.harness.model.get_relation("fiveg-f1")
+        self.assertEqual(
+            relation.data[self.harness.model.app]["du_address"], "192.168.250.10"  # type: ignore[union-attr]  # noqa: E501
+        )
+        self.patch_apply_network_attachment_definition.assert_called_with(
+            name="oai-5g-du-f1",
+            config={
+                "cniVersion": "0.3.1",
+                "type": "macvlan",
+                "master": "eth0",
+                "mode": "bridge",
+                "ipam": {"type": "host-local", "subnet": "192.168.250.0/24"},
+            },
+        )
+        self.assertEqual(
+            self.patch_statefulset_is_patched.call_args.kwargs["pod_annotations"],
+            {"k8s.v1.cni.cncf.io/networks": '[{"name": "oai-5g-du-f1", "interface": "f1"}]'},
+        )
+
+    def test_given_f1_secondary_network_never_enabled_when_config_changed_then_network_attachment_definition_is_not_deleted(  # noqa: E501
+        self,
+    ):
+        self.harness.set_leader(True)
+
+        self.harness.update_config({"cpu-measurements": True})
+
+        self.patch_delete_network_attachment_definition.assert_not_called()
+
+    def test_given_f1_secondary_network_enabled_when_it_is_disabled_then_network_attachment_definition_is_deleted_once(  # noqa: E501
+        self,
+    ):
+        self.harness.set_leader(True)
+        self.harness.update_config(
+            {"f1-network-type": "macvlan", "f1-network-subnet": "192.168.250.0/24"}
+        )
+
+        self.harness.update_config({"f1-network-type": ""})
+        self.harness.update_config({"cpu-measurements": True})
+
+        self.patch_delete_network_attachment_definition.assert_called_once_with(
+            name="oai-5g-du-f1"
+        )
+
+    def test_given_f1_secondary_network_without_subnet_when_config_changed_then_status_is_blocked(  # noqa: E501
+        self,
+    ):
+        self.harness.update_config({"f1-network-type": "macvlan"})
+
+        self.assertEqual(
+            self.harness.model.unit.status,
+            BlockedStatus("Invalid configuration: F1 network subnet must be an IPv4 CIDR, got ''"),
+        )
+
+    @patch("charm.Kubernetes.patch_statefulset")
+    @patch("charm.Kubernetes.get_host_ports_in_use")
+    @patch("charm.Kubernetes.get_pod_node_name")
+    def test_given_host_network_and_port_used_on_node_when_config_changed_then_status_is_blocked_and_statefulset_is_not_patched(  # noqa: E501
+        self, patch_get_pod_node_name, patch_get_host_ports_in_use, patch_patch_statefulset
+    ):
+        self.patch_statefulset_is_patched.return_value = False
+        patch_get_pod_node_name.return_value = "node-1"
+        patch_get_host_ports_in_use.return_value = {(2152, "UDP"): "core/upf-0"}
+        self.harness.set_leader(True)
+        patch_patch_statefulset.reset_mock()
+
+        self.harness.update_config({"host-network": True})
+
+        patch_get_host_ports_in_use.assert_called_with(node_name="node-1", exclude_app="oai-5g-du")
+        patch_patch_statefulset.assert_not_called()
+        self.assertEqual(
+            self.harness.model.unit.status,
+            BlockedStatus("Host network port collision: 2152/UDP (s1u) used by core/upf-0"),
+        )
+
+    @patch("charm.Kubernetes.patch_statefulset")
+    @patch("charm.Kubernetes.get_host_ports_in_use")
+    @patch("charm.Kubernetes.get_pod_node_name")
+    def test_given_host_network_and_no_port_collision_when_config_changed_then_statefulset_is_patched(  # noqa: E501
+        self, patch_get_pod_node_name, patch_get_host_ports_in_use, patch_patch_statefulset
+    ):
+        self.patch_statefulset_is_patched.return_value = False
+        patch_get_pod_node_name.return_value = "node-1"
+        patch_get_host_ports_in_use.return_value = {}
+        self.harness.set_leader(True)
+
+        self.harness.update_config({"host-network": True})
+
+        patch_patch_statefulset.assert_called_with(
+            statefulset_name="oai-5g-du",
+            pod_annotations={"k8s.v1.cni.cncf.io/networks": None},
+            host_network=True,
+            pod_sysctls={},
+            config_map_name=None,
+            config_map_mount_path="/opt/oai-gnb/etc-configmap",
+            iq_volume_size=None,
+            iq_volume_mount_path="/var/lib/oai-iq",
+            log_volume_size=None,
+            log_volume_mount_path="/var/log/oai",
+            node_selector={},
+            tolerations=[],
+            spread_across_nodes=False,
+        )
+
+    @patch("charm.Kubernetes.patch_statefulset")
+    @patch("charm.Kubernetes.get_nodes")
+    def test_given_no_node_matches_node_selector_when_config_changed_then_statefulset_is_not_patched_and_status_is_blocked(  # noqa: E501
+        self, patch_get_nodes, patch_patch_statefulset
+    ):
+        self.patch_statefulset_is_patched.return_value = False
+        patch_get_nodes.return_value = [
+            NodeInfo(name="node-1", labels={"realtime": "true"}, taints=[], unschedulable=True),
+            NodeInfo(name="node-2", labels={}, taints=[]),
+        ]
+        self.harness.set_leader(True)
+        patch_patch_statefulset.reset_mock()
+
+        self.harness.update_config({"node-selector": "realtime=true"})
+
+        patch_patch_statefulset.assert_not_called()
+        self.assertEqual(
+            self.harness.model.unit.status,
+            BlockedStatus(
+                "No suitable node: no schedulable node matches node-selector and tolerations"
+            ),
+        )
+
+    @patch("charm.get_interface_name_for_address")
+    @patch("charm.Kubernetes.get_pod_host_ip")
+    @patch("ops.model.Container.push")
+    def test_given_host_network_when_config_changed_then_node_address_is_used_and_published(
+        self, patch_push, patch_get_pod_host_ip, patch_get_interface_name_for_address
+    ):
+        patch_get_pod_host_ip.return_value = "10.0.0.5"
+        patch_get_interface_name_for_address.return_value = "enp1s0"
+        self.harness.update_config({"host-network": True})
+        self.harness.set_leader(True)
+        self._create_peer_relation()
+        self.harness.set_can_connect(container="du", val=True)
+
+        self._create_cu_relation_with_valid_data()
+
+        patch_get_pod_host_ip.assert_called_with("oai-5g-du-0")
+        content = patch_push.call_args.kwargs["source"]
+        self.assertIn('    local_n_if_name = "enp1s0";\n', content)
+        self.assertIn('    local_n_address = "10.0.0.5";\n', content)
+        relation = self.harness.model.get_relation("fiveg-f1")
+        self.assertEqual(
+            relation.data[self.harness.model.app]["du_address"], "10.0.0.5"  # type: ignore[union-attr]  # noqa: E501
+        )
+
+    @patch("lightkube.Client.get")
+    @patch("ops.model.Container.push", new=lambda *args, **kwargs: None)
+    def test_given_sysctls_when_workload_starts_then_unsafe_sysctls_are_written_and_read_back(
+        self, patch_lightkube_client_get
+    ):
+        self.harness.update_config(
+            {"sysctls": "net.core.rmem_max=26214400,net.sctp.sctp_rmem=4096  1048576 26214400"}
+        )
+
+        self._set_up_running_workload(patch_lightkube_client_get)
+
+        self.assertEqual(
+            self.sysctl_values,
+            {
+                "/proc/sys/net/core/rmem_max": "26214400",
+                "/proc/sys/net/sctp/sctp_rmem": "4096 1048576 26214400",
+            },
+        )
+        action_output = self.harness.run_action("get-sysctls")
+        self.assertEqual(
+            json.loads(action_output.results["effective"]),
+            {"net.core.rmem_max": "26214400", "net.sctp.sctp_rmem": "4096 1048576 26214400"},
+        )
+
+    @patch("lightkube.Client.get")
+    @patch("ops.model.Container.push", new=lambda *args, **kwargs: None)
+    def test_given_default_sysctls_when_workload_starts_then_only_namespaced_sysctls_are_written(
+        self, patch_lightkube_client_get
+    ):
+        self._set_up_running_workload(patch_lightkube_client_get)
+
+        self.harness.charm.on.update_status.emit()
+
+        self.assertEqual(
+            sorted(self.sysctl_values),
+            [
+                "/proc/sys/net/ipv4/udp_rmem_min",
+                "/proc/sys/net/ipv4/udp_wmem_min",
+                "/proc/sys/net/sctp/sctp_rmem",
+                "/proc/sys/net/sctp/sctp_wmem",
+            ],
+        )
+        self.assertEqual(self.harness.model.unit.status, ActiveStatus())
+
+    @patch("lightkube.Client.get")
+    @patch("ops.model.Container.push", new=lambda *args, **kwargs: None)
+    def test_given_sysctls_change_when_config_changed_then_workload_is_restarted(
+        self, patch_lightkube_client_get
+    ):
+        self._set_up_running_workload(patch_lightkube_client_get)
+
+        with patch("ops.model.Container.restart") as patch_restart:
+            self.harness.update_config({"sysctls": "net.core.rmem_max=8388608"})
+
+        patch_restart.assert_called_once_with("du")
+        self.assertEqual(self.sysctl_values["/proc/sys/net/core/rmem_max"], "8388608")
+
+    @patch("lightkube.Client.get")
+    @patch("ops.model.Container.push", new=lambda *args, **kwargs: None)
+    def test_given_sysctl_not_namespaced_when_workload_starts_then_status_reports_it(
+        self, patch_lightkube_client_get
+    ):
+        def write_sysctl(args: ops.testing.ExecArgs) -> ops.testing.ExecResult:
+            if args.command[-1] == "/proc/sys/net/core/rmem_max":
+                return ops.testing.ExecResult(exit_code=1, stderr="Read-only file system")
+            return self._write_sysctl(args)
+
+        self.harness.handle_exec("du", ["sh"], handler=write_sysctl)
+        self.harness.update_config(
+            {"sysctls": "net.core.rmem_max=26214400,net.sctp.sctp_rmem=4096 1048576 26214400"}
+        )
+        self._set_up_running_workload(patch_lightkube_client_get)
+
+        self.harness.charm.on.update_status.emit()
+
+        self.assertEqual(
+            self.harness.model.unit.status, ActiveStatus("Sysctls not applied: net.core.rmem_max")
+        )
+
+    def test_given_safe_sysctl_when_config_changed_then_it_is_set_in_pod_security_context(
+        self,
+    ):
+        self.harness.set_leader(True)
+
+        self.harness.update_config(
+            {"sysctls": "net.ipv4.ip_local_port_range=1024 65000,net.core.rmem_max=26214400"}
+        )
+
+        self.assertEqual(
+            self.patch_statefulset_is_patched.call_args.kwargs["pod_sysctls"],
+            {"net.ipv4.ip_local_port_range": "1024 65000"},
+        )
+
+    def test_given_invalid_sysctl_when_config_changed_then_status_is_blocked(self):
+        self.harness.update_config({"sysctls": "net.core.rmem_max"})
+
+        self.assertEqual(
+            self.harness.model.unit.status,
+            BlockedStatus(
+                "Invalid configuration: Invalid sysctl net.core.rmem_max, expected name=value"
+            ),
+        )
+
+    def test_given_unknown_setting_in_gnb_config_overrides_when_config_changed_then_status_is_blocked(  # noqa: E501
+        self,
+    ):
+        self.harness.set_can_connect(container="du", val=True)
+
+        self.harness.update_config({"gnb-config-overrides": "MACRLCs: {unknown: 1}"})
+
+        self.assertEqual(
+            self.harness.model.unit.status,
+            BlockedStatus("Invalid configuration: Unknown setting unknown in MacRlc"),
+        )
+
+    @patch("lightkube.Client.get")
+    @patch("ops.model.Container.push")
+    def test_given_custom_f1_ports_when_config_changed_then_they_are_set_in_config_file(
+        self, patch_push, patch_lightkube_client_get
+    ):
+        self.harness.update_config({"f1-c-port": 38472, "cu-f1-c-port": 38473, "f1-u-port": 2154})
+
+        self._set_up_running_workload(patch_lightkube_client_get)
+
+        content = patch_push.call_args.kwargs["source"]
+        self.assertIn("    local_n_portc = 38472;\n", content)
+        self.assertIn("    local_n_portd = 2154;\n", content)
+        self.assertIn("    remote_n_portc = 38473;\n", content)
+
+    def test_given_f1_u_port_used_by_s1u_when_config_changed_then_status_is_blocked(self):
+        self.harness.update_config({"f1-u-port": 2152})
+
+        self.assertEqual(
+            self.harness.model.unit.status,
+            BlockedStatus("Invalid configuration: 2152/UDP is used by both s1u and f1"),
+        )
+
+    @patch("lightkube.Client.get")
+    def test_given_workload_configured_when_config_changed_then_stats_exporter_is_pushed(
+        self, patch_lightkube_client_get
+    ):
+        container = self.harness.model.unit.get_container("du")
+        self.harness.set_can_connect(container="du", val=True)
+        container.make_dir("/opt/oai-gnb/etc", make_parents=True)
+
+        self._set_up_running_workload(patch_lightkube_client_get)
+
+        exporter = container.pull("/opt/oai-gnb/exporter/stats_exporter.py")
+        self.assertIn("class StatsExporter", exporter.read())
+        service = container.get_service("stats-exporter")
+        self.assertTrue(service.is_running())
+
+    def test_given_unit_is_leader_when_metrics_endpoint_relation_joined_then_scrape_job_is_published(  # noqa: E501
+        self,
+    ):
+        self.harness.set_leader(True)
+
+        relation_id = self.harness.add_relation("metrics-endpoint", "prometheus")
+        self.harness.add_relation_unit(relation_id, "prometheus/0")
+
+        app_data = self.harness.get_relation_data(relation_id, self.harness.charm.app.name)
+        self.assertEqual(
+            json.loads(app_data["scrape_jobs"]),
+            [{"metrics_path": "/metrics", "static_configs": [{"targets": ["*:9102"]}]}],
+        )
+        self.assertEqual(json.loads(app_data["scrape_metadata"])["application"], "oai-5g-du")
+        unit_data = self.harness.get_relation_data(relation_id, self.harness.charm.unit.name)
+        self.assertEqual(unit_data["prometheus_scrape_unit_name"], "oai-5g-du/0")
+        self.assertIn("prometheus_scrape_unit_address", unit_data)
+
+    def test_given_unit_address_changed_when_pebble_ready_then_it_is_republished(self):
+        relation_id = self.harness.add_relation("metrics-endpoint", "prometheus")
+        self.harness.add_network("10.1.0.7", endpoint="metrics-endpoint", relation_id=relation_id)
+
+        self.harness.container_pebble_ready("du")
+
+        unit_data = self.harness.get_relation_data(relation_id, self.harness.charm.unit.name)
+        self.assertEqual(unit_data["prometheus_scrape_unit_address"], "10.1.0.7")
+
+    @patch("lightkube.Client.get")
+    @patch("ops.model.Container.push", new=lambda *args, **kwargs: None)
+    def test_given_thread_stats_metrics_enabled_when_config_changed_then_only_exporter_is_replanned(  # noqa: E501
+        self, patch_lightkube_client_get
+    ):
+        self._set_up_running_workload(patch_lightkube_client_get)
+
+        with patch("ops.model.Container.restart") as patch_restart:
+            self.harness.update_config({"thread-stats-metrics": True})
+
+        patch_restart.assert_not_called()
+        plan = self.harness.get_container_pebble_plan("du").to_dict()
+        self.assertTrue(plan["services"]["stats-exporter"]["command"].endswith(" --thread-stats"))
+
+    def test_given_softmodem_running_when_thread_stats_action_then_threads_are_returned(self):
+        self.harness.set_can_connect(container="du", val=True)
+        stat_fields = " ".join(["S"] + ["0"] * 10 + ["{utime}", "0"] + ["0"] * 23 + ["2"])
+        first_stat = "1235 (ru_thread) " + stat_fields.format(utime=100)
+        second_stat = "1235 (ru_thread) " + stat_fields.format(utime=150)
+        self.harness.handle_exec(
+            "du",
+            ["sh", "-c", SAMPLER_SCRIPT],
+            result=f"clk_tck 100\n== 1235\n{first_stat}\n@@ sample\n== 1235\n{second_stat}\n",
+        )
+
+        action_output = self.harness.run_action("thread-stats", {"interval": 0.5})
+
+        self.assertEqual(
+            action_output.results["threads"].splitlines()[1],
+            "   1235 ru_thread         100.0       0.0       0.0    2",
+        )
+
+    def test_given_softmodem_not_running_when_thread_stats_action_then_action_fails(self):
+        self.harness.set_can_connect(container="du", val=True)
+        self.harness.handle_exec("du", ["sh", "-c", SAMPLER_SCRIPT], result=3)
+
+        with self.assertRaises(ops.testing.ActionFailed) as context:
+            self.harness.run_action("thread-stats")
+
+        self.assertEqual(context.exception.message, "nr-softmodem is not running")
+
+    @patch("charm.urlopen")
+    def test_given_stats_exporter_running_when_get_kpis_action_then_kpis_are_returned(
+        self, patch_urlopen
+    ):
+        patch_urlopen.return_value.__enter__.return_value.read.return_value = (
+            b'{"f1-setup-latency": {"count": 1, "last": 0.25}}'
+        )
+
+        action_output = self.harness.run_action("get-kpis")
+
+        patch_urlopen.assert_called_once_with("http://127.0.0.1:9102/kpis", timeout=5)
+        self.assertEqual(
+            json.loads(action_output.results["f1-setup-latency"]), {"count": 1, "last": 0.25}
+        )
+
+    @patch("charm.urlopen")
+    def test_given_stats_exporter_not_running_when_get_kpis_action_then_action_fails(
+        self, patch_urlopen
+    ):
+        patch_urlopen.side_effect = ConnectionRefusedError(111, "Connection refused")
+
+        with self.assertRaises(ops.testing.ActionFailed) as context:
+            self.harness.run_action("get-kpis")
+
+        self.assertEqual(
+            context.exception.message,
+            "Couldn't get KPIs from the stats exporter: [Errno 111] Connection refused",
+        )
+
+    @patch("lightkube.Client.get")
+    @patch("ops.model.Container.push", new=lambda *args, **kwargs: None)
+    def test_given_checks_pass_when_update_status_then_status_is_active(
+        self, patch_lightkube_client_get
+    ):
+        self._set_up_running_workload(patch_lightkube_client_get)
+
+        self.harness.charm.on.update_status.emit()
+
+        self.assertEqual(self.harness.model.unit.status, ActiveStatus())
+
+    @patch("lightkube.Client.get")
+    @patch("ops.model.Container.push", new=lambda *args, **kwargs: None)
+    def test_given_running_workload_when_update_status_then_kubernetes_is_not_called(
+        self, patch_lightkube_client_get
+    ):
+        self._set_up_running_workload(patch_lightkube_client_get)
+        patch_lightkube_client_get.reset_mock()
+        self.patch_statefulset_is_patched.reset_mock()
+        self.patch_apply_network_attachment_definition.reset_mock()
+
+        self.harness.charm.on.update_status.emit()
+
+        patch_lightkube_client_get.assert_not_called()
+        self.patch_statefulset_is_patched.assert_not_called()
+        self.patch_apply_network_attachment_definition.assert_not_called()
+        self.patch_delete_network_attachment_definition.assert_not_called()
+        self.assertEqual(self.harness.model.unit.status, ActiveStatus())
+
+    @patch("lightkube.Client.get")
+    @patch("ops.model.Container.push", new=lambda *args, **kwargs: None)
+    def test_given_invalid_configuration_when_update_status_then_status_is_kept(
+        self, patch_lightkube_client_get
+    ):
+        self._set_up_running_workload(patch_lightkube_client_get)
+        self.harness.update_config({"f1-network-type": "macvlan"})
+
+        self.harness.charm.on.update_status.emit()
+
+        self.assertEqual(
+            self.harness.model.unit.status,
+            BlockedStatus("Invalid configuration: F1 network subnet must be an IPv4 CIDR, got ''"),
+        )
+
+    @patch("ops.model.Container.get_checks")
+    @patch("lightkube.Client.get")
+    @patch("ops.model.Container.push", new=lambda *args, **kwargs: None)
+    def test_given_f1_association_check_down_when_check_failed_then_status_is_waiting(
+        self, patch_lightkube_client_get, patch_get_checks
+    ):
+        self._set_up_running_workload(patch_lightkube_client_get)
+        patch_get_checks.return_value = {
+            "du-alive": CheckInfo(
+                name="du-alive", level=CheckLevel.ALIVE, status=CheckStatus.UP
+            ),
+            "f1-association": CheckInfo(
+                name="f1-association",
+                level=CheckLevel.READY,
+                status=CheckStatus.DOWN,
+                failures=3,
+            ),
+        }
+
+        with patch("ops.model.Container.restart") as patch_restart:
+            self.harness.charm.on.du_pebble_check_failed.emit(
+                self.harness.model.unit.get_container("du"), "f1-association"
+            )
+
+        patch_restart.assert_not_called()
+        plan = self.harness.get_container_pebble_plan("du").to_dict()
+        self.assertNotIn("f1-association", plan["services"]["du"]["on-check-failure"])
+        self.assertEqual(
+            self.harness.model.unit.status,
+            WaitingStatus("Waiting for nr-softmodem to be ready, failing checks: f1-association"),
+        )
+
+    @patch("lightkube.Client.get")
+    @patch("ops.model.Container.push", new=lambda *args, **kwargs: None)
+    def test_given_stats_freshness_check_enabled_when_config_changed_then_check_restarts_workload(  # noqa: E501
+        self, patch_lightkube_client_get
+    ):
+        self._set_up_running_workload(patch_lightkube_client_get)
+
+        self.harness.update_config({"check-stats-freshness": True})
+
+        plan = self.harness.get_container_pebble_plan("du").to_dict()
+        self.assertEqual(plan["checks"]["stats-fresh"]["level"], "alive")
+        self.assertEqual(plan["services"]["du"]["on-check-failure"]["stats-fresh"], "restart")
+
+    def test_given_ul_heavy_tdd_pattern_when_get_tdd_pattern_action_then_capacity_ratio_is_returned(  # noqa: E501
+        self,
+    ):
+        self.harness.update_config({"tdd-pattern": "ul-heavy"})
+
+        action_output = self.harness.run_action("get-tdd-pattern")
+
+        self.assertEqual(action_output.results["dl-slots"], 2)
+        self.assertEqual(action_output.results["ul-slots"], 7)
+        self.assertEqual(action_output.results["dl-ul-ratio"], "0.33")
+
+    @patch("charm.time.sleep")
+    @patch("charm.Kubernetes.apply_config_map")
+    @patch("charm.Kubernetes.get_config_map_data")
+    @patch("lightkube.Client.get")
+    def test_given_config_map_delivery_and_key_not_mounted_when_config_changed_then_status_is_waiting(  # noqa: E501
+        self,
+        patch_lightkube_client_get,
+        patch_get_config_map_data,
+        patch_apply_config_map,
+        patch_sleep,
+    ):
+        patch_get_config_map_data.return_value = {}
+        self.harness.update_config({"config-delivery": "configmap"})
+
+        self._set_up_running_workload(patch_lightkube_client_get)
+
+        data = patch_apply_config_map.call_args.kwargs["data"]
+        key, content = list(data.items())[0]
+        self.assertEqual(key, config_map_key("oai-5g-du-0", content))
+        self.assertEqual(patch_apply_config_map.call_args.kwargs["name"], "oai-5g-du-config")
+        self.assertFalse(self.harness.model.unit.get_container("du").exists("/opt/oai-gnb/etc"))
+        self.assertEqual(
+            self.harness.model.unit.status,
+            WaitingStatus("Waiting for gnb.conf to be mounted from ConfigMap"),
+        )
+
+    @patch("charm.time.sleep")
+    @patch("charm.Kubernetes.apply_config_map")
+    @patch("charm.Kubernetes.get_config_map_data")
+    @patch("lightkube.Client.get")
+    def test_given_config_map_key_mounted_while_polling_when_config_changed_then_symlink_is_swapped(  # noqa: E501
+        self,
+        patch_lightkube_client_get,
+        patch_get_config_map_data,
+        patch_apply_config_map,
+        patch_sleep,
+    ):
+        swaps = []
+
+        def swap(args: ops.testing.ExecArgs) -> ops.testing.ExecResult:
+            swaps.append(args.command[-2])
+            return ops.testing.ExecResult()
+
+        def project_key(_: float) -> None:
+            key, content = list(patch_apply_config_map.call_args.kwargs["data"].items())[0]
+            self.harness.model.unit.get_container("du").push(
+                f"/opt/oai-gnb/etc-configmap/{key}", content, make_dirs=True
+            )
+
+        self.harness.handle_exec("du", ["sh", "-c", SWAP_SCRIPT], handler=swap)
+        patch_get_config_map_data.return_value = {}
+        patch_sleep.side_effect = project_key
+        self.harness.update_config({"config-delivery": "configmap"})
+
+        self._set_up_running_workload(patch_lightkube_client_get)
+
+        self.assertEqual(len(swaps), 1)
+        self.assertNotEqual(
+            self.harness.model.unit.status,
+            WaitingStatus("Waiting for gnb.conf to be mounted from ConfigMap"),
+        )
+
+    @patch("charm.time.sleep")
+    @patch("charm.Kubernetes.apply_config_map")
+    @patch("charm.Kubernetes.get_config_map_data")
+    @patch("lightkube.Client.get")
+    def test_given_config_map_key_not_mounted_when_config_changed_then_event_is_deferred_until_it_is(  # noqa: E501
+        self,
+        patch_lightkube_client_get,
+        patch_get_config_map_data,
+        patch_apply_config_map,
+        patch_sleep,
+    ):
+        swaps = []
+
+        def swap(args: ops.testing.ExecArgs) -> ops.testing.ExecResult:
+            swaps.append(args.command[-2])
+            return ops.testing.ExecResult()
+
+        self.harness.handle_exec("du", ["sh", "-c", SWAP_SCRIPT], handler=swap)
+        patch_get_config_map_data.return_value = {}
+        self.harness.update_config({"config-delivery": "configmap"})
+        self._set_up_running_workload(patch_lightkube_client_get)
+        key, content = list(patch_apply_config_map.call_args.kwargs["data"].items())[0]
+        self.harness.model.unit.get_container("du").push(
+            f"/opt/oai-gnb/etc-configmap/{key}", content, make_dirs=True
+        )
+
+        self.harness.framework.reemit()
+
+        self.assertIn(f"/opt/oai-gnb/etc-configmap/{key}", swaps)
+
+    @patch("charm.time.sleep")
+    @patch("charm.Kubernetes.apply_config_map")
+    @patch("charm.Kubernetes.get_config_map_data")
+    @patch("lightkube.Client.get")
+    def test_given_config_map_delivery_and_key_mounted_when_deferred_event_is_reemitted_then_symlink_is_swapped_and_previous_key_removed(  # noqa: E501
+        self,
+        patch_lightkube_client_get,
+        patch_get_config_map_data,
+        patch_apply_config_map,
+        patch_sleep,
+    ):
+        swaps = []
+
+        def swap(args: ops.testing.ExecArgs) -> ops.testing.ExecResult:
+            swaps.append(args.command[-2:])
+            return ops.testing.ExecResult()
+
+        self.harness.handle_exec("du", ["sh", "-c", SWAP_SCRIPT], handler=swap)
+        previous_key = config_map_key("oai-5g-du-0", "previous")
+        patch_get_config_map_data.return_value = {previous_key: "previous"}
+        self.harness.update_config({"config-delivery": "configmap"})
+        self._set_up_running_workload(patch_lightkube_client_get)
+        key, content = list(patch_apply_config_map.call_args.kwargs["data"].items())[0]
+        container = self.harness.model.unit.get_container("du")
+        container.push(f"/opt/oai-gnb/etc-configmap/{key}", content, make_dirs=True)
+        patch_get_config_map_data.return_value = {previous_key: "previous", key: content}
+
+        self.harness.framework.reemit()
+
+        self.assertEqual(
+            {tuple(swap) for swap in swaps},
+            {(f"/opt/oai-gnb/etc-configmap/{key}", "/opt/oai-gnb/etc/gnb.conf")},
+        )
+        patch_apply_config_map.assert_called_with(
+            name="oai-5g-du-config",
+            data={previous_key: None},
+            owner_statefulset_name="oai-5g-du",
+        )
+        self.assertNotEqual(
+            self.harness.model.unit.status,
+            WaitingStatus("Waiting for gnb.conf to be mounted from ConfigMap"),
+        )
+
+    @patch("ops.model.Container.get_checks")
+    @patch("lightkube.Client.get")
+    def test_given_known_good_config_when_new_config_crash_loops_then_good_config_is_restored(
+        self, patch_lightkube_client_get, patch_get_checks
+    ):
+        patch_get_checks.return_value = {
+            "du-alive": CheckInfo(name="du-alive", level=CheckLevel.ALIVE, status=CheckStatus.UP)
+        }
+        self.harness.set_can_connect(container="du", val=True)
+        container = self.harness.model.unit.get_container("du")
+        container.make_dir("/opt/oai-gnb/etc", make_parents=True)
+        self._set_up_running_workload(patch_lightkube_client_get)
+        self.harness.charm.on.update_status.emit()
+        good_content = container.pull("/opt/oai-gnb/etc/gnb.conf").read()
+        self.harness.update_config({"gnb-config-overrides": "log_config: {mac_log_level: debug}"})
+        bad_content = container.pull("/opt/oai-gnb/etc/gnb.conf").read()
+        patch_get_checks.return_value = {
+            "du-alive": CheckInfo(
+                name="du-alive", level=CheckLevel.ALIVE, status=CheckStatus.DOWN, failures=3
+            )
+        }
+
+        with patch("ops.model.Container.restart") as patch_restart:
+            self.harness.charm.on.du_pebble_check_failed.emit(container, "du-alive")
+            self.harness.charm.on.update_status.emit()
+
+        patch_restart.assert_called_once_with("du")
+        self.assertEqual(container.pull("/opt/oai-gnb/etc/gnb.conf").read(), good_content)
+        good_hash = config_hash(good_content)
+        bad_hash = config_hash(bad_content)
+        self.assertEqual(
+            self.harness.model.unit.status,
+            BlockedStatus(f"Rolled back gnb.conf {bad_hash} to {good_hash}: du-alive check down"),
+        )
+        action_output = self.harness.run_action("get-config-history")
+        self.assertEqual(
+            [entry["hash"] for entry in json.loads(action_output.results["good-configs"])],
+            [good_hash],
+        )
+        last_rollback = json.loads(action_output.results["last-rollback"])
+        self.assertEqual(
+            (last_rollback["rejected"], last_rollback["restored"], last_rollback["cause"]),
+            (bad_hash, good_hash, "du-alive check down"),
+        )
+
+    @patch("ops.model.Container.get_checks")
+    @patch("lightkube.Client.get")
+    @patch("ops.model.Container.push", new=lambda *args, **kwargs: None)
+    def test_given_no_known_good_config_when_workload_crash_loops_then_it_is_not_rolled_back(
+        self, patch_lightkube_client_get, patch_get_checks
+    ):
+        patch_get_checks.return_value = {
+            "du-alive": CheckInfo(
+                name="du-alive", level=CheckLevel.ALIVE, status=CheckStatus.DOWN, failures=3
+            )
+        }
+        self._set_up_running_workload(patch_lightkube_client_get)
+
+        self.harness.charm.on.update_status.emit()
+
+        self.assertEqual(
+            self.harness.model.unit.status,
+            WaitingStatus("Waiting for nr-softmodem to be ready, failing checks: du-alive"),
+        )
+        action_output = self.harness.run_action("get-config-history")
+        self.assertEqual(action_output.results["last-rollback"], "{}")
+
+    @patch("charm.is_statefulset_patched", return_value=True)
+    @patch("charm.AsyncKubernetes")
+    def test_given_service_and_statefulset_to_reconcile_when_install_then_they_are_reconciled_concurrently(  # noqa: E501
+        self, patch_async_kubernetes, _
+    ):
+        started = []
+        all_started = asyncio.Event()
+
+        async def wait_for_other_operation(*args, **kwargs):
+            started.append(args)
+            if len(started) == 2:
+                all_started.set()
+            await asyncio.wait_for(all_started.wait(), timeout=1)
+
+        kubernetes = patch_async_kubernetes.return_value
+        kubernetes.get_statefulset = AsyncMock(side_effect=wait_for_other_operation)
+        kubernetes.close = AsyncMock()
+        service_patcher = MagicMock()
+        service_patcher.reconcile_async = AsyncMock(side_effect=wait_for_other_operation)
+        self.harness.charm.service_patcher = service_patcher
+
+        self.harness.charm.on.install.emit()
+
+        self.assertEqual(len(started), 2)
+        service_patcher.reconcile_async.assert_awaited_once_with(kubernetes)
+        kubernetes.close.assert_awaited_once()
+
+    @patch("charm.is_statefulset_patched", return_value=True)
+    @patch("charm.AsyncKubernetes")
+    def test_given_service_reconcile_fails_when_install_then_error_is_raised(
+        self, patch_async_kubernetes, _
+    ):
+        kubernetes = patch_async_kubernetes.return_value
+        kubernetes.get_statefulset = AsyncMock()
+        kubernetes.close = AsyncMock()
+        service_patcher = MagicMock()
+        service_patcher.reconcile_async = AsyncMock(
+            side_effect=ApiError(status=Status(code=500, message="error"))
+        )
+        self.harness.charm.service_patcher = service_patcher
+
+        with self.assertRaises(ApiError):
+            self.harness.charm.on.install.emit()
+
+    @patch("lightkube.Client.get")
+    @patch("ops.model.Container.push")
+    def test_given_iq_record_mode_when_config_changed_then_samples_are_saved_to_recorder_fifo(
+        self, patch_push, patch_lightkube_client_get
+    ):
+        self.harness.update_config({"rfsim-iq-mode": "record", "rfsim-iq-ring-size-mb": 64})
+
+        self._set_up_running_workload(patch_lightkube_client_get)
+
+        content = patch_push.call_args.kwargs["source"]
+        self.assertIn('  options = ("saviq");\n', content)
+        self.assertIn('  IQfile = "/var/lib/oai-iq/rfsimulator.iqs";\n', content)
+        plan = self.harness.get_container_pebble_plan("du").to_dict()
+        self.assertEqual(
+            plan["services"]["iq-recorder"]["command"],
+            "python3 /opt/oai-gnb/exporter/iq_recorder.py record --size-mb 64",
+        )
+        self.assertEqual(plan["services"]["du"]["after"], ["iq-recorder"])
+
+    @patch("lightkube.Client.get")
+    @patch("ops.model.Container.push", new=lambda *args, **kwargs: None)
+    def test_given_iq_recorder_running_when_iq_mode_is_off_then_recorder_is_disabled_and_stopped(
+        self, patch_lightkube_client_get
+    ):
+        self.harness.update_config({"rfsim-iq-mode": "record"})
+        self._set_up_running_workload(patch_lightkube_client_get)
+
+        self.harness.update_config({"rfsim-iq-mode": "off"})
+
+        plan = self.harness.get_container_pebble_plan("du").to_dict()
+        self.assertEqual(plan["services"]["iq-recorder"]["startup"], "disabled")
+        self.assertNotIn("after", plan["services"]["du"])
+        container = self.harness.model.unit.get_container("du")
+        self.assertFalse(container.get_service("iq-recorder").is_running())
+
+    @patch("lightkube.Client.get")
+    def test_given_iq_replay_mode_and_recording_exists_when_config_changed_then_du_connects_to_replayer(  # noqa: E501
+        self, patch_lightkube_client_get
+    ):
+        self.harness.set_can_connect(container="du", val=True)
+        container = self.harness.model.unit.get_container("du")
+        container.make_dir("/opt/oai-gnb/etc", make_parents=True)
+        container.push("/var/lib/oai-iq/recordings/busy-hour.iqs", "", make_dirs=True)
+        self.harness.update_config(
+            {"rfsim-iq-mode": "replay", "rfsim-iq-replay-file": "busy-hour.iqs"}
+        )
+
+        self._set_up_running_workload(patch_lightkube_client_get)
+
+        self.assertIn(
+            '  serveraddr = "127.0.0.1";\n', container.pull("/opt/oai-gnb/etc/gnb.conf").read()
+        )
+        plan = self.harness.get_container_pebble_plan("du").to_dict()
+        self.assertEqual(
+            plan["services"]["iq-replay"]["command"],
+            "python3 /opt/oai-gnb/exporter/iq_recorder.py replay --file /var/lib/oai-iq/recordings/busy-hour.iqs --port 4043",  # noqa: E501
+        )
+        self.assertEqual(plan["services"]["du"]["after"], ["iq-replay"])
+
+    @patch("lightkube.Client.get")
+    def test_given_iq_replay_mode_and_recording_missing_when_config_changed_then_status_is_blocked(  # noqa: E501
+        self, patch_lightkube_client_get
+    ):
+        self.harness.update_config(
+            {"rfsim-iq-mode": "replay", "rfsim-iq-replay-file": "busy-hour.iqs"}
+        )
+
+        self._set_up_running_workload(patch_lightkube_client_get)
+
+        self.assertEqual(
+            self.harness.model.unit.status,
+            BlockedStatus("IQ recording busy-hour.iqs not found in /var/lib/oai-iq/recordings"),
+        )
+
+    def test_given_iq_replay_mode_without_recording_name_when_config_changed_then_status_is_blocked(  # noqa: E501
+        self,
+    ):
+        self.harness.update_config({"rfsim-iq-mode": "replay"})
+
+        self.assertEqual(
+            self.harness.model.unit.status,
+            BlockedStatus(
+                "Invalid configuration: rfsim-iq-replay-file must be the name of a recording, got ''"  # noqa: E501, W505
+            ),
+        )
+
+    def test_given_iq_record_mode_when_get_iq_recording_action_then_ring_is_exported_and_old_recordings_removed(  # noqa: E501
+        self,
+    ):
+        self.harness.update_config({"rfsim-iq-mode": "record"})
+        self.harness.set_can_connect(container="du", val=True)
+        container = self.harness.model.unit.get_container("du")
+        for name in ("rfsim-20260101T000000Z.iqs", "rfsim-20260102T000000Z.iqs"):
+            container.push(f"/var/lib/oai-iq/recordings/{name}", "", make_dirs=True)
+        exported = []
+
+        def export(args: ops.testing.ExecArgs) -> ops.testing.ExecResult:
+            output = args.command[-1]
+            container.push(output, "")
+            exported.append(output)
+            return ops.testing.ExecResult(stdout='{"blocks": 2, "bytes": 4096}')
+
+        self.harness.handle_exec(
+            "du", ["python3", "/opt/oai-gnb/exporter/iq_recorder.py", "export"], handler=export
+        )
+
+        with patch("charm.IQ_RECORDINGS_KEPT", 2):
+            action_output = self.harness.run_action("get-iq-recording")
+
+        self.assertEqual(action_output.results["path"], exported[0])
+        self.assertEqual(action_output.results["blocks"], 2)
+        self.assertEqual(action_output.results["bytes"], 4096)
+        recordings = [file.name for file in container.list_files("/var/lib/oai-iq/recordings")]
+        self.assertEqual(
+            sorted(recordings), ["rfsim-20260102T000000Z.iqs", action_output.results["name"]]
+        )
+
+    def test_given_iq_mode_off_when_get_iq_recording_action_then_action_fails(self):
+        with self.assertRaises(ops.testing.ActionFailed) as context:
+            self.harness.run_action("get-iq-recording")
+
+        self.assertEqual(context.exception.message, "IQ recording requires rfsim-iq-mode=record")
+
+    @patch("lightkube.Client.get")
+    @patch("ops.model.Container.push", new=lambda *args, **kwargs: None)
+    def test_given_log_to_file_when_config_changed_then_du_logs_to_log_writer_fifo(
+        self, patch_lightkube_client_get
+    ):
+        self.harness.update_config(
+            {"log-to-file": True, "log-file-max-size-mb": 16, "log-file-backups": 2}
+        )
+
+        self._set_up_running_workload(patch_lightkube_client_get)
+
+        plan = self.harness.get_container_pebble_plan("du").to_dict()
+        self.assertEqual(
+            plan["services"]["log-writer"]["command"],
+            "python3 /opt/oai-gnb/exporter/log_writer.py write --max-size-mb 16 --backups 2",
+        )
+        self.assertEqual(plan["services"]["du"]["after"], ["log-writer"])
+        self.assertTrue(
+            plan["services"]["du"]["command"].startswith(
+                "python3 /opt/oai-gnb/exporter/log_writer.py exec "
+                "--fifo /var/log/oai/nr-softmodem.fifo /opt/oai-gnb/bin/nr-softmodem "
+            )
+        )
+        self.assertIn("--log-service log-writer", plan["services"]["stats-exporter"]["command"])
+
+    @patch("lightkube.Client.get")
+    @patch("ops.model.Container.push", new=lambda *args, **kwargs: None)
+    def test_given_log_writer_running_when_log_to_file_is_disabled_then_log_writer_is_disabled_and_stopped(  # noqa: E501
+        self, patch_lightkube_client_get
+    ):
+        self.harness.update_config({"log-to-file": True})
+        self._set_up_running_workload(patch_lightkube_client_get)
+
+        self.harness.update_config({"log-to-file": False})
+
+        plan = self.harness.get_container_pebble_plan("du").to_dict()
+        self.assertEqual(plan["services"]["log-writer"]["startup"], "disabled")
+        self.assertNotIn("after", plan["services"]["du"])
+        self.assertIn("--log-service du", plan["services"]["stats-exporter"]["command"])
+        container = self.harness.model.unit.get_container("du")
+        self.assertFalse(container.get_service("log-writer").is_running())
+
+    def test_given_rotated_log_files_when_get_logs_action_then_last_lines_are_returned(self):
+        self.harness.update_config({"log-to-file": True})
+        self.harness.set_can_connect(container="du", val=True)
+        container = self.harness.model.unit.get_container("du")
+        container.push("/var/log/oai/nr-softmodem.log", "current\n", make_dirs=True)
+        container.push("/var/log/oai/nr-softmodem.log.1", "first\nsecond\nthird\n")
+
+        action_output = self.harness.run_action("get-logs", {"rotation": 1, "lines": 2})
+
+        self.assertEqual(action_output.results["path"], "/var/log/oai/nr-softmodem.log.1")
+        self.assertEqual(action_output.results["content"], "second\nthird\n")
+        self.assertEqual(action_output.results["files"], "nr-softmodem.log,nr-softmodem.log.1")
+
+    def test_given_log_to_file_disabled_when_get_logs_action_then_action_fails(self):
+        with self.assertRaises(ops.testing.ActionFailed) as context:
+            self.harness.run_action("get-logs")
+
+        self.assertEqual(
+            context.exception.message,
+            "nr-softmodem logs to Pebble, file logging requires log-to-file",
+        )
+
+    def _set_up_benchmark(self) -> None:
+        self.harness.set_can_connect(container="du", val=True)
+        self.harness.set_can_connect(container="ue", val=True)
+        self._start_patch(
+            "charm.Oai5GDUOperatorCharm._service_is_running",
+            new_callable=PropertyMock,
+            return_value=True,
+        )
+        self.netns_created = []
+        self.netns_removed = []
+
+        def create_netns(args: ops.testing.ExecArgs) -> ops.testing.ExecResult:
+            self.netns_created.append(args.command[-1])
+            return ops.testing.ExecResult()
+
+        def remove_netns(args: ops.testing.ExecArgs) -> ops.testing.ExecResult:
+            self.netns_removed.append(args.command[-1])
+            return ops.testing.ExecResult()
+
+        self.harness.handle_exec("ue", ["sh", "-c", NETNS_SCRIPT], handler=create_netns)
+        self.harness.handle_exec("ue", ["sh", "-c", NETNS_CLEANUP_SCRIPT], handler=remove_netns)
+        self.harness.handle_exec(
+            "ue", ["ip", "netns"], result="5: oaitun_ue1    inet 10.0.0.2/24 scope global\n"
+        )
+
+    def test_given_softmodem_running_when_benchmark_action_then_results_are_returned_and_ues_removed(  # noqa: E501
+        self,
+    ):
+        self._set_up_benchmark()
+        container = self.harness.model.unit.get_container("du")
+        container.push(
+            "/opt/oai-gnb/nrMAC_stats.log", "UE RNTI 4a3b CU-UE-ID 1 in-sync\n", make_dirs=True
+        )
+        stat_fields = " ".join(["S"] + ["0"] * 10 + ["{utime}", "0"] + ["0"] * 23 + ["2"])
+        self.harness.handle_exec(
+            "du",
+            ["sh", "-c", SAMPLER_SCRIPT],
+            result=(
+                f"clk_tck 100\n== 1235\n1235 (ru_thread) {stat_fields.format(utime=100)}\n"
+                f"@@ sample\n== 1235\n1235 (ru_thread) {stat_fields.format(utime=600)}\n"
+            ),
+        )
+        self.harness.handle_exec(
+            "ue",
+            ["sh", "-c", TRAFFIC_SCRIPT],
+            result="20 packets transmitted, 19 received, 5% packet loss, time 9000ms\n",
+        )
+        clock = [0.0]
+
+        def sleep(seconds: float) -> None:
+            clock[0] += seconds
+            tx_bytes = int(clock[0] * 125000)
+            container.push(
+                "/opt/oai-gnb/nrMAC_stats.log",
+                "UE RNTI 4a3b CU-UE-ID 1 in-sync\n"
+                f"UE 4a3b: MAC:    TX    {tx_bytes} RX          0 bytes\n",
+            )
+            container.push(
+                "/opt/oai-gnb/nrL1_stats.log",
+                f"L1 Tx processing:  {clock[0] * 10:.2f} us;  {int(clock[0]) * 100};\n",
+            )
+
+        with patch("charm.time.monotonic", lambda: clock[0]), patch("charm.time.sleep", sleep):
+            action_output = self.harness.run_action(
+                "benchmark", {"ues": 2, "duration": 5, "traffic-target": "12.1.1.1"}
+            )
+
+        results = json.loads(action_output.results["results"])
+        self.assertEqual(results["ues"], 2)
+        self.assertEqual(results["throughput"], {"dl-mbps": 1.0, "ul-mbps": 0.0})
+        self.assertEqual(results["cpu-percent-per-cell"], {"oai-5g-du/0": 100.0})
+        self.assertEqual(results["slot-processing-us"]["rx"], None)
+        self.assertEqual(results["ping"]["ue2"], {"transmitted": 20, "received": 19})
+        self.assertEqual(self.netns_created, ["1", "2"])
+        self.assertEqual(self.netns_removed, ["2"])
+        services = self.harness.model.unit.get_container("ue").get_services()
+        self.assertEqual(sorted(services), ["ue-1", "ue-2"])
+        self.assertFalse(any(service.is_running() for service in services.values()))
+
+    def test_given_iq_replay_mode_when_benchmark_action_then_action_fails(self):
+        self._set_up_benchmark()
+        self.harness.update_config({"rfsim-iq-mode": "replay", "rfsim-iq-replay-file": "a.iqs"})
+
+        with self.assertRaises(ops.testing.ActionFailed) as context:
+            self.harness.run_action("benchmark", {"traffic-target": "12.1.1.1"})
+
+        self.assertEqual(
+            context.exception.message, "nr-softmodem must be running as rfsimulator server"
+        )
+
+    def test_given_ues_never_attach_when_benchmark_action_then_action_fails_and_ues_are_removed(
+        self,
+    ):
+        self._set_up_benchmark()
+        self.harness.handle_exec("ue", ["ip", "netns"], result=1)
+        clock = [0.0]
+
+        def sleep(seconds: float) -> None:
+            clock[0] += seconds
+
+        with patch("charm.time.monotonic", lambda: clock[0]), patch("charm.time.sleep", sleep):
+            with self.assertRaises(ops.testing.ActionFailed) as context:
+                self.harness.run_action(
+                    "benchmark", {"ues": 3, "traffic-target": "12.1.1.1", "attach-timeout": 5}
+                )
+
+        self.assertEqual(
+            context.exception.message, "Benchmark failed: 0/3 UEs got a PDU session within 5s"
+        )
+        self.assertEqual(self.netns_removed, ["3"])
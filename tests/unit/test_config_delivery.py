@@ -0,0 +1,36 @@
+# Copyright 2022 Guillaume Belanger
+# See LICENSE file for licensing details.
+
+import unittest
+
+from config_delivery import (
+    ConfigDeliveryError,
+    config_map_key,
+    stale_config_map_keys,
+    validate_config_delivery,
+)
+
+
+class TestConfigDelivery(unittest.TestCase):
+    def test_given_unknown_mode_when_validate_config_delivery_then_error_is_raised(self):
+        with self.assertRaises(ConfigDeliveryError):
+            validate_config_delivery("pvc")
+
+    def test_given_same_content_when_config_map_key_then_key_is_the_same(self):
+        self.assertEqual(config_map_key("du-0", "a"), config_map_key("du-0", "a"))
+        self.assertNotEqual(config_map_key("du-0", "a"), config_map_key("du-0", "b"))
+        self.assertRegex(config_map_key("du-0", "a"), r"^du-0-[0-9a-f]{12}\.conf$")
+
+    def test_given_keys_of_several_pods_when_stale_config_map_keys_then_only_previous_keys_of_pod_are_returned(  # noqa: E501
+        self,
+    ):
+        kept_keys = [config_map_key("du-1", "new"), config_map_key("du-1", "good")]
+        keys = kept_keys + [
+            config_map_key("du-1", "old"),
+            config_map_key("du-10", "old"),
+            config_map_key("du-0", "old"),
+        ]
+
+        self.assertEqual(
+            stale_config_map_keys(keys, "du-1", kept_keys), [config_map_key("du-1", "old")]
+        )
@@ -0,0 +1,55 @@
+# Copyright 2022 Guillaume Belanger
+# See LICENSE file for licensing details.
+
+import unittest
+
+from config_diff import HOT, RESTART, changed_sections, classify_changes
+from gnb_config import GnbConfig, apply_overrides
+
+
+class TestConfigDiff(unittest.TestCase):
+    def test_given_added_removed_and_modified_sections_when_changed_sections_then_all_are_returned(  # noqa: E501
+        self,
+    ):
+        previous = {"a": "1", "b": "2", "c": "3"}
+        current = {"b": "2", "c": "4", "d": "5"}
+
+        self.assertEqual(changed_sections(previous, current), ["a", "c", "d"])
+
+    def test_given_no_previous_configuration_when_classify_changes_then_every_section_requires_restart(  # noqa: E501
+        self,
+    ):
+        current = GnbConfig().sections()
+
+        changes = classify_changes({}, current, hot_sections=("log_config",))
+
+        self.assertEqual(set(changes), set(current))
+        self.assertEqual(set(changes.values()), {RESTART})
+
+    def test_given_log_level_and_serving_cell_changes_when_classify_changes_then_each_is_classified(  # noqa: E501
+        self,
+    ):
+        previous = GnbConfig()
+        current = apply_overrides(
+            previous,
+            {
+                "log_config": {"mac_log_level": "debug"},
+                "gNBs": {"servingCellConfigCommon": {"pMax": 23}},
+            },
+        )
+
+        changes = classify_changes(
+            previous.sections(), current.sections(), hot_sections=("log_config",)
+        )
+
+        self.assertEqual(changes, {"log_config": HOT, "gNBs.servingCellConfigCommon": RESTART})
+
+    def test_given_no_hot_sections_when_classify_changes_then_log_level_change_requires_restart(
+        self,
+    ):
+        previous = GnbConfig()
+        current = apply_overrides(previous, {"log_config": {"mac_log_level": "debug"}})
+
+        changes = classify_changes(previous.sections(), current.sections(), hot_sections=())
+
+        self.assertEqual(changes, {"log_config": RESTART})
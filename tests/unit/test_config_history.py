@@ -0,0 +1,61 @@
+# Copyright 2022 Guillaume Belanger
+# See LICENSE file for licensing details.
+
+import unittest
+
+from ops.pebble import CheckInfo, CheckLevel, CheckStatus, ServiceInfo, ServiceStartup
+
+from config_history import (
+    GOOD_CONFIG_HISTORY_SIZE,
+    crash_loop_cause,
+    last_good_config,
+    record_good_config,
+)
+
+
+def _check(name: str, level: CheckLevel, status: CheckStatus) -> CheckInfo:
+    return CheckInfo(name=name, level=level, status=status)
+
+
+class TestConfigHistory(unittest.TestCase):
+    def test_given_full_history_when_record_good_config_then_oldest_version_is_dropped(self):
+        history = []
+        for index in range(GOOD_CONFIG_HISTORY_SIZE + 1):
+            history = record_good_config(history, f"hash-{index}", f"content-{index}", "now")
+
+        self.assertEqual(len(history), GOOD_CONFIG_HISTORY_SIZE)
+        self.assertEqual(history[0]["hash"], "hash-1")
+        self.assertEqual(last_good_config(history)["hash"], f"hash-{GOOD_CONFIG_HISTORY_SIZE}")
+
+    def test_given_recorded_version_when_record_good_config_then_it_becomes_most_recent(self):
+        history = record_good_config([], "a", "content-a", "t1")
+        history = record_good_config(history, "b", "content-b", "t2")
+
+        history = record_good_config(history, "a", "content-a", "t3")
+
+        self.assertEqual([entry["hash"] for entry in history], ["b", "a"])
+        self.assertEqual(history[-1]["recorded-at"], "t3")
+
+    def test_given_empty_history_when_last_good_config_then_none_is_returned(self):
+        self.assertIsNone(last_good_config([]))
+
+    def test_given_service_in_backoff_when_crash_loop_cause_then_cause_is_returned(self):
+        service = ServiceInfo(name="du", startup=ServiceStartup.ENABLED, current="backoff")
+
+        self.assertEqual(crash_loop_cause(service, {}), "du service in backoff state")
+
+    def test_given_liveness_check_down_when_crash_loop_cause_then_cause_is_returned(self):
+        checks = {
+            "du-alive": _check("du-alive", CheckLevel.ALIVE, CheckStatus.DOWN),
+            "f1-association": _check("f1-association", CheckLevel.READY, CheckStatus.DOWN),
+        }
+
+        self.assertEqual(crash_loop_cause(None, checks), "du-alive check down")
+
+    def test_given_only_readiness_check_down_when_crash_loop_cause_then_none_is_returned(self):
+        checks = {
+            "du-alive": _check("du-alive", CheckLevel.ALIVE, CheckStatus.UP),
+            "f1-association": _check("f1-association", CheckLevel.READY, CheckStatus.DOWN),
+        }
+
+        self.assertIsNone(crash_loop_cause(None, checks))
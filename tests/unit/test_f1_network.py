@@ -0,0 +1,52 @@
+# Copyright 2022 Guillaume Belanger
+# See LICENSE file for licensing details.
+
+import json
+import unittest
+
+from f1_network import (
+    F1NetworkError,
+    get_interface_ipv4_address,
+    multus_networks_annotation,
+    network_attachment_config,
+)
+
+
+class TestF1Network(unittest.TestCase):
+    def test_given_ipvlan_and_whereabouts_when_network_attachment_config_then_range_is_used(
+        self,
+    ):
+        config = network_attachment_config(
+            network_type="ipvlan", master="ens5", subnet="10.10.0.0/24", ipam="whereabouts"
+        )
+
+        self.assertEqual(config["mode"], "l2")
+        self.assertEqual(config["master"], "ens5")
+        self.assertEqual(config["ipam"], {"type": "whereabouts", "range": "10.10.0.0/24"})
+
+    def test_given_invalid_settings_when_network_attachment_config_then_error_is_raised(self):
+        invalid_settings = [
+            {"network_type": "bridge", "master": "eth0", "subnet": "10.0.0.0/24"},
+            {"network_type": "macvlan", "master": "", "subnet": "10.0.0.0/24"},
+            {"network_type": "macvlan", "master": "eth0", "subnet": "10.0.0.1/24"},
+            {"network_type": "macvlan", "master": "eth0", "subnet": "fd00::/64"},
+        ]
+        for settings in invalid_settings:
+            with self.subTest(settings=settings):
+                with self.assertRaises(F1NetworkError):
+                    network_attachment_config(ipam="host-local", **settings)
+
+    def test_given_network_attachment_name_when_multus_networks_annotation_then_interface_is_f1(
+        self,
+    ):
+        annotation = multus_networks_annotation("du-f1")
+
+        self.assertEqual(json.loads(annotation), [{"name": "du-f1", "interface": "f1"}])
+
+    def test_given_loopback_interface_when_get_interface_ipv4_address_then_address_is_returned(
+        self,
+    ):
+        self.assertEqual(get_interface_ipv4_address("lo"), "127.0.0.1")
+
+    def test_given_missing_interface_when_get_interface_ipv4_address_then_none_is_returned(self):
+        self.assertIsNone(get_interface_ipv4_address("doesnotexist0"))
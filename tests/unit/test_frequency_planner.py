@@ -0,0 +1,98 @@
+# Copyright 2022 Guillaume Belanger
+# See LICENSE file for licensing details.
+
+import unittest
+
+from frequency_planner import (
+    FrequencyPlanError,
+    frequency_to_arfcn,
+    gscn_to_frequency,
+    plan_frequencies,
+    resource_indicator_value,
+)
+
+
+class TestFrequencyPlanner(unittest.TestCase):
+    def test_given_40mhz_band78_carrier_when_plan_frequencies_then_reference_oai_values_are_computed(  # noqa: E501
+        self,
+    ):
+        plan = plan_frequencies(
+            band=78, bandwidth_mhz=40, scs_khz=30, center_frequency_khz=3619200
+        )
+
+        self.assertEqual(plan.n_rb, 106)
+        self.assertEqual(plan.point_a_arfcn, 640008)
+        self.assertEqual(plan.ssb_arfcn, 641280)
+        self.assertEqual(plan.gscn, 7929)
+        self.assertEqual(plan.ssb_offset_prb, 43)
+        self.assertEqual(plan.k_ssb, 0)
+        self.assertEqual(plan.coreset0_index, 12)
+        self.assertEqual(plan.coreset0_start_prb, 27)
+        self.assertEqual(plan.search_space_zero_index, 0)
+        self.assertEqual(plan.initial_bwp_riv, 28875)
+        self.assertEqual(plan.numerology, 1)
+
+    def test_given_100mhz_band78_carrier_when_plan_frequencies_then_273_prb_carrier_is_planned(
+        self,
+    ):
+        plan = plan_frequencies(
+            band=78, bandwidth_mhz=100, scs_khz=30, center_frequency_khz=3349740
+        )
+
+        self.assertEqual(plan.n_rb, 273)
+        self.assertEqual(plan.point_a_arfcn, 620040)
+        self.assertEqual(plan.initial_bwp_riv, 1099)
+        self.assertEqual(plan.k_ssb, 0)
+        ssb_start_khz = plan.ssb_frequency_khz - 120 * 30
+        self.assertEqual((ssb_start_khz - plan.point_a_khz) % 360, 0)
+        self.assertGreaterEqual(plan.coreset0_start_prb, 0)
+        self.assertLessEqual(plan.coreset0_start_prb + plan.coreset0_n_rb, plan.n_rb)
+
+    def test_given_carrier_center_not_aligned_with_ssb_raster_when_plan_frequencies_then_ssb_subcarrier_offset_is_used(  # noqa: E501
+        self,
+    ):
+        plan = plan_frequencies(
+            band=78, bandwidth_mhz=100, scs_khz=30, center_frequency_khz=3619200
+        )
+
+        self.assertEqual(plan.k_ssb, 12)
+
+    def test_given_30khz_scs_and_only_odd_ssb_subcarrier_offsets_when_plan_frequencies_then_error_is_raised(  # noqa: E501
+        self,
+    ):
+        with self.assertRaises(FrequencyPlanError):
+            plan_frequencies(band=78, bandwidth_mhz=20, scs_khz=30, center_frequency_khz=3309195)
+
+    def test_given_band41_with_30khz_scs_when_plan_frequencies_then_30khz_sync_raster_is_used(
+        self,
+    ):
+        plan = plan_frequencies(
+            band=41, bandwidth_mhz=10, scs_khz=30, center_frequency_khz=2500320
+        )
+
+        self.assertEqual(plan.gscn, 6252)
+        self.assertEqual(plan.k_ssb, 18)
+
+    def test_given_unsupported_bandwidth_when_plan_frequencies_then_error_is_raised(self):
+        with self.assertRaises(FrequencyPlanError):
+            plan_frequencies(band=78, bandwidth_mhz=45, scs_khz=30, center_frequency_khz=3619200)
+
+    def test_given_unsupported_ssb_scs_when_plan_frequencies_then_error_is_raised(self):
+        with self.assertRaises(FrequencyPlanError):
+            plan_frequencies(band=78, bandwidth_mhz=40, scs_khz=15, center_frequency_khz=3619200)
+
+    def test_given_carrier_outside_of_band_when_plan_frequencies_then_error_is_raised(self):
+        with self.assertRaises(FrequencyPlanError):
+            plan_frequencies(band=78, bandwidth_mhz=100, scs_khz=30, center_frequency_khz=3790020)
+
+    def test_given_frequency_off_global_raster_when_frequency_to_arfcn_then_error_is_raised(self):
+        with self.assertRaises(FrequencyPlanError):
+            frequency_to_arfcn(3600007)
+
+    def test_given_gscn_below_3ghz_when_gscn_to_frequency_then_frequency_is_computed(self):
+        self.assertEqual(gscn_to_frequency(6245), 2082 * 1200 + 50)
+        self.assertEqual(gscn_to_frequency(6246), 2082 * 1200 + 150)
+        self.assertEqual(gscn_to_frequency(6247), 2082 * 1200 + 250)
+
+    def test_given_small_bwp_when_resource_indicator_value_then_short_formula_is_used(self):
+        self.assertEqual(resource_indicator_value(27, 48), 12952)
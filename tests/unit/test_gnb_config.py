@@ -0,0 +1,94 @@
+# Copyright 2022 Guillaume Belanger
+# See LICENSE file for licensing details.
+
+import unittest
+
+from gnb_config import (
+    Gnb,
+    GnbConfig,
+    GnbConfigError,
+    LogConfig,
+    Plmn,
+    ServingCellConfigCommon,
+    apply_overrides,
+    parse_int,
+)
+from libconfig import Hex
+
+
+class TestGnbConfig(unittest.TestCase):
+    def test_given_default_config_when_dumps_then_reference_du_settings_are_written(self):
+        content = GnbConfig().dumps()
+
+        self.assertIn('Active_gNBs = ("oai-du-rfsim");\n', content)
+        self.assertIn("    gNB_ID = 0xe00;\n", content)
+        self.assertIn("    nr_cellid = 12345678L;\n", content)
+        self.assertIn("            sd = 0x000001;\n", content)
+        self.assertIn(
+            "    bf_weights = [0x00007fff, 0x00000000, 0x00000000, 0x00000000];\n", content
+        )
+        self.assertIn("  options = ();\n", content)
+
+    def test_given_out_of_range_pci_when_create_then_error_is_raised(self):
+        with self.assertRaises(GnbConfigError):
+            ServingCellConfigCommon(phys_cell_id=1008)
+
+    def test_given_mnc_longer_than_mnc_length_when_create_then_error_is_raised(self):
+        with self.assertRaises(GnbConfigError):
+            Plmn(mnc=123, mnc_length=2)
+
+    def test_given_invalid_log_level_when_create_then_error_is_raised(self):
+        with self.assertRaises(GnbConfigError):
+            LogConfig(mac_log_level="verbose")
+
+    def test_given_active_gnb_not_defined_when_create_then_error_is_raised(self):
+        with self.assertRaises(GnbConfigError):
+            GnbConfig(active_gnbs=("other",), gnbs=[Gnb()])
+
+    def test_given_overrides_when_apply_overrides_then_only_overridden_settings_change(self):
+        config = GnbConfig()
+
+        overridden = apply_overrides(
+            config,
+            {
+                "MACRLCs": {"pusch_TargetSNRx10": 250},
+                "gNBs": {"servingCellConfigCommon": {"pMax": 23}, "SCTP": {"SCTP_INSTREAMS": 4}},
+                "log_config": {"mac_log_level": "debug"},
+            },
+        )
+
+        self.assertEqual(overridden.macrlcs[0].pusch_target_snrx10, 250)
+        self.assertEqual(overridden.gnbs[0].serving_cell_config_common[0].p_max, 23)
+        self.assertEqual(overridden.gnbs[0].sctp.instreams, 4)
+        self.assertEqual(overridden.log_config.mac_log_level, "debug")
+        self.assertEqual(overridden.macrlcs[0].pucch_target_snrx10, 200)
+        self.assertEqual(config.macrlcs[0].pusch_target_snrx10, 200)
+
+    def test_given_hex_setting_overridden_when_apply_overrides_then_hex_format_is_kept(self):
+        overridden = apply_overrides(GnbConfig(), {"gNBs": {"gNB_ID": 0xE01}})
+
+        self.assertIsInstance(overridden.gnbs[0].gnb_id, Hex)
+        self.assertIn("gNB_ID = 0xe01;", overridden.dumps())
+
+    def test_given_invalid_overrides_when_apply_overrides_then_error_is_raised(self):
+        invalid_overrides = [
+            {"unknown_section": {}},
+            {"MACRLCs": {"unknown": 1}},
+            {"MACRLCs": {"pusch_TargetSNRx10": "high"}},
+            {"MACRLCs": {"pusch_TargetSNRx10": 501}},
+            {"log_config": "debug"},
+        ]
+        for overrides in invalid_overrides:
+            with self.subTest(overrides=overrides):
+                with self.assertRaises(GnbConfigError):
+                    apply_overrides(GnbConfig(), overrides)
+
+    def test_given_hex_width_when_parse_int_then_value_is_parsed_as_hexadecimal(self):
+        value = parse_int("sd", "00000a", hex_width=6)
+
+        self.assertEqual(value, 10)
+        self.assertEqual(value.width, 6)  # type: ignore[attr-defined]
+
+    def test_given_invalid_integer_when_parse_int_then_error_is_raised(self):
+        with self.assertRaises(GnbConfigError):
+            parse_int("mcc", "abc")
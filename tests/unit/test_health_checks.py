@@ -0,0 +1,86 @@
+# Copyright 2022 Guillaume Belanger
+# See LICENSE file for licensing details.
+
+import os
+import shlex
+import subprocess
+import tempfile
+import unittest
+
+from health_checks import (
+    ALIVE_CHECK,
+    F1_ASSOCIATION_SCRIPT,
+    STATS_FRESH_CHECK,
+    pebble_checks,
+    restart_on_failure,
+)
+
+# Association of a DU connecting from an ephemeral port to the CU, on port 501
+SCTP_ASSOCS = (
+    " ASSOC     SOCK   STY SST ST HBKT ASSOC-ID TX_QUEUE RX_QUEUE UID INODE LPORT RPORT LADDRS <-> RADDRS HBINT INS OUTS MAXRT T1X T2X RTXC wmema wmemq sndbuf rcvbuf\n"  # noqa: E501, W505
+    "ffff8f4d1e0d4000 ffff8f4d3b2e1b00 2   1   3  13142   11        0        0       0 2351019 38462   501  10.1.1.10 <-> *10.1.1.20 \t    7500     2     2   10    0    0        0        1        0   212992   212992\n"  # noqa: E501, W505
+)
+
+
+def run_check(check: dict) -> int:
+    return subprocess.run(shlex.split(check["exec"]["command"]), capture_output=True).returncode
+
+
+class TestHealthChecks(unittest.TestCase):
+    def setUp(self):
+        self.stats_file = tempfile.NamedTemporaryFile()
+        self.addCleanup(self.stats_file.close)
+        self.checks = pebble_checks(
+            cu_f1_c_address="10.1.1.20",
+            cu_f1_c_port=501,
+            stats_file=self.stats_file.name,
+            stats_freshness=True,
+        )
+
+    def test_given_stats_freshness_disabled_when_pebble_checks_then_stats_check_is_absent(self):
+        checks = pebble_checks(
+            cu_f1_c_address="10.1.1.20",
+            cu_f1_c_port=501,
+            stats_file="/nrMAC_stats.log",
+            stats_freshness=False,
+        )
+
+        self.assertEqual(set(checks), {"du-alive", "f1-association"})
+        self.assertEqual(checks["f1-association"]["level"], "ready")
+
+    def test_given_checks_when_restart_on_failure_then_only_alive_checks_restart_the_service(
+        self,
+    ):
+        self.assertEqual(
+            restart_on_failure(self.checks), {"du-alive": "restart", "stats-fresh": "restart"}
+        )
+
+    def test_given_stats_file_just_written_when_stats_check_runs_then_it_succeeds(self):
+        self.assertEqual(run_check(self.checks[STATS_FRESH_CHECK]), 0)
+
+    def test_given_stale_stats_file_when_stats_check_runs_then_it_fails(self):
+        os.utime(self.stats_file.name, (0, 0))
+
+        self.assertEqual(run_check(self.checks[STATS_FRESH_CHECK]), 1)
+
+    def test_given_softmodem_not_running_when_alive_check_runs_then_it_fails(self):
+        self.assertEqual(run_check(self.checks[ALIVE_CHECK]), 1)
+
+    def _run_f1_association_script(self, cu_address: str, cu_port: int) -> int:
+        with tempfile.NamedTemporaryFile("w") as assocs:
+            assocs.write(SCTP_ASSOCS)
+            assocs.flush()
+            return subprocess.run(
+                ["sh", "-c", F1_ASSOCIATION_SCRIPT, "sh", cu_address, str(cu_port), assocs.name]
+            ).returncode
+
+    def test_given_association_from_ephemeral_port_when_f1_association_check_runs_then_it_succeeds(  # noqa: E501
+        self,
+    ):
+        self.assertEqual(self._run_f1_association_script("10.1.1.20", 501), 0)
+
+    def test_given_association_with_other_cu_when_f1_association_check_runs_then_it_fails(self):
+        self.assertEqual(self._run_f1_association_script("10.1.1.30", 501), 1)
+
+    def test_given_association_on_other_port_when_f1_association_check_runs_then_it_fails(self):
+        self.assertEqual(self._run_f1_association_script("10.1.1.20", 38412), 1)
@@ -0,0 +1,28 @@
+# Copyright 2022 Guillaume Belanger
+# See LICENSE file for licensing details.
+
+import unittest
+
+from host_network import find_port_collisions
+from workload_ports import WorkloadPort
+
+DU_PORTS = [
+    WorkloadPort("s1c", 36412, "SCTP"),
+    WorkloadPort("s1u", 2152, "UDP"),
+    WorkloadPort("f1", 2153, "UDP"),
+]
+
+
+class TestHostNetwork(unittest.TestCase):
+    def test_given_no_port_in_use_when_find_port_collisions_then_none_is_returned(self):
+        self.assertEqual(find_port_collisions(DU_PORTS, {}), [])
+
+    def test_given_same_port_with_other_protocol_in_use_when_find_port_collisions_then_none_is_returned(  # noqa: E501
+        self,
+    ):
+        self.assertEqual(find_port_collisions(DU_PORTS, {(2152, "TCP"): "ns/pod"}), [])
+
+    def test_given_port_in_use_when_find_port_collisions_then_collision_is_returned(self):
+        collisions = find_port_collisions(DU_PORTS, {(2152, "UDP"): "core/upf-0"})
+
+        self.assertEqual(collisions, ["2152/UDP (s1u) used by core/upf-0"])
@@ -0,0 +1,114 @@
+# Copyright 2022 Guillaume Belanger
+# See LICENSE file for licensing details.
+
+import os
+import struct
+import tempfile
+import unittest
+
+from iq_recorder import (
+    BLOCK_HEADER,
+    IqRecorderError,
+    IqRing,
+    export,
+    recording_span,
+    shift_timestamp,
+    validate_iq_settings,
+)
+
+
+def _block(timestamp: int, samples: int = 4, antennas: int = 1) -> bytes:
+    header = BLOCK_HEADER.pack(samples, antennas, timestamp, 0, 0)
+    return header + struct.pack("<h", timestamp % 100) * 2 * samples * antennas
+
+
+def _timestamps(blocks) -> list:
+    return [BLOCK_HEADER.unpack_from(block)[2] for block in blocks]
+
+
+class TestIqRing(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.addCleanup(self.directory.cleanup)
+        self.ring_path = os.path.join(self.directory.name, "ring.iqr")
+        # Holds 3 blocks of 40 bytes
+        self.ring = IqRing(self.ring_path, capacity=130)
+        self.addCleanup(self.ring.close)
+
+    def test_given_blocks_fit_when_append_then_blocks_are_returned_oldest_first(self):
+        for timestamp in (0, 4, 8):
+            self.ring.append(_block(timestamp))
+
+        self.assertEqual(self.ring.blocks(), [_block(0), _block(4), _block(8)])
+
+    def test_given_ring_full_when_append_then_oldest_blocks_are_overwritten(self):
+        for timestamp in range(0, 28, 4):
+            self.ring.append(_block(timestamp))
+
+        self.assertEqual(_timestamps(self.ring.blocks()), [16, 20, 24])
+
+    def test_given_blocks_of_different_sizes_when_ring_wraps_then_blocks_are_kept_whole(self):
+        self.ring.append(_block(0, samples=10))
+        self.ring.append(_block(10, samples=4))
+        self.ring.append(_block(14, samples=8))
+
+        self.assertEqual(self.ring.blocks(), [_block(10, samples=4), _block(14, samples=8)])
+
+    def test_given_block_larger_than_ring_when_append_then_it_is_dropped(self):
+        self.ring.append(_block(0))
+
+        self.assertFalse(self.ring.append(_block(4, samples=40)))
+
+        self.assertEqual(self.ring.blocks(), [_block(0)])
+
+    def test_given_ring_written_by_recorder_when_opened_then_blocks_are_read(self):
+        for timestamp in range(0, 20, 4):
+            self.ring.append(_block(timestamp))
+
+        ring = IqRing.open(self.ring_path)
+        self.addCleanup(ring.close)
+
+        self.assertEqual(ring.capacity, 130)
+        self.assertEqual(_timestamps(ring.blocks()), [8, 12, 16])
+
+    def test_given_ring_when_export_then_recording_holds_blocks_oldest_first(self):
+        for timestamp in range(0, 20, 4):
+            self.ring.append(_block(timestamp))
+        output = os.path.join(self.directory.name, "recordings", "busy-hour.iqs")
+
+        summary = export(self.ring_path, output)
+
+        self.assertEqual(summary, {"blocks": 3, "bytes": 120})
+        with open(output, "rb") as file:
+            self.assertEqual(file.read(), _block(8) + _block(12) + _block(16))
+        self.assertEqual(recording_span(output), (8, 12))
+
+    def test_given_empty_ring_when_export_then_error_is_raised(self):
+        with self.assertRaises(IqRecorderError):
+            export(self.ring_path, os.path.join(self.directory.name, "empty.iqs"))
+
+
+class TestIqRecorder(unittest.TestCase):
+    def test_given_offset_when_shift_timestamp_then_only_timestamp_changes(self):
+        shifted = shift_timestamp(_block(8, antennas=2), 100)
+
+        self.assertEqual(BLOCK_HEADER.unpack_from(shifted), (4, 2, 108, 0, 0))
+        samples_start = BLOCK_HEADER.size
+        self.assertEqual(shifted[samples_start:], _block(8, antennas=2)[samples_start:])
+
+    def test_given_unknown_mode_when_validate_iq_settings_then_error_is_raised(self):
+        with self.assertRaises(IqRecorderError):
+            validate_iq_settings("stream", 256, "")
+
+    def test_given_ring_size_too_large_when_validate_iq_settings_then_error_is_raised(self):
+        with self.assertRaises(IqRecorderError):
+            validate_iq_settings("record", 8192, "")
+
+    def test_given_replay_file_outside_recordings_when_validate_iq_settings_then_error_is_raised(
+        self,
+    ):
+        with self.assertRaises(IqRecorderError):
+            validate_iq_settings("replay", 256, "../ring.iqr")
+
+    def test_given_recording_name_when_validate_iq_settings_then_no_error_is_raised(self):
+        validate_iq_settings("replay", 256, "rfsim-20261019T120000Z.iqs")
@@ -0,0 +1,552 @@
+# Copyright 2022 Guillaume Belanger
+# See LICENSE file for licensing details.
+
+import asyncio
+import unittest
+from unittest.mock import AsyncMock, patch
+
+from lightkube.core.exceptions import ApiError
+from lightkube.models.apps_v1 import StatefulSetSpec
+from lightkube.models.core_v1 import (
+    Capabilities,
+    Container,
+    ContainerPort,
+    PodSecurityContext,
+    PodSpec,
+    PodStatus,
+    PodTemplateSpec,
+    SecurityContext,
+    ServicePort,
+    ServiceSpec,
+)
+from lightkube.models.meta_v1 import LabelSelector, ObjectMeta, Status
+from lightkube.resources.apps_v1 import StatefulSet
+from lightkube.resources.core_v1 import ConfigMap, Pod, Service
+from lightkube.types import PatchType
+
+from kubernetes import AsyncKubernetes, Kubernetes, NetworkAttachmentDefinition
+from retry import Retrier
+
+
+def _api_error(code: int) -> ApiError:
+    return ApiError(status=Status(code=code, message="error"))
+
+
+def _patched_statefulset(annotations=None) -> StatefulSet:
+    return StatefulSet(
+        spec=StatefulSetSpec(
+            selector=LabelSelector(),
+            serviceName="du",
+            template=PodTemplateSpec(
+                metadata=ObjectMeta(annotations=annotations),
+                spec=PodSpec(
+                    securityContext=PodSecurityContext(runAsUser=0, runAsGroup=0),
+                    containers=[
+                        Container(name="charm"),
+                        Container(name="du", securityContext=SecurityContext(privileged=True)),
+                    ],
+                ),
+            ),
+        )
+    )
+
+
+class TestKubernetes(unittest.TestCase):
+    @patch("kubernetes.Client")
+    def setUp(self, patch_client):
+        self.kubernetes = Kubernetes(namespace="whatever")
+        self.client = self.kubernetes.client
+
+    def test_given_network_attachment_definition_not_created_when_apply_then_it_is_created(self):
+        self.client.get.side_effect = _api_error(404)
+
+        self.kubernetes.apply_network_attachment_definition(name="du-f1", config={"a": 1})
+
+        created = self.client.create.call_args.kwargs["obj"]
+        self.assertEqual(created.metadata.name, "du-f1")
+        self.assertEqual(created.spec, {"config": '{"a": 1}'})
+
+    def test_given_network_attachment_definition_with_other_config_when_apply_then_it_is_patched(
+        self,
+    ):
+        self.client.get.return_value = NetworkAttachmentDefinition(
+            metadata=ObjectMeta(name="du-f1"), spec={"config": '{"a": 2}'}
+        )
+
+        self.kubernetes.apply_network_attachment_definition(name="du-f1", config={"a": 1})
+
+        self.assertEqual(
+            self.client.patch.call_args.kwargs["obj"], {"spec": {"config": '{"a": 1}'}}
+        )
+        self.client.create.assert_not_called()
+
+    def test_given_network_attachment_definition_created_concurrently_when_apply_then_it_is_patched(  # noqa: E501
+        self,
+    ):
+        self.client.get.side_effect = _api_error(404)
+        self.client.create.side_effect = _api_error(409)
+
+        self.kubernetes.apply_network_attachment_definition(name="du-f1", config={"a": 1})
+
+        self.assertEqual(
+            self.client.patch.call_args.kwargs["obj"], {"spec": {"config": '{"a": 1}'}}
+        )
+
+    def test_given_network_attachment_definition_not_created_when_delete_then_error_is_ignored(
+        self,
+    ):
+        self.client.delete.side_effect = _api_error(404)
+
+        self.kubernetes.delete_network_attachment_definition(name="du-f1")
+
+    def test_given_annotation_missing_when_statefulset_is_patched_then_false_is_returned(self):
+        self.client.get.return_value = _patched_statefulset()
+
+        self.assertFalse(
+            self.kubernetes.statefulset_is_patched(
+                statefulset_name="du", pod_annotations={"networks": "f1"}
+            )
+        )
+
+    def test_given_annotation_to_remove_is_absent_when_statefulset_is_patched_then_true_is_returned(  # noqa: E501
+        self,
+    ):
+        self.client.get.return_value = _patched_statefulset()
+
+        self.assertTrue(
+            self.kubernetes.statefulset_is_patched(
+                statefulset_name="du", pod_annotations={"networks": None}
+            )
+        )
+
+    def test_given_annotations_when_patch_statefulset_then_annotations_are_merged(self):
+        self.client.get.return_value = _patched_statefulset(annotations={"other": "value"})
+
+        self.kubernetes.patch_statefulset(
+            statefulset_name="du", pod_annotations={"networks": "f1", "removed": None}
+        )
+
+        patched = self.client.patch.call_args.kwargs["obj"]
+        self.assertEqual(
+            patched.spec.template.metadata.annotations,
+            {"other": "value", "networks": "f1", "removed": None},
+        )
+
+    def test_given_ue_container_without_capabilities_when_statefulset_is_patched_then_false_is_returned(  # noqa: E501
+        self,
+    ):
+        statefulset = _patched_statefulset()
+        statefulset.spec.template.spec.containers.append(Container(name="ue"))
+        self.client.get.return_value = statefulset
+
+        self.assertFalse(self.kubernetes.statefulset_is_patched(statefulset_name="du"))
+
+    def test_given_privileged_ue_container_when_statefulset_is_patched_then_false_is_returned(
+        self,
+    ):
+        statefulset = _patched_statefulset()
+        statefulset.spec.template.spec.containers.append(
+            Container(
+                name="ue",
+                securityContext=SecurityContext(
+                    privileged=True, capabilities=Capabilities(add=["NET_ADMIN", "SYS_ADMIN"])
+                ),
+            )
+        )
+        self.client.get.return_value = statefulset
+
+        self.assertFalse(self.kubernetes.statefulset_is_patched(statefulset_name="du"))
+
+    def test_given_ue_container_when_patch_statefulset_then_only_du_container_is_privileged(
+        self,
+    ):
+        statefulset = _patched_statefulset()
+        statefulset.spec.template.spec.containers.insert(
+            1, Container(name="ue", securityContext=SecurityContext(privileged=True))
+        )
+        self.client.get.return_value = statefulset
+
+        self.kubernetes.patch_statefulset(statefulset_name="du")
+
+        containers = {
+            container.name: container
+            for container in self.client.patch.call_args.kwargs[
+                "obj"
+            ].spec.template.spec.containers
+        }
+        self.assertTrue(containers["du"].securityContext.privileged)
+        self.assertIs(containers["ue"].securityContext.privileged, False)
+        self.assertEqual(
+            containers["ue"].securityContext.capabilities.add, ["NET_ADMIN", "SYS_ADMIN"]
+        )
+        self.assertIsNone(containers["charm"].securityContext)
+
+    def test_given_placement_when_patch_statefulset_then_node_selector_tolerations_and_anti_affinity_are_set(  # noqa: E501
+        self,
+    ):
+        statefulset = _patched_statefulset()
+        statefulset.spec.selector = LabelSelector(matchLabels={"app.kubernetes.io/name": "du"})
+        statefulset.spec.template.spec.nodeSelector = {"old": "label"}
+        self.client.get.return_value = statefulset
+        toleration = {"key": "isolcpus", "operator": "Exists", "effect": "NoSchedule"}
+
+        self.kubernetes.patch_statefulset(
+            statefulset_name="du",
+            node_selector={"realtime": "true"},
+            tolerations=[toleration],
+            spread_across_nodes=True,
+        )
+
+        pod_spec = self.client.patch.call_args.kwargs["obj"].spec.template.spec
+        self.assertEqual(pod_spec.nodeSelector, {"old": None, "realtime": "true"})
+        self.assertEqual([item.to_dict() for item in pod_spec.tolerations], [toleration])
+        terms = pod_spec.affinity.podAntiAffinity.requiredDuringSchedulingIgnoredDuringExecution
+        self.assertEqual(terms[0].topologyKey, "kubernetes.io/hostname")
+        self.assertEqual(terms[0].labelSelector.matchLabels, {"app.kubernetes.io/name": "du"})
+
+    def test_given_spread_across_nodes_no_longer_expected_when_statefulset_is_patched_then_false_is_returned(  # noqa: E501
+        self,
+    ):
+        statefulset = _patched_statefulset()
+        self.client.get.return_value = statefulset
+        self.kubernetes.patch_statefulset(statefulset_name="du", spread_across_nodes=True)
+
+        self.assertTrue(
+            self.kubernetes.statefulset_is_patched(statefulset_name="du", spread_across_nodes=True)
+        )
+        self.assertFalse(self.kubernetes.statefulset_is_patched(statefulset_name="du"))
+
+        self.kubernetes.patch_statefulset(statefulset_name="du")
+
+        anti_affinity = statefulset.spec.template.spec.affinity.podAntiAffinity
+        self.assertEqual(anti_affinity.requiredDuringSchedulingIgnoredDuringExecution, [])
+        self.assertTrue(self.kubernetes.statefulset_is_patched(statefulset_name="du"))
+
+    def test_given_host_network_expected_when_statefulset_is_patched_then_false_is_returned(self):
+        self.client.get.return_value = _patched_statefulset()
+
+        self.assertFalse(
+            self.kubernetes.statefulset_is_patched(statefulset_name="du", host_network=True)
+        )
+
+    def test_given_host_network_when_patch_statefulset_then_dns_policy_is_set(self):
+        self.client.get.return_value = _patched_statefulset()
+
+        self.kubernetes.patch_statefulset(statefulset_name="du", host_network=True)
+
+        patched = self.client.patch.call_args.kwargs["obj"]
+        self.assertTrue(patched.spec.template.spec.hostNetwork)
+        self.assertEqual(patched.spec.template.spec.dnsPolicy, "ClusterFirstWithHostNet")
+
+    def test_given_pods_on_node_when_get_host_ports_in_use_then_host_ports_are_returned(self):
+        self.client.list.return_value = [
+            Pod(
+                metadata=ObjectMeta(name="upf-0", namespace="core"),
+                spec=PodSpec(
+                    hostNetwork=True,
+                    containers=[
+                        Container(
+                            name="upf", ports=[ContainerPort(containerPort=2152, protocol="UDP")]
+                        )
+                    ],
+                ),
+            ),
+            Pod(
+                metadata=ObjectMeta(name="web-0", namespace="web"),
+                spec=PodSpec(
+                    containers=[
+                        Container(
+                            name="web",
+                            ports=[
+                                ContainerPort(containerPort=8080, hostPort=80),
+                                ContainerPort(containerPort=9000),
+                            ],
+                        )
+                    ]
+                ),
+            ),
+            Pod(
+                metadata=ObjectMeta(
+                    name="du-1", namespace="whatever", labels={"app.kubernetes.io/name": "du"}
+                ),
+                spec=PodSpec(
+                    hostNetwork=True,
+                    containers=[
+                        Container(
+                            name="du", ports=[ContainerPort(containerPort=2153, protocol="UDP")]
+                        )
+                    ],
+                ),
+            ),
+            Pod(
+                metadata=ObjectMeta(name="job-0", namespace="jobs"),
+                spec=PodSpec(
+                    containers=[
+                        Container(name="job", ports=[ContainerPort(containerPort=1, hostPort=1)])
+                    ]
+                ),
+                status=PodStatus(phase="Succeeded"),
+            ),
+        ]
+
+        ports_in_use = self.kubernetes.get_host_ports_in_use(node_name="node-1", exclude_app="du")
+
+        self.assertEqual(ports_in_use, {(2152, "UDP"): "core/upf-0", (80, "TCP"): "web/web-0"})
+        self.assertEqual(self.client.list.call_args.kwargs["fields"], {"spec.nodeName": "node-1"})
+
+    def test_given_sysctls_when_patch_statefulset_then_they_are_set_in_pod_security_context(self):
+        self.client.get.return_value = _patched_statefulset()
+
+        self.kubernetes.patch_statefulset(
+            statefulset_name="du", pod_sysctls={"net.ipv4.tcp_syncookies": "1"}
+        )
+
+        patched = self.client.patch.call_args.kwargs["obj"]
+        self.assertEqual(
+            [
+                (sysctl.name, sysctl.value)
+                for sysctl in patched.spec.template.spec.securityContext.sysctls
+            ],
+            [("net.ipv4.tcp_syncookies", "1")],
+        )
+
+    def test_given_other_sysctls_expected_when_statefulset_is_patched_then_false_is_returned(
+        self,
+    ):
+        self.client.get.return_value = _patched_statefulset()
+
+        self.assertFalse(
+            self.kubernetes.statefulset_is_patched(
+                statefulset_name="du", pod_sysctls={"net.ipv4.tcp_syncookies": "1"}
+            )
+        )
+
+    def test_given_config_map_name_when_patch_statefulset_then_it_is_mounted_in_workload_container(  # noqa: E501
+        self,
+    ):
+        self.client.get.return_value = _patched_statefulset()
+
+        self.kubernetes.patch_statefulset(
+            statefulset_name="du", config_map_name="du-config", config_map_mount_path="/etc/du"
+        )
+
+        patched = self.client.patch.call_args.kwargs["obj"]
+        pod_spec = patched.spec.template.spec
+        self.assertEqual(pod_spec.volumes[0].configMap.name, "du-config")
+        self.assertTrue(pod_spec.volumes[0].configMap.optional)
+        self.assertEqual(pod_spec.containers[1].volumeMounts[0].mountPath, "/etc/du")
+        self.client.get.return_value = patched
+        self.assertTrue(
+            self.kubernetes.statefulset_is_patched(
+                statefulset_name="du", config_map_name="du-config", config_map_mount_path="/etc/du"
+            )
+        )
+        self.assertFalse(self.kubernetes.statefulset_is_patched(statefulset_name="du"))
+
+    def test_given_iq_volume_size_when_patch_statefulset_then_empty_dir_is_mounted_in_workload_container(  # noqa: E501
+        self,
+    ):
+        self.client.get.return_value = _patched_statefulset()
+
+        self.kubernetes.patch_statefulset(
+            statefulset_name="du", iq_volume_size="1280Mi", iq_volume_mount_path="/var/lib/iq"
+        )
+
+        patched = self.client.patch.call_args.kwargs["obj"]
+        pod_spec = patched.spec.template.spec
+        self.assertEqual(pod_spec.volumes[0].emptyDir.sizeLimit, "1280Mi")
+        self.assertEqual(pod_spec.containers[1].volumeMounts[0].mountPath, "/var/lib/iq")
+        self.client.get.return_value = patched
+        self.assertTrue(
+            self.kubernetes.statefulset_is_patched(
+                statefulset_name="du", iq_volume_size="1280Mi", iq_volume_mount_path="/var/lib/iq"
+            )
+        )
+        self.assertFalse(
+            self.kubernetes.statefulset_is_patched(
+                statefulset_name="du", iq_volume_size="640Mi", iq_volume_mount_path="/var/lib/iq"
+            )
+        )
+
+    def test_given_log_volume_size_when_patch_statefulset_then_memory_backed_empty_dir_is_mounted(
+        self,
+    ):
+        self.client.get.return_value = _patched_statefulset()
+
+        self.kubernetes.patch_statefulset(
+            statefulset_name="du", log_volume_size="257Mi", log_volume_mount_path="/var/log/oai"
+        )
+
+        patched = self.client.patch.call_args.kwargs["obj"]
+        pod_spec = patched.spec.template.spec
+        self.assertEqual(pod_spec.volumes[0].emptyDir.sizeLimit, "257Mi")
+        self.assertEqual(pod_spec.volumes[0].emptyDir.medium, "Memory")
+        self.assertEqual(pod_spec.containers[1].volumeMounts[0].mountPath, "/var/log/oai")
+        self.client.get.return_value = patched
+        self.assertTrue(
+            self.kubernetes.statefulset_is_patched(
+                statefulset_name="du",
+                log_volume_size="257Mi",
+                log_volume_mount_path="/var/log/oai",
+            )
+        )
+        self.assertFalse(self.kubernetes.statefulset_is_patched(statefulset_name="du"))
+
+    def test_given_config_map_not_created_when_apply_config_map_then_it_is_created_owned_by_statefulset(  # noqa: E501
+        self,
+    ):
+        self.client.patch.side_effect = _api_error(404)
+        statefulset = _patched_statefulset()
+        statefulset.metadata = ObjectMeta(name="du", uid="1234")
+        self.client.get.return_value = statefulset
+
+        self.kubernetes.apply_config_map(
+            name="du-config",
+            data={"du-0-a.conf": "new", "du-0-b.conf": None},
+            owner_statefulset_name="du",
+        )
+
+        created = self.client.create.call_args.kwargs["obj"]
+        self.assertEqual(created.data, {"du-0-a.conf": "new"})
+        self.assertEqual(created.metadata.ownerReferences[0].uid, "1234")
+
+    def test_given_config_map_created_concurrently_when_apply_config_map_then_keys_are_merged(  # noqa: E501
+        self,
+    ):
+        self.client.patch.side_effect = [_api_error(404), None]
+        self.client.create.side_effect = _api_error(409)
+        statefulset = _patched_statefulset()
+        statefulset.metadata = ObjectMeta(name="du", uid="1234")
+        self.client.get.return_value = statefulset
+
+        self.kubernetes.apply_config_map(
+            name="du-config",
+            data={"du-0-a.conf": "new"},
+            owner_statefulset_name="du",
+        )
+
+        self.assertEqual(self.client.patch.call_count, 2)
+        self.assertEqual(
+            self.client.patch.call_args.kwargs["obj"], {"data": {"du-0-a.conf": "new"}}
+        )
+
+    def test_given_config_map_when_apply_config_map_then_keys_are_merged(self):
+        self.kubernetes.apply_config_map(
+            name="du-config",
+            data={"du-0-a.conf": "new", "du-0-b.conf": None},
+            owner_statefulset_name="du",
+        )
+
+        self.assertEqual(
+            self.client.patch.call_args.kwargs["obj"],
+            {"data": {"du-0-a.conf": "new", "du-0-b.conf": None}},
+        )
+        self.client.create.assert_not_called()
+
+    def test_given_config_map_not_created_when_get_config_map_data_then_empty_data_is_returned(
+        self,
+    ):
+        self.client.get.side_effect = _api_error(404)
+
+        self.assertEqual(self.kubernetes.get_config_map_data(name="du-config"), {})
+
+    def test_given_config_map_when_get_config_map_data_then_data_is_returned(self):
+        self.client.get.return_value = ConfigMap(data={"du-0-a.conf": "content"})
+
+        self.assertEqual(
+            self.kubernetes.get_config_map_data(name="du-config"), {"du-0-a.conf": "content"}
+        )
+
+    def test_given_replace_ports_when_apply_service_then_service_is_applied_and_ports_replaced(
+        self,
+    ):
+        self.kubernetes.apply_service(
+            _service(2152), field_manager="du-service-patch", replace_ports=True
+        )
+
+        applied, merged = self.client.patch.call_args_list
+        self.assertEqual(applied.kwargs["patch_type"], PatchType.APPLY)
+        self.assertEqual(applied.kwargs["obj"], _service(2152))
+        self.assertEqual(merged.kwargs["patch_type"], PatchType.MERGE)
+        self.assertEqual(
+            merged.kwargs["obj"], {"spec": {"ports": [{"port": 2152, "targetPort": 2152}]}}
+        )
+
+    @patch("kubernetes.Client")
+    def test_given_transient_api_error_when_get_pod_then_call_is_retried(self, patch_client):
+        sleeps = []
+        kubernetes = Kubernetes(namespace="whatever", retrier=Retrier(sleep=sleeps.append))
+        pod = Pod(metadata=ObjectMeta(name="du-0"))
+        kubernetes.client.get.side_effect = [_api_error(503), pod]
+
+        self.assertEqual(kubernetes.get_pod("du-0"), pod)
+        self.assertEqual(len(sleeps), 1)
+        self.assertEqual(kubernetes.retrier.retries, 1)
+
+    @patch("kubernetes.Client")
+    def test_given_create_timed_out_after_going_through_when_apply_config_map_then_keys_are_merged(  # noqa: E501
+        self, patch_client
+    ):
+        kubernetes = Kubernetes(namespace="whatever", retrier=Retrier(sleep=lambda _: None))
+        statefulset = _patched_statefulset()
+        statefulset.metadata = ObjectMeta(name="du", uid="1234")
+        kubernetes.client.get.return_value = statefulset
+        kubernetes.client.patch.side_effect = [_api_error(404), None]
+        kubernetes.client.create.side_effect = [_api_error(504), _api_error(409)]
+
+        kubernetes.apply_config_map(
+            name="du-config", data={"du-0-a.conf": "new"}, owner_statefulset_name="du"
+        )
+
+        self.assertEqual(kubernetes.client.create.call_count, 2)
+        self.assertEqual(
+            kubernetes.client.patch.call_args.kwargs["obj"], {"data": {"du-0-a.conf": "new"}}
+        )
+
+
+def _service(port: int) -> Service:
+    return Service(
+        metadata=ObjectMeta(name="du"),
+        spec=ServiceSpec(ports=[ServicePort(port=port, targetPort=port)]),
+    )
+
+
+class TestAsyncKubernetes(unittest.TestCase):
+    @patch("kubernetes.AsyncClient")
+    def setUp(self, patch_async_client):
+        self.kubernetes = AsyncKubernetes(namespace="whatever")
+        self.client = self.kubernetes.client
+        self.client.get = AsyncMock()
+        self.client.patch = AsyncMock()
+
+    def test_given_service_when_apply_service_then_it_is_server_side_applied(self):
+        asyncio.run(
+            self.kubernetes.apply_service(_service(2152), field_manager="du-service-patch")
+        )
+
+        self.client.patch.assert_awaited_once()
+        self.assertEqual(self.client.patch.call_args.kwargs["obj"], _service(2152))
+        self.assertEqual(self.client.patch.call_args.kwargs["patch_type"], PatchType.APPLY)
+        self.assertEqual(self.client.patch.call_args.kwargs["field_manager"], "du-service-patch")
+
+    def test_given_replace_ports_when_apply_service_then_ports_are_merge_patched(self):
+        asyncio.run(
+            self.kubernetes.apply_service(
+                _service(2152), field_manager="du-service-patch", replace_ports=True
+            )
+        )
+
+        self.assertEqual(self.client.patch.await_count, 2)
+        self.assertEqual(self.client.patch.call_args.kwargs["patch_type"], PatchType.MERGE)
+        self.assertEqual(
+            self.client.patch.call_args.kwargs["obj"],
+            {"spec": {"ports": [{"port": 2152, "targetPort": 2152}]}},
+        )
+
+    def test_given_statefulset_when_patch_statefulset_then_fetched_object_is_patched(self):
+        statefulset = _patched_statefulset()
+
+        asyncio.run(self.kubernetes.patch_statefulset("du", statefulset))
+
+        self.assertEqual(self.client.patch.call_args.kwargs["name"], "du")
+        self.assertIs(self.client.patch.call_args.kwargs["obj"], statefulset)
@@ -0,0 +1,140 @@
+# Copyright 2022 Guillaume Belanger
+# See LICENSE file for licensing details.
+
+import unittest
+from unittest.mock import PropertyMock, patch
+
+from lightkube.core.exceptions import ApiError
+from lightkube.models.core_v1 import ServicePort, ServiceSpec
+from lightkube.models.meta_v1 import ObjectMeta, Status
+from lightkube.resources.core_v1 import Service
+from lightkube.types import PatchType
+from ops.charm import CharmBase
+from ops.testing import Harness
+
+from service_patch import ServicePatch
+
+METADATA = """
+name: du
+containers:
+  du:
+    resource: du-image
+resources:
+  du-image:
+    type: oci-image
+"""
+
+F1_PORT = ServicePort(name="f1", port=2152, protocol="UDP")
+
+
+class ServicePatchCharm(CharmBase):
+    def __init__(self, *args):
+        """Patches the Service created by Juju."""
+        super().__init__(*args)
+        self.service_patcher = ServicePatch(self, [F1_PORT])
+
+
+def _service(ports, labels=None, annotations=None) -> Service:
+    return Service(
+        metadata=ObjectMeta(
+            name="du",
+            labels=labels or {"app.kubernetes.io/name": "du"},
+            annotations=annotations,
+        ),
+        spec=ServiceSpec(
+            ports=ports,
+            selector={"app.kubernetes.io/name": "du"},
+            type="ClusterIP",
+        ),
+    )
+
+
+class TestServicePatch(unittest.TestCase):
+    def setUp(self):
+        self._start_patch(
+            "service_patch.ServicePatch._namespace",
+            new_callable=PropertyMock,
+            return_value="whatever",
+        )
+        self.client = self._start_patch("kubernetes.Client").return_value
+        self.harness = Harness(ServicePatchCharm, meta=METADATA)
+        self.addCleanup(self.harness.cleanup)
+        self.harness.begin()
+        self.service_patcher = self.harness.charm.service_patcher
+
+    def _start_patch(self, target: str, **kwargs):
+        patcher = patch(target, **kwargs)
+        self.addCleanup(patcher.stop)
+        return patcher.start()
+
+    def test_given_service_with_desired_spec_when_is_up_to_date_then_returns_true(self):
+        service = _service(
+            [ServicePort(name="f1", port=2152, protocol="UDP", targetPort=2152)],
+            labels={"app.kubernetes.io/name": "du", "other": "label"},
+            annotations={"other": "annotation"},
+        )
+
+        self.assertTrue(self.service_patcher.is_up_to_date(service))
+
+    def test_given_port_with_other_protocol_when_is_up_to_date_then_returns_false(self):
+        service = _service([ServicePort(name="f1", port=2152, protocol="SCTP")])
+
+        self.assertFalse(self.service_patcher.is_up_to_date(service))
+
+    def test_given_service_of_other_type_when_is_up_to_date_then_returns_false(self):
+        service = _service([F1_PORT])
+        service.spec.type = "LoadBalancer"
+
+        self.assertFalse(self.service_patcher.is_up_to_date(service))
+
+    def test_given_juju_placeholder_port_when_stale_ports_then_it_is_returned(self):
+        placeholder = ServicePort(name="placeholder", port=65535)
+
+        self.assertEqual(
+            self.service_patcher.stale_ports(_service([placeholder, F1_PORT])), [placeholder]
+        )
+
+    def test_given_outdated_service_when_upgrade_charm_then_spec_is_server_side_applied(self):
+        self.client.get.return_value = _service(
+            [ServicePort(name="f1", port=2152, protocol="UDP", targetPort=2153)]
+        )
+
+        self.harness.charm.on.upgrade_charm.emit()
+
+        self.client.patch.assert_called_once()
+        self.assertEqual(self.client.patch.call_args.kwargs["patch_type"], PatchType.APPLY)
+        self.assertEqual(self.client.patch.call_args.kwargs["field_manager"], "du-service-patch")
+        self.client.delete.assert_not_called()
+
+    def test_given_juju_placeholder_port_when_upgrade_charm_then_ports_are_replaced(self):
+        self.client.get.return_value = _service([ServicePort(name="placeholder", port=65535)])
+
+        self.harness.charm.on.upgrade_charm.emit()
+
+        self.assertEqual(self.client.patch.call_count, 2)
+        self.assertEqual(self.client.patch.call_args.kwargs["patch_type"], PatchType.MERGE)
+        self.assertEqual(
+            self.client.patch.call_args.kwargs["obj"],
+            {"spec": {"ports": [{"name": "f1", "port": 2152, "protocol": "UDP"}]}},
+        )
+
+    def test_given_service_up_to_date_when_upgrade_charm_then_it_is_not_patched(self):
+        self.client.get.return_value = _service([F1_PORT])
+
+        self.harness.charm.on.upgrade_charm.emit()
+
+        self.client.patch.assert_not_called()
+
+    def test_given_outdated_service_when_install_then_it_is_left_to_the_charm(self):
+        self.client.get.return_value = _service([ServicePort(name="placeholder", port=65535)])
+
+        self.harness.charm.on.install.emit()
+
+        self.client.get.assert_not_called()
+        self.client.patch.assert_not_called()
+
+    def test_given_api_error_when_upgrade_charm_then_it_is_logged(self):
+        self.client.get.side_effect = ApiError(status=Status(code=403, message="forbidden"))
+
+        with self.assertLogs("service_patch", level="ERROR"):
+            self.harness.charm.on.upgrade_charm.emit()
@@ -0,0 +1,75 @@
+# Copyright 2022 Guillaume Belanger
+# See LICENSE file for licensing details.
+
+import unittest
+
+from libconfig import Hex, Int64, LibconfigError, dumps
+
+
+class TestLibconfig(unittest.TestCase):
+    def test_given_scalars_when_dumps_then_each_type_is_written_in_libconfig_syntax(self):
+        content = dumps(
+            {
+                "integer": 3,
+                "negative": -90,
+                "boolean": True,
+                "float": 0.5,
+                "string": "oai",
+                "big": Int64(12345678),
+                "id": Hex(0xE00),
+                "padded": Hex(1, 6),
+            }
+        )
+
+        self.assertEqual(
+            content,
+            "integer = 3;\n\n"
+            "negative = -90;\n\n"
+            "boolean = true;\n\n"
+            "float = 0.5;\n\n"
+            'string = "oai";\n\n'
+            "big = 12345678L;\n\n"
+            "id = 0xe00;\n\n"
+            "padded = 0x000001;\n",
+        )
+
+    def test_given_nested_groups_lists_and_arrays_when_dumps_then_structure_is_indented(self):
+        content = dumps(
+            {
+                "Active_gNBs": ("du",),
+                "gNBs": [{"bands": [78], "SCTP": {"SCTP_INSTREAMS": 2}}],
+                "options": (),
+            }
+        )
+
+        self.assertEqual(
+            content,
+            'Active_gNBs = ("du");\n\n'
+            "gNBs = (\n"
+            "  {\n"
+            "    bands = [78];\n"
+            "    SCTP = {\n"
+            "      SCTP_INSTREAMS = 2;\n"
+            "    };\n"
+            "  }\n"
+            ");\n\n"
+            "options = ();\n",
+        )
+
+    def test_given_string_with_quotes_when_dumps_then_string_is_escaped(self):
+        content = dumps({"name": 'a "b" \\ c'})
+
+        self.assertEqual(content, 'name = "a \\"b\\" \\\\ c";\n')
+
+    def test_given_same_settings_when_dumps_twice_then_output_is_identical(self):
+        settings = {"b": 1, "a": {"c": [1, 2]}}
+
+        self.assertEqual(dumps(settings), dumps(dict(settings)))
+
+    def test_given_invalid_setting_name_when_dumps_then_error_is_raised(self):
+        with self.assertRaises(LibconfigError):
+            dumps({"1invalid": 1})
+
+    def test_given_unsupported_value_when_dumps_then_error_is_raised(self):
+        with self.assertRaises(LibconfigError):
+            dumps({"value": None})
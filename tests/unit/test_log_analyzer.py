@@ -0,0 +1,111 @@
+# Copyright 2022 Guillaume Belanger
+# See LICENSE file for licensing details.
+
+import os
+import socketserver
+import tempfile
+import threading
+import unittest
+
+from log_analyzer import (
+    LogAnalyzer,
+    RollingHistogram,
+    follow_service_logs,
+    is_kpi_message,
+    parse_log_entry,
+)
+
+LOGS_RESPONSE = (
+    b"HTTP/1.1 200 OK\r\nContent-Type: application/x-ndjson\r\nConnection: close\r\n\r\n"
+    b'{"time":"2022-09-23T12:34:56Z","service":"du","message":"first\\n"}\n'
+    b'{"time":"2022-09-23T12:34:57Z","service":"du","message":"second\\n"}\n'
+)
+
+
+class PebbleLogsHandler(socketserver.StreamRequestHandler):
+    def handle(self):
+        self.server.request_line = self.rfile.readline()  # type: ignore[attr-defined]
+        while self.rfile.readline() not in (b"\r\n", b""):
+            pass
+        self.wfile.write(LOGS_RESPONSE)
+
+
+class TestLogAnalyzer(unittest.TestCase):
+    def setUp(self):
+        self.analyzer = LogAnalyzer()
+
+    def test_given_softmodem_restarted_when_f1_setup_response_then_latencies_are_recorded(self):
+        self.analyzer.process(100.0, 'CMDLINE: "/opt/oai-gnb/bin/nr-softmodem" "-O"')
+        self.analyzer.process(103.0, "[F1AP]   I F1AP_SETUP_REQ sent")
+        self.analyzer.process(103.5, "[GNB_APP]   I Received F1AP_SETUP_RESP: 1 cell to activate")
+
+        kpis = self.analyzer.kpis()
+
+        self.assertEqual(kpis["f1-setup-latency"]["last"], 0.5)
+        self.assertEqual(kpis["restart-to-ready"]["last"], 3.5)
+
+    def test_given_ue_attaches_when_process_then_ra_and_attach_durations_are_recorded(self):
+        self.analyzer.process(
+            10.0, "[NR_MAC]   I [RAPROC] Initiating RA procedure with preamble 2"
+        )
+        self.analyzer.process(10.01, "[NR_MAC]   I Activating Msg2 using RA-RNTI 10b TC-RNTI 4a3b")
+        self.analyzer.process(10.05, "[NR_MAC]   I (UE RNTI 0x4a3b) Received Ack of Msg4. CBRA")
+        self.analyzer.process(10.8, "[F1AP]   I UE Context Setup Request for RNTI 4A3B")
+
+        kpis = self.analyzer.kpis()
+
+        self.assertAlmostEqual(kpis["ra-duration"]["last"], 0.05)
+        self.assertAlmostEqual(kpis["attach-duration"]["last"], 0.8)
+
+    def test_given_errors_logged_when_kpis_then_errors_of_last_minute_are_counted(self):
+        self.analyzer.process(0.0, "[PHY]   E old error")
+        self.analyzer.process(90.0, "[NR_MAC]   E recent error")
+        self.analyzer.process(100.0, "[NR_MAC]   W warning")
+
+        kpis = self.analyzer.kpis()
+
+        self.assertEqual(
+            kpis["log-errors"], {"errors": 2, "warnings": 1, "errors-per-minute": 1.0}
+        )
+
+    def test_given_more_samples_than_window_when_observe_then_window_is_bounded(self):
+        histogram = RollingHistogram(buckets=(1.0, 10.0), window_size=4)
+
+        for value in range(20):
+            histogram.observe(float(value))
+
+        self.assertEqual(len(histogram.recent), 4)
+        self.assertEqual(histogram.summary()["count"], 20)
+        self.assertEqual(histogram.summary()["p50"], 18.0)
+        self.assertIn('f1_bucket{le="10.0"} 11', histogram.metric_lines("f1", "F1."))
+        self.assertIn('f1_bucket{le="+Inf"} 20', histogram.metric_lines("f1", "F1."))
+
+    def test_given_log_lines_when_is_kpi_message_then_only_measured_procedures_match(self):
+        self.assertTrue(is_kpi_message("[F1AP]   I F1AP_SETUP_REQ sent"))
+        self.assertTrue(is_kpi_message("[NR_MAC]   I (UE RNTI 0x4a3b) Received Ack of Msg4. CBRA"))
+        self.assertFalse(is_kpi_message("[NR_MAC]   I Frame.Slot 128.0"))
+
+    def test_given_pebble_log_entry_when_parse_log_entry_then_time_and_message_are_returned(self):
+        entry = parse_log_entry(
+            b'{"time":"2022-09-23T12:34:56.250000000Z","service":"du","message":"[PHY] I ok\\n"}'
+        )
+
+        self.assertEqual(entry, (1663936496.25, "[PHY] I ok"))
+
+    def test_given_invalid_line_when_parse_log_entry_then_none_is_returned(self):
+        self.assertIsNone(parse_log_entry(b"not json"))
+
+    def test_given_pebble_socket_when_follow_service_logs_then_log_lines_are_yielded(self):
+        with tempfile.TemporaryDirectory() as directory:
+            socket_path = os.path.join(directory, "pebble.socket")
+            server = socketserver.UnixStreamServer(socket_path, PebbleLogsHandler)
+            self.addCleanup(server.server_close)
+            threading.Thread(target=server.handle_request, daemon=True).start()
+
+            entries = list(follow_service_logs(socket_path, "du"))
+
+        self.assertEqual(entries, [(1663936496.0, "first"), (1663936497.0, "second")])
+        self.assertEqual(
+            server.request_line,  # type: ignore[attr-defined]
+            b"GET /v1/logs?follow=true&n=0&services=du HTTP/1.1\r\n",
+        )
@@ -0,0 +1,119 @@
+# Copyright 2022 Guillaume Belanger
+# See LICENSE file for licensing details.
+
+import errno
+import fcntl
+import io
+import os
+import queue
+import tempfile
+import unittest
+from unittest.mock import patch
+
+from log_writer import (
+    READ_SIZE,
+    LineReader,
+    LogWriterError,
+    RotatingFile,
+    exec_writing_to_fifo,
+    forwarded_lines,
+    log_volume_size_mb,
+    validate_log_settings,
+    write_chunks,
+)
+
+
+class TestLogWriter(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.addCleanup(self.directory.cleanup)
+        self.path = os.path.join(self.directory.name, "nr-softmodem.log")
+
+    def test_given_file_full_when_write_then_file_is_rotated_and_oldest_dropped(self):
+        log_file = RotatingFile(self.path, max_bytes=8, backups=2)
+        for line in (b"first\n", b"second\n", b"third\n", b"fourth\n"):
+            log_file.write(line)
+        log_file.close()
+
+        with open(self.path, "rb") as current, open(f"{self.path}.1", "rb") as previous:
+            self.assertEqual(current.read(), b"fourth\n")
+            self.assertEqual(previous.read(), b"third\n")
+        with open(f"{self.path}.2", "rb") as oldest:
+            self.assertEqual(oldest.read(), b"second\n")
+        self.assertFalse(os.path.exists(f"{self.path}.3"))
+
+    def test_given_chunks_when_write_chunks_then_file_holds_all_lines_and_output_the_forwarded_ones(  # noqa: E501
+        self,
+    ):
+        chunks: "queue.Queue" = queue.Queue()
+        chunks.put(b"[NR_MAC]   I Frame.Slot 128.0\n[PHY]   E rx error\n")
+        chunks.put(b"[F1AP]   I F1AP_SETUP_REQ sent\n")
+        chunks.put(None)
+        log_file = RotatingFile(self.path, max_bytes=2**20, backups=1)
+        output = io.BytesIO()
+
+        write_chunks(chunks, log_file, output)
+        log_file.close()
+
+        with open(self.path, "rb") as current:
+            self.assertEqual(current.read().count(b"\n"), 3)
+        self.assertEqual(
+            output.getvalue(), b"[PHY]   E rx error\n[F1AP]   I F1AP_SETUP_REQ sent\n"
+        )
+
+    def test_given_file_volume_full_when_write_chunks_then_error_is_reported_and_writing_goes_on(
+        self,
+    ):
+        chunks: "queue.Queue" = queue.Queue()
+        for chunk in (b"[PHY]   I first\n", b"[PHY]   I second\n", b"[PHY]   I third\n", None):
+            chunks.put(chunk)
+        log_file = RotatingFile(self.path, max_bytes=2**20, backups=1)
+        output = io.BytesIO()
+        full = OSError(errno.ENOSPC, "No space left on device")
+
+        with patch.object(log_file._file, "write", side_effect=[full, full, 17]):
+            write_chunks(chunks, log_file, output)
+
+        self.assertEqual(
+            output.getvalue(),
+            f"log_writer: failed to write {self.path}: [Errno 28] No space left on device\n"
+            "log_writer: dropped 33 bytes from the file\n".encode(),
+        )
+
+    def test_given_fifo_when_exec_writing_to_fifo_then_command_output_does_not_block(self):
+        fifo_path = os.path.join(self.directory.name, "nr-softmodem.fifo")
+        os.mkfifo(fifo_path)
+        flags = []
+
+        def dup2(fd: int, _: int) -> None:
+            flags.append(fcntl.fcntl(fd, fcntl.F_GETFL))
+
+        with patch("os.dup2", side_effect=dup2), patch("os.execvp") as patch_execvp:
+            exec_writing_to_fifo(fifo_path, ["nr-softmodem", "--sa"])
+
+        self.assertEqual(len(flags), 2)
+        for flag in flags:
+            self.assertTrue(flag & os.O_NONBLOCK)
+            self.assertEqual(flag & os.O_ACCMODE, os.O_RDWR)
+        patch_execvp.assert_called_once_with("nr-softmodem", ["nr-softmodem", "--sa"])
+
+    def test_given_informational_line_when_forwarded_lines_then_it_is_not_forwarded(self):
+        self.assertEqual(
+            forwarded_lines(b"[NR_MAC]   I Frame.Slot 128.0\n[HW]   W late\n"),
+            [b"[HW]   W late\n"],
+        )
+
+    def test_given_partial_lines_when_feed_then_only_complete_lines_are_returned(self):
+        reader = LineReader()
+
+        self.assertEqual(reader.feed(b"first\nsec"), b"first\n")
+        self.assertEqual(reader.feed(b"ond"), b"")
+        self.assertEqual(reader.feed(b"\n"), b"second\n")
+        self.assertEqual(len(reader.feed(b"x" * READ_SIZE)), READ_SIZE)
+
+    def test_given_log_settings_when_log_volume_size_mb_then_files_fit(self):
+        self.assertEqual(log_volume_size_mb(max_size_mb=64, backups=3), 257)
+
+    def test_given_too_many_backups_when_validate_log_settings_then_error_is_raised(self):
+        with self.assertRaises(LogWriterError):
+            validate_log_settings(max_size_mb=64, backups=11)
@@ -0,0 +1,65 @@
+# Copyright 2022 Guillaume Belanger
+# See LICENSE file for licensing details.
+
+import unittest
+
+from mimo import AntennaConfig, MimoConfigError
+
+
+def _antenna_config(**kwargs) -> AntennaConfig:
+    values = {
+        "n_tx": 1,
+        "n_rx": 1,
+        "max_mimo_layers": 1,
+        "pdsch_antenna_ports": 1,
+        "pusch_antenna_ports": 1,
+        "enable_256qam": False,
+    }
+    values.update(kwargs)
+    return AntennaConfig(**values)
+
+
+class TestAntennaConfig(unittest.TestCase):
+    def test_given_single_antenna_when_beamforming_weights_then_oai_default_1x4_matrix_is_returned(  # noqa: E501
+        self,
+    ):
+        antenna_config = _antenna_config()
+
+        self.assertEqual(antenna_config.beamforming_weights, [0x7FFF, 0, 0, 0])
+
+    def test_given_4x4_configuration_when_beamforming_weights_then_identity_matrix_is_returned(
+        self,
+    ):
+        antenna_config = _antenna_config(n_tx=4, pdsch_antenna_ports=4)
+
+        weights = antenna_config.beamforming_weights
+
+        self.assertEqual(len(weights), 16)
+        for antenna in range(4):
+            for port in range(4):
+                expected = 0x7FFF if antenna == port else 0
+                self.assertEqual(weights[antenna * 4 + port], expected)
+
+    def test_given_4_pdsch_ports_when_antenna_ports_then_ports_are_cross_polarized(self):
+        antenna_config = _antenna_config(n_tx=4, pdsch_antenna_ports=4, max_mimo_layers=4)
+
+        antenna_config.validate()
+
+        self.assertEqual(antenna_config.pdsch_antenna_ports_xp, 2)
+        self.assertEqual(antenna_config.pdsch_antenna_ports_n1, 2)
+
+    def test_given_more_pdsch_ports_than_tx_antennas_when_validate_then_error_is_raised(self):
+        with self.assertRaises(MimoConfigError):
+            _antenna_config(n_tx=1, pdsch_antenna_ports=2).validate()
+
+    def test_given_more_pusch_ports_than_rx_antennas_when_validate_then_error_is_raised(self):
+        with self.assertRaises(MimoConfigError):
+            _antenna_config(n_rx=2, pusch_antenna_ports=4).validate()
+
+    def test_given_more_layers_than_pdsch_ports_when_validate_then_error_is_raised(self):
+        with self.assertRaises(MimoConfigError):
+            _antenna_config(n_tx=2, pdsch_antenna_ports=2, max_mimo_layers=4).validate()
+
+    def test_given_invalid_antenna_count_when_validate_then_error_is_raised(self):
+        with self.assertRaises(MimoConfigError):
+            _antenna_config(n_tx=3).validate()
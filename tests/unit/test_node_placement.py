@@ -0,0 +1,83 @@
+# Copyright 2022 Guillaume Belanger
+# See LICENSE file for licensing details.
+
+import unittest
+
+from node_placement import (
+    NodeInfo,
+    NodePlacementError,
+    NoSuitableNodeError,
+    Taint,
+    Toleration,
+    check_placement,
+    parse_node_selector,
+    parse_tolerations,
+    suitable_nodes,
+)
+
+RT_TAINT = Taint(key="isolcpus", value="true", effect="NoSchedule")
+NODES = [
+    NodeInfo(name="rt-1", labels={"realtime": "true"}, taints=[RT_TAINT]),
+    NodeInfo(name="rt-2", labels={"realtime": "true"}, taints=[RT_TAINT], unschedulable=True),
+    NodeInfo(
+        name="rt-3",
+        labels={"realtime": "true"},
+        taints=[Taint(key="gpu", effect="PreferNoSchedule")],
+    ),
+    NodeInfo(name="generic", labels={}, taints=[]),
+]
+
+
+class TestNodePlacement(unittest.TestCase):
+    def test_given_node_selector_when_parse_node_selector_then_labels_are_returned(self):
+        self.assertEqual(
+            parse_node_selector("realtime=true, kubernetes.io/arch=amd64,"),
+            {"realtime": "true", "kubernetes.io/arch": "amd64"},
+        )
+
+    def test_given_entry_without_value_when_parse_node_selector_then_error_is_raised(self):
+        with self.assertRaises(NodePlacementError):
+            parse_node_selector("realtime")
+
+    def test_given_taints_when_parse_tolerations_then_tolerations_are_returned(self):
+        tolerations = parse_tolerations("isolcpus=true:NoSchedule,realtime")
+
+        self.assertEqual(
+            tolerations,
+            [
+                Toleration(key="isolcpus", value="true", effect="NoSchedule"),
+                Toleration(key="realtime"),
+            ],
+        )
+        self.assertEqual(
+            [toleration.to_dict() for toleration in tolerations],
+            [
+                {"key": "isolcpus", "operator": "Equal", "value": "true", "effect": "NoSchedule"},
+                {"key": "realtime", "operator": "Exists"},
+            ],
+        )
+
+    def test_given_unknown_effect_when_parse_tolerations_then_error_is_raised(self):
+        with self.assertRaises(NodePlacementError):
+            parse_tolerations("isolcpus:NoRun")
+
+    def test_given_node_selector_and_tolerations_when_suitable_nodes_then_only_schedulable_tolerated_nodes_are_returned(  # noqa: E501
+        self,
+    ):
+        self.assertEqual(suitable_nodes(NODES, {"realtime": "true"}, []), ["rt-3"])
+        self.assertEqual(
+            suitable_nodes(NODES, {"realtime": "true"}, [Toleration(key="isolcpus")]),
+            ["rt-1", "rt-3"],
+        )
+
+    def test_given_fewer_suitable_nodes_than_units_when_check_placement_with_spread_then_error_is_raised(  # noqa: E501
+        self,
+    ):
+        check_placement(NODES, {"realtime": "true"}, [], spread_across_nodes=False, units=3)
+        with self.assertRaises(NoSuitableNodeError) as context:
+            check_placement(NODES, {"realtime": "true"}, [], spread_across_nodes=True, units=3)
+
+        self.assertEqual(
+            str(context.exception),
+            "spread-across-nodes needs 3 nodes, 1 match node-selector and tolerations",
+        )
@@ -0,0 +1,67 @@
+# Copyright 2022 Guillaume Belanger
+# See LICENSE file for licensing details.
+
+import unittest
+
+from performance_profile import (
+    PARAMETER_RANGES,
+    PROFILES,
+    PerformanceProfileError,
+    get_performance_parameters,
+    parse_overrides,
+)
+
+
+class TestPerformanceProfile(unittest.TestCase):
+    def test_given_profiles_when_get_performance_parameters_then_every_profile_is_valid(self):
+        for profile in PROFILES:
+            with self.subTest(profile=profile):
+                parameters = get_performance_parameters(profile, overrides={})
+
+                self.assertEqual(set(parameters), set(PARAMETER_RANGES))
+
+    def test_given_low_latency_profile_when_get_performance_parameters_then_min_rxtxtime_is_2(
+        self,
+    ):
+        parameters = get_performance_parameters("low-latency", overrides={})
+
+        self.assertEqual(parameters["min_rxtxtime"], 2)
+
+    def test_given_override_when_get_performance_parameters_then_override_replaces_profile_value(  # noqa: E501
+        self,
+    ):
+        parameters = get_performance_parameters(
+            "high-throughput", overrides=parse_overrides("pusch_TargetSNRx10=300")
+        )
+
+        self.assertEqual(parameters["pusch_TargetSNRx10"], 300)
+        self.assertEqual(parameters["SCTP_INSTREAMS"], 16)
+
+    def test_given_out_of_range_override_when_get_performance_parameters_then_error_is_raised(
+        self,
+    ):
+        with self.assertRaises(PerformanceProfileError):
+            get_performance_parameters("balanced", overrides={"ra_ResponseWindow": 8})
+
+    def test_given_incomplete_custom_profile_when_get_performance_parameters_then_error_is_raised(  # noqa: E501
+        self,
+    ):
+        with self.assertRaises(PerformanceProfileError):
+            get_performance_parameters("custom", overrides={"min_rxtxtime": 2})
+
+    def test_given_complete_custom_profile_when_get_performance_parameters_then_overrides_are_used(  # noqa: E501
+        self,
+    ):
+        overrides = dict(PROFILES["balanced"], min_rxtxtime=3)
+
+        parameters = get_performance_parameters("custom", overrides=overrides)
+
+        self.assertEqual(parameters, overrides)
+
+    def test_given_unknown_parameter_when_parse_overrides_then_error_is_raised(self):
+        with self.assertRaises(PerformanceProfileError):
+            parse_overrides("max_rxtxtime=2")
+
+    def test_given_non_integer_value_when_parse_overrides_then_error_is_raised(self):
+        with self.assertRaises(PerformanceProfileError):
+            parse_overrides("min_rxtxtime=fast")
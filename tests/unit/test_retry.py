@@ -0,0 +1,96 @@
+# Copyright 2022 Guillaume Belanger
+# See LICENSE file for licensing details.
+
+import unittest
+from unittest.mock import MagicMock
+
+from lightkube.core.exceptions import ApiError
+from lightkube.models.meta_v1 import Status
+
+from retry import Retrier, RetryPolicy
+
+
+def _api_error(code: int, retry_after=None) -> ApiError:
+    error = ApiError(status=Status(code=code, message="error"))
+    if retry_after is not None:
+        error.response = MagicMock(headers={"Retry-After": retry_after})
+    return error
+
+
+class FakeClock:
+    def __init__(self):
+        """Starts at 0 seconds."""
+        self.now = 0.0
+        self.sleeps = []
+
+    def __call__(self) -> float:
+        return self.now
+
+    def sleep(self, delay: float) -> None:
+        self.sleeps.append(delay)
+        self.now += delay
+
+
+class TestRetrier(unittest.TestCase):
+    def setUp(self):
+        self.clock = FakeClock()
+        self.retrier = Retrier(
+            policy=RetryPolicy(base_delay=1, max_delay=4, budget=20),
+            clock=self.clock,
+            sleep=self.clock.sleep,
+            jitter=lambda: 1.0,
+        )
+
+    def test_given_server_errors_when_call_then_it_is_retried_with_capped_exponential_backoff(
+        self,
+    ):
+        function = MagicMock(side_effect=[_api_error(503)] * 4 + ["result"])
+
+        self.assertEqual(self.retrier.call(function, "a", key="b"), "result")
+        self.assertEqual(self.clock.sleeps, [1, 2, 4, 4])
+        self.assertEqual(self.retrier.retries, 4)
+        function.assert_called_with("a", key="b")
+
+    def test_given_jitter_when_call_then_delay_is_between_half_and_full_backoff(self):
+        self.retrier = Retrier(
+            policy=RetryPolicy(base_delay=1),
+            clock=self.clock,
+            sleep=self.clock.sleep,
+            jitter=lambda: 0.0,
+        )
+        function = MagicMock(side_effect=[ConnectionResetError(), "result"])
+
+        self.retrier.call(function)
+
+        self.assertEqual(self.clock.sleeps, [0.5])
+
+    def test_given_throttled_with_retry_after_when_call_then_requested_delay_is_honoured(self):
+        function = MagicMock(side_effect=[_api_error(429, retry_after="7"), "result"])
+
+        self.retrier.call(function)
+
+        self.assertEqual(self.clock.sleeps, [7.0])
+
+    def test_given_client_error_when_call_then_it_is_raised_without_retry(self):
+        function = MagicMock(side_effect=_api_error(404))
+
+        with self.assertRaises(ApiError):
+            self.retrier.call(function)
+
+        self.assertEqual(function.call_count, 1)
+        self.assertEqual(self.retrier.retries, 0)
+
+    def test_given_errors_beyond_time_budget_when_call_then_last_error_is_raised(self):
+        function = MagicMock(side_effect=_api_error(500))
+
+        with self.assertRaises(ApiError):
+            self.retrier.call(function)
+
+        self.assertLessEqual(sum(self.clock.sleeps), 20)
+        self.assertEqual(self.clock.sleeps, [1, 2, 4, 4, 4, 4])
+
+    def test_given_budget_spent_by_previous_calls_when_call_then_error_is_raised(self):
+        self.clock.now = 19.5
+
+        with self.assertRaises(ApiError):
+            self.retrier.call(MagicMock(side_effect=_api_error(502)))
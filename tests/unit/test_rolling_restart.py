@@ -0,0 +1,163 @@
+# Copyright 2022 Guillaume Belanger
+# See LICENSE file for licensing details.
+
+import unittest
+
+from rolling_restart import (
+    GRANT_TIMEOUT_SECONDS,
+    Grant,
+    RollingRestartError,
+    grant_restarts,
+    grants_from_json,
+    grants_to_json,
+    validate_rolling_restart,
+)
+
+UNITS = ["du/0", "du/1", "du/2", "du/10"]
+ALL_SERVING = {unit: True for unit in UNITS}
+NOW = 1000000.0
+
+
+class TestRollingRestart(unittest.TestCase):
+    def test_given_requests_when_grant_restarts_then_units_are_granted_in_unit_order(self):
+        grants = grant_restarts(
+            units=UNITS,
+            requests={"du/10": "a", "du/2": "a"},
+            grants={},
+            serving=ALL_SERVING,
+            max_concurrent=1,
+            min_serving_percent=0,
+            now=NOW,
+        )
+
+        self.assertEqual(grants, {"du/2": Grant(request="a", time=NOW, serving=True)})
+
+    def test_given_granted_unit_still_requesting_when_grant_restarts_then_next_unit_waits(self):
+        current_grants = {"du/0": Grant(request="a", time=NOW - 60, serving=True)}
+
+        grants = grant_restarts(
+            units=UNITS,
+            requests={"du/0": "a", "du/1": "a"},
+            grants=current_grants,
+            serving={**ALL_SERVING, "du/0": False},
+            max_concurrent=1,
+            min_serving_percent=0,
+            now=NOW,
+        )
+
+        self.assertEqual(grants, current_grants)
+
+    def test_given_granted_unit_withdrew_request_when_grant_restarts_then_next_unit_is_granted(
+        self,
+    ):
+        grants = grant_restarts(
+            units=UNITS,
+            requests={"du/1": "a"},
+            grants={"du/0": Grant(request="a", time=NOW - 60, serving=True)},
+            serving=ALL_SERVING,
+            max_concurrent=1,
+            min_serving_percent=0,
+            now=NOW,
+        )
+
+        self.assertEqual(grants, {"du/1": Grant(request="a", time=NOW, serving=True)})
+
+    def test_given_serving_floor_when_grant_restarts_then_only_serving_units_above_floor_are_granted(  # noqa: E501
+        self,
+    ):
+        grants = grant_restarts(
+            units=UNITS,
+            requests={unit: "a" for unit in UNITS},
+            grants={},
+            serving={**ALL_SERVING, "du/10": False},
+            max_concurrent=4,
+            min_serving_percent=50,
+            now=NOW,
+        )
+
+        self.assertEqual(
+            grants,
+            {
+                "du/0": Grant(request="a", time=NOW, serving=True),
+                "du/10": Grant(request="a", time=NOW, serving=False),
+            },
+        )
+
+    def test_given_units_not_serving_when_grant_restarts_then_they_are_granted_beyond_max_concurrent(  # noqa: E501
+        self,
+    ):
+        grants = grant_restarts(
+            units=UNITS,
+            requests={unit: "a" for unit in UNITS},
+            grants={"du/0": Grant(request="a", time=NOW - 60, serving=True)},
+            serving={unit: False for unit in UNITS},
+            max_concurrent=1,
+            min_serving_percent=50,
+            now=NOW,
+        )
+
+        self.assertEqual(set(grants), set(UNITS))
+
+    def test_given_unit_granted_while_not_serving_when_grant_restarts_then_serving_unit_is_granted(  # noqa: E501
+        self,
+    ):
+        grants = grant_restarts(
+            units=UNITS,
+            requests={"du/0": "a", "du/1": "a"},
+            grants={"du/0": Grant(request="a", time=NOW - 60, serving=False)},
+            serving={**ALL_SERVING, "du/0": False},
+            max_concurrent=1,
+            min_serving_percent=0,
+            now=NOW,
+        )
+
+        self.assertEqual(grants["du/1"], Grant(request="a", time=NOW, serving=True))
+
+    def test_given_granted_unit_stuck_past_timeout_when_grant_restarts_then_next_unit_is_granted(
+        self,
+    ):
+        stuck_grant = Grant(request="a", time=NOW - GRANT_TIMEOUT_SECONDS, serving=True)
+
+        grants = grant_restarts(
+            units=UNITS,
+            requests={"du/0": "a", "du/1": "a"},
+            grants={"du/0": stuck_grant},
+            serving={**ALL_SERVING, "du/0": False},
+            max_concurrent=1,
+            min_serving_percent=0,
+            now=NOW,
+        )
+
+        self.assertEqual(
+            grants,
+            {"du/0": stuck_grant, "du/1": Grant(request="a", time=NOW, serving=True)},
+        )
+
+    def test_given_granted_unit_requests_other_restart_when_grant_restarts_then_grant_is_renewed(
+        self,
+    ):
+        grants = grant_restarts(
+            units=["du/0"],
+            requests={"du/0": "b"},
+            grants={
+                "du/0": Grant(request="a", time=NOW - 60, serving=True),
+                "du/1": Grant(request="a", time=NOW - 60, serving=True),
+            },
+            serving={"du/0": False},
+            max_concurrent=1,
+            min_serving_percent=50,
+            now=NOW,
+        )
+
+        self.assertEqual(grants, {"du/0": Grant(request="b", time=NOW, serving=False)})
+
+    def test_given_grants_when_published_then_they_are_read_back(self):
+        grants = {"du/0": Grant(request="a", time=NOW, serving=True)}
+
+        self.assertEqual(grants_from_json(grants_to_json(grants)), grants)
+
+    def test_given_serving_floor_of_100_percent_when_validate_rolling_restart_then_error_is_raised(  # noqa: E501
+        self,
+    ):
+        with self.assertRaises(RollingRestartError):
+            validate_rolling_restart(max_concurrent=1, min_serving_percent=100)
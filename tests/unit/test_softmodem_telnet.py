@@ -0,0 +1,56 @@
+# Copyright 2022 Guillaume Belanger
+# See LICENSE file for licensing details.
+
+import unittest
+from unittest.mock import call, patch
+
+from softmodem_telnet import SoftmodemTelnet, SoftmodemTelnetError
+
+LOG_SHOW_OUTPUT = (
+    "softmodem> log show\n"
+    "component                 verbosity  output\n"
+    " 00               PHY:      info     stdout\n"
+    " 01               MAC:      info     stdout\n"
+    " 12               RLC:      info     stdout\n"
+    " 25              F1AP:     debug     stdout\n"
+)
+
+
+class TestSoftmodemTelnet(unittest.TestCase):
+    @patch("softmodem_telnet.SoftmodemTelnet.run")
+    def test_given_log_show_output_when_log_components_then_components_are_indexed_by_name(
+        self, patch_run
+    ):
+        patch_run.return_value = LOG_SHOW_OUTPUT
+
+        components = SoftmodemTelnet().log_components()
+
+        self.assertEqual(components, {"phy": 0, "mac": 1, "rlc": 12, "f1ap": 25})
+
+    @patch("softmodem_telnet.SoftmodemTelnet.run")
+    def test_given_global_and_component_levels_when_set_log_levels_then_global_is_applied_first(
+        self, patch_run
+    ):
+        patch_run.return_value = LOG_SHOW_OUTPUT
+
+        SoftmodemTelnet().set_log_levels({"global": "info", "mac": "debug"})
+
+        self.assertEqual(
+            patch_run.call_args_list[1:],
+            [
+                call("softmodem log level_info 0-25"),
+                call("softmodem log level_debug 1-1"),
+            ],
+        )
+
+    @patch("softmodem_telnet.SoftmodemTelnet.run")
+    def test_given_unknown_component_when_set_log_levels_then_error_is_raised(self, patch_run):
+        patch_run.return_value = LOG_SHOW_OUTPUT
+
+        with self.assertRaises(SoftmodemTelnetError):
+            SoftmodemTelnet().set_log_levels({"ngap": "debug"})
+
+    def test_given_server_not_listening_when_run_then_error_is_raised(self):
+        with patch("socket.create_connection", side_effect=ConnectionRefusedError()):
+            with self.assertRaises(SoftmodemTelnetError):
+                SoftmodemTelnet().run("softmodem log show")
@@ -0,0 +1,171 @@
+# Copyright 2022 Guillaume Belanger
+# See LICENSE file for licensing details.
+
+import os
+import tempfile
+import unittest
+
+from log_analyzer import LogAnalyzer
+from stats_exporter import (
+    L1_STATS_FILE,
+    MAC_STATS_FILE,
+    StatsExporter,
+    StatsFile,
+    parse_l1_stats,
+    parse_mac_stats,
+)
+
+MAC_STATS = (
+    "Frame.Slot 256.0\n"
+    "UE RNTI 4a3b CU-UE-ID 1 in-sync PH 28 dB PCMAX 20 dBm, average RSRP -75 (16 meas)\n"
+    "UE 4a3b: CQI 15, RI 1, PMI (0,0)\n"
+    "UE 4a3b: dlsch_rounds 1000/20/3/1, dlsch_errors 1, pucch0_DTX 2, BLER 0.01234 MCS (0) 20\n"
+    "UE 4a3b: ulsch_rounds 500/10/0/0, ulsch_DTX 0, ulsch_errors 0, BLER 0.00500 MCS (0) 16\n"
+    "UE 4a3b: MAC:    TX        1000000 RX         200000 bytes\n"
+    "UE 4a3b: LCID 1: TX            669 RX            276 bytes\n"
+)
+
+L1_STATS = (
+    "max_IO = 40 (80), min_I0 = 0 (2), avg_I0 = 35 dB(0.0.0.0)\n"
+    "PRACH I0 = 29.3 dB\n"
+    "Blacklisted PRBs 2/106\n"
+)
+
+
+class TestStatsExporter(unittest.TestCase):
+    def setUp(self):
+        self.stats_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.stats_dir.cleanup)
+        self.now = 100.0
+
+    def _write(self, file_name: str, content: str, mode: str = "w") -> None:
+        with open(os.path.join(self.stats_dir.name, file_name), mode) as file:
+            file.write(content)
+
+    def test_given_mac_stats_when_parse_mac_stats_then_ue_statistics_are_returned(self):
+        ue = parse_mac_stats(MAC_STATS)["4a3b"]
+
+        self.assertEqual(ue.rsrp_dbm, -75)
+        self.assertEqual(ue.cqi, 15)
+        self.assertEqual(ue.dl_rounds, (1000, 20, 3, 1))
+        self.assertEqual(ue.dl_retransmissions, 24)
+        self.assertEqual(ue.dl_bler, 0.01234)
+        self.assertEqual(ue.dl_mcs, 20)
+        self.assertEqual(ue.ul_retransmissions, 10)
+        self.assertEqual(ue.ul_mcs, 16)
+        self.assertEqual((ue.mac_tx_bytes, ue.mac_rx_bytes), (1000000, 200000))
+
+    def test_given_truncated_line_when_parse_mac_stats_then_it_is_ignored(self):
+        ues = parse_mac_stats(MAC_STATS + "UE 4a3b: dlsch_rou")
+
+        self.assertEqual(ues["4a3b"].dl_mcs, 20)
+
+    def test_given_l1_stats_when_parse_l1_stats_then_cell_statistics_are_returned(self):
+        cell = parse_l1_stats(L1_STATS)
+
+        self.assertEqual(cell.avg_i0_db, 35)
+        self.assertEqual(cell.prach_i0_db, 29.3)
+        self.assertEqual((cell.blacklisted_prbs, cell.total_prbs), (2, 106))
+
+    def test_given_file_unchanged_when_read_then_none_is_returned(self):
+        self._write(MAC_STATS_FILE, MAC_STATS)
+        stats_file = StatsFile(os.path.join(self.stats_dir.name, MAC_STATS_FILE))
+
+        self.assertEqual(stats_file.read(), MAC_STATS)
+        self.assertIsNone(stats_file.read())
+
+    def test_given_lines_appended_when_read_then_whole_content_is_returned(self):
+        self._write(MAC_STATS_FILE, "Frame.Slot 256.0\n")
+        stats_file = StatsFile(os.path.join(self.stats_dir.name, MAC_STATS_FILE))
+        stats_file.read()
+
+        self._write(MAC_STATS_FILE, "UE 4a3b: CQI 15, RI 1, PMI (0,0)\n", mode="a")
+
+        self.assertEqual(stats_file.read(), "Frame.Slot 256.0\nUE 4a3b: CQI 15, RI 1, PMI (0,0)\n")
+
+    def test_given_file_rewritten_when_read_then_new_content_is_returned(self):
+        self._write(MAC_STATS_FILE, MAC_STATS)
+        stats_file = StatsFile(os.path.join(self.stats_dir.name, MAC_STATS_FILE))
+        stats_file.read()
+
+        self._write(MAC_STATS_FILE, MAC_STATS.replace("Frame.Slot 256.0", "Frame.Slot 384.0"))
+
+        self.assertTrue(stats_file.read().startswith("Frame.Slot 384.0\n"))
+
+    def test_given_file_rewritten_with_same_head_and_size_when_read_then_new_content_is_returned(  # noqa: E501
+        self,
+    ):
+        path = os.path.join(self.stats_dir.name, MAC_STATS_FILE)
+        self._write(MAC_STATS_FILE, MAC_STATS)
+        os.utime(path, ns=(0, 0))
+        stats_file = StatsFile(path)
+        stats_file.read()
+
+        self._write(MAC_STATS_FILE, MAC_STATS.replace("TX        1000000", "TX        2000000"))
+        os.utime(path, ns=(1, 1))
+
+        self.assertEqual(parse_mac_stats(stats_file.read())["4a3b"].mac_tx_bytes, 2000000)
+
+    def test_given_mac_bytes_increase_when_render_then_throughput_is_exported(self):
+        exporter = StatsExporter(self.stats_dir.name, clock=lambda: self.now)
+        self._write(MAC_STATS_FILE, MAC_STATS)
+        self._write(L1_STATS_FILE, L1_STATS)
+        exporter.update()
+
+        self.now += 2
+        self._write(
+            MAC_STATS_FILE,
+            MAC_STATS.replace("Frame.Slot 256.0", "Frame.Slot 384.0").replace(
+                "1000000", "1250000"
+            ),
+        )
+        exporter.update()
+
+        metrics = exporter.render()
+        self.assertIn('oai_du_ue_dl_throughput_bits_per_second{rnti="4a3b"} 1000000.0\n', metrics)
+        self.assertIn('oai_du_ue_ul_throughput_bits_per_second{rnti="4a3b"} 0.0\n', metrics)
+        self.assertIn('oai_du_ue_dl_harq_retransmissions_total{rnti="4a3b"} 24\n', metrics)
+        self.assertIn("# TYPE oai_du_ue_dl_bler gauge\n", metrics)
+        self.assertIn('oai_du_ue_dl_bler{rnti="4a3b"} 0.01234\n', metrics)
+        self.assertIn("oai_du_connected_ues 1\n", metrics)
+        self.assertIn("oai_du_cell_blacklisted_prbs 2\n", metrics)
+
+    def test_given_no_stats_file_when_render_then_only_metric_descriptions_are_exported(self):
+        exporter = StatsExporter(self.stats_dir.name)
+        exporter.update()
+
+        metrics = exporter.render()
+
+        self.assertIn("oai_du_connected_ues 0\n", metrics)
+        self.assertNotIn("oai_du_ue_dl_bler{", metrics)
+        self.assertNotIn("\noai_du_cell_avg_i0_db ", metrics)
+
+    def test_given_thread_stats_when_render_then_thread_metrics_are_exported(self):
+        with tempfile.TemporaryDirectory() as proc:
+            task_dir = os.path.join(proc, "1234", "task", "1234")
+            os.makedirs(task_dir)
+            with open(os.path.join(proc, "1234", "comm"), "w") as comm:
+                comm.write("nr-softmodem\n")
+            fields = ["S"] + ["0"] * 36
+            fields[11], fields[12], fields[36] = str(200 * os.sysconf("SC_CLK_TCK")), "0", "3"
+            with open(os.path.join(task_dir, "stat"), "w") as stat:
+                stat.write(f"1234 (nr-softmodem) {' '.join(fields)}\n")
+            exporter = StatsExporter(self.stats_dir.name, thread_stats=True, proc=proc)
+
+            metrics = exporter.render()
+
+        self.assertIn(
+            'oai_du_thread_cpu_seconds_total{tid="1234",name="nr-softmodem"} 200.0\n', metrics
+        )
+        self.assertIn('oai_du_thread_last_cpu{tid="1234",name="nr-softmodem"} 3\n', metrics)
+
+    def test_given_log_analyzer_when_render_then_kpis_are_exported(self):
+        log_analyzer = LogAnalyzer()
+        log_analyzer.process(10.0, "[F1AP]   I F1AP_SETUP_REQ sent")
+        log_analyzer.process(10.2, "[GNB_APP]   I Received F1AP_SETUP_RESP")
+        exporter = StatsExporter(self.stats_dir.name, log_analyzer=log_analyzer)
+
+        metrics = exporter.render()
+
+        self.assertIn('oai_du_f1_setup_latency_seconds_bucket{le="0.25"} 1\n', metrics)
+        self.assertIn("oai_du_log_errors_total 0\n", metrics)
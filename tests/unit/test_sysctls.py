@@ -0,0 +1,35 @@
+# Copyright 2022 Guillaume Belanger
+# See LICENSE file for licensing details.
+
+import unittest
+
+from sysctls import SysctlError, parse_sysctls, split_sysctls, sysctl_path
+
+
+class TestSysctls(unittest.TestCase):
+    def test_given_sysctls_when_parse_sysctls_then_values_are_normalized(self):
+        sysctls = parse_sysctls(
+            " net.core.rmem_max = 26214400 ,net.sctp.sctp_rmem=4096   1048576 26214400,"
+        )
+
+        self.assertEqual(
+            sysctls,
+            {"net.core.rmem_max": "26214400", "net.sctp.sctp_rmem": "4096 1048576 26214400"},
+        )
+
+    def test_given_invalid_sysctls_when_parse_sysctls_then_error_is_raised(self):
+        for value in ["net.core.rmem_max", "rmem_max=1", "net.core.rmem_max=", "a.b=$(reboot)"]:
+            with self.subTest(value=value):
+                with self.assertRaises(SysctlError):
+                    parse_sysctls(value)
+
+    def test_given_safe_and_unsafe_sysctls_when_split_sysctls_then_they_are_separated(self):
+        safe, unsafe = split_sysctls(
+            {"net.ipv4.ip_local_port_range": "1024 65000", "net.core.rmem_max": "26214400"}
+        )
+
+        self.assertEqual(safe, {"net.ipv4.ip_local_port_range": "1024 65000"})
+        self.assertEqual(unsafe, {"net.core.rmem_max": "26214400"})
+
+    def test_given_sysctl_name_when_sysctl_path_then_proc_sys_path_is_returned(self):
+        self.assertEqual(sysctl_path("net.core.rmem_max"), "/proc/sys/net/core/rmem_max")
@@ -0,0 +1,72 @@
+# Copyright 2022 Guillaume Belanger
+# See LICENSE file for licensing details.
+
+import unittest
+
+from tdd_pattern import PRESETS, TddPattern, TddPatternError, get_tdd_pattern
+
+DEFAULT_CUSTOM_PATTERN = TddPattern(
+    periodicity_ms=5.0, dl_slots=7, dl_symbols=6, ul_slots=2, ul_symbols=4
+)
+
+
+class TestTddPattern(unittest.TestCase):
+    def test_given_presets_when_validate_then_all_presets_are_valid(self):
+        for name, patterns in PRESETS.items():
+            for numerology, pattern in patterns.items():
+                with self.subTest(name=name, numerology=numerology):
+                    pattern.validate(numerology)
+
+    def test_given_dl_heavy_preset_at_30khz_when_get_tdd_pattern_then_oai_default_pattern_is_returned(  # noqa: E501
+        self,
+    ):
+        pattern = get_tdd_pattern("dl-heavy", numerology=1, custom=DEFAULT_CUSTOM_PATTERN)
+
+        self.assertEqual(pattern, DEFAULT_CUSTOM_PATTERN)
+        self.assertEqual(pattern.periodicity_index, 6)
+        self.assertEqual(pattern.dl_symbols_per_period, 104)
+        self.assertEqual(pattern.ul_symbols_per_period, 32)
+        self.assertAlmostEqual(pattern.dl_ul_ratio, 3.25)
+
+    def test_given_ul_heavy_preset_when_get_tdd_pattern_then_uplink_capacity_exceeds_downlink(
+        self,
+    ):
+        pattern = get_tdd_pattern("ul-heavy", numerology=1, custom=DEFAULT_CUSTOM_PATTERN)
+
+        self.assertLess(pattern.dl_ul_ratio, 1)
+
+    def test_given_low_latency_preset_at_15khz_when_get_tdd_pattern_then_error_is_raised(self):
+        with self.assertRaises(TddPatternError):
+            get_tdd_pattern("low-latency", numerology=0, custom=DEFAULT_CUSTOM_PATTERN)
+
+    def test_given_custom_pattern_with_too_many_slots_when_get_tdd_pattern_then_error_is_raised(
+        self,
+    ):
+        custom = TddPattern(periodicity_ms=5.0, dl_slots=8, dl_symbols=6, ul_slots=2, ul_symbols=4)
+
+        with self.assertRaises(TddPatternError):
+            get_tdd_pattern("custom", numerology=1, custom=custom)
+
+    def test_given_custom_pattern_without_guard_symbol_when_get_tdd_pattern_then_error_is_raised(
+        self,
+    ):
+        custom = TddPattern(
+            periodicity_ms=5.0, dl_slots=7, dl_symbols=10, ul_slots=2, ul_symbols=4
+        )
+
+        with self.assertRaises(TddPatternError):
+            get_tdd_pattern("custom", numerology=1, custom=custom)
+
+    def test_given_periodicity_not_whole_number_of_slots_when_get_tdd_pattern_then_error_is_raised(  # noqa: E501
+        self,
+    ):
+        custom = TddPattern(
+            periodicity_ms=0.625, dl_slots=0, dl_symbols=6, ul_slots=0, ul_symbols=4
+        )
+
+        with self.assertRaises(TddPatternError):
+            get_tdd_pattern("custom", numerology=1, custom=custom)
+
+    def test_given_unknown_preset_when_get_tdd_pattern_then_error_is_raised(self):
+        with self.assertRaises(TddPatternError):
+            get_tdd_pattern("uplink", numerology=1, custom=DEFAULT_CUSTOM_PATTERN)
@@ -0,0 +1,118 @@
+# Copyright 2022 Guillaume Belanger
+# See LICENSE file for licensing details.
+
+import os
+import tempfile
+import unittest
+
+from thread_stats import (
+    SAMPLE_MARKER,
+    ThreadStatsError,
+    compute_thread_stats,
+    find_pid,
+    format_table,
+    parse_sampler_output,
+    parse_task,
+    read_tasks,
+)
+
+
+def task_stat(tid: int, name: str, utime: int, stime: int, processor: int) -> str:
+    fields = ["S"] + ["0"] * 36
+    fields[11], fields[12], fields[36] = str(utime), str(stime), str(processor)
+    return f"{tid} ({name}) {' '.join(fields)}\n"
+
+
+def task_sched(voluntary: int, involuntary: int) -> str:
+    return (
+        "ru_thread (1235, #threads: 3)\n"
+        "-------------------------------------------------------------------\n"
+        f"nr_voluntary_switches                        :                 {voluntary}\n"
+        f"nr_involuntary_switches                      :                 {involuntary}\n"
+    )
+
+
+def write_proc(proc: str, pid: int, tasks: dict) -> None:
+    os.makedirs(os.path.join(proc, str(pid)), exist_ok=True)
+    with open(os.path.join(proc, str(pid), "comm"), "w") as comm:
+        comm.write("nr-softmodem\n")
+    for tid, files in tasks.items():
+        task_dir = os.path.join(proc, str(pid), "task", str(tid))
+        os.makedirs(task_dir, exist_ok=True)
+        for file_name, content in files.items():
+            with open(os.path.join(task_dir, file_name), "w") as file:
+                file.write(content)
+
+
+class TestThreadStats(unittest.TestCase):
+    def test_given_stat_and_sched_when_parse_task_then_counters_are_returned(self):
+        sample = parse_task(1235, task_stat(1235, "ru_thread", 300, 50, 3) + task_sched(12, 4))
+
+        self.assertEqual(sample.name, "ru_thread")
+        self.assertEqual(sample.cpu_ticks, 350)
+        self.assertEqual(sample.processor, 3)
+        self.assertEqual((sample.voluntary_switches, sample.involuntary_switches), (12, 4))
+
+    def test_given_name_with_parenthesis_when_parse_task_then_name_is_returned(self):
+        sample = parse_task(1235, task_stat(1235, "L1_rx (0)", 1, 1, 0))
+
+        self.assertEqual(sample.name, "L1_rx (0)")
+
+    def test_given_status_without_sched_when_parse_task_then_context_switches_are_returned(self):
+        status = "Name:\tru_thread\nvoluntary_ctxt_switches:\t7\nnonvoluntary_ctxt_switches:\t2\n"
+
+        sample = parse_task(1235, task_stat(1235, "ru_thread", 1, 1, 0) + status)
+
+        self.assertEqual((sample.voluntary_switches, sample.involuntary_switches), (7, 2))
+
+    def test_given_truncated_stat_when_parse_task_then_error_is_raised(self):
+        with self.assertRaises(ThreadStatsError):
+            parse_task(1235, "1235 (ru_thread) S 1 2\n")
+
+    def test_given_two_samples_when_compute_thread_stats_then_busiest_thread_is_first(self):
+        output = (
+            "clk_tck 100\n"
+            f"== 1234\n{task_stat(1234, 'nr-softmodem', 10, 0, 0)}{task_sched(5, 0)}"
+            f"== 1235\n{task_stat(1235, 'ru_thread', 100, 0, 2)}{task_sched(10, 1)}"
+            f"{SAMPLE_MARKER}\n"
+            f"== 1234\n{task_stat(1234, 'nr-softmodem', 11, 0, 1)}{task_sched(7, 0)}"
+            f"== 1235\n{task_stat(1235, 'ru_thread', 180, 10, 2)}{task_sched(10, 21)}"
+            f"== 1236\n{task_stat(1236, 'new_thread', 1, 0, 0)}{task_sched(0, 0)}"
+        )
+        clock_ticks, previous, current = parse_sampler_output(output)
+
+        stats = compute_thread_stats(previous, current, 2.0, clock_ticks)
+
+        self.assertEqual([thread.tid for thread in stats], [1235, 1234])
+        self.assertEqual(stats[0].cpu_percent, 45.0)
+        self.assertEqual(stats[0].involuntary_switches_per_second, 10.0)
+        self.assertEqual(stats[1].voluntary_switches_per_second, 1.0)
+        self.assertEqual(
+            format_table(stats).splitlines()[1],
+            "   1235 ru_thread          45.0       0.0      10.0    2",
+        )
+
+    def test_given_invalid_output_when_parse_sampler_output_then_error_is_raised(self):
+        with self.assertRaises(ThreadStatsError):
+            parse_sampler_output("sh: getconf: not found\n")
+
+    def test_given_process_running_when_read_tasks_then_threads_are_returned(self):
+        with tempfile.TemporaryDirectory() as proc:
+            write_proc(
+                proc,
+                1234,
+                {
+                    1234: {"stat": task_stat(1234, "nr-softmodem", 3, 1, 0)},
+                    1235: {
+                        "stat": task_stat(1235, "ru_thread", 300, 50, 3),
+                        "sched": task_sched(12, 4),
+                    },
+                },
+            )
+
+            pid = find_pid(proc=proc)
+            tasks = read_tasks(1234, proc=proc)
+
+        self.assertEqual(pid, 1234)
+        self.assertEqual(set(tasks), {1234, 1235})
+        self.assertEqual(tasks[1235].involuntary_switches, 4)
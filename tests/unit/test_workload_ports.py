@@ -0,0 +1,25 @@
+# Copyright 2022 Guillaume Belanger
+# See LICENSE file for licensing details.
+
+import unittest
+
+from workload_ports import PortConfigError, WorkloadPort, validate_ports
+
+
+class TestWorkloadPorts(unittest.TestCase):
+    def test_given_same_port_with_different_protocols_when_validate_ports_then_no_error_is_raised(  # noqa: E501
+        self,
+    ):
+        validate_ports([WorkloadPort("f1c", 2153, "SCTP"), WorkloadPort("f1", 2153, "UDP")])
+
+    def test_given_duplicate_ports_when_validate_ports_then_error_is_raised(self):
+        with self.assertRaises(PortConfigError) as context:
+            validate_ports([WorkloadPort("s1u", 2152, "UDP"), WorkloadPort("f1", 2152, "UDP")])
+
+        self.assertEqual(str(context.exception), "2152/UDP is used by both s1u and f1")
+
+    def test_given_out_of_range_port_when_validate_ports_then_error_is_raised(self):
+        for port in (0, 65536):
+            with self.subTest(port=port):
+                with self.assertRaises(PortConfigError):
+                    validate_ports([WorkloadPort("f1c", port, "SCTP")])